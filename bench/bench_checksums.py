@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark parallel checksum verification of a directory of images.
+
+Writes --count files of --size-mb random data plus a SHA256SUMS for them.
+The baseline hashes them one after another with 64 KiB reads, like
+`sha256sum -c`. The engine then runs with one thread, with --jobs threads
+and a second time with a warm digest cache (nothing changed, so nothing
+is hashed). The images are dropped from the page cache before every run.
+
+Usage: python3 bench/bench_checksums.py [--dir /path/on/real/disk] [--count 8] [--size-mb 256] [--jobs 4]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.checksums import OK, verify_images
+from core.isolib import IsoLibrary
+
+
+def evict(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def sequential(root, names):
+    with open(os.path.join(root, 'SHA256SUMS')) as f:
+        expected = dict(reversed(line.split()) for line in f)
+    ok = 0
+    for name in names:
+        digest = hashlib.sha256()
+        with open(os.path.join(root, name), 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(block)
+        ok += digest.hexdigest() == expected[name]
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the images (default: system temp)')
+    parser.add_argument('--count', type=int, default=8)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--jobs', type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-sums-', dir=args.dir)
+    try:
+        root = os.path.join(workdir, 'data')
+        os.mkdir(root)
+        names = []
+        sums = []
+        block = os.urandom(1024 * 1024)
+        for i in range(args.count):
+            name = f"image-{i}.iso"
+            digest = hashlib.sha256()
+            with open(os.path.join(root, name), 'wb') as f:
+                for n in range(args.size_mb):
+                    chunk = block[n % 251 + i:] + block[:n % 251 + i]
+                    f.write(chunk)
+                    digest.update(chunk)
+            names.append(name)
+            sums.append(f"{digest.hexdigest()}  {name}\n")
+        with open(os.path.join(root, 'SHA256SUMS'), 'w') as f:
+            f.writelines(sums)
+        paths = [os.path.join(root, name) for name in names]
+        payload = args.count * args.size_mb * 1024 * 1024
+        library = IsoLibrary('BENCH-0000', os.path.join(workdir, 'index'))
+
+        def engine(jobs, cache):
+            report = verify_images(root, library if cache else None, jobs)
+            return report.count(OK)
+
+        print(f"{args.count} images of {args.size_mb} MiB")
+        baseline = None
+        for name, func in (('sequential, 64 KiB reads', lambda: sequential(root, names)),
+                           ('engine, 1 thread', lambda: engine(1, False)),
+                           (f"engine, {args.jobs} threads", lambda: engine(args.jobs, True)),
+                           (f"engine, {args.jobs} threads, cached", lambda: engine(args.jobs, True))):
+            evict(paths)
+            start = time.perf_counter()
+            ok = func()
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{name:32s}: {elapsed * 1000:8.1f} ms  {payload / elapsed / 1e6:8.1f} MB/s  "
+                  f"x{baseline / elapsed:6.1f}  {ok}/{args.count} OK")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark the start-up time of the headless CLI.
+
+Each command is run --runs times as a fresh process, the way an
+orchestration tool calls it, and the median and best wall times are
+reported. The floor is a bare interpreter. For comparison, the old
+ventoy-gui-cli entry point paid at least for importing PySide6.QtWidgets,
+which is timed too when PySide6 is installed. Every CLI command is also
+checked to have loaded no Qt module at all. PYTHONDONTWRITEBYTECODE
+makes every run recompile cli.py and core.cli, so unset it to see the
+numbers of an installed copy.
+
+Usage: python3 bench/bench_cli_startup.py [--runs 30]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+CLI = os.path.join(ROOT, 'cli.py')
+
+# Runs a CLI command in-process and reports which modules it loaded
+PROBE = '''
+import contextlib, io, json, sys
+sys.argv = ["cli.py"] + json.loads(sys.argv[1])
+sys.path.insert(0, {lib!r})
+from core.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    main(sys.argv[1:])
+qt = sorted(m for m in sys.modules if m.startswith(("PySide6", "shiboken6")))
+print(json.dumps([len(sys.modules), qt]))
+'''.format(lib=os.path.join(ROOT, 'lib'))
+
+
+def timed(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'control': [{'VTOY_DEFAULT_MENU_MODE': '0'}]}, f)
+        plugin_json = f.name
+    try:
+        commands = [('--version',), ('list',), ('plugson', '--file', plugin_json, 'get', 'control')]
+        cases = [('python3 -c pass (floor)', [sys.executable, '-c', 'pass'])]
+        cases += [(f"cli {' '.join(c[:1] + c[-2:-1] if len(c) > 2 else c)}", [sys.executable, CLI] + list(c))
+                  for c in commands]
+        try:
+            import importlib.util
+            if importlib.util.find_spec('PySide6'):
+                cases.append(('import PySide6.QtWidgets', [sys.executable, '-c', 'import PySide6.QtWidgets']))
+        except ImportError:
+            pass
+
+        print(f"{args.runs} runs each")
+        floor = None
+        for name, argv in cases:
+            median, best = timed(argv, args.runs)
+            floor = floor or median
+            print(f"{name:28s}: median {median * 1000:7.1f} ms  best {best * 1000:7.1f} ms  "
+                  f"(+{(median - floor) * 1000:6.1f} ms over the floor)")
+        for command in commands:
+            out = subprocess.run([sys.executable, '-c', PROBE, json.dumps(list(command))],
+                                 capture_output=True, text=True, check=True).stdout
+            modules, qt = json.loads(out.splitlines()[-1])
+            verdict = 'no Qt' if not qt else f"QT LOADED: {', '.join(qt[:3])}"
+            print(f"cli {command[0]:24s}: {modules} modules loaded, {verdict}")
+            if qt:
+                sys.exit(1)
+    finally:
+        os.remove(plugin_json)
+
+
+if __name__ == '__main__':
+    main()
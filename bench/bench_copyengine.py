@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmark the ISO copy engine against a file-manager style copy.
+
+The baseline copies the files one after another through a 256 KiB buffer
+and fsyncs each one, as file managers copying to removable drives do. The
+engine is run with one stream and with --jobs streams. Each copies --count
+files of --size-mb random data into two targets:
+- a directory next to the sources;
+- a filesystem in an image file attached through a loop device, like a
+  USB stick. This one needs root and mkfs.ext4 and is skipped otherwise.
+The sources are dropped from the page cache before every run. The growth
+of the page cache during a run is reported too.
+
+Usage: python3 bench/bench_copyengine.py [--dir /path/on/real/disk] [--count 6] [--size-mb 256] [--jobs 3]
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.copyengine import CopyEngine, plan_jobs
+
+BASELINE_BUFFER = 256 * 1024
+
+
+def page_cache():
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('Cached:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def evict(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def file_manager_copy(sources, dest):
+    for source in sources:
+        with open(source, 'rb') as src, open(os.path.join(dest, os.path.basename(source)), 'wb') as dst:
+            shutil.copyfileobj(src, dst, BASELINE_BUFFER)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+
+def engine_copy(jobs):
+    return lambda sources, dest: CopyEngine(jobs).copy(plan_jobs(sources, dest))
+
+
+def loop_filesystem(workdir, size):
+    """Mount an ext4 image through a loop device; returns (mountpoint, cleanup) or None."""
+    if os.geteuid() != 0 or not shutil.which('mkfs.ext4'):
+        return None
+    image = os.path.join(workdir, 'stick.img')
+    mountpoint = os.path.join(workdir, 'stick')
+    os.mkdir(mountpoint)
+    with open(image, 'wb') as f:
+        f.truncate(size)
+    try:
+        subprocess.run(['mkfs.ext4', '-q', '-F', image], check=True)
+        subprocess.run(['mount', '-o', 'loop', image, mountpoint], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return mountpoint, lambda: subprocess.run(['umount', mountpoint], check=False)
+
+
+def run(name, func, sources, dest):
+    os.makedirs(dest)
+    evict(sources)
+    cached = page_cache()
+    start = time.perf_counter()
+    func(sources, dest)
+    # The engine syncs once at the end; this only charges whatever is still dirty
+    os.sync()
+    elapsed = time.perf_counter() - start
+    growth = page_cache() - cached
+    same = all(filecmp.cmp(s, os.path.join(dest, os.path.basename(s)), shallow=False) for s in sources)
+    shutil.rmtree(dest)
+    return name, elapsed, growth, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the sources and targets (default: system temp)')
+    parser.add_argument('--count', type=int, default=6)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--jobs', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-copy-', dir=args.dir)
+    cleanup = None
+    try:
+        source_dir = os.path.join(workdir, 'src')
+        os.mkdir(source_dir)
+        sources = []
+        block = os.urandom(1024 * 1024)
+        for i in range(args.count):
+            path = os.path.join(source_dir, f"image-{i}.iso")
+            with open(path, 'wb') as f:
+                for n in range(args.size_mb):
+                    f.write(block[n % 251:] + block[:n % 251])
+            sources.append(path)
+        payload = args.count * args.size_mb * 1024 * 1024
+
+        targets = [('directory', os.path.join(workdir, 'dst'))]
+        loop = loop_filesystem(workdir, payload * 2 + 256 * 1024 * 1024)
+        if loop:
+            mountpoint, cleanup = loop
+            targets.append(('loop image', os.path.join(mountpoint, 'dst')))
+        else:
+            print('loop image target skipped (needs root and mkfs.ext4)')
+
+        print(f"{args.count} files of {args.size_mb} MiB")
+        for target, dest in targets:
+            results = [run(name, func, sources, dest) for name, func in (
+                ('file manager (fsync each)', file_manager_copy),
+                ('engine, 1 stream', engine_copy(1)),
+                (f"engine, {args.jobs} streams", engine_copy(args.jobs)))]
+            baseline = results[0][1]
+            for name, elapsed, growth, same in results:
+                print(f"{target:10s} {name:26s}: {payload / elapsed / 1e6:8.1f} MB/s  x{baseline / elapsed:4.1f}  "
+                      f"page cache {growth / 2 ** 20:+7.0f} MiB  {'identical' if same else 'DIFFERENT OUTPUT'}")
+    finally:
+        if cleanup:
+            cleanup()
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
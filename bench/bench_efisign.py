@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark EFI signing: one file at a time against the parallel, cached signing stage.
+
+The .efi files below --efi-dir (the system ESP by default) are copied to
+a scratch directory before every run and signed there with a throwaway
+key made with openssl. Four runs are timed:
+- one sbsign after the other without a cache, as the install used to do
+  on every stick;
+- --jobs sbsign processes at once, without a cache;
+- the same with a cold cache, which also stores the signed copies;
+- the same with the cache warm, which copies instead of signing.
+The last lines project a --sticks batch: signing on every stick as
+before, against one staged, signed ESP image written to all of them.
+Needs sbsign (sbsigntool) and openssl.
+
+Usage: python3 bench/bench_efisign.py [--efi-dir /boot/efi/EFI] [--jobs 8] [--sticks 60]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.efisign import FAILED, SignCache, find_efi_files, sign_files
+
+
+def make_key(workdir):
+    key, cert = os.path.join(workdir, 'bench.key'), os.path.join(workdir, 'bench.crt')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key, '-out', cert,
+                    '-subj', '/CN=Ventoy-X bench/', '-days', '1'], check=True, capture_output=True)
+    return key, cert
+
+
+def timed_run(sources, scratch, key, cert, jobs, cache):
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    paths = []
+    for i, source in enumerate(sources):
+        paths.append(os.path.join(scratch, f"{i}-{os.path.basename(source)}"))
+        shutil.copyfile(source, paths[-1])
+    start = time.perf_counter()
+    results = sign_files(paths, key, cert, jobs, cache)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if result.state == FAILED]
+    if failed:
+        sys.exit(f"{failed[0].path}: {failed[0].message}")
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--efi-dir', default='/boot/efi/EFI', help='where to take .efi files from')
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--sticks', type=int, default=60)
+    args = parser.parse_args()
+    if not (shutil.which('sbsign') and shutil.which('openssl')):
+        sys.exit('needs sbsign and openssl')
+    sources = find_efi_files(args.efi_dir)
+    if not sources:
+        sys.exit(f"no .efi files below {args.efi_dir}")
+
+    workdir = tempfile.mkdtemp(prefix='bench-efisign-')
+    try:
+        key, cert = make_key(workdir)
+        scratch = os.path.join(workdir, 'esp')
+        cache = SignCache(os.path.join(workdir, 'cache'))
+        serial, _ = timed_run(sources, scratch, key, cert, 1, False)
+        parallel, _ = timed_run(sources, scratch, key, cert, args.jobs, False)
+        cold, _ = timed_run(sources, scratch, key, cert, args.jobs, cache)
+        warm, results = timed_run(sources, scratch, key, cert, args.jobs, cache)
+    finally:
+        shutil.rmtree(workdir)
+
+    size = sum(os.path.getsize(path) for path in sources)
+    print(f"{len(sources)} EFI files, {size / 1e6:.1f} MB, from {args.efi_dir}")
+    print(f"{'one at a time':24s} {serial:7.3f} s")
+    print(f"{f'{args.jobs} at once':24s} {parallel:7.3f} s  ({serial / parallel:.1f}x)")
+    print(f"{'cold cache':24s} {cold:7.3f} s")
+    print(f"{'warm cache':24s} {warm:7.3f} s  ({sum(r.state == 'cached' for r in results)} copied from the cache)")
+    print(f"{args.sticks}-stick batch: {serial * args.sticks:.1f} s signing on every stick, "
+          f"{parallel:.1f} s for one staged image")
+
+
+if __name__ == '__main__':
+    main()
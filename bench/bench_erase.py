@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark the native erase engine against the `dd if=/dev/urandom bs=1M` secure erase.
+
+Erases a file-backed target of --size-mb. Use --dir to put it on a real
+disk; on tmpfs there is no O_DIRECT and the numbers mostly measure the
+data generation.
+
+Usage: python3 bench/bench_erase.py [--dir /path/on/real/disk] [--size-mb 512] [--rounds 3]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.erase import erase
+
+
+def dd(source):
+    def run(path):
+        subprocess.run(['dd', f'if={source}', f'of={path}', 'bs=1M', f'count={os.path.getsize(path) >> 20}',
+                        'conv=notrunc,fsync', 'status=none'], check=True)
+    return run
+
+
+def native(pattern, threads):
+    return lambda path: erase(path, pattern, threads=threads)
+
+
+def native_cli(path):
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'lib'))
+    subprocess.run([sys.executable, '-m', 'core.erase', path, '--pattern', 'random'], check=True, env=env,
+                   stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the target file (default: system temp)')
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-erase-', dir=args.dir)
+    path = os.path.join(workdir, 'target.img')
+    size = args.size_mb * 1024 * 1024
+    try:
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        results = []
+        for name, func in (('dd if=/dev/urandom', dd('/dev/urandom')),
+                           ('erase random, 1 thread', native('random', 1)),
+                           ('erase random, 4 threads', native('random', 4)),
+                           ('erase random (python -m)', native_cli),
+                           ('dd if=/dev/zero', dd('/dev/zero')),
+                           ('erase zero, 4 threads', native('zero', 4))):
+            times = []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                func(path)
+                times.append(time.perf_counter() - start)
+            assert os.path.getsize(path) == size
+            results.append((name, min(times)))
+
+        baseline = results[0][1]
+        print(f"{args.size_mb} MiB target, {os.cpu_count()} CPU(s)")
+        for name, elapsed in results:
+            print(f"{name:26s}: {elapsed:7.2f} s  {size / elapsed / 1e6:8.0f} MB/s  x{baseline / elapsed:5.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
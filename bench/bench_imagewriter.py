@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark the native image writer against the `xzcat | dd bs=512 conv=fsync` script path.
+
+Both write core.img and the Ventoy EFI partition image into a file-backed
+target, the way VentoyWorker.sh lays them out on an MBR disk. The cached
+variants read the decompressed images from a warm asset cache.
+
+Usage: python3 bench/bench_imagewriter.py [--dir /path/on/real/disk] [--rounds 5]
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.assetcache import AssetCache
+from core.imagewriter import WriteJob, write_images
+
+CORE_IMG = os.path.join(ROOT, 'src', 'boot', 'core.img.xz')
+DISK_IMG = os.path.join(ROOT, 'src', 'ventoy', 'ventoy_4k.disk.img.xz')
+LAYOUT = ((CORE_IMG, 1, 2047), (DISK_IMG, 2048, 65536))
+TARGET_SIZE = 64 * 1024 * 1024
+
+
+def script_path(target):
+    for source, seek, count in LAYOUT:
+        subprocess.run(f"xzcat '{source}' | dd status=none conv=fsync,notrunc of='{target}' "
+                       f"bs=512 count={count} seek={seek}", shell=True, check=True)
+
+
+def native_in_process(target, cache=None):
+    write_images(target, [WriteJob(source, seek, count) for source, seek, count in LAYOUT], cache=cache)
+
+
+def native_cli(target, cache_dir=None):
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'lib'))
+    images = [str(value) for job in LAYOUT for value in job]
+    if cache_dir:
+        env['VTOY_CACHE_DIR'] = cache_dir
+    else:
+        images.append('--no-cache')
+    subprocess.run([sys.executable, '-m', 'core.imagewriter', target] + images, check=True, env=env)
+
+
+def best_of(func, target, rounds):
+    times = []
+    for _ in range(rounds):
+        with open(target, 'wb') as f:
+            f.truncate(TARGET_SIZE)
+        start = time.perf_counter()
+        func(target)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the target files (default: system temp)')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if not shutil.which('xzcat'):
+        sys.exit('xzcat is required for the script path')
+    workdir = tempfile.mkdtemp(prefix='ventoy-writer-', dir=args.dir)
+    try:
+        payload = 2047 * 512 + 65536 * 512
+        cache_dir = os.path.join(workdir, 'cache')
+        cache = AssetCache(cache_dir)
+        for source, _, _ in LAYOUT:
+            cache.path(source)
+        results = {}
+        for i, (name, func) in enumerate((
+                ('xzcat | dd bs=512', script_path),
+                ('native (in-process)', native_in_process),
+                ('native (python -m)', native_cli),
+                ('cached (in-process)', lambda target: native_in_process(target, cache)),
+                ('cached (python -m)', lambda target: native_cli(target, cache_dir)))):
+            target = os.path.join(workdir, f"target{i}.img")
+            results[name] = (best_of(func, target, args.rounds), target)
+
+        baseline = results['xzcat | dd bs=512'][0]
+        for name, (elapsed, target) in results.items():
+            same = filecmp.cmp(target, results['xzcat | dd bs=512'][1], shallow=False)
+            print(f"{name:22s}: {elapsed * 1000:8.1f} ms  {payload / elapsed / 1e6:8.1f} MB/s  "
+                  f"x{baseline / elapsed:5.1f}  {'identical' if same else 'DIFFERENT OUTPUT'}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
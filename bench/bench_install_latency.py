@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Benchmark the install pipeline's partition waits on file-backed targets (root).
+
+Every target is a disk image file attached as a partition-scanning loop
+device. The default mode walks through the points where the install used
+to sleep a fixed time. For each target it writes a Ventoy-style partition
+table with core.ptable and has the kernel re-read it. It then times
+core.readiness.wait_ready at every point that used to sleep: 3 s after
+partitioning, 2 s before the ESP resize, 3 s before EFI signing and 5 s
+before the user directories. Some kernels (e.g. in containers) do not
+create partitions for loop devices. When the partitions do not show up,
+the waits fall back to the whole disk, and the output says so.
+
+--install runs the real install job (core.jobs.install_job) on every
+image instead, which needs parted or fdisk. Add --fixed-sleeps to the
+same run to get the old fixed sleeps, in the job and in VentoyWorker.sh
+(VTOY_FIXED_SLEEPS=1).
+
+Usage: sudo python3 bench/bench_install_latency.py [--count 8] [--size-mb 256] [--install [--fixed-sleeps]]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.erase import reread_partitions
+from core.ptable import PartitionTable
+from core.readiness import wait_ready
+
+MIB = 1024 * 1024
+# Where the install pipeline slept, and for how long
+FIXED_SLEEPS = (('partitioning', 3), ('ESP resize', 2), ('EFI signing', 3), ('user directories', 5))
+
+
+def attach(path):
+    return subprocess.check_output(['losetup', '--find', '--show', '--partscan', path], text=True).strip()
+
+
+def detach(device):
+    subprocess.run(['losetup', '--detach', device], capture_output=True)
+
+
+def partition(path, size):
+    # Data partition from sector 2048, then the 32 MiB EFI partition, as Ventoy2Disk.sh lays it out
+    sectors = size // 512
+    table = PartitionTable.create(size, 'MBR', [(0x07, 2048, sectors - 2048 - 65536 - 8),
+                                                (0xEF, sectors - 65536, 65536)])
+    table.commit(path)
+
+
+def repartition(device, size):
+    partition(device, size)
+    fd = os.open(device, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        reread_partitions(fd)
+    finally:
+        os.close(fd)
+
+
+def partitions_supported(path, size, timeout):
+    """Whether the kernel creates partition devices for a loop device here."""
+    device = attach(path)
+    try:
+        repartition(device, size)
+        wait_ready(device, (1, 2), timeout)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        detach(device)
+
+
+def bench_waits(images, size, partitions):
+    per_target = []
+    for path in images:
+        device = attach(path)
+        try:
+            repartition(device, size)
+            per_target.append([wait_ready(device, partitions) for _ in FIXED_SLEEPS])
+        finally:
+            detach(device)
+    return per_target
+
+
+def bench_install(images, fixed_sleeps):
+    from core import jobs
+    if fixed_sleeps:
+        os.environ['VTOY_FIXED_SLEEPS'] = '1'
+        # The job slept 3 s before signing and 5 s before the user directories
+        delays = iter([3, 5] * len(images))
+        jobs.wait_partitions = lambda context, device, numbers=(), timeout=None: context.sleep(next(delays))
+    engine = jobs.JobEngine(1)
+    times = []
+    for path in images:
+        job = engine.submit(jobs.install_job(path))
+        engine.wait()
+        if job.state != jobs.DONE:
+            sys.exit(f"install on {path} {job.state}: {job.message}")
+        times.append(job.finished - job.started)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=8)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=2.0, help='how long to wait for partitions to show up')
+    parser.add_argument('--install', action='store_true', help='run the real install job on every image')
+    parser.add_argument('--fixed-sleeps', action='store_true', help='with --install: use the old fixed sleeps')
+    args = parser.parse_args()
+    if os.geteuid() != 0:
+        sys.exit('loop devices need root')
+    if args.install and not (shutil.which('parted') or shutil.which('fdisk')):
+        sys.exit('--install needs parted or fdisk')
+
+    workdir = tempfile.mkdtemp(prefix='bench-install-')
+    size = args.size_mb * MIB
+    images = [os.path.join(workdir, f"stick{i}.img") for i in range(args.count)]
+    for path in images:
+        with open(path, 'wb') as f:
+            f.truncate(size)
+    try:
+        if args.install:
+            times = bench_install(images, args.fixed_sleeps)
+            kind = 'fixed sleeps' if args.fixed_sleeps else 'readiness waits'
+            print(f"install of {args.count} x {args.size_mb} MiB images with {kind}: "
+                  f"median {statistics.median(times):.2f} s, total {sum(times):.1f} s")
+            return
+        probe = os.path.join(workdir, 'probe.img')
+        with open(probe, 'wb') as f:
+            f.truncate(size)
+        partitions = (1, 2) if partitions_supported(probe, size, args.timeout) else ()
+        per_target = bench_waits(images, size, partitions)
+    finally:
+        shutil.rmtree(workdir)
+
+    fixed = sum(seconds for _, seconds in FIXED_SLEEPS)
+    print(f"{args.count} file-backed targets of {args.size_mb} MiB")
+    if not partitions:
+        print("this kernel creates no partitions for loop devices, so only the disks themselves were waited for")
+    if not shutil.which('udevadm'):
+        print("there is no udevadm here, so the waits did not include udev settling")
+    for i, (name, seconds) in enumerate(FIXED_SLEEPS):
+        waits = [target[i] for target in per_target]
+        print(f"{name:18s} fixed {seconds:5.1f} s   ready after median {statistics.median(waits) * 1000:7.1f} ms, "
+              f"max {max(waits) * 1000:7.1f} ms")
+    waited = [sum(target) for target in per_target]
+    print(f"{'per stick':18s} fixed {fixed:5.1f} s   ready after median {statistics.median(waited) * 1000:7.1f} ms")
+    print(f"60-stick batch, one at a time: {fixed:.1f} min of fixed sleeps, "
+          f"{60 * statistics.median(waited):.1f} s of readiness waits")
+
+
+if __name__ == '__main__':
+    main()
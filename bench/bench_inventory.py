@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Benchmark the sysfs disk inventory against a fake /sys tree and lsblk.
+
+Usage: python3 bench/bench_inventory.py [--disks 48] [--rounds 2000]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+from core.inventory import DiskInventory
+from test_inventory import build_fake_sysfs
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--disks', type=int, default=48)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='ventoy-inventory-')
+    try:
+        sys_root, udev_root, mounts_path = build_fake_sysfs(root, args.disks)
+
+        def cold():
+            DiskInventory(sys_root, udev_root, mounts_path).scan()
+
+        inventory = DiskInventory(sys_root, udev_root, mounts_path)
+        devices = inventory.scan()
+        assert len(devices) == args.disks and all(d.transport == 'usb' for d in devices)
+
+        print(f"devices            : {args.disks} disks, {args.disks * 2} partitions")
+        print(f"cold scan          : {timed(cold, max(1, args.rounds // 20)) * 1e6:8.1f} us")
+        print(f"warm scan (cached) : {timed(inventory.scan, args.rounds) * 1e6:8.1f} us")
+
+        if shutil.which('lsblk'):
+            lsblk = ['lsblk', '-o', 'NAME,MODEL,SIZE,TYPE,TRAN']
+            rounds = max(1, args.rounds // 100)
+            elapsed = timed(lambda: subprocess.run(lsblk, capture_output=True), rounds)
+            print(f"lsblk (host)       : {elapsed * 1e6:8.1f} us")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
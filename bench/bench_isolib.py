@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Benchmark the incremental ISO library index.
+
+Builds a directory tree of --count sparse --size-gb images, each with an
+ISO9660 primary volume descriptor, most with an El Torito catalog (some
+with a UEFI entry) and an isohybrid MBR. The tree also has a hidden
+directory and a .ventoyignore'd one, neither of which may be indexed.
+Reports the first scan, a rescan with nothing changed, a rescan after a
+few images were replaced, and listing the library from the index alone
+(what the GUI shows before it touches the drive).
+
+Usage: python3 bench/bench_isolib.py [--dir /path/on/real/disk] [--count 200] [--size-gb 4]
+"""
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.isolib import ISO_SECTOR, IsoLibrary
+
+CATALOG_LBA = 20
+
+
+def make_iso(path, size, label, eltorito=True, uefi=False, hybrid=True):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        if hybrid:
+            mbr = bytearray(512)
+            mbr[446 + 4] = 0x17
+            mbr[510:512] = b'\x55\xaa'
+            f.seek(0)
+            f.write(mbr)
+        lba = 16
+        pvd = bytearray(ISO_SECTOR)
+        pvd[0:7] = b'\x01CD001\x01'
+        pvd[40:72] = label.encode().ljust(32)
+        pvd[813:830] = b'2024051612304500\x00'
+        f.seek(lba * ISO_SECTOR)
+        f.write(pvd)
+        lba += 1
+        if eltorito:
+            record = bytearray(ISO_SECTOR)
+            record[0:7] = b'\x00CD001\x01'
+            record[7:30] = b'EL TORITO SPECIFICATION'
+            struct.pack_into('<I', record, 71, CATALOG_LBA)
+            f.seek(lba * ISO_SECTOR)
+            f.write(record)
+            lba += 1
+            catalog = bytearray(ISO_SECTOR)
+            catalog[0] = 0x01
+            catalog[30:32] = b'\x55\xaa'
+            catalog[32] = 0x88
+            if uefi:
+                catalog[64:66] = b'\x91\xef'
+                catalog[96] = 0x88
+            f.seek(CATALOG_LBA * ISO_SECTOR)
+            f.write(catalog)
+        terminator = bytearray(ISO_SECTOR)
+        terminator[0:7] = b'\xffCD001\x01'
+        f.seek(lba * ISO_SECTOR)
+        f.write(terminator)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the image tree (default: system temp)')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--size-gb', type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-isolib-', dir=args.dir)
+    root = os.path.join(workdir, 'data')
+    size = args.size_gb * 1024 ** 3
+    try:
+        for sub in ('ISO', 'ISO/linux', 'ISO/windows', '.Trash-1000', 'private'):
+            os.makedirs(os.path.join(root, sub))
+        open(os.path.join(root, 'private', '.ventoyignore'), 'w').close()
+        for i in range(args.count):
+            folder = ('ISO', 'ISO/linux', 'ISO/windows')[i % 3]
+            make_iso(os.path.join(root, folder, f"image-{i:04d}.iso"), size, f"IMAGE_{i:04d}",
+                     eltorito=i % 10 != 0, uefi=i % 2 == 0, hybrid=i % 4 != 3)
+        make_iso(os.path.join(root, '.Trash-1000', 'deleted.iso'), size, 'DELETED')
+        make_iso(os.path.join(root, 'private', 'hidden.iso'), size, 'HIDDEN')
+
+        library = IsoLibrary('BENCH-0000', os.path.join(workdir, 'index'))
+        first, first_ms = timed(lambda: library.scan(root))
+        again, again_ms = timed(lambda: library.scan(root))
+        for i in range(5):
+            folder = ('ISO', 'ISO/linux', 'ISO/windows')[i % 3]
+            make_iso(os.path.join(root, folder, f"image-{i:04d}.iso"), size, f"UPDATED_{i:04d}")
+        changed, changed_ms = timed(lambda: library.scan(root))
+        listed, listed_ms = timed(library.images)
+
+        assert len(first.images) == args.count, len(first.images)
+        assert first.probed == args.count and again.probed == 0 and changed.probed == 5
+        assert sum(i.label.startswith('UPDATED_') for i in listed) == 5
+        assert sum(i.uefi for i in listed) == len([i for i in range(5, args.count) if i % 2 == 0 and i % 10])
+
+        print(f"{args.count} images of {args.size_gb} GiB ({args.count * args.size_gb} GiB in total)")
+        print(f"first scan          : {first_ms:8.1f} ms  ({first.probed} probed)")
+        print(f"rescan, no changes  : {again_ms:8.1f} ms  ({again.probed} probed)")
+        print(f"rescan, 5 replaced  : {changed_ms:8.1f} ms  ({changed.probed} probed)")
+        print(f"open from the index : {listed_ms:8.1f} ms  ({len(listed)} images)")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
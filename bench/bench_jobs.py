@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Benchmark the job engine's scheduling and cancellation.
+
+--jobs synthetic jobs are spread over --drives drives behind --controllers
+USB controllers. Each one sleeps for --work seconds in small steps and
+reports progress. Three things are measured. The first is the wall time
+against the ideal schedule that the limits allow. The second is the peak
+concurrency per drive, per controller and in total, checked against the
+limits. The third is how long a cancel takes to settle every queued and
+running job. Every job also runs one cleanup, and the benchmark checks
+that all of them ran after the cancel.
+
+Usage: python3 bench/bench_jobs.py [--jobs 200] [--drives 16] [--controllers 3] [--workers 8] [--per-controller 2]
+"""
+import argparse
+import collections
+import math
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.jobs import CANCELLED, DONE, Job, JobEngine
+
+
+class Meter:
+    """Counts how many jobs run at once, in total and per key."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.now = collections.Counter()
+        self.peak = collections.Counter()
+
+    def enter(self, keys):
+        with self.lock:
+            for key in keys:
+                self.now[key] += 1
+                self.peak[key] = max(self.peak[key], self.now[key])
+
+    def leave(self, keys):
+        with self.lock:
+            for key in keys:
+                self.now[key] -= 1
+
+
+def make_jobs(args, meter, cleaned):
+    jobs = []
+    for i in range(args.jobs):
+        drive = f"sd{i % args.drives}"
+        controller = f"usb{i % args.drives % args.controllers}"
+        keys = ('total', drive, controller)
+
+        def work(context, keys=keys):
+            context.defer(lambda: cleaned.append(context.job.id))
+            meter.enter(keys)
+            try:
+                for step in range(10):
+                    context.progress(step + 1, 10, 'Working')
+                    context.sleep(args.work / 10)
+            finally:
+                meter.leave(keys)
+        jobs.append((Job('bench', f"/dev/{drive}", work, [drive]), controller))
+    return jobs
+
+
+def run(args, cancel_after=None):
+    meter = Meter()
+    cleaned = []
+    jobs = make_jobs(args, meter, cleaned)
+    controllers = {job.devices[0]: controller for job, controller in jobs}
+    engine = JobEngine(args.workers, args.per_controller, controller_of=controllers.get)
+    events = collections.Counter()
+    engine.subscribe(lambda event: events.update([event['event']]))
+    start = time.perf_counter()
+    for job, _ in jobs:
+        engine.submit(job)
+    settle = None
+    if cancel_after is not None:
+        time.sleep(cancel_after)
+        cancelled_at = time.perf_counter()
+        engine.cancel()
+        engine.wait()
+        settle = time.perf_counter() - cancelled_at
+    engine.wait()
+    return time.perf_counter() - start, settle, meter, cleaned, events, [job for job, _ in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--drives', type=int, default=16)
+    parser.add_argument('--controllers', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--per-controller', type=int, default=2)
+    parser.add_argument('--work', type=float, default=0.05, help='seconds each job takes')
+    args = parser.parse_args()
+
+    # Concurrency the limits allow: per controller, capped by its drives, then by the worker count
+    drives_per_controller = collections.Counter(f"usb{d % args.controllers}" for d in range(args.drives))
+    allowed = min(args.workers, sum(min(args.per_controller, n) for n in drives_per_controller.values()))
+    ideal = math.ceil(args.jobs / allowed) * args.work
+
+    elapsed, _, meter, cleaned, events, jobs = run(args)
+    assert all(job.state == DONE for job in jobs)
+    drive_peak = max(meter.peak[key] for key in meter.peak if key.startswith('sd'))
+    controller_peak = max(meter.peak[key] for key in meter.peak if key.startswith('usb'))
+    print(f"{args.jobs} jobs, {args.drives} drives, {args.controllers} controllers, {args.workers} workers, "
+          f"{args.per_controller} per controller ({allowed} at once at most)")
+    print(f"run:    {elapsed:6.2f} s (ideal {ideal:.2f} s, {(elapsed - ideal) / args.jobs * 1000:+.2f} ms per job)  "
+          f"{sum(events.values())} events")
+    print(f"peaks:  {meter.peak['total']} total, {drive_peak} per drive, {controller_peak} per controller")
+    assert meter.peak['total'] <= args.workers and drive_peak == 1 and controller_peak <= args.per_controller
+    assert len(cleaned) == args.jobs
+
+    _, settle, _, cleaned, _, jobs = run(args, cancel_after=args.work * 2.5)
+    states = collections.Counter(job.state for job in jobs)
+    started = sum(job.started is not None for job in jobs)
+    print(f"cancel: settled in {settle * 1000:.1f} ms, {states[DONE]} done, {states[CANCELLED]} cancelled, "
+          f"{len(cleaned)} cleanups for {started} started jobs")
+    assert states[DONE] + states[CANCELLED] == args.jobs
+    assert len(cleaned) == started
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Benchmark the batched log pipeline against one signal and one HTML append per line.
+
+A worker thread pushes --lines log lines (mixed kinds, like Ventoy2Disk.sh
+and dd output) to the GUI. "per-line signal" is the old path: a queued
+signal per line, colored with an HTML span and appended to a QTextEdit
+with a cursor move. "LogPipe" is the new one: the worker writes into a
+LogPipe, a 100 ms timer drains it into the block-limited LogView, and the
+full log goes to disk. Each variant runs in its own process so the
+resident set sizes are comparable.
+
+Usage: QT_QPA_PLATFORM=offscreen python3 bench/bench_logpipe.py [--lines 100000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, ROOT)
+from PySide6.QtCore import QThread, QTimer, Signal
+from PySide6.QtWidgets import QApplication, QTextEdit
+from core.logpipe import LogPipe, new_log_path
+from main import LogView
+
+SAMPLES = (
+    'Formatting partition 1 as exFAT...',
+    'WARNING: partition table changed on disk',
+    '65536+0 records in',
+    'mkexfatfs: Creating... done.',
+    '✅ Step completed',
+)
+
+
+def line(i):
+    return f"[{i:06d}] {SAMPLES[i % len(SAMPLES)]}"
+
+
+_PADDING = []
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+class PerLineWorker(QThread):
+    log_signal = Signal(str)
+
+    def __init__(self, lines):
+        super().__init__()
+        self.lines = lines
+
+    def run(self):
+        for i in range(self.lines):
+            self.log_signal.emit(line(i))
+
+
+def run_per_line(lines):
+    app = QApplication.instance() or QApplication(sys.argv)
+    view = QTextEdit()
+    view.setReadOnly(True)
+    view.show()
+
+    received = [0]
+
+    def append(text):
+        if 'WARNING' in text:
+            text = f'<span style="color: #ffa726;">{text}</span>'
+        elif '✅' in text:
+            text = f'<span style="color: #4caf50;">{text}</span>'
+        view.append(text)
+        cursor = view.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        view.setTextCursor(cursor)
+        received[0] += 1
+        if received[0] == lines:
+            app.quit()
+
+    worker = PerLineWorker(lines)
+    worker.log_signal.connect(append)
+    start = time.perf_counter()
+    worker.start()
+    app.exec()
+    elapsed = time.perf_counter() - start
+    worker.wait()
+    return elapsed, view.document().blockCount()
+
+
+def run_logpipe(lines, log_dir):
+    app = QApplication.instance() or QApplication(sys.argv)
+    view = LogView()
+    view.show()
+    pipe = LogPipe(new_log_path('bench', log_dir))
+    finished = threading.Event()
+
+    def worker():
+        for i in range(lines):
+            pipe.write(line(i))
+        finished.set()
+
+    def flush():
+        done = finished.is_set()
+        view.append_lines(pipe.drain())
+        if done:
+            app.quit()
+
+    timer = QTimer()
+    timer.setInterval(100)
+    timer.timeout.connect(flush)
+    start = time.perf_counter()
+    timer.start()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    app.exec()
+    elapsed = time.perf_counter() - start
+    thread.join()
+    pipe.close()
+    with open(pipe.path) as f:
+        on_disk = sum(1 for _ in f)
+    assert on_disk == lines, on_disk
+    return elapsed, view.document().blockCount()
+
+
+def child(variant, lines):
+    # Some PySide6 releases (6.12.0) drop a reference to True on every emit()
+    # and to None on every void call; pad the refcounts so both variants
+    # survive long enough to be measured. The padding is never released.
+    _PADDING.extend([True, None] * (4 * lines + 10000))
+    before = rss_mb()
+    with tempfile.TemporaryDirectory(prefix='ventoy-logs-') as log_dir:
+        if variant == 'per-line':
+            elapsed, blocks = run_per_line(lines)
+        else:
+            elapsed, blocks = run_logpipe(lines, log_dir)
+    print(f"{elapsed:.4f} {rss_mb() - before:.1f} {blocks}", flush=True)
+    # Skip interpreter teardown, which would free _PADDING on an affected PySide6
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--child', choices=('per-line', 'logpipe'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.lines)
+        return
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    results = []
+    for name, variant in (('per-line signal', 'per-line'), ('LogPipe', 'logpipe')):
+        out = subprocess.run([sys.executable, __file__, '--child', variant, '--lines', str(args.lines)],
+                             check=True, capture_output=True, text=True).stdout.split()
+        results.append((name, float(out[0]), float(out[1]), int(out[2])))
+
+    baseline = results[0][1]
+    print(f"{args.lines} lines")
+    for name, elapsed, rss, blocks in results:
+        print(f"{name:16s}: {elapsed:8.2f} s  x{baseline / elapsed:6.1f}  +{rss:7.1f} MB RSS  {blocks} lines shown")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark building persistence images against CreatePersistentImg.sh's pipeline.
+
+The baseline is the script's `dd if=/dev/zero bs=1M | tr '\\000' '\\377'`
+followed by mkfs.ext4. It is compared with core.persistence filling the
+file from a pre-built 0xFF buffer, with preallocating it, and with --count
+preallocated images built --jobs at a time. Every image is synced to disk
+inside the timing.
+
+Usage: python3 bench/bench_persistence.py [--dir /path/on/real/disk] [--size-mb 1024] [--count 4] [--jobs 2]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.persistence import PersistenceSpec, build_image, build_images, can_preallocate
+
+
+def script_pipeline(path, size_mb):
+    subprocess.run(f"dd if=/dev/zero bs=1M count={size_mb} status=none | tr '\\000' '\\377' > '{path}'",
+                   shell=True, check=True)
+    subprocess.run(['mkfs.ext4', '-F', '-q', '-L', 'casper-rw', path], check=True)
+
+
+def sync(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the images (default: system temp)')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--count', type=int, default=4)
+    parser.add_argument('--jobs', type=int, default=2)
+    args = parser.parse_args()
+    if not shutil.which('mkfs.ext4'):
+        sys.exit('mkfs.ext4 is needed')
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-persistence-', dir=args.dir)
+    try:
+        def path(name):
+            return os.path.join(workdir, name)
+
+        def run(specs):
+            results = build_images(specs, args.jobs) if len(specs) > 1 else [build_image(specs[0])]
+            assert not any(r.error for r in results), [r.error for r in results]
+            return [r.path for r in results]
+
+        print(f"{args.size_mb} MiB ext4 images in {workdir} (preallocation {'native' if can_preallocate(workdir) else 'not available'})")
+        baseline = None
+        for name, func, count in (
+                ('dd | tr, then mkfs', lambda: script_pipeline(path('script.dat'), args.size_mb) or [path('script.dat')], 1),
+                ('0xFF buffer fill', lambda: run([PersistenceSpec(path('fill.dat'), args.size_mb, fill=True)]), 1),
+                ('preallocated', lambda: run([PersistenceSpec(path('alloc.dat'), args.size_mb)]), 1),
+                (f"{args.count} preallocated, {args.jobs} at a time",
+                 lambda: run([PersistenceSpec(path(f"many-{i}.dat"), args.size_mb) for i in range(args.count)]), args.count)):
+            start = time.perf_counter()
+            sync(func())
+            elapsed = time.perf_counter() - start
+            per_image = elapsed / count
+            baseline = baseline or per_image
+            print(f"{name:32s}: {elapsed * 1000:9.1f} ms  {per_image * 1000:9.1f} ms/image  x{baseline / per_image:7.1f}")
+            for entry in os.listdir(workdir):
+                os.remove(path(entry))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
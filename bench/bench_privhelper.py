@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark the privileged helper against a process per operation.
+
+The helper runs as the local stand-in on --count small disk image files,
+so nothing here needs root. Four things are timed:
+- a quick erase per image as a fresh `python3 -m core.erase --quick`
+  process. This is the floor of the old way, which also paid for pkexec
+  and a password prompt on every operation;
+- the same erases as helper requests sent one after another;
+- the same erases sent as one batch;
+- a ping round trip, i.e. the protocol overhead per request.
+
+Usage: python3 bench/bench_privhelper.py [--count 50] [--size-mb 64] [--pings 500]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LIB = os.path.abspath(os.path.join(ROOT, 'lib'))
+sys.path.insert(0, LIB)
+from core.privhelper import start_helper
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--pings', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-privhelper-')
+    socket_path = os.path.join(workdir, 'helper.sock')
+    images = [os.path.join(workdir, f"disk{i}.img") for i in range(args.count)]
+    for path in images:
+        with open(path, 'wb') as f:
+            f.truncate(args.size_mb * 1024 * 1024)
+    env = dict(os.environ, PYTHONPATH=LIB)
+    try:
+        spawned = timed(lambda: [subprocess.run([sys.executable, '-m', 'core.erase', '--quick', path], env=env,
+                                                check=True, capture_output=True) for path in images])
+        started = time.perf_counter()
+        helper = start_helper(socket_path, local=True, idle_timeout=60)
+        startup = time.perf_counter() - started
+        sequential = timed(lambda: [helper.call('erase', target=path) for path in images])
+        batched = timed(lambda: [request.wait() for request in
+                                 helper.submit_batch([('erase', {'target': path}, None) for path in images])])
+        pings = []
+        for _ in range(args.pings):
+            pings.append(timed(lambda: helper.call('ping')))
+        helper.call('shutdown')
+    finally:
+        shutil.rmtree(workdir)
+
+    def line(name, seconds):
+        print(f"{name:34s} {seconds:7.3f} s  {seconds / args.count * 1000:7.2f} ms per image")
+
+    print(f"quick erase of {args.count} images of {args.size_mb} MiB")
+    line('process per operation', spawned)
+    print(f"{'helper start (once)':34s} {startup:7.3f} s")
+    line('helper, one request at a time', sequential)
+    line('helper, one batch', batched)
+    print(f"ping round trip: median {statistics.median(pings) * 1e6:.0f} us, best {min(pings) * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
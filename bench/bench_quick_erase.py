@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Check and time the signature-aware quick erase on disk image fixtures.
+
+Each fixture is a sparse image with a GPT and three partitions:
+- an ext4 filesystem (mke2fs -E offset) spanning most of the disk;
+- an md 1.0 member;
+- an LVM PV with a btrfs mirror superblock and an NTFS backup boot sector.
+There is also an md 0.90 superblock for the whole disk. An "imaged"
+variant carries a GPT written for a disk half the size, so its backup
+sits in the middle. After erasing, every planted signature, every ext4
+backup superblock and anything blkid can still find (on the disk and at
+each old partition offset) counts as a leftover. The old quick erase
+(`wipefs -af` plus zeroing the first 10 MiB) is checked the same way.
+
+Usage: python3 bench/bench_quick_erase.py [--dir /path/on/real/disk] [--sizes-gb 1,16,256]
+"""
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.erase import quick_erase
+from core.ptable import BASIC_DATA_GUID, PartitionTable
+
+MiB = 1024 * 1024
+LINUX_RAID_GUID = 'A19D880F-05FC-4D3B-A006-743F0F84911E'
+LINUX_LVM_GUID = 'E6D6D379-F507-44C2-A23C-238F2A3DF928'
+MD_MAGIC = struct.pack('<I', 0xa92b4efc)
+
+
+def layout(size):
+    """(start, length) of the three partitions, in bytes."""
+    md = (size - 200 * MiB, 32 * MiB)
+    lvm = (size - 160 * MiB, 128 * MiB)
+    return [(MiB, size - 202 * MiB), md, lvm]
+
+
+def plant(f, offset, data, planted, what):
+    f.seek(offset)
+    f.write(data)
+    planted.append((offset, data, what))
+
+
+def make_fixture(path, size, imaged=False):
+    """Build the image; returns [(offset, bytes, what)] of the signatures planted by hand."""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    parts = layout(size // 2 if imaged else size)
+    PartitionTable.create(size // 2 if imaged else size, 'GPT', [
+        (BASIC_DATA_GUID, parts[0][0] // 512, parts[0][1] // 512, 'data'),
+        (LINUX_RAID_GUID, parts[1][0] // 512, parts[1][1] // 512, 'md'),
+        (LINUX_LVM_GUID, parts[2][0] // 512, parts[2][1] // 512, 'lvm'),
+    ]).commit(path)
+    start, length = parts[0]
+    subprocess.run(['mke2fs', '-q', '-F', '-t', 'ext4', '-E', f'offset={start}', path, f'{length // 1024}k'],
+                   check=True)
+    planted = []
+    with open(path, 'r+b') as f:
+        md_start, md_length = parts[1]
+        # md 1.0: superblock 8 KiB before the end, 4 KiB aligned
+        plant(f, md_start + ((md_length - 8192) & ~4095), MD_MAGIC + struct.pack('<I', 1), planted, 'md 1.0')
+        lvm_start, lvm_length = parts[2]
+        plant(f, lvm_start + 512, b'LABELONE', planted, 'LVM label')
+        plant(f, lvm_start + 512 + 24, b'LVM2 001', planted, 'LVM type')
+        plant(f, lvm_start + 64 * MiB + 64, b'_BHRfS_M', planted, 'btrfs mirror')
+        plant(f, lvm_start + lvm_length - 512 + 3, b'NTFS    ', planted, 'NTFS backup boot sector')
+        # md 0.90 on the whole disk: 64 KiB aligned, in the last 128 KiB
+        plant(f, (size & ~(64 * 1024 - 1)) - 64 * 1024, MD_MAGIC, planted, 'md 0.90')
+    return planted
+
+
+def leftovers(path, size, planted, imaged=False):
+    found = []
+    with open(path, 'rb') as f:
+        for offset, data, what in planted:
+            f.seek(offset)
+            if f.read(len(data)) == data:
+                found.append(what)
+        # ext4 backup superblocks (4 KiB blocks, 32768 blocks per group)
+        start, length = layout(size // 2 if imaged else size)[0]
+        group = 32768 * 4096
+        for offset in range(start + group, start + length, group):
+            f.seek(offset + 56)
+            if f.read(2) == b'\x53\xef':
+                found.append(f"ext4 backup superblock at group {(offset - start) // group}")
+    offsets = [0] + [start for start, _ in layout(size // 2 if imaged else size)]
+    for offset in offsets:
+        result = subprocess.run(['blkid', '-p', '-O', str(offset), '-o', 'export', path],
+                                capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if line.startswith(('TYPE=', 'PTTYPE=')):
+                found.append(f"blkid at {offset}: {line}")
+    return found
+
+
+def old_quick_erase(path):
+    subprocess.run(['wipefs', '-af', path], check=True, capture_output=True)
+    subprocess.run(['dd', 'if=/dev/zero', f'of={path}', 'bs=1M', 'count=10', 'conv=notrunc,fsync', 'status=none'],
+                   check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the fixture images (default: system temp)')
+    parser.add_argument('--sizes-gb', default='1,16,256')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-quick-erase-', dir=args.dir)
+    path = os.path.join(workdir, 'disk.img')
+    failed = False
+    try:
+        for size_gb in (int(s) for s in args.sizes_gb.split(',')):
+            size = size_gb * 1024 * MiB
+            for imaged in (False, True):
+                name = f"{size_gb:4d} GiB{' imaged' if imaged else ''}"
+                planted = make_fixture(path, size, imaged)
+                before = leftovers(path, size, planted, imaged)
+                start = time.perf_counter()
+                old_quick_erase(path)
+                old_elapsed = time.perf_counter() - start
+                old_left = leftovers(path, size, planted, imaged)
+
+                make_fixture(path, size, imaged)
+                start = time.perf_counter()
+                extents = quick_erase(path)
+                elapsed = time.perf_counter() - start
+                left = leftovers(path, size, planted, imaged)
+                failed = failed or bool(left)
+                print(f"{name:17s}: {len(before):3d} signatures | wipefs+dd {old_elapsed * 1000:7.1f} ms, "
+                      f"{len(old_left):3d} left | quick erase {elapsed * 1000:7.1f} ms, "
+                      f"{len(extents):3d} extents, {sum(e.length for e in extents) // 1024:6d} KiB, {len(left)} left")
+                for what in left:
+                    print(f"    left: {what}")
+    finally:
+        shutil.rmtree(workdir)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
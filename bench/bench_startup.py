@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Measure GUI cold start: import time, time to first paint and time to interactive.
+
+Each round starts a fresh interpreter that builds main.MainWindow on the
+offscreen Qt platform with the device probes stubbed. The stubbed probes
+are the USB disk scan, the hotplug monitor and secure boot key detection,
+and each sleeps for --probe-ms. Any probe left on the path to the first
+frame therefore shows up in the numbers, whatever hardware the bench runs
+on. "Interactive" is when the startup drive scan is on screen and the
+event loop is idle again (key detection may still be running in the
+background). The first switch to each lazily built tab is timed as
+well. --eager builds everything before showing the window, like the GUI
+used to, for comparison.
+
+Exits with status 1 when a median is over its budget.
+
+Usage: python3 bench/bench_startup.py [--rounds 5] [--probe-ms 200] [--eager]
+                                      [--budget-paint-ms 400] [--budget-interactive-ms 800]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+FAKE_DISKS = [{
+    'name': f"sd{letter}", 'model': 'Bench Stick', 'size': '14.3G', 'size_bytes': 15376318464, 'type': 'disk',
+    'tran': 'usb', 'vendor': 'Bench', 'serial': f"BENCH{letter}", 'wwn': '', 'removable': True, 'mounted': False,
+    'filesystem': 'exfat', 'partitions': [], 'key': f"serial:Bench:Bench Stick:BENCH{letter}",
+} for letter in 'bcd']
+
+
+def child(probe_ms, eager):
+    start = time.perf_counter()
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PySide6.QtCore import QEvent, QObject, QTimer
+    from PySide6.QtWidgets import QApplication, QMessageBox
+    sys.path.insert(0, ROOT)
+    import main
+    imported = time.perf_counter()
+
+    delay = probe_ms / 1000
+
+    def slow(result):
+        def probe(*args, **kwargs):
+            time.sleep(delay)
+            return result
+        return probe
+
+    main.list_usb_disks = slow(FAKE_DISKS)
+    main.detect_system_keys = slow((None, None))
+    main.get_machine_owner_guid = slow(None)
+    main.HotplugMonitor.start = slow(False)
+    for name in ('information', 'warning', 'critical'):
+        setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: None))
+
+    app = QApplication(['ventoy-x'])
+    times = {'import_ms': (imported - start) * 1000}
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and 'paint_ms' not in times:
+                times['paint_ms'] = (time.perf_counter() - start) * 1000
+            return False
+
+    window = main.MainWindow()
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+
+    def lazy_tabs():
+        tabs = window.centralWidget()
+        for i in range(1, tabs.count()):
+            began = time.perf_counter()
+            tabs.setCurrentIndex(i)
+            app.processEvents()
+            times[f"tab_{tabs.tabText(i).lower()}_ms"] = (time.perf_counter() - began) * 1000
+        print(json.dumps(times), flush=True)
+        os._exit(0)
+
+    def interactive():
+        times['interactive_ms'] = (time.perf_counter() - start) * 1000
+        QTimer.singleShot(0, lazy_tabs)
+
+    if eager:
+        # What the constructors used to do before the window could be shown
+        dashboard = window.dashboard_tab
+        dashboard.refresh_disks()
+        dashboard.on_hotplug_started(dashboard.hotplug_monitor.start())
+        dashboard.show_detected_keys(*main.detect_system_keys(), main.get_machine_owner_guid(), quiet=True)
+        for i in range(window.centralWidget().count()):
+            widget = window.centralWidget().widget(i)
+            if isinstance(widget, main.LazyTab):
+                widget.ensure()
+        window.started = True
+        QTimer.singleShot(0, lambda: QTimer.singleShot(0, interactive))
+    else:
+        window.ready.connect(lambda: QTimer.singleShot(0, interactive))
+    window.show()
+    app.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--probe-ms', type=int, default=200, help='latency of each stubbed device probe')
+    parser.add_argument('--eager', action='store_true', help='build every tab and probe devices before showing')
+    parser.add_argument('--budget-paint-ms', type=float, default=400)
+    parser.add_argument('--budget-interactive-ms', type=float, default=800)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.probe_ms, args.eager)
+        return 1
+
+    runs = []
+    command = [sys.executable, os.path.abspath(__file__), '--child', '--probe-ms', str(args.probe_ms)]
+    if args.eager:
+        command.append('--eager')
+    for _ in range(args.rounds):
+        result = subprocess.run(command, capture_output=True, text=True, timeout=120)
+        lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+        if not lines:
+            sys.stderr.write(f"bench_startup: child failed\n{result.stderr}")
+            return 2
+        runs.append(json.loads(lines[-1]))
+
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    print(f"{'eager' if args.eager else 'lazy'} start, {args.rounds} rounds, {args.probe_ms} ms per device probe")
+    for key, value in medians.items():
+        print(f"{key[:-3].replace('_', ' '):20s}: {value:8.1f} ms")
+    over = []
+    if medians['paint_ms'] > args.budget_paint_ms:
+        over.append(f"first paint {medians['paint_ms']:.0f} ms > {args.budget_paint_ms:.0f} ms")
+    if medians['interactive_ms'] > args.budget_interactive_ms:
+        over.append(f"interactive {medians['interactive_ms']:.0f} ms > {args.budget_interactive_ms:.0f} ms")
+    for line in over:
+        print(f"over budget: {line}")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
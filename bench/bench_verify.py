@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark read-back verification of an erased target.
+
+Compares `sha256sum` (one serial reader, the usual manual check) with
+core.verify at one and four threads, all reading a --size-mb file after
+a random erase with its page cache dropped. Use --dir to put the target
+on a real disk.
+
+Usage: python3 bench/bench_verify.py [--dir /path/on/real/disk] [--size-mb 1024] [--rounds 3]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+from core.erase import RandomStream, erase
+from core.verify import verify_pattern
+
+
+def drop_cache(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def sha256sum(path):
+    subprocess.run(['sha256sum', path], check=True, stdout=subprocess.DEVNULL)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory for the target file (default: system temp)')
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ventoy-verify-', dir=args.dir)
+    path = os.path.join(workdir, 'target.img')
+    size = args.size_mb * 1024 * 1024
+    try:
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        stream = RandomStream()
+        erase(path, 'random', stream=stream)
+        variants = (
+            ('sha256sum', lambda: sha256sum(path)),
+            ('verify, 1 thread', lambda: verify_pattern(path, size, 'random', stream, None, threads=1)),
+            ('verify, 4 threads', lambda: verify_pattern(path, size, 'random', stream, None, threads=4)),
+            ('verify, 64 samples', lambda: verify_pattern(path, size, 'random', stream, threads=4)),
+        )
+        results = []
+        for name, func in variants:
+            times = []
+            for _ in range(args.rounds):
+                drop_cache(path)
+                start = time.perf_counter()
+                mismatches = func()
+                times.append(time.perf_counter() - start)
+                assert not mismatches
+            results.append((name, min(times)))
+
+        baseline = results[0][1]
+        print(f"{args.size_mb} MiB target, {os.cpu_count()} CPU(s)")
+        for name, elapsed in results:
+            print(f"{name:20s}: {elapsed:7.2f} s  {size / elapsed / 1e6:8.0f} MB/s  x{baseline / elapsed:5.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""Ventoy-X command line interface; see lib/core/cli.py. Never imports Qt."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib'))
+
+from core.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
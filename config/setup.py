@@ -24,7 +24,7 @@ setup(
             'ventoy-gui = main:main',
         ],
         'console_scripts': [
-            'ventoy-gui-cli = main:main',
+            'ventoy-gui-cli = cli:main',
         ],
     },
     include_package_data=True,
@@ -0,0 +1,202 @@
+"""Content-addressed cache of decompressed boot assets.
+
+core.img.xz and ventoy*.disk.img.xz are decompressed once into the user
+cache directory, keyed by the SHA-256 of the compressed file, so repeated
+installs (a batch of sticks, an upgrade after an install) skip xz
+entirely. Entries are written atomically, checked against the digest
+recorded at creation the first time a process uses them, and evicted
+least recently used first once the cache grows past its size limit.
+Readers map the cached file, so concurrent installs share one page-cache
+copy.
+"""
+import contextlib
+import fcntl
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_CHUNK = 1024 * 1024
+
+
+def default_cache_dir():
+    """$VTOY_CACHE_DIR, else $XDG_CACHE_HOME/ventoy-x/assets (~/.cache by default)."""
+    if os.environ.get('VTOY_CACHE_DIR'):
+        return os.environ['VTOY_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ventoy-x', 'assets')
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                digest.update(data)
+    return digest.hexdigest()
+
+
+class AssetCache:
+    """Decompressed copies of .xz assets, shared between processes through the filesystem."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._digests = {}
+        self._verified = set()
+        self._lock = threading.Lock()
+
+    def key(self, source):
+        """SHA-256 of the compressed source, memoized per inode, size and mtime."""
+        st = os.stat(source)
+        stamp = (os.path.abspath(source), st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            digest = file_digest(source)
+            self._digests[stamp] = digest
+        return digest
+
+    def path(self, source):
+        """Return the path of the decompressed copy of source, creating it if needed.
+
+        Sources that are not .xz compressed are returned unchanged.
+        """
+        if not source.endswith('.xz'):
+            return source
+        key = self.key(source)
+        entry = os.path.join(self.directory, key)
+        with self._lock:
+            if self._valid(key, entry):
+                self._touch(entry)
+                return entry
+            os.makedirs(self.directory, exist_ok=True)
+            with self._dir_lock():
+                # Another process may have filled the entry while we waited for the lock
+                if not self._valid(key, entry):
+                    self._fill(source, key, entry)
+                self._evict(keep=key)
+        return entry
+
+    def map(self, source):
+        """Return a read-only mmap of the decompressed copy of source."""
+        with open(self.path(source), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def entries(self):
+        """Return [(key, size, last_used)] for the cached assets, oldest first."""
+        result = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if len(entry.name) == 64 and '.' not in entry.name:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        result.append((entry.name, st.st_size, st.st_mtime))
+        except OSError:
+            pass
+        result.sort(key=lambda item: item[2])
+        return result
+
+    def clear(self):
+        with self._lock:
+            for key, _, _ in self.entries():
+                self._remove(key)
+
+    @contextlib.contextmanager
+    def _dir_lock(self):
+        fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _valid(self, key, entry):
+        try:
+            st = os.stat(entry)
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if st.st_size != meta.get('size'):
+            self._remove(key)
+            return False
+        # Entries are only ever replaced by rename, so the inode identifies the verified content
+        stamp = (key, st.st_ino)
+        if stamp in self._verified:
+            return True
+        if file_digest(entry) != meta.get('sha256'):
+            self._remove(key)
+            return False
+        self._verified.add(stamp)
+        return True
+
+    def _fill(self, source, key, entry):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(prefix='.fill-', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as out, lzma.open(source, 'rb') as src:
+                while True:
+                    chunk = src.read(_CHUNK)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            os.chmod(tmp, 0o644)
+            meta = {'source': os.path.basename(source), 'size': size, 'sha256': digest.hexdigest()}
+            meta_fd, meta_tmp = tempfile.mkstemp(prefix='.meta-', dir=self.directory)
+            with os.fdopen(meta_fd, 'w') as f:
+                json.dump(meta, f)
+            os.chmod(meta_tmp, 0o644)
+            os.replace(meta_tmp, self._meta_path(key))
+            os.replace(tmp, entry)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+        self._verified.add((key, os.stat(entry).st_ino))
+
+    def _touch(self, entry):
+        # mtime is the LRU clock used by _evict()
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+
+    def _evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                self._remove(key)
+                total -= size
+
+    def _remove(self, key):
+        for path in (os.path.join(self.directory, key), self._meta_path(key)):
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+
+def warm(sources, cache=None):
+    """Populate the cache for sources ahead of a batch; returns the sources that failed."""
+    cache = cache or AssetCache()
+    failed = []
+    for source in sources:
+        try:
+            cache.path(source)
+        except (OSError, lzma.LZMAError):
+            failed.append(source)
+    return failed
@@ -0,0 +1,304 @@
+"""Verify the boot images on a Ventoy data partition against their published SHA-256 checksums.
+
+Expected checksums come from the checksum files sitting next to the images:
+- SHA256SUMS-style lists in GNU ("digest  name") or BSD
+  ("SHA256 (name) = digest") format, as shipped by most distributions
+  (SHA256SUMS, sha256sums.txt, Fedora's *-CHECKSUM, ...);
+- per-image <image>.sha256 / .sha256sum files, which win over a list.
+Images are hashed in parallel with large reads; hashlib releases the GIL
+while it digests a buffer, so the threads really run side by side. The
+digests are cached in the drive's core.isolib index by (path, size, mtime),
+so a file that did not change is never hashed twice.
+
+    python3 -m core.checksums /media/user/Ventoy --uuid 4E21-0000
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .inventory import format_size
+from .isolib import IsoLibrary, walk_images
+from .progress import format_marker, format_rate
+
+ALGORITHM = 'sha256'
+DEFAULT_JOBS = 4
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+# Anything bigger is not a checksum list
+MAX_CHECKSUM_FILE = 1024 * 1024
+SINGLE_SUFFIXES = ('.sha256', '.sha256sum')
+
+OK = 'ok'
+MISMATCH = 'mismatch'
+UNLISTED = 'unlisted'
+ERROR = 'error'
+
+_GNU_LINE = re.compile(r'^\\?([0-9a-fA-F]{64}) [ *]?(.+)$')
+_BSD_LINE = re.compile(r'^SHA256 ?\((.+)\) ?= ?([0-9a-fA-F]{64})$')
+_BARE_LINE = re.compile(r'^([0-9a-fA-F]{64})$')
+
+
+class Verification:
+    """The verdict for one image; elapsed is 0 for a digest taken from the cache."""
+    __slots__ = ('path', 'size', 'status', 'expected', 'actual', 'checksum_file', 'elapsed', 'cached', 'error')
+
+    def __init__(self, path, size, status, expected='', actual='', checksum_file='', elapsed=0.0, cached=False,
+                 error=''):
+        self.path = path
+        self.size = size
+        self.status = status
+        self.expected = expected
+        self.actual = actual
+        self.checksum_file = checksum_file
+        self.elapsed = elapsed
+        self.cached = cached
+        self.error = error
+
+    @property
+    def rate(self):
+        return self.size / self.elapsed if self.elapsed > 0 else None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class VerifyReport:
+    """All the verdicts of one run; hashed is the number of bytes actually read."""
+    __slots__ = ('results', 'hashed', 'elapsed')
+
+    def __init__(self, results, hashed, elapsed):
+        self.results = results
+        self.hashed = hashed
+        self.elapsed = elapsed
+
+    @property
+    def rate(self):
+        return self.hashed / self.elapsed if self.hashed and self.elapsed > 0 else None
+
+    @property
+    def ok(self):
+        return not any(r.status in (MISMATCH, ERROR) for r in self.results)
+
+    def count(self, status):
+        return sum(r.status == status for r in self.results)
+
+    def to_dict(self):
+        return {'results': [r.to_dict() for r in self.results], 'hashed': self.hashed, 'elapsed': self.elapsed,
+                'rate': self.rate}
+
+
+def is_checksum_file(name):
+    lower = name.lower()
+    return 'sha256' in lower or lower.endswith('checksum')
+
+
+def parse_checksums(text):
+    """[(name, digest)] from the lines of a checksum file; names are as written, digests lower case."""
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        match = _GNU_LINE.match(line)
+        if match:
+            entries.append((match.group(2), match.group(1).lower()))
+            continue
+        match = _BSD_LINE.match(line)
+        if match:
+            entries.append((match.group(1), match.group(2).lower()))
+    return entries
+
+
+def _read_small(path):
+    try:
+        if os.path.getsize(path) > MAX_CHECKSUM_FILE:
+            return None
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
+        return None
+
+
+def expected_digests(root, directories):
+    """{relative image path: (digest, relative checksum file)} from the checksum files in directories."""
+    expected = {}
+    for directory in directories:
+        try:
+            names = sorted(os.listdir(os.path.join(root, directory)))
+        except OSError:
+            continue
+        lists = {}
+        singles = {}
+        for name in names:
+            if not is_checksum_file(name):
+                continue
+            relative = os.path.join(directory, name)
+            text = _read_small(os.path.join(root, relative))
+            if text is None:
+                continue
+            single = next((name[:-len(s)] for s in SINGLE_SUFFIXES if name.lower().endswith(s)), None)
+            bare = _BARE_LINE.match(text.strip())
+            if single and bare:
+                singles[os.path.join(directory, single)] = (bare.group(1).lower(), relative)
+                continue
+            for listed, digest in parse_checksums(text):
+                # Names may carry "./" or a subdirectory relative to the list
+                target = os.path.normpath(os.path.join(directory, listed.lstrip('*')))
+                lists.setdefault(target, (digest, relative))
+        expected.update(lists)
+        expected.update(singles)
+    return expected
+
+
+def _lookup(expected, folded, path):
+    # exFAT and FAT are case-insensitive, checksum lists often are not written that way
+    return expected.get(path) or folded.get(path.lower())
+
+
+def hash_file(path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """SHA-256 hex digest of a file; progress(n) is called with each chunk's byte count."""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    with open(path, 'rb', buffering=0) as f, memoryview(buffer) as view:
+        fd = f.fileno()
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        offset = 0
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            # A full-stick pass would otherwise push everything else out of the page cache
+            os.posix_fadvise(fd, offset, n, os.POSIX_FADV_DONTNEED)
+            offset += n
+            if progress:
+                progress(n)
+    return digest.hexdigest()
+
+
+def verify_images(root, library=None, jobs=DEFAULT_JOBS, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                  on_result=None):
+    """Verify every image under root (see core.isolib.walk_images) and return a VerifyReport.
+
+    library is the drive's IsoLibrary, used as the digest cache.
+    progress(done, total) counts the bytes to hash, and on_result(Verification)
+    is called as each image is settled, both from worker threads.
+    """
+    start = time.monotonic()
+    images = sorted(walk_images(root))
+    expected = expected_digests(root, sorted({os.path.dirname(path) for path, _ in images}))
+    folded = {path.lower(): value for path, value in expected.items()}
+    cached = library.digests(ALGORITHM) if library else {}
+    results = []
+    todo = []
+    for path, st in images:
+        listed = _lookup(expected, folded, path)
+        if listed is None:
+            results.append(Verification(path, st.st_size, UNLISTED))
+            continue
+        hit = cached.get(path)
+        if hit and hit[:2] == (st.st_size, st.st_mtime_ns):
+            results.append(_verdict(path, st.st_size, listed, hit[2], 0.0, True))
+        else:
+            todo.append((path, st, listed))
+    if on_result:
+        for result in results:
+            on_result(result)
+
+    lock = threading.Lock()
+    state = {'done': 0}
+    total = sum(st.st_size for _, st, _ in todo)
+
+    def advance(n):
+        with lock:
+            state['done'] += n
+            done = state['done']
+        if progress:
+            progress(done, total)
+
+    def run(item):
+        path, st, listed = item
+        began = time.monotonic()
+        try:
+            actual = hash_file(os.path.join(root, path), chunk_size, advance)
+        except OSError as e:
+            result = Verification(path, st.st_size, ERROR, listed[0], checksum_file=listed[1], error=str(e))
+        else:
+            result = _verdict(path, st.st_size, listed, actual, time.monotonic() - began, False)
+        if on_result:
+            on_result(result)
+        return result, st
+
+    hashed = []
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(todo))), thread_name_prefix='checksum') as pool:
+            hashed = list(pool.map(run, todo))
+    results.extend(result for result, _ in hashed)
+    if library:
+        library.store_digests(ALGORITHM, [(r.path, st.st_size, st.st_mtime_ns, r.actual)
+                                          for r, st in hashed if r.actual])
+    results.sort(key=lambda r: r.path.lower())
+    return VerifyReport(results, state['done'], time.monotonic() - start)
+
+
+def _verdict(path, size, listed, actual, elapsed, cached):
+    digest, checksum_file = listed
+    return Verification(path, size, OK if actual == digest else MISMATCH, digest, actual, checksum_file, elapsed,
+                        cached)
+
+
+def describe(result):
+    """One log line for a Verification."""
+    if result.status == UNLISTED:
+        return f"{result.path}: no checksum listed"
+    if result.status == ERROR:
+        return f"{result.path}: could not read: {result.error}"
+    verdict = 'OK' if result.status == OK else f"MISMATCH (expected {result.expected[:16]}..., got {result.actual[:16]}...)"
+    if result.cached:
+        speed = 'unchanged, cached digest'
+    else:
+        speed = f"{format_size(result.size)} in {result.elapsed:.1f} s, {format_rate(result.rate) or '-'}"
+    return f"{result.path}: {verdict} [{result.checksum_file}] ({speed})"
+
+
+def summarize(report):
+    """One line with the totals and the aggregate throughput of a VerifyReport."""
+    cached = sum(r.cached for r in report.results)
+    return (f"{report.count(OK)} OK, {report.count(MISMATCH)} mismatched, {report.count(ERROR)} unreadable, "
+            f"{report.count(UNLISTED)} without a checksum; {format_size(report.hashed)} hashed in "
+            f"{report.elapsed:.1f} s ({format_rate(report.rate) or '-'}), {cached} from the cache")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify the images on a mounted Ventoy partition against SHA256SUMS.')
+    parser.add_argument('root', help='mount point of the data partition')
+    parser.add_argument('--uuid', default=None, help='partition UUID whose index caches the digests')
+    parser.add_argument('--index-dir', default=None)
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='files hashed at the same time')
+    parser.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    args = parser.parse_args(argv)
+    progress = None
+    if args.progress:
+        last = [0.0]
+
+        def progress(done, total):
+            now = time.monotonic()
+            if now - last[0] >= 0.25 or done == total:
+                last[0] = now
+                print(format_marker('Verifying checksums', done, total), flush=True)
+    library = IsoLibrary(args.uuid, args.index_dir) if args.uuid else None
+    try:
+        report = verify_images(args.root, library, args.jobs, progress=progress,
+                               on_result=lambda result: print(describe(result), flush=True))
+    except (OSError, sqlite3.Error) as e:
+        sys.stderr.write(f"checksums: {e}\n")
+        return 2
+    print(summarize(report))
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
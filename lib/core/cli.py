@@ -0,0 +1,354 @@
+"""Headless command line interface for scripts and provisioning boxes.
+
+Everything here is built on core and never imports Qt. Each subcommand
+imports only the modules it needs when it runs, so `list` starts in a
+fraction of the time the GUI takes just to load PySide6.
+
+Output is machine-readable:
+- list, themes and plugson print a single JSON document;
+- install, upgrade, erase and verify print NDJSON, one event per line:
+  {"event": "progress", "step": ..., "done": ..., "total": ...}, log and
+  status events, and a final {"event": "result", "ok": ...}.
+Errors that stop a command before it starts go to stderr. The exit code
+is 0 on success, 1 when the operation failed and 2 for bad arguments or
+targets.
+
+    python3 cli.py list
+    python3 cli.py install --jobs 2 /dev/sdb /dev/sdc
+    python3 cli.py erase /dev/sdb --quick --yes
+    python3 cli.py verify sdb
+    python3 cli.py plugson set theme '{"file": "/ventoy/theme/theme.txt"}'
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+VERSION_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../VERSION'))
+PROGRESS_INTERVAL = 0.25
+# core.erase.PATTERNS, spelled out so parsing the command line does not import the erase engine
+ERASE_PATTERNS = ('discard', 'multipass', 'random', 'zero')
+
+
+def emit(event, **fields):
+    """Write one NDJSON event to stdout."""
+    sys.stdout.write(json.dumps(dict(event=event, **fields)) + '\n')
+    sys.stdout.flush()
+
+
+def dump(document):
+    """Write a whole JSON document to stdout."""
+    json.dump(document, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+def progress_emitter(step):
+    """progress(done, total) that emits progress events at most every PROGRESS_INTERVAL seconds."""
+    last = [0.0]
+
+    def progress(done, total):
+        now = time.monotonic()
+        if now - last[0] >= PROGRESS_INTERVAL or done >= total:
+            last[0] = now
+            emit('progress', step=step, done=done, total=total)
+    return progress
+
+
+def _fail(message):
+    sys.stderr.write(f"cli: {message}\n")
+    return 2
+
+
+def _disks(all_disks=False):
+    from .disk import get_inventory, list_usb_disks
+    if all_disks:
+        return [dev.to_dict() for dev in get_inventory().scan()]
+    return list_usb_disks()
+
+
+def data_partition_of(target):
+    """(partition device, index UUID) for a disk name ('sdb'), a disk device or a partition device."""
+    from .isolib import data_partition
+    name = os.path.basename(target)
+    for disk in _disks(True):
+        if disk['name'] == name:
+            part = data_partition(disk)
+            if not part:
+                raise ValueError(f"{target} has no Ventoy data partition")
+        else:
+            part = next((p for p in disk.get('partitions', ()) if p['name'] == name), None)
+            if not part:
+                continue
+        return f"/dev/{part['name']}", part.get('uuid') or disk['key']
+    raise ValueError(f"no such disk or partition: {target}")
+
+
+def cmd_list(args):
+    dump(_disks(args.all))
+    return 0
+
+
+def cmd_install(args):
+    import signal
+    from .assetcache import warm
+    from .flash_station import boot_assets
+    from .jobs import JobEngine, install_job
+    # Checked before any job starts, as the jobs unmount the target's partitions first
+    for target in args.targets:
+        refusal = _target_refusal(target, args.command, args.force, unmounts=True)
+        if refusal:
+            return _fail(refusal)
+    signing = {}
+    if args.sign:
+        from .efisign import resolve_keys
+        try:
+            signing['sign_key'], signing['sign_cert'] = resolve_keys(args.sign_key, args.sign_cert)
+        except FileNotFoundError as e:
+            return _fail(f"--sign: {e}")
+    for source in warm(boot_assets()):
+        emit('log', target='batch', message=f"could not cache {source}, it will be decompressed per drive")
+    engine = JobEngine(args.jobs, args.per_controller)
+    engine.subscribe(lambda event: emit(**event))
+    # Ctrl+C cancels: the jobs stop their subprocesses, unmount and report back as cancelled
+    signal.signal(signal.SIGINT, lambda signum, frame: engine.cancel())
+    jobs = [engine.submit(install_job(target, args.secureboot, args.gpt, args.reserve_mb, args.command == 'upgrade',
+                                      args.verify, **signing))
+            for target in args.targets]
+    while not engine.wait(0.5):
+        pass
+    emit('result', ok=engine.succeeded(), targets=[job.to_dict() for job in jobs])
+    return 0 if engine.succeeded() else 1
+
+
+def _target_refusal(target, action, force, unmounts=False):
+    """Why target must not be erased or installed to, or '' if it may be.
+
+    Like the privileged helper: a drive holding a system mount is always
+    refused, a fixed (neither removable nor USB) disk unless force is set.
+    Mounted partitions are refused unless force, or unmounts when the
+    job unmounts them itself.
+    """
+    import stat
+    from .flash_station import _is_target
+    from .jobs import _mounted_partitions, disk_of, usb_controller
+    from .privhelper import SYSTEM_MOUNTS, _read_sys
+    if not _is_target(target):
+        return f"{target}: not a block device or image file"
+    mounted = _mounted_partitions(target)
+    for partition, mountpoint in mounted:
+        if mountpoint in SYSTEM_MOUNTS:
+            return f"{target} holds {mountpoint} ({partition}), refusing to {action} it"
+    if force:
+        return ''
+    if stat.S_ISBLK(os.stat(target).st_mode):
+        disk = disk_of(target)
+        if not usb_controller(disk) and _read_sys(f"/sys/class/block/{disk}/removable") != '1':
+            return f"{target} is neither removable nor on USB; pass --force to {action} it anyway"
+    if mounted and not unmounts:
+        return (f"{target} has mounted partitions ({', '.join(partition for partition, _ in mounted)}); "
+                f"unmount them or pass --force")
+    return ''
+
+
+def cmd_erase(args):
+    from .erase import RandomStream, erase, quick_erase, target_size
+    from .verify import verify_pattern
+    refusal = _target_refusal(args.target, 'erase', args.force)
+    if refusal:
+        return _fail(refusal)
+    if not (args.yes or args.force):
+        return _fail(f"erasing destroys everything on {args.target}; pass --yes to go ahead")
+    if args.quick:
+        extents = quick_erase(args.target)
+        emit('result', ok=True, target=args.target,
+             cleared=[{'offset': e.offset, 'length': e.length, 'what': e.what} for e in extents])
+        return 0
+    stream = RandomStream()
+    passes = erase(args.target, args.pattern, threads=args.threads, progress=progress_emitter('Erasing'),
+                   direct=not args.buffered, stream=stream)
+    mismatches = []
+    if args.verify and passes[-1] in ('zero', 'one', 'random'):
+        fd = os.open(args.target, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            size = target_size(fd)
+        finally:
+            os.close(fd)
+        mismatches = verify_pattern(args.target, size, passes[-1], stream,
+                                    args.samples if args.verify == 'sample' else None, args.threads,
+                                    progress_emitter('Verifying'))
+    emit('result', ok=not mismatches, target=args.target, passes=passes,
+         mismatches=[{'offset': m.offset, 'length': m.length} for m in mismatches])
+    return 1 if mismatches else 0
+
+
+def cmd_verify(args):
+    import sqlite3
+    from .checksums import verify_images
+    from .isolib import IsoLibrary
+
+    def run(mountpoint, uuid):
+        library = IsoLibrary(uuid) if uuid else None
+        try:
+            return verify_images(mountpoint, library, args.jobs, progress=progress_emitter('Verifying checksums'),
+                                 on_result=lambda result: emit('image', **result.to_dict()))
+        except sqlite3.Error as e:
+            raise OSError(f"digest cache: {e}")
+
+    if os.path.isdir(args.target):
+        report = run(args.target, args.uuid)
+    else:
+        from .mounts import get_mount_manager
+        try:
+            device, uuid = data_partition_of(args.target)
+        except ValueError as e:
+            return _fail(e)
+        with get_mount_manager().lease(device) as mountpoint:
+            report = run(mountpoint, args.uuid or uuid)
+    summary = report.to_dict()
+    del summary['results']
+    emit('result', ok=report.ok, **summary)
+    return 0 if report.ok else 1
+
+
+def cmd_themes(args):
+    from .mounts import get_mount_manager
+    from .themes import ThemeIndex
+    themes = ThemeIndex(mounts=None if args.no_mount else get_mount_manager()).scan(_disks())
+    dump([theme.to_dict() for theme in sorted(themes, key=lambda t: (t.disk, t.name.lower()))])
+    return 0
+
+
+def _walk(document, key):
+    # Dotted keys reach into nested objects, e.g. "theme.file"
+    node = document
+    for part in key.split('.'):
+        if not isinstance(node, dict) or part not in node:
+            raise KeyError(key)
+        node = node[part]
+    return node
+
+
+def cmd_plugson(args):
+    from .plugson import find_plugin_json, save_plugin_json
+    path = args.file or find_plugin_json()
+    if not path:
+        return _fail('no ventoy.json found, pass --file')
+    try:
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        if args.action == 'get':
+            return _fail(f"{path} does not exist")
+        document = {}
+    if args.action == 'get':
+        try:
+            dump(_walk(document, args.key) if args.key else document)
+        except KeyError:
+            return _fail(f"{args.key} is not set in {path}")
+        return 0
+    if args.value == '-':
+        value = json.load(sys.stdin)
+    else:
+        try:
+            value = json.loads(args.value)
+        except ValueError:
+            # A bare word is taken as a string
+            value = args.value
+    parent = document
+    parts = args.key.split('.')
+    for part in parts[:-1]:
+        parent = parent.setdefault(part, {})
+        if not isinstance(parent, dict):
+            return _fail(f"{part} in {args.key} is not an object")
+    parent[parts[-1]] = value
+    save_plugin_json(document, path)
+    dump({'file': path, 'key': args.key, 'value': value})
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ventoy-x-cli', description='Ventoy-X without the GUI.')
+    parser.add_argument('--version', action='store_true', help='print the version and exit')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    listing = commands.add_parser('list', help='USB disks and their partitions as JSON')
+    listing.add_argument('--all', action='store_true', help='every disk, not only USB ones')
+    listing.set_defaults(func=cmd_list)
+
+    for name, action in (('install', 'Install Ventoy on'), ('upgrade', 'Upgrade Ventoy on')):
+        install = commands.add_parser(name, help=f"{action} drives in parallel (root)")
+        install.add_argument('targets', nargs='+', help='block devices or disk image files')
+        install.add_argument('-j', '--jobs', type=int, default=2, help='maximum concurrent installs')
+        install.add_argument('--per-controller', type=int, default=2,
+                             help='maximum concurrent installs on drives behind one USB controller')
+        install.add_argument('-s', '--secureboot', action='store_true')
+        install.add_argument('-g', '--gpt', action='store_true')
+        install.add_argument('-r', '--reserve-mb', type=int, default=0)
+        install.add_argument('--verify', action='store_true', help='read back and check the written boot images')
+        install.add_argument('--sign', action='store_true',
+                             help='sign the EFI files with a Secure Boot key (once for the whole batch)')
+        install.add_argument('--sign-key', default=None, help='with --sign: key (default: the one found on the system)')
+        install.add_argument('--sign-cert', default=None, help='with --sign: certificate (default: likewise)')
+        install.add_argument('--force', action='store_true',
+                             help='also use disks that are neither removable nor on USB (never one holding a system mount)')
+        install.set_defaults(func=cmd_install)
+
+    erase = commands.add_parser('erase', help='erase a whole drive or image file (root)')
+    erase.add_argument('target')
+    erase.add_argument('--pattern', choices=ERASE_PATTERNS, default='random')
+    erase.add_argument('--quick', action='store_true', help='only clear partition tables and filesystem metadata')
+    erase.add_argument('--threads', type=int, default=4, help='writes kept in flight')
+    erase.add_argument('--buffered', action='store_true', help='do not use O_DIRECT')
+    erase.add_argument('--verify', choices=('sample', 'full'), help='read back the last pass afterwards')
+    erase.add_argument('--samples', type=int, default=64, help='chunks read by --verify sample')
+    erase.add_argument('--yes', action='store_true', help='confirm that everything on the target may be destroyed')
+    erase.add_argument('--force', action='store_true',
+                       help='also erase a fixed disk or one with mounted partitions (never one holding a system '
+                            'mount); implies --yes')
+    erase.set_defaults(func=cmd_erase)
+
+    verify = commands.add_parser('verify', help='check the images on a drive against their SHA256SUMS')
+    verify.add_argument('target', help='disk (sdb), data partition (/dev/sdb1) or mount point')
+    verify.add_argument('--uuid', default=None, help='index the digests are cached under (default: the partition UUID)')
+    verify.add_argument('--jobs', type=int, default=4, help='files hashed at the same time')
+    verify.set_defaults(func=cmd_verify)
+
+    themes = commands.add_parser('themes', help='GRUB themes on the USB drives as JSON')
+    themes.add_argument('--no-mount', action='store_true', help='skip partitions that would have to be mounted')
+    themes.set_defaults(func=cmd_themes)
+
+    plugson = commands.add_parser('plugson', help='read or change ventoy.json')
+    plugson.add_argument('--file', default=None, help='ventoy.json to use (default: the first one found)')
+    actions = plugson.add_subparsers(dest='action', metavar='ACTION', required=True)
+    get = actions.add_parser('get', help='print the document, or one (dotted) key of it')
+    get.add_argument('key', nargs='?')
+    put = actions.add_parser('set', help='set a (dotted) key to a JSON value, or - to read it from stdin')
+    put.add_argument('key')
+    put.add_argument('value')
+    plugson.set_defaults(func=cmd_plugson)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.version:
+        with open(VERSION_FILE) as f:
+            print(f.read().strip())
+        return 0
+    if not args.command:
+        parser.print_usage(sys.stderr)
+        return 2
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # The reader went away, e.g. `list | head`
+        return 1
+    except (OSError, ValueError, RuntimeError) as e:
+        sys.stderr.write(f"cli: {e}\n")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
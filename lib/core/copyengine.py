@@ -0,0 +1,393 @@
+"""Fast, resumable copy of boot images onto a Ventoy data partition.
+
+Several files are copied at once (jobs), each in large chunks. The data is
+moved by the kernel where it can be: copy_file_range, then sendfile, then
+pread/pwrite through a page-aligned buffer as the last resort. The copy
+advises the kernel to drop the source pages behind it, so a few GiB of
+ISOs do not push everything else out of the page cache.
+
+Each file is written to a hidden partial file next to its destination.
+The partial's name carries the source size and mtime. Nothing is flushed
+per file. The partition is synced once, when every file is done, and only
+then are the partials renamed into place. A copy that was cancelled or
+killed leaves its partials behind, and copying the same files again
+resumes them after checking that their tail still matches the source.
+A finished file is skipped when its size matches and its mtime matches to
+within what the destination filesystem can store (2 s on FAT, 10 ms on
+exFAT).
+
+    python3 -m core.copyengine ~/Downloads/*.iso /media/user/Ventoy --jobs 2
+"""
+import argparse
+import errno
+import mmap
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .inventory import format_size
+from .persistence import filesystem_type
+from .progress import format_marker
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_JOBS = 2
+PARTIAL_SUFFIX = '.part'
+# Bytes at the end of a partial file compared with the source before it is resumed
+RESUME_CHECK = 1024 * 1024
+# Written chunks are dropped from the page cache this many chunks behind, once write-back had a chance
+DROP_LAG = 4
+
+# Errors meaning "this transfer method does not work for these two files", not "the copy failed"
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+METHODS = ('copy_file_range', 'sendfile', 'buffer')
+# Timestamp resolution (ns) of filesystems that cannot keep the source's mtime exactly; fuseblk may be exFAT
+MTIME_GRANULARITY = {'vfat': 2 * 10**9, 'msdos': 2 * 10**9, 'exfat': 10**7, 'fuseblk': 10**7,
+                     'ntfs': 100, 'ntfs3': 100}
+
+
+class CopyJob:
+    """One file to copy, with its progress."""
+    __slots__ = ('source', 'dest', 'size', 'mtime_ns', 'partial', 'done', 'resumed_from', 'method', 'error')
+
+    def __init__(self, source, dest, size, mtime_ns):
+        self.source = source
+        self.dest = dest
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.partial = partial_path(dest, size, mtime_ns)
+        self.done = 0
+        self.resumed_from = 0
+        self.method = ''
+        self.error = ''
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CopyResult:
+    """Outcome of CopyEngine.copy(); rate is in bytes per second of unpaused time."""
+    __slots__ = ('jobs', 'copied', 'skipped', 'elapsed', 'cancelled')
+
+    def __init__(self, jobs, copied, skipped, elapsed, cancelled):
+        self.jobs = jobs
+        self.copied = copied
+        self.skipped = skipped
+        self.elapsed = elapsed
+        self.cancelled = cancelled
+
+    @property
+    def failed(self):
+        return [job for job in self.jobs if job.error]
+
+    @property
+    def rate(self):
+        return self.copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {'jobs': [job.to_dict() for job in self.jobs], 'copied': self.copied, 'skipped': self.skipped,
+                'elapsed': self.elapsed, 'cancelled': self.cancelled, 'rate': self.rate}
+
+
+def partial_path(dest, size, mtime_ns):
+    """Hidden file the copy of one version of a source is written to before it is renamed to dest."""
+    directory, name = os.path.split(dest)
+    return os.path.join(directory, f".{name}.{size}-{mtime_ns}{PARTIAL_SUFFIX}")
+
+
+def plan_jobs(sources, dest_dir):
+    """CopyJobs for copying the source files into dest_dir, keeping their names."""
+    jobs = []
+    for source in sources:
+        st = os.stat(source)
+        jobs.append(CopyJob(source, os.path.join(dest_dir, os.path.basename(source)), st.st_size, st.st_mtime_ns))
+    return jobs
+
+
+def mtime_granularity(directory):
+    """Smallest mtime step (ns) the filesystem directory is on can store."""
+    return MTIME_GRANULARITY.get(filesystem_type(directory), 1)
+
+
+def _advise(fd, offset, length, advice):
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+
+class CopyEngine:
+    """Copies files with jobs parallel streams; pause(), resume() and cancel() may be called from any thread.
+
+    progress(done, total, rate) is called from the worker threads after
+    every chunk, with byte counts for the whole batch.
+    """
+
+    def __init__(self, jobs=DEFAULT_JOBS, chunk_size=DEFAULT_CHUNK_SIZE, sync=True, progress=None,
+                 clock=time.monotonic):
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.sync = sync
+        self.progress = progress
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+        self._paused_at = None
+        self._paused_total = 0.0
+        self._start = None
+        self._done = 0
+        self._granularity = {}
+        self._copied = 0
+        self._total = 0
+        # Methods that failed as unsupported; later files start with the next one
+        self._skip_methods = set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        with self._lock:
+            if self._paused_at is None:
+                self._paused_at = self.clock()
+                self._running.clear()
+
+    def resume(self):
+        with self._lock:
+            if self._paused_at is not None:
+                self._paused_total += self.clock() - self._paused_at
+                self._paused_at = None
+                self._running.set()
+
+    def cancel(self):
+        """Stop after the current chunks; the partial files are kept so the copy can be resumed."""
+        self._cancelled.set()
+        self._running.set()
+
+    def _elapsed(self):
+        with self._lock:
+            paused = self._paused_total
+            if self._paused_at is not None:
+                paused += self.clock() - self._paused_at
+        return max(0.0, self.clock() - self._start - paused)
+
+    def _advance(self, n):
+        with self._lock:
+            self._done += n
+            self._copied += n
+            done, total, copied = self._done, self._total, self._copied
+        if self.progress:
+            elapsed = self._elapsed()
+            self.progress(done, total, copied / elapsed if elapsed > 0 else 0.0)
+
+    def copy(self, jobs):
+        """Copy a list of CopyJobs (see plan_jobs) and return a CopyResult.
+
+        Raises OSError before copying anything if the destination is short
+        of space. Errors in single files are recorded on their job instead.
+        """
+        self._start = self.clock()
+        self._paused_total = 0.0
+        self._copied = 0
+        skipped = 0
+        todo = []
+        for job in jobs:
+            if self._complete(job):
+                job.done = job.size
+                skipped += 1
+            else:
+                todo.append(job)
+        self._check_space(todo)
+        self._total = sum(job.size for job in jobs)
+        self._done = sum(job.size for job in jobs if job not in todo)
+        if todo:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(todo))),
+                                    thread_name_prefix='copy') as pool:
+                list(pool.map(self._run, todo))
+        cancelled = self._cancelled.is_set()
+        finished = [job for job in todo if not job.error and job.done == job.size]
+        if finished and not cancelled:
+            self._finish(finished)
+        return CopyResult(jobs, self._copied, skipped, self._elapsed(), cancelled)
+
+    def _complete(self, job):
+        try:
+            st = os.stat(job.dest)
+        except OSError:
+            return False
+        directory = os.path.dirname(job.dest) or '.'
+        if directory not in self._granularity:
+            self._granularity[directory] = mtime_granularity(directory)
+        return st.st_size == job.size and abs(st.st_mtime_ns - job.mtime_ns) < self._granularity[directory]
+
+    def _check_space(self, jobs):
+        needed = {}
+        for job in jobs:
+            try:
+                have = os.stat(job.partial).st_size
+            except OSError:
+                have = 0
+            directory = os.path.dirname(job.dest) or '.'
+            needed[directory] = needed.get(directory, 0) + max(0, job.size - have)
+        for directory, size in needed.items():
+            st = os.statvfs(directory)
+            free = st.f_bavail * st.f_frsize
+            if size > free:
+                raise OSError(errno.ENOSPC, f"{format_size(size)} needed, {format_size(free)} free", directory)
+
+    def _finish(self, jobs):
+        # One flush for the whole batch, then the renames, whose metadata is cheap to flush again
+        if self.sync:
+            os.sync()
+            for job in jobs:
+                # Clean now, so the copied images can leave the page cache too
+                try:
+                    fd = os.open(job.partial, os.O_RDONLY | os.O_CLOEXEC)
+                except OSError:
+                    continue
+                _advise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                os.close(fd)
+        for job in jobs:
+            try:
+                os.utime(job.partial, ns=(job.mtime_ns, job.mtime_ns))
+                os.replace(job.partial, job.dest)
+            except OSError as e:
+                job.error = str(e)
+        if self.sync:
+            os.sync()
+
+    def _run(self, job):
+        try:
+            self._copy_file(job)
+        except OSError as e:
+            job.error = str(e)
+
+    def _resume_offset(self, job, src, dst):
+        # A partial whose tail does not match the source was written by something else; start over
+        size = os.fstat(dst).st_size
+        if size > job.size:
+            return 0
+        # Round down so a chunk that may have been torn is copied again
+        offset = size - size % self.chunk_size if size < job.size else size
+        check = min(RESUME_CHECK, offset)
+        if check and os.pread(src, check, offset - check) != os.pread(dst, check, offset - check):
+            return 0
+        return offset
+
+    def _copy_file(self, job):
+        src = os.open(job.source, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            dst = os.open(job.partial, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            try:
+                offset = self._resume_offset(job, src, dst)
+                os.ftruncate(dst, offset)
+                job.resumed_from = job.done = offset
+                self._advance_done(offset)
+                _advise(src, offset, 0, os.POSIX_FADV_SEQUENTIAL)
+                self._transfer(job, src, dst, offset)
+            finally:
+                os.close(dst)
+        finally:
+            os.close(src)
+
+    def _advance_done(self, n):
+        # Bytes already in a partial count as done, but not as copied in this session
+        with self._lock:
+            self._done += n
+
+    def _transfer(self, job, src, dst, offset):
+        methods = [m for m in METHODS if m not in self._skip_methods or m == 'buffer']
+        buffer = None
+        try:
+            while offset < job.size:
+                self._running.wait()
+                if self._cancelled.is_set():
+                    return
+                length = min(self.chunk_size, job.size - offset)
+                method = methods[0]
+                try:
+                    if method == 'copy_file_range':
+                        n = os.copy_file_range(src, dst, length, offset, offset)
+                    elif method == 'sendfile':
+                        os.lseek(dst, offset, os.SEEK_SET)
+                        n = os.sendfile(dst, src, offset, length)
+                    else:
+                        if buffer is None:
+                            buffer = mmap.mmap(-1, self.chunk_size)
+                        n = self._buffered(src, dst, buffer, offset, length)
+                except OSError as e:
+                    if method == 'buffer' or e.errno not in _UNSUPPORTED:
+                        raise
+                    n = 0
+                if not n:
+                    if method == 'buffer':
+                        raise OSError(errno.EIO, 'source ended early', job.source)
+                    # Unsupported, or a filesystem that returns 0 instead of failing
+                    with self._lock:
+                        self._skip_methods.add(method)
+                    methods.pop(0)
+                    continue
+                job.method = method
+                # Only clean pages are dropped, so this never forces a write-back
+                _advise(src, offset, n, os.POSIX_FADV_DONTNEED)
+                lag = DROP_LAG * self.chunk_size
+                if offset >= lag:
+                    _advise(dst, offset - lag, n, os.POSIX_FADV_DONTNEED)
+                offset += n
+                job.done = offset
+                self._advance(n)
+        finally:
+            if buffer is not None:
+                buffer.close()
+
+    def _buffered(self, src, dst, buffer, offset, length):
+        with memoryview(buffer) as view:
+            n = os.preadv(src, [view[:length]], offset)
+            pos = 0
+            while pos < n:
+                pos += os.pwrite(dst, view[pos:n], offset + pos)
+        return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Copy boot images onto a (Ventoy) partition, resumably.')
+    parser.add_argument('sources', nargs='+', metavar='SOURCE')
+    parser.add_argument('dest', help='destination directory')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='files copied at the same time')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024))
+    parser.add_argument('--no-sync', action='store_true', help='do not flush the destination at the end')
+    parser.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.dest):
+        parser.error(f"{args.dest} is not a directory")
+    progress = None
+    if args.progress:
+        last = [0.0]
+
+        def progress(done, total, rate):
+            now = time.monotonic()
+            if now - last[0] >= 0.25 or done == total:
+                last[0] = now
+                print(format_marker('Copying images', done, total), flush=True)
+    engine = CopyEngine(args.jobs, args.chunk_mb * 1024 * 1024, not args.no_sync, progress)
+    # Ctrl-C stops cleanly, keeping the partial files to resume from
+    signal.signal(signal.SIGINT, lambda *_: engine.cancel())
+    try:
+        result = engine.copy(plan_jobs(args.sources, args.dest))
+    except OSError as e:
+        sys.stderr.write(f"copyengine: {e}\n")
+        return 1
+    for job in result.failed:
+        sys.stderr.write(f"copyengine: {job.source}: {job.error}\n")
+    print(f"{len(result.jobs) - len(result.failed)} of {len(result.jobs)} files, {format_size(result.copied)} copied "
+          f"in {result.elapsed:.1f} s ({result.rate / 1e6:.1f} MB/s), {result.skipped} already there"
+          f"{', cancelled' if result.cancelled else ''}")
+    return 1 if result.failed or result.cancelled else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""Sign the EFI binaries Ventoy boots with a custom Secure Boot key.
+
+The install used to mount the stick, find every .efi file and run sbsign
+on them one after another, on every stick, ignoring failures. Here:
+- sign_files() keeps up to jobs sbsign processes running at once,
+  verifies every result (sbverify against the certificate, or the PE
+  certificate table when sbverify is not installed) and returns a
+  SignResult per file;
+- SignCache keeps the signed copy of every binary, keyed by the SHA-256
+  of the unsigned file and of the certificate. A binary already signed
+  with the certificate is left alone, and one that was signed before is
+  copied from the cache instead of signed again;
+- stage_image() signs a copy of the ESP image (ventoy.disk.img.xz) once
+  per image and certificate. The install writes that copy in place of
+  the original (VTOY_EFI_IMAGE), so a batch of sticks shares one signing
+  run and nothing has to be mounted on the sticks.
+
+The key and certificate default to the ones core.secureboot finds.
+
+    python3 -m core.efisign sign /mnt/VTOYEFI --key MOK.key --cert MOK.crt
+    python3 -m core.efisign stage src/ventoy/ventoy.disk.img.xz
+"""
+import argparse
+import contextlib
+import fcntl
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .assetcache import AssetCache, default_cache_dir, file_digest
+from .secureboot import detect_system_keys
+
+# sbsign mostly starts up, reads and writes, so more run at once than there are CPUs
+DEFAULT_JOBS = 8
+
+SIGNED = 'signed'
+CACHED = 'cached'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+# PE data directory index of the Authenticode certificate table
+_SECURITY_DIRECTORY = 4
+
+
+class SignResult:
+    """What happened to one file: signed, cached (copied from the cache), skipped (already signed) or failed."""
+    __slots__ = ('path', 'state', 'message')
+
+    def __init__(self, path, state, message=''):
+        self.path = path
+        self.state = state
+        self.message = message
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SigningError(RuntimeError):
+    """Some files could not be signed or did not verify; results has every SignResult."""
+
+    def __init__(self, results):
+        self.results = results
+        failed = [result for result in results if result.state == FAILED]
+        super().__init__(f"{len(failed)} of {len(results)} EFI file(s) could not be signed: "
+                         f"{', '.join(os.path.basename(result.path) for result in failed)}")
+
+
+def resolve_keys(key=None, cert=None):
+    """(key, cert), filling in what is missing from core.secureboot; raises FileNotFoundError without a pair."""
+    if not key or not cert:
+        found_key, found_cert = detect_system_keys()
+        key, cert = key or found_key, cert or found_cert
+    for path, what in ((key, 'signing key'), (cert, 'certificate')):
+        if not path or not os.path.isfile(path):
+            raise FileNotFoundError(f"no {what} found" if not path else f"{what} {path} does not exist")
+    return os.path.realpath(key), os.path.realpath(cert)
+
+
+def key_id(cert):
+    """SHA-256 of the certificate file, which names everything signed with it in the cache."""
+    return file_digest(cert)
+
+
+def has_signature(path):
+    """Whether a PE/COFF binary carries an Authenticode certificate table."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(4096)
+        if header[:2] != b'MZ':
+            return False
+        pe = struct.unpack_from('<I', header, 0x3c)[0]
+        if header[pe:pe + 4] != b'PE\0\0':
+            return False
+        optional = pe + 24
+        # PE32 and PE32+ optional headers differ in size before the data directories
+        count_at = optional + (92 if struct.unpack_from('<H', header, optional)[0] == 0x10b else 108)
+        if struct.unpack_from('<I', header, count_at)[0] <= _SECURITY_DIRECTORY:
+            return False
+        offset, size = struct.unpack_from('<II', header, count_at + 4 + 8 * _SECURITY_DIRECTORY)
+        return offset > 0 and size > 0
+    except (OSError, struct.error):
+        return False
+
+
+def verify_signature(path, cert):
+    """'' if path is signed with cert, else why not; without sbverify only the signature's presence is checked."""
+    if shutil.which('sbverify'):
+        process = subprocess.run(['sbverify', '--cert', cert, path], capture_output=True, text=True)
+        if process.returncode != 0:
+            lines = (process.stderr or process.stdout).strip().splitlines()
+            return lines[-1] if lines else f"sbverify exited with code {process.returncode}"
+        return ''
+    return '' if has_signature(path) else 'no signature after signing'
+
+
+def find_efi_files(root):
+    """Every .efi file below root (FAT names are case-insensitive, e.g. BOOTX64.EFI), sorted."""
+    found = []
+    for directory, _, names in os.walk(root):
+        found.extend(os.path.join(directory, name) for name in names if name.lower().endswith('.efi'))
+    return sorted(found)
+
+
+def default_sign_cache_dir():
+    """The 'signed' directory of the asset cache (see core.assetcache.default_cache_dir)."""
+    return os.path.join(default_cache_dir(), 'signed')
+
+
+class SignCache:
+    """Signed copies of EFI binaries and ESP images, per certificate, shared between processes.
+
+    <directory>/<key id>/<digest> is the signed copy of the unsigned file
+    with that SHA-256, and <directory>/<key id>/<digest>.signed marks
+    content that already is signed with the certificate.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_sign_cache_dir()
+
+    def signed_copy(self, key_id, digest):
+        """Path of the signed copy of the file with SHA-256 digest, or None."""
+        path = os.path.join(self.directory, key_id, digest)
+        return path if os.path.isfile(path) else None
+
+    def is_signed(self, key_id, digest):
+        return os.path.exists(os.path.join(self.directory, key_id, digest + '.signed'))
+
+    def add(self, key_id, digest, signed_path):
+        """Keep a copy of signed_path as the signed form of digest; returns the signed file's digest."""
+        directory = os.path.join(self.directory, key_id)
+        os.makedirs(directory, exist_ok=True)
+        signed_digest = file_digest(signed_path)
+        _copy_atomically(signed_path, os.path.join(directory, digest))
+        with open(os.path.join(directory, signed_digest + '.signed'), 'w'):
+            pass
+        return signed_digest
+
+    def image_path(self, key_id, image_digest):
+        return os.path.join(self.directory, key_id, f"{image_digest}.img")
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold the cache's lock file, between threads and processes alike."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+
+def _copy_atomically(source, destination):
+    fd, tmp = tempfile.mkstemp(prefix='.sign-', dir=os.path.dirname(destination))
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, destination)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def _sbsign(path, key, cert):
+    """Sign path in place through a temporary file next to it; returns '' or the error."""
+    fd, tmp = tempfile.mkstemp(prefix='.sbsign-', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        process = subprocess.run(['sbsign', '--key', key, '--cert', cert, '--output', tmp, path],
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            lines = (process.stderr or process.stdout).strip().splitlines()
+            return lines[-1] if lines else f"sbsign exited with code {process.returncode}"
+        os.replace(tmp, path)
+        return ''
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+
+
+def sign_one(path, key, cert, key_id, cache_dir=None, verify=True):
+    """Sign one file, using and filling the cache; returns a SignResult."""
+    cache = SignCache(cache_dir) if cache_dir is not False else None
+    try:
+        digest = file_digest(path)
+        if cache and cache.is_signed(key_id, digest):
+            return SignResult(path, SKIPPED, 'already signed with this certificate')
+        copy = cache.signed_copy(key_id, digest) if cache else None
+        if copy:
+            _copy_atomically(copy, path)
+            state = CACHED
+        else:
+            error = _sbsign(path, key, cert)
+            if error:
+                return SignResult(path, FAILED, error)
+            state = SIGNED
+        error = verify_signature(path, cert) if verify else ''
+        if error:
+            return SignResult(path, FAILED, error)
+        if cache and state == SIGNED:
+            cache.add(key_id, digest, path)
+        return SignResult(path, state)
+    except OSError as e:
+        return SignResult(path, FAILED, str(e))
+
+
+def sign_files(paths, key=None, cert=None, jobs=DEFAULT_JOBS, cache=None, verify=True, on_result=None,
+               cancelled=None):
+    """Sign paths in place, jobs sbsign processes at a time; returns their SignResults in the order of paths.
+
+    cache is a SignCache, None for the default one or False for none.
+    on_result(result) is called as each file finishes, and cancelled()
+    between them; once it returns True, files not started yet are
+    dropped from the results.
+    """
+    key, cert = resolve_keys(key, cert)
+    if not shutil.which('sbsign'):
+        raise FileNotFoundError('sbsign is not installed')
+    paths = list(paths)
+    if not paths:
+        return []
+    cache_dir = False if cache is False else (cache or SignCache()).directory
+    ident = key_id(cert)
+    results = {}
+    # The work is in the sbsign processes and in hashing, which releases the GIL, so threads drive them
+    with ThreadPoolExecutor(max(1, min(jobs, len(paths))), thread_name_prefix='efisign') as pool:
+        futures = {pool.submit(sign_one, path, key, cert, ident, cache_dir, verify): path for path in paths}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.path] = result
+            if on_result:
+                on_result(result)
+            if cancelled and cancelled():
+                # Not shutdown(cancel_futures=True), which needs Python 3.9
+                for pending in futures:
+                    pending.cancel()
+                break
+    return [results[path] for path in paths if path in results]
+
+
+def image_digest(source):
+    """SHA-256 of an ESP image as shipped (the .xz file, if it is compressed)."""
+    return AssetCache().key(source) if source.endswith('.xz') else file_digest(source)
+
+
+def stage_image(source, key=None, cert=None, jobs=DEFAULT_JOBS, cache=None, on_result=None, cancelled=None):
+    """Path of a copy of the ESP image source with every .efi file signed, made once per image and certificate.
+
+    The copy is loop mounted to sign it, which needs root. Raises
+    SigningError if a file could not be signed, and RuntimeError if the
+    image could not be mounted.
+    """
+    key, cert = resolve_keys(key, cert)
+    cache = cache or SignCache()
+    ident = key_id(cert)
+    staged = cache.image_path(ident, image_digest(source))
+    if os.path.isfile(staged):
+        return staged
+    with cache.lock():
+        # Another job may have staged it while we waited for the lock
+        if os.path.isfile(staged):
+            return staged
+        raw = AssetCache().path(source)
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.stage-', dir=os.path.dirname(staged))
+        os.close(fd)
+        mountpoint = tempfile.mkdtemp(prefix='ventoy-x-esp-')
+        try:
+            shutil.copyfile(raw, tmp)
+            process = subprocess.run(['mount', '-o', 'loop', tmp, mountpoint], capture_output=True, text=True)
+            if process.returncode != 0:
+                error = (process.stderr.strip().splitlines() or [f"exit code {process.returncode}"])[0]
+                raise RuntimeError(f"could not mount {os.path.basename(source)}: {error}")
+            try:
+                results = sign_files(find_efi_files(mountpoint), key, cert, jobs, cache, on_result=on_result,
+                                     cancelled=cancelled)
+            finally:
+                subprocess.run(['umount', mountpoint], capture_output=True)
+            if any(result.state == FAILED for result in results):
+                raise SigningError(results)
+            if cancelled and cancelled():
+                raise RuntimeError('cancelled')
+            os.replace(tmp, staged)
+        finally:
+            os.rmdir(mountpoint)
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+    return staged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sign EFI binaries or a Ventoy ESP image with sbsign.')
+    parser.add_argument('--key', default=None, help='signing key (default: the one core.secureboot finds)')
+    parser.add_argument('--cert', default=None, help='certificate (default: the one core.secureboot finds)')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='files signed at the same time')
+    commands = parser.add_subparsers(dest='command', required=True)
+    sign = commands.add_parser('sign', help='sign .efi files in place')
+    sign.add_argument('paths', nargs='+', help='.efi files, or directories to search for them')
+    sign.add_argument('--no-cache', action='store_true', help='sign every file, without the signed copy cache')
+    sign.add_argument('--no-verify', action='store_true', help='do not check the signatures afterwards')
+    stage = commands.add_parser('stage', help='make (or find) the signed copy of an ESP image and print its path')
+    stage.add_argument('image')
+    args = parser.parse_args(argv)
+
+    def report(result):
+        print(f"{result.state:8s} {result.path}{f' ({result.message})' if result.message else ''}")
+
+    try:
+        if args.command == 'stage':
+            print(stage_image(args.image, args.key, args.cert, args.jobs, on_result=report))
+            return 0
+        paths = [found for path in args.paths
+                 for found in (find_efi_files(path) if os.path.isdir(path) else [path])]
+        results = sign_files(paths, args.key, args.cert, args.jobs, False if args.no_cache else None,
+                             not args.no_verify, report)
+    except SigningError as e:
+        sys.stderr.write(f"efisign: {e}\n")
+        return 1
+    except (OSError, RuntimeError) as e:
+        sys.stderr.write(f"efisign: {e}\n")
+        return 2
+    return 1 if any(result.state == FAILED for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
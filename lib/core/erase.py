@@ -0,0 +1,368 @@
+"""Native drive erase (replacement for `dd if=/dev/urandom of=/dev/sdX bs=1M`).
+
+Worker threads fill large page-aligned buffers and pwrite them at
+independent offsets with O_DIRECT where the target allows it, so several
+writes are in flight and the page cache is left alone. Random data comes
+from RandomStream instead of the kernel CRNG, which tops out at a few
+hundred MB/s per core. The 'discard' pattern asks the device to drop every
+block. A secure discard (BLKSECDISCARD) is the whole erase. A plain
+BLKDISCARD does not promise that the blocks read back as zeros, so it is
+followed by a zero pass, as is a device that supports neither.
+
+quick_erase() only zeroes the metadata extents found by core.signatures
+(partition tables, filesystem, RAID and LVM superblocks at both ends of
+the disk and of every partition) with one flush, in constant time.
+
+    python3 -m core.erase /dev/sdX --pattern random --progress
+    python3 -m core.erase /dev/sdX --quick
+"""
+import argparse
+import errno
+import fcntl
+import hashlib
+import mmap
+import os
+import random
+import stat
+import struct
+import sys
+import threading
+import time
+
+from .progress import format_marker
+from .signatures import metadata_extents
+from .verify import DEFAULT_SAMPLES, verify_pattern
+
+BLKGETSIZE64 = 0x80081272
+BLKDISCARD = 0x1277
+BLKSECDISCARD = 0x127d
+BLKRRPART = 0x125f
+
+ALIGNMENT = 4096
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_THREADS = 4
+POOL_SIZE = 16 * 1024 * 1024
+# A new pool is derived for every RESEED_INTERVAL bytes of the target
+RESEED_INTERVAL = 1024 * 1024 * 1024
+_GROUP_BLOCKS = 256
+_CACHED_POOLS = 8
+
+# Passes run for each pattern, in order
+PATTERNS = {
+    'zero': ('zero',),
+    'random': ('random',),
+    'multipass': ('zero', 'one', 'random'),
+    'discard': ('discard',),
+}
+
+_FILL_BYTES = {'zero': b'\x00', 'one': b'\xff'}
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS}
+
+
+class RandomStream:
+    """Fast incompressible filler: 4 KiB windows of a random pool at random offsets.
+
+    Not a CSPRNG. Overwriting only needs every block to differ and to be
+    incompressible, so a flash controller can neither compress nor
+    deduplicate the pass away. Each GiB of the target gets its own pool,
+    derived (SHAKE-256) from a random key and the GiB's index, and every
+    window starts with its block number, so no two blocks are the same.
+    The pools and window offsets are functions of the key and the
+    position, so the same stream can regenerate any part of what it wrote
+    for read-back verification. Thread-safe.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.pool_size = pool_size
+        self._key = os.urandom(32)
+        self._seed = int.from_bytes(os.urandom(16), 'little') << 64
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, epoch):
+        with self._lock:
+            pool = self._pools.get(epoch)
+        if pool is None:
+            # Built outside the lock, so threads in other GiBs are not held up
+            digest = hashlib.shake_256(self._key + epoch.to_bytes(8, 'little')).digest(self.pool_size + ALIGNMENT)
+            with self._lock:
+                if len(self._pools) >= _CACHED_POOLS:
+                    # Writers move forward together; drop the pool furthest from them
+                    self._pools.pop(max(self._pools, key=lambda cached: abs(cached - epoch)))
+                pool = self._pools.setdefault(epoch, memoryview(digest))
+        return pool
+
+    def fill(self, view, position=0):
+        """Fill view with the stream bytes at byte position (a multiple of ALIGNMENT)."""
+        block = position // ALIGNMENT
+        blocks_per_pool = RESEED_INTERVAL // ALIGNMENT
+        pack = struct.Struct('<Q').pack_into
+        start = 0
+        while start < len(view):
+            epoch, in_epoch = divmod(block, blocks_per_pool)
+            source = self._pool(epoch)
+            group, index = divmod(block, _GROUP_BLOCKS)
+            rng = random.Random(self._seed + group)
+            offsets = [rng.randrange(self.pool_size) for _ in range(_GROUP_BLOCKS)]
+            # Stop at the end of the group, the view and the pool's GiB
+            count = min(_GROUP_BLOCKS - index, -(-(len(view) - start) // ALIGNMENT), blocks_per_pool - in_epoch)
+            for offset in offsets[index:index + count]:
+                n = min(ALIGNMENT, len(view) - start)
+                view[start:start + n] = source[offset:offset + n]
+                if n >= 8:
+                    pack(view, start, block)
+                start += n
+                block += 1
+
+
+def open_target(path, direct=True):
+    """Open an existing device or file for writing; returns (fd, direct).
+
+    Falls back to buffered I/O where O_DIRECT is not supported (tmpfs, some FUSE mounts).
+    """
+    flags = os.O_WRONLY | os.O_CLOEXEC
+    if direct:
+        try:
+            return os.open(path, flags | os.O_DIRECT), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    return os.open(path, flags), False
+
+
+def target_size(fd):
+    """Size in bytes of a block device or regular file."""
+    st = os.fstat(fd)
+    if stat.S_ISBLK(st.st_mode):
+        return struct.unpack('Q', fcntl.ioctl(fd, BLKGETSIZE64, b'\0' * 8))[0]
+    return st.st_size
+
+
+def discard(fd, size):
+    """Discard the whole device; returns 'secure', 'discard' or None if unsupported."""
+    span = struct.pack('QQ', 0, size)
+    for request, kind in ((BLKSECDISCARD, 'secure'), (BLKDISCARD, 'discard')):
+        try:
+            fcntl.ioctl(fd, request, span)
+            return kind
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+    return None
+
+
+def _set_direct(fd, enabled):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_DIRECT if enabled else flags & ~os.O_DIRECT)
+
+
+def _write_pass(fd, size, kind, chunk_size, threads, stream, progress, done_before, direct):
+    # O_DIRECT needs aligned lengths; an unaligned tail of a plain file is written buffered
+    aligned = size - size % ALIGNMENT if direct else size
+    shared = None
+    if kind in _FILL_BYTES:
+        shared = mmap.mmap(-1, chunk_size)
+        if kind != 'zero':
+            shared.write(_FILL_BYTES[kind] * chunk_size)
+    state = {'next': 0, 'done': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    error = []
+
+    def worker():
+        buf = shared or mmap.mmap(-1, chunk_size)
+        try:
+            with memoryview(buf) as view:
+                while not stop.is_set():
+                    with lock:
+                        offset = state['next']
+                        state['next'] += chunk_size
+                    if offset >= aligned:
+                        break
+                    n = min(chunk_size, aligned - offset)
+                    if stream is not None:
+                        stream.fill(view[:n], offset)
+                    pos = 0
+                    while pos < n:
+                        pos += os.pwrite(fd, view[pos:n], offset + pos)
+                    with lock:
+                        state['done'] += n
+                        if progress:
+                            progress(done_before + state['done'])
+        except Exception as e:
+            error.append(e)
+            stop.set()
+        finally:
+            if buf is not shared:
+                buf.close()
+
+    workers = [threading.Thread(target=worker, name=f"erase-{i}", daemon=True)
+               for i in range(max(1, min(threads, -(-aligned // chunk_size))))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if shared is not None:
+        shared.close()
+    if error:
+        raise error[0]
+    if aligned < size:
+        tail = size - aligned
+        if stream is not None:
+            data = bytearray(tail)
+            stream.fill(memoryview(data), aligned)
+        else:
+            data = _FILL_BYTES[kind] * tail
+        if direct:
+            _set_direct(fd, False)
+        try:
+            os.pwrite(fd, data, aligned)
+        finally:
+            if direct:
+                _set_direct(fd, True)
+        if progress:
+            progress(done_before + size)
+    return size
+
+
+def erase(target, pattern='random', chunk_size=DEFAULT_CHUNK_SIZE, threads=DEFAULT_THREADS, progress=None,
+          sync=True, direct=True, stream=None):
+    """Erase a whole device or image file with one of PATTERNS.
+
+    progress(done, total) is called as chunks complete, from the worker
+    threads. Pass a RandomStream as stream to verify a random pass later.
+    Returns the passes actually run: ['secure'] for a secure discard,
+    ['discard', 'zero'] for a plain one and ['zero'] without discard support.
+    """
+    passes = list(PATTERNS[pattern])
+    fd, direct = open_target(target, direct)
+    try:
+        size = target_size(fd)
+        done = []
+        if passes == ['discard']:
+            kind = discard(fd, size)
+            if kind == 'secure':
+                if progress:
+                    progress(size, size)
+                return [kind]
+            # What a plainly discarded block reads back as is up to the device, so zero it as well
+            if kind:
+                done.append(kind)
+            passes = ['zero']
+        total = size * len(passes)
+        report = (lambda n: progress(n, total)) if progress else None
+        if 'random' in passes:
+            stream = stream or RandomStream()
+        for i, kind in enumerate(passes):
+            _write_pass(fd, size, kind, chunk_size, threads, stream if kind == 'random' else None,
+                        report, i * size, direct)
+            # Each pass has to reach the medium before the next one overwrites it
+            if sync:
+                os.fsync(fd)
+            done.append(kind)
+        return done
+    finally:
+        os.close(fd)
+
+
+def reread_partitions(fd):
+    """Ask the kernel to drop its view of the old partitions; False if the device is busy or not a disk."""
+    if not stat.S_ISBLK(os.fstat(fd).st_mode):
+        return False
+    try:
+        fcntl.ioctl(fd, BLKRRPART)
+        return True
+    except OSError:
+        return False
+
+
+def quick_erase(target, sync=True):
+    """Zero every known metadata location of target with one flush; returns the cleared Extents."""
+    fd = os.open(target, os.O_RDWR | os.O_CLOEXEC)
+    try:
+        extents = metadata_extents(fd, target_size(fd))
+        zeros = bytes(min(DEFAULT_CHUNK_SIZE, max((e.length for e in extents), default=0)))
+        with memoryview(zeros) as view:
+            for extent in extents:
+                done = 0
+                while done < extent.length:
+                    n = min(len(zeros), extent.length - done)
+                    done += os.pwrite(fd, view[:n], extent.offset + done)
+        if sync:
+            os.fsync(fd)
+        reread_partitions(fd)
+        return extents
+    finally:
+        os.close(fd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Erase a whole device or image file.')
+    parser.add_argument('target')
+    parser.add_argument('--pattern', choices=sorted(PATTERNS), default='random')
+    parser.add_argument('--quick', action='store_true',
+                        help='only clear partition tables and filesystem/RAID/LVM metadata')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='writes kept in flight')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024))
+    parser.add_argument('--buffered', action='store_true', help='do not use O_DIRECT')
+    parser.add_argument('--verify', choices=('sample', 'full'), help='read back the last pass afterwards')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='chunks read by --verify sample')
+    parser.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    args = parser.parse_args(argv)
+
+    def reporter(step):
+        if not args.progress:
+            return None
+        last = [0.0]
+
+        def progress(done, total):
+            now = time.monotonic()
+            if now - last[0] >= 0.25 or done >= total:
+                last[0] = now
+                print(format_marker(step, done, total), flush=True)
+        return progress
+
+    if args.quick:
+        try:
+            extents = quick_erase(args.target)
+        except OSError as e:
+            sys.stderr.write(f"erase: {e}\n")
+            return 1
+        for extent in extents:
+            print(f"Cleared {extent.length} bytes at {extent.offset}: {extent.what}")
+        print(f"Erased {args.target}: {len(extents)} metadata extents, "
+              f"{sum(e.length for e in extents)} bytes")
+        return 0
+
+    stream = RandomStream()
+    try:
+        passes = erase(args.target, args.pattern, args.chunk_mb * 1024 * 1024, args.threads, reporter('Erasing'),
+                       direct=not args.buffered, stream=stream)
+        print(f"Erased {args.target}: {' + '.join(passes)}", flush=True)
+        if not args.verify:
+            return 0
+        if passes[-1] not in ('zero', 'one', 'random'):
+            # What a discarded block reads back as is up to the device
+            print(f"Nothing to verify after {passes[-1]}")
+            return 0
+        fd = os.open(args.target, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            size = target_size(fd)
+        finally:
+            os.close(fd)
+        mismatches = verify_pattern(args.target, size, passes[-1], stream,
+                                    args.samples if args.verify == 'sample' else None, args.threads,
+                                    reporter('Verifying'))
+    except OSError as e:
+        sys.stderr.write(f"erase: {e}\n")
+        return 1
+    for m in mismatches:
+        print(f"Mismatch at byte {m.offset} ({m.length} bytes)")
+    if mismatches:
+        return 1
+    print(f"Verified {args.target}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
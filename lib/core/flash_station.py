@@ -0,0 +1,177 @@
+"""Batch ("flash station") Ventoy install/upgrade on many drives at once.
+
+The batch runs as core.jobs install jobs on a JobEngine, so it gets the
+engine's per-controller limit and cancellation (Ctrl+C or a "cancel"
+line on stdin). This module also holds what those jobs use to drive
+Ventoy2Disk.sh. Run as root, once per batch, so a single privilege
+escalation covers every drive:
+
+    pkexec env PYTHONPATH=lib python3 -m core.flash_station --jobs 4 /dev/sdb /dev/sdc
+
+Progress is written to stdout as one JSON event per line, the events of
+core.jobs. `cli.py install` runs the same jobs.
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import stat
+import subprocess
+import sys
+import threading
+
+from .assetcache import warm
+from .progress import VENTOY_MILESTONES, milestone_percent, parse_marker
+
+SCRIPT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src/Ventoy2Disk.sh'))
+LIB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Compressed images VentoyWorker.sh writes, relative to the script directory
+ASSET_PATTERNS = ('boot/*.img.xz', 'ventoy/*.disk.img.xz')
+# The ESP image VentoyWorker.sh writes to partition 2, unless VTOY_EFI_IMAGE names a (signed) replacement
+ESP_IMAGE = os.path.join(os.path.dirname(SCRIPT_PATH), 'ventoy', 'ventoy.disk.img.xz')
+
+
+def ventoy2disk_args(secureboot=False, use_gpt=False, reserve_mb=0, upgrade=False):
+    """Build the Ventoy2Disk.sh option list (without the target device)."""
+    args = []
+    if secureboot:
+        args.append('-s')
+    if use_gpt:
+        args.append('-g')
+    if reserve_mb:
+        args.extend(['-r', str(int(reserve_mb))])
+    args.append('-u' if upgrade else '-I')
+    return args
+
+
+class LoopDevice:
+    """Attach a disk image file as a partition-scanning loop device (needs root)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.device = None
+
+    def __enter__(self):
+        self.device = subprocess.check_output(
+            ['losetup', '--find', '--show', '--partscan', self.path], text=True).strip()
+        return self.device
+
+    def __exit__(self, *exc):
+        subprocess.run(['losetup', '--detach', self.device], capture_output=True)
+
+
+def ventoy2disk_command(options, device, script_path=SCRIPT_PATH, timeout=300, verify=False, efi_image=None):
+    """(args, env, cwd) to run Ventoy2Disk.sh with options (see ventoy2disk_args) against device.
+
+    efi_image replaces the ESP image, e.g. with one core.efisign signed.
+    """
+    args = ['timeout', str(timeout), 'bash', script_path] + ventoy2disk_args(**options) + [device]
+    # VTOY_PYTHON lets VentoyWorker.sh use the native image writer
+    env = dict(os.environ, PYTHONPATH=LIB_DIR, VTOY_PYTHON=sys.executable, VTOY_PROGRESS='1')
+    if verify:
+        env['VTOY_VERIFY'] = '1'
+    if efi_image:
+        env['VTOY_EFI_IMAGE'] = efi_image
+    return args, env, os.path.dirname(script_path)
+
+
+class Ventoy2DiskOutput:
+    """Turns Ventoy2Disk.sh output lines into report(message, percent, fields) calls.
+
+    fields are the image writer's marker fields; its byte progress is
+    spread over the span up to the next milestone. finished tells whether
+    the script printed its success line.
+    """
+
+    def __init__(self, report):
+        self.report = report
+        self.milestone = 0
+        self.finished = False
+
+    def feed(self, line):
+        line = line.rstrip()
+        fields = parse_marker(line)
+        if fields is not None:
+            if fields.get('total'):
+                following = min((value for _, value in VENTOY_MILESTONES if value > self.milestone), default=100)
+                self.report(None, self.milestone + (following - self.milestone) * fields.get('done', 0) // fields['total'],
+                            fields)
+            return
+        percent = milestone_percent(line)
+        if percent is not None:
+            self.milestone = percent
+        self.finished = self.finished or 'successfully finished' in line
+        self.report(line, percent)
+
+
+def boot_assets(script_path=SCRIPT_PATH):
+    """The .xz boot images used by an install, for warming the asset cache."""
+    base = os.path.dirname(script_path)
+    return sorted(path for pattern in ASSET_PATTERNS for path in glob.glob(os.path.join(base, pattern)))
+
+
+def _is_target(path):
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return False
+    return stat.S_ISBLK(mode) or stat.S_ISREG(mode)
+
+
+def main(argv=None):
+    from .jobs import DEFAULT_PER_CONTROLLER, JobEngine, install_job
+    parser = argparse.ArgumentParser(description='Install or upgrade Ventoy on several drives in parallel.')
+    parser.add_argument('targets', nargs='+', help='block devices or disk image files')
+    parser.add_argument('-j', '--jobs', type=int, default=2, help='maximum concurrent installs')
+    parser.add_argument('--per-controller', type=int, default=DEFAULT_PER_CONTROLLER,
+                        help='installs running at the same time on drives behind one USB controller')
+    parser.add_argument('-s', '--secureboot', action='store_true')
+    parser.add_argument('-g', '--gpt', action='store_true')
+    parser.add_argument('-r', '--reserve-mb', type=int, default=0)
+    parser.add_argument('-u', '--upgrade', action='store_true')
+    parser.add_argument('--verify', action='store_true', help='read back and check the written boot images')
+    parser.add_argument('--sign-key', default='', help='sign the EFI files with this key (and --sign-cert)')
+    parser.add_argument('--sign-cert', default='')
+    args = parser.parse_args(argv)
+
+    def emit(event):
+        sys.stdout.write(json.dumps(event) + '\n')
+        sys.stdout.flush()
+
+    for target in args.targets:
+        if not _is_target(target):
+            emit({'event': 'status', 'job': None, 'target': target, 'state': 'failed', 'percent': 0,
+                  'message': 'not a block device or image file'})
+            return 2
+    if bool(args.sign_key) != bool(args.sign_cert):
+        sys.stderr.write("flash_station: --sign-key and --sign-cert go together\n")
+        return 2
+
+    # Decompress the boot images once up front instead of in every worker
+    for source in warm(boot_assets()):
+        emit({'event': 'log', 'job': None, 'target': 'batch', 'level': 'warning',
+              'message': f"could not cache {source}, it will be decompressed per drive"})
+
+    engine = JobEngine(args.jobs, args.per_controller)
+    engine.subscribe(emit)
+
+    def commands():
+        for line in sys.stdin:
+            if line.strip() == 'cancel':
+                engine.cancel()
+
+    signal.signal(signal.SIGINT, lambda signum, frame: engine.cancel())
+    threading.Thread(target=commands, name='flash-stdin', daemon=True).start()
+    for target in args.targets:
+        engine.submit(install_job(target, args.secureboot, args.gpt, args.reserve_mb, args.upgrade, args.verify,
+                                  sign_key=args.sign_key, sign_cert=args.sign_cert))
+    # Short waits keep the main thread responsive to SIGINT
+    while not engine.wait(0.5):
+        pass
+    return 0 if engine.succeeded() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Block-device hotplug events from the kernel, without udev or polling.
+
+NetlinkEventSource listens on the NETLINK_KOBJECT_UEVENT socket and turns
+the kernel's block uevents (add, remove, change) into HotplugEvents.
+HotplugMonitor reads them on a background thread and hands each one to a
+callback, so the drive list can update as soon as a stick is plugged in.
+
+Uevents are datagrams, and the kernel drops them when the socket buffer
+is full, for example when a hub full of sticks comes up at once. The
+overflow (ENOBUFS) is reported as a single RESCAN event, which means
+"anything may have changed, list the drives again". If netlink can not
+be opened at all, start() returns False. If the source fails later, the
+monitor calls on_error. Either way the caller falls back to polling, as
+the GUI does with its refresh timer. QueueEventSource feeds a monitor
+from the same process, for tests and benchmarks.
+"""
+import errno
+import os
+import queue
+import select
+import socket
+import threading
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+# Action of the event that stands in for uevents the kernel dropped: everything may have changed
+RESCAN = 'rescan'
+
+
+class HotplugEvent:
+    """A single block-device uevent (add/remove/change)."""
+    __slots__ = ('action', 'name', 'devtype', 'subsystem')
+
+    def __init__(self, action, name, devtype='disk', subsystem='block'):
+        self.action = action
+        self.name = name
+        self.devtype = devtype
+        self.subsystem = subsystem
+
+    def __repr__(self):
+        return f"HotplugEvent({self.action!r}, {self.name!r}, {self.devtype!r})"
+
+
+def parse_uevent(data):
+    """Parse a raw kernel uevent datagram into a HotplugEvent, or None if it is not a block event."""
+    fields = {}
+    for chunk in data.split(b'\0')[1:]:
+        key, sep, value = chunk.partition(b'=')
+        if sep:
+            fields[key.decode('ascii', 'replace')] = value.decode('utf-8', 'replace')
+    if fields.get('SUBSYSTEM') != 'block':
+        return None
+    action = fields.get('ACTION')
+    name = fields.get('DEVNAME') or os.path.basename(fields.get('DEVPATH', ''))
+    if not action or not name:
+        return None
+    return HotplugEvent(action, os.path.basename(name), fields.get('DEVTYPE', 'disk'))
+
+
+class NetlinkEventSource:
+    """Reads block-device uevents straight from the kernel netlink socket."""
+
+    def __init__(self, group=KERNEL_GROUP):
+        self.group = group
+        self.sock = None
+
+    def open(self):
+        """Open the netlink socket; raises OSError when netlink is not available."""
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                             NETLINK_KOBJECT_UEVENT)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+            sock.bind((0, self.group))
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def read(self, timeout):
+        """Return the events received within timeout seconds (possibly empty).
+
+        When the socket's buffer overflowed (e.g. many sticks plugged in at
+        once) the lost events are reported as one RESCAN event.
+        """
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        events = []
+        while ready:
+            try:
+                data = self.sock.recv(64 * 1024, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                if not any(event.action == RESCAN for event in events):
+                    events.append(HotplugEvent(RESCAN, ''))
+                continue
+            event = parse_uevent(data)
+            if event:
+                events.append(event)
+        return events
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class QueueEventSource:
+    """In-process event feed; push events with put() to drive a monitor without a kernel."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def open(self):
+        pass
+
+    def put(self, action, name, devtype='disk'):
+        self.events.put(HotplugEvent(action, name, devtype))
+
+    def read(self, timeout):
+        try:
+            events = [self.events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        pass
+
+
+class HotplugMonitor:
+    """Background thread that forwards block-device hotplug events to a callback.
+
+    The callback runs on the monitor thread, so GUI users must marshal it
+    onto their own thread (e.g. through a Qt signal). If the source fails
+    for good, the thread ends and on_error(exception) is called (from the
+    monitor thread too), so the user can fall back to polling.
+    """
+
+    def __init__(self, callback, source=None, poll_interval=0.5, on_error=None):
+        self.callback = callback
+        self.on_error = on_error
+        self.source = source if source is not None else NetlinkEventSource()
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start listening. Returns False if the event source cannot be opened."""
+        if self._thread:
+            return True
+        try:
+            self.source.open()
+        except OSError:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hotplug-monitor', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.source.close()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                events = self.source.read(self.poll_interval)
+            except OSError as e:
+                if self.on_error and not self._stop.is_set():
+                    self.on_error(e)
+                break
+            for event in events:
+                self.callback(event)
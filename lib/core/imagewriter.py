@@ -0,0 +1,217 @@
+"""Streaming boot image writer (replacement for `xzcat image.xz | dd bs=512 ...`).
+
+Decompresses .xz images on the fly into large page-aligned buffers and
+writes them with pwrite at a sector offset, overlapping decompression and
+I/O, then flushes once at the end. With an AssetCache the decompressed
+copy is mapped from the cache instead, so xz only runs once per asset.
+Works on block devices and on plain image files (which are never
+truncated).
+
+    python3 -m core.imagewriter /dev/sdX core.img.xz 1 2047 ventoy.disk.img.xz 2048 65536
+"""
+import argparse
+import lzma
+import mmap
+import os
+import queue
+import sys
+import threading
+import time
+
+from .assetcache import AssetCache
+from .progress import format_marker
+
+SECTOR_SIZE = 512
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class WriteJob:
+    """One image to write: source file, sector offset and optional sector limit."""
+    __slots__ = ('source', 'seek', 'count')
+
+    def __init__(self, source, seek=0, count=None):
+        self.source = source
+        self.seek = seek
+        self.count = count
+
+
+def open_source(path):
+    """Open an image for reading, transparently decompressing .xz files."""
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rb')
+    return open(path, 'rb', buffering=0)
+
+
+def open_target(path):
+    """Open a block device or image file for writing without truncating it."""
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o644)
+
+
+def _fill(source, view):
+    """Read until view is full or the source is exhausted; returns the byte count."""
+    filled = 0
+    while filled < len(view):
+        n = source.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _stream(fd, job, buffer_size, progress, done_before):
+    limit = job.count * SECTOR_SIZE if job.count is not None else None
+    offset = job.seek * SECTOR_SIZE
+    buffers = queue.Queue()
+    for _ in range(3):
+        buffers.put(mmap.mmap(-1, buffer_size))
+    filled = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    error = []
+
+    # Decompression releases the GIL, so a reader thread keeps the device busy
+    def reader():
+        remaining = limit
+        try:
+            with open_source(job.source) as source:
+                while (remaining is None or remaining > 0) and not stop.is_set():
+                    buf = buffers.get()
+                    want = buffer_size if remaining is None else min(buffer_size, remaining)
+                    n = _fill(source, memoryview(buf)[:want])
+                    if not n:
+                        buffers.put(buf)
+                        break
+                    filled.put((buf, n))
+                    if remaining is not None:
+                        remaining -= n
+                    if n < want:
+                        break
+        except Exception as e:
+            error.append(e)
+        filled.put(None)
+
+    thread = threading.Thread(target=reader, name='imagewriter-reader', daemon=True)
+    thread.start()
+    written = 0
+    try:
+        while True:
+            item = filled.get()
+            if item is None:
+                break
+            buf, n = item
+            view = memoryview(buf)[:n]
+            pos = 0
+            while pos < n:
+                pos += os.pwrite(fd, view[pos:], offset + written + pos)
+            view.release()
+            written += n
+            buffers.put(buf)
+            if progress:
+                progress(done_before + written)
+    finally:
+        # Drain so the reader can never block forever on a full queue
+        stop.set()
+        while thread.is_alive():
+            try:
+                item = filled.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not None:
+                buffers.put(item[0])
+        thread.join()
+    if error:
+        raise error[0]
+    return written
+
+
+def _write_mapped(fd, data, job, buffer_size, progress, done_before):
+    limit = len(data) if job.count is None else min(len(data), job.count * SECTOR_SIZE)
+    offset = job.seek * SECTOR_SIZE
+    written = 0
+    with memoryview(data) as view:
+        while written < limit:
+            written += os.pwrite(fd, view[written:min(limit, written + buffer_size)], offset + written)
+            if progress:
+                progress(done_before + written)
+    return written
+
+
+def _mapped_source(cache, source):
+    if cache is None or not source.endswith('.xz'):
+        return None
+    try:
+        return cache.map(source)
+    except (OSError, ValueError):
+        # Unwritable or full cache directory: stream from the .xz file instead
+        return None
+
+
+def write_images(target, jobs, buffer_size=DEFAULT_BUFFER_SIZE, progress=None, sync=True, cache=None):
+    """Write several images into one target with a single open and a single flush.
+
+    progress(bytes_written) is called after every buffer. cache is an
+    optional AssetCache for the .xz sources. Returns the total number of
+    bytes written.
+    """
+    fd = open_target(target)
+    total = 0
+    try:
+        for job in jobs:
+            data = _mapped_source(cache, job.source)
+            if data is None:
+                total += _stream(fd, job, buffer_size, progress, total)
+            else:
+                with data:
+                    total += _write_mapped(fd, data, job, buffer_size, progress, total)
+        if sync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    return total
+
+
+def write_image(source, target, seek=0, count=None, buffer_size=DEFAULT_BUFFER_SIZE, progress=None, sync=True,
+                cache=None):
+    """Write one (optionally .xz compressed) image at sector seek, at most count sectors."""
+    return write_images(target, [WriteJob(source, seek, count)], buffer_size, progress, sync, cache)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write (.xz compressed) images at sector offsets with one flush.')
+    parser.add_argument('target')
+    parser.add_argument('images', nargs='+', metavar='SOURCE SEEK COUNT',
+                        help='image, offset in 512-byte sectors and maximum sectors ("-" for no limit)')
+    parser.add_argument('--buffer-mb', type=int, default=DEFAULT_BUFFER_SIZE // (1024 * 1024))
+    parser.add_argument('--no-cache', action='store_true', help='always decompress, bypassing the asset cache')
+    parser.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    args = parser.parse_args(argv)
+    if len(args.images) % 3:
+        parser.error('images must be given as SOURCE SEEK COUNT triples')
+    try:
+        jobs = [WriteJob(args.images[i], int(args.images[i + 1]),
+                         None if args.images[i + 2] == '-' else int(args.images[i + 2]))
+                for i in range(0, len(args.images), 3)]
+    except ValueError:
+        parser.error('SEEK and COUNT must be sector numbers')
+    progress = None
+    if args.progress:
+        total = sum(job.count * SECTOR_SIZE for job in jobs if job.count is not None) or None
+        last = [0.0]
+
+        def progress(done):
+            now = time.monotonic()
+            if now - last[0] >= 0.25:
+                last[0] = now
+                print(format_marker('Writing boot images', done, total), flush=True)
+    try:
+        written = write_images(args.target, jobs, args.buffer_mb * 1024 * 1024, progress,
+                               cache=None if args.no_cache else AssetCache())
+        if args.progress:
+            print(format_marker('Writing boot images', written, written), flush=True)
+    except (OSError, lzma.LZMAError) as e:
+        sys.stderr.write(f"imagewriter: {e}\n")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Block device inventory read straight from sysfs, without running lsblk.
+
+DiskInventory.scan() lists /sys/class/block and returns a BlockDevice
+per whole disk, with its partitions. Vendor, model and serial come from
+sysfs, or from the USB device above the disk. WWN and filesystem type,
+label and UUID come from the udev database. Mount points come from
+/proc/mounts. Records are cached per disk and read again only when its
+sysfs link, partition set or udev entries change, or after invalidate()
+(e.g. on a hotplug event). So a rescan costs little more than a
+directory listing. Every root can be pointed at a fake tree, which is
+how tests/test_inventory.py runs it.
+"""
+import os
+import threading
+
+# sysfs reports sizes and offsets in 512-byte units regardless of the logical block size
+SECTOR_SIZE = 512
+
+_TRANSPORTS = (
+    ('/usb', 'usb'),
+    ('/nvme', 'nvme'),
+    ('/mmc_host/', 'mmc'),
+    ('/ata', 'sata'),
+    ('/virtio', 'virtio'),
+)
+
+
+class Partition:
+    """A partition of a block device as seen in sysfs."""
+    __slots__ = ('name', 'number', 'start', 'size', 'fstype', 'label', 'uuid', 'mountpoint')
+
+    def __init__(self, name, number=0, start=0, size=0, fstype='', label='', uuid='', mountpoint=''):
+        self.name = name
+        self.number = number
+        self.start = start
+        self.size = size
+        self.fstype = fstype
+        self.label = label
+        self.uuid = uuid
+        self.mountpoint = mountpoint
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BlockDevice:
+    """A whole-disk block device; sizes are in bytes."""
+    __slots__ = ('name', 'model', 'vendor', 'serial', 'wwn', 'size', 'removable',
+                 'transport', 'partitions', 'mountpoint', 'syspath')
+
+    def __init__(self, name, model='', vendor='', serial='', wwn='', size=0, removable=False,
+                 transport='', partitions=(), mountpoint='', syspath=''):
+        self.name = name
+        self.model = model
+        self.vendor = vendor
+        self.serial = serial
+        self.wwn = wwn
+        self.size = size
+        self.removable = removable
+        self.transport = transport
+        self.partitions = tuple(partitions)
+        self.mountpoint = mountpoint
+        self.syspath = syspath
+
+    @property
+    def key(self):
+        """Stable identity that survives re-enumeration under a different /dev name."""
+        if self.wwn:
+            return f"wwn:{self.wwn}"
+        if self.serial:
+            return f"serial:{self.vendor}:{self.model}:{self.serial}"
+        return f"name:{self.name}"
+
+    @property
+    def mounted(self):
+        return bool(self.mountpoint) or any(p.mountpoint for p in self.partitions)
+
+    def __eq__(self, other):
+        if not isinstance(other, BlockDevice):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__
+                   if name != 'partitions') and \
+            [p.to_dict() for p in self.partitions] == [p.to_dict() for p in other.partitions]
+
+    def to_dict(self):
+        """Dict form used by the GUI (same keys as the old lsblk parser plus typed extras)."""
+        fstypes = sorted({p.fstype for p in self.partitions if p.fstype})
+        return {
+            'name': self.name,
+            'model': self.model or 'Unknown',
+            'size': format_size(self.size),
+            'size_bytes': self.size,
+            'type': 'disk',
+            'tran': self.transport,
+            'vendor': self.vendor,
+            'serial': self.serial,
+            'wwn': self.wwn,
+            'removable': self.removable,
+            'mounted': self.mounted,
+            'filesystem': ','.join(fstypes),
+            'partitions': [p.to_dict() for p in self.partitions],
+            'key': self.key,
+        }
+
+
+def format_size(size):
+    """Format a byte count the way lsblk does, e.g. 15376318464 -> '14.3G'."""
+    value = float(size)
+    for unit in ('B', 'K', 'M', 'G', 'T', 'P'):
+        if value < 1024 or unit == 'P':
+            break
+        value /= 1024
+    if unit == 'B':
+        return f"{int(value)}B"
+    text = f"{value:.1f}".rstrip('0').rstrip('.')
+    return f"{text}{unit}"
+
+
+def _read(path, default=''):
+    # Raw os-level reads are several times cheaper than open() for tiny sysfs attributes
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    except OSError:
+        return default
+    try:
+        return os.read(fd, 4096).decode('utf-8', 'replace').strip()
+    except OSError:
+        return default
+    finally:
+        os.close(fd)
+
+
+def _read_int(path, default=0):
+    try:
+        return int(_read(path))
+    except ValueError:
+        return default
+
+
+def _unescape_mount(path):
+    return path.replace('\\040', ' ').replace('\\011', '\t').replace('\\012', '\n').replace('\\134', '\\')
+
+
+class DiskInventory:
+    """Block device inventory built from /sys/class/block without spawning any process.
+
+    Records are cached per device and only re-read when the device's sysfs
+    signature (link target, partition set, udev database entry or size)
+    changes or when invalidate() is called, e.g. from a hotplug event.
+    All roots can be pointed at a fake tree.
+    """
+
+    def __init__(self, sys_root='/sys', udev_root='/run/udev/data', mounts_path='/proc/mounts'):
+        self.class_dir = os.path.join(sys_root, 'class', 'block')
+        self.udev_root = udev_root
+        self.mounts_path = mounts_path
+        self._cache = {}
+        self._devnums = {}
+        self._links = {}
+        self._inodes = {}
+        self._udev_mtime = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, name=None):
+        """Forget the cached record for a disk or partition name (or all records)."""
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+                return
+            self._cache.pop(name, None)
+            for disk, (_, device) in list(self._cache.items()):
+                if any(p.name == name for p in device.partitions):
+                    del self._cache[disk]
+
+    def scan(self):
+        """Return a list of BlockDevice records for all whole disks."""
+        with self._lock:
+            return self._scan()
+
+    def _scan(self):
+        # Link targets are only re-read for directory entries with a new inode
+        links = {}
+        inodes = {}
+        try:
+            with os.scandir(self.class_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    inode = entry.inode()
+                    target = self._links.get(name)
+                    if target is None or self._inodes.get(name) != inode:
+                        try:
+                            target = os.readlink(entry.path)
+                        except OSError:
+                            continue
+                    links[name] = target
+                    inodes[name] = inode
+        except OSError:
+            return []
+        self._links = links
+        self._inodes = inodes
+
+        # udev replaces database files by rename, so the directory mtime moves on any change
+        try:
+            udev_mtime = os.stat(self.udev_root).st_mtime_ns
+        except OSError:
+            udev_mtime = None
+        udev_changed = udev_mtime != self._udev_mtime
+        self._udev_mtime = udev_mtime
+
+        # A partition's link target ends in .../<disk>/<partition>
+        disks = {}
+        for name, target in links.items():
+            parent = target.rpartition('/')[0].rpartition('/')[2]
+            if parent in links:
+                disks.setdefault(parent, []).append(name)
+            else:
+                disks.setdefault(name, [])
+
+        mounts = self._read_mounts()
+        devices = []
+        for name in sorted(disks):
+            parts = sorted(disks[name], key=lambda p: (len(p), p))
+            cached = self._cache.get(name)
+            signature = self._signature(name, links[name], parts, cached, udev_changed)
+            if cached and cached[0] == signature:
+                device = cached[1]
+            else:
+                device = self._read_device(name, links[name], parts)
+                # Device numbers are known now, so the signature can cover the udev entries
+                self._cache[name] = (self._signature(name, links[name], parts, None, True), device)
+            devices.append(self._with_mounts(device, mounts))
+
+        for name in list(self._cache):
+            if name not in disks:
+                del self._cache[name]
+        for name in list(self._devnums):
+            if name not in links:
+                del self._devnums[name]
+        return devices
+
+    def _signature(self, name, target, parts, cached, udev_changed):
+        parts = tuple(parts)
+        if self._udev_mtime is None:
+            return (target, parts, _read(f"{self.class_dir}/{name}/size"))
+        if cached and not udev_changed and cached[0][:2] == (target, parts):
+            return cached[0]
+        # udev rewrites its database entry on every change event (media change, resize)
+        stamps = []
+        for dev in (name,) + parts:
+            devnum = self._devnums.get(dev)
+            try:
+                stamps.append(os.stat(f"{self.udev_root}/b{devnum}").st_mtime_ns if devnum else 0)
+            except OSError:
+                stamps.append(0)
+        return (target, parts, tuple(stamps))
+
+    def _udev_properties(self, devnum):
+        props = {}
+        if not devnum:
+            return props
+        try:
+            with open(os.path.join(self.udev_root, f"b{devnum}"), 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if line.startswith('E:'):
+                        key, _, value = line[2:].rstrip('\n').partition('=')
+                        props[key] = value
+        except OSError:
+            pass
+        return props
+
+    def _read_device(self, name, target, parts):
+        base = os.path.join(self.class_dir, name)
+        syspath = os.path.normpath(os.path.join(self.class_dir, target))
+        devnum = _read(os.path.join(base, 'dev'))
+        self._devnums[name] = devnum
+        udev = self._udev_properties(devnum)
+
+        transport = ''
+        for marker, tran in _TRANSPORTS:
+            if marker in target:
+                transport = tran
+                break
+
+        serial = _read(os.path.join(base, 'device', 'serial')) or udev.get('ID_SERIAL_SHORT', '')
+        if not serial and transport == 'usb':
+            serial = self._usb_serial(syspath)
+        wwn = udev.get('ID_WWN_WITH_EXTENSION') or udev.get('ID_WWN') or _read(os.path.join(base, 'wwid'))
+
+        partitions = []
+        for part in parts:
+            pbase = os.path.join(self.class_dir, part)
+            pdevnum = _read(os.path.join(pbase, 'dev'))
+            self._devnums[part] = pdevnum
+            pudev = self._udev_properties(pdevnum)
+            partitions.append(Partition(
+                part,
+                number=_read_int(os.path.join(pbase, 'partition')),
+                start=_read_int(os.path.join(pbase, 'start')) * SECTOR_SIZE,
+                size=_read_int(os.path.join(pbase, 'size')) * SECTOR_SIZE,
+                fstype=pudev.get('ID_FS_TYPE', ''),
+                label=pudev.get('ID_FS_LABEL', ''),
+                uuid=pudev.get('ID_FS_UUID', ''),
+            ))
+
+        return BlockDevice(
+            name,
+            model=_read(os.path.join(base, 'device', 'model')) or udev.get('ID_MODEL', '').replace('_', ' '),
+            vendor=_read(os.path.join(base, 'device', 'vendor')) or udev.get('ID_VENDOR', ''),
+            serial=serial,
+            wwn=wwn,
+            size=_read_int(os.path.join(base, 'size')) * SECTOR_SIZE,
+            removable=_read(os.path.join(base, 'removable')) == '1',
+            transport=transport,
+            partitions=partitions,
+            syspath=syspath,
+        )
+
+    def _usb_serial(self, syspath):
+        """Walk up from the block device to the USB device that carries the iSerial string."""
+        path = syspath
+        for _ in range(8):
+            path = os.path.dirname(path)
+            if os.path.basename(path).startswith('usb'):
+                break
+            if os.path.exists(os.path.join(path, 'idVendor')):
+                return _read(os.path.join(path, 'serial'))
+        return ''
+
+    def _read_mounts(self):
+        mounts = {}
+        try:
+            with open(self.mounts_path, 'rb') as f:
+                data = f.read().decode('utf-8', 'replace')
+        except OSError:
+            return mounts
+        for line in data.splitlines():
+            if line.startswith('/dev/'):
+                fields = line.split(' ', 2)
+                if len(fields) >= 2:
+                    mounts.setdefault(os.path.basename(fields[0]), _unescape_mount(fields[1]))
+        return mounts
+
+    def _with_mounts(self, device, mounts):
+        mountpoint = mounts.get(device.name, '')
+        if mountpoint == device.mountpoint and \
+                all(mounts.get(p.name, '') == p.mountpoint for p in device.partitions):
+            return device
+        partitions = []
+        for part in device.partitions:
+            if mounts.get(part.name, '') == part.mountpoint:
+                partitions.append(part)
+            else:
+                values = part.to_dict()
+                values['mountpoint'] = mounts.get(part.name, '')
+                partitions.append(Partition(**values))
+        updated = BlockDevice(device.name, device.model, device.vendor, device.serial, device.wwn,
+                              device.size, device.removable, device.transport, partitions,
+                              mountpoint, device.syspath)
+        signature = self._cache[device.name][0]
+        self._cache[device.name] = (signature, updated)
+        return updated
+
+
+def unique_keys(disks):
+    """Make the 'key' of disk dicts unique, in place, and return them.
+
+    Identical cheap sticks and some USB-SATA bridges report the same serial
+    or WWN; those drives get their kernel name appended to the key, so each
+    keeps its own row.
+    """
+    counts = {}
+    for disk in disks:
+        counts[disk['key']] = counts.get(disk['key'], 0) + 1
+    for disk in disks:
+        if counts[disk['key']] > 1:
+            disk['key'] = f"{disk['key']}@{disk['name']}"
+    return disks
+
+
+def diff_devices(old, new):
+    """Compare two {key: record} mappings.
+
+    Returns (added, removed, changed) lists of keys; added keys keep the
+    order of new, so callers can append them as rows.
+    """
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key in new if key in old and old[key] != new[key]]
+    return added, removed, changed
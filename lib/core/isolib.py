@@ -0,0 +1,310 @@
+"""Incremental index of the boot images on a Ventoy data partition.
+
+Each drive gets a SQLite database in the user cache directory, named
+after the data partition's UUID. A scan walks the partition the way
+Ventoy does: image extensions only, hidden directories and directories
+holding a .ventoyignore file skipped. Only files whose size or
+modification time changed since the last scan are probed again. Probing
+reads a few sectors, not the image:
+- the first sector, for an isohybrid MBR or GPT;
+- the ISO9660 volume descriptors, for the volume label, the creation date
+  and an El Torito boot record;
+- the El Torito boot catalog, for a UEFI entry.
+A library that has been scanned once is listed straight from the
+database, before (or without) touching the drive. The database also
+caches the checksums computed by core.checksums.
+
+    python3 -m core.isolib /media/user/Ventoy --uuid 4E21-0000
+"""
+import argparse
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+
+from .inventory import format_size
+
+ISO_SECTOR = 2048
+DESCRIPTOR_LBA = 16
+MAX_DESCRIPTORS = 32
+IMAGE_EXTENSIONS = ('.iso', '.img', '.wim', '.vhd', '.vhdx', '.efi', '.vtoy', '.dat')
+IGNORE_MARKER = '.ventoyignore'
+SKIP_DIRS = ('System Volume Information', '$RECYCLE.BIN', 'ventoy')
+DATA_LABEL = 'Ventoy'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    created TEXT NOT NULL DEFAULT '',
+    eltorito INTEGER NOT NULL DEFAULT 0,
+    uefi INTEGER NOT NULL DEFAULT 0,
+    hybrid TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (path, algorithm)
+);
+'''
+_COLUMNS = ('path', 'size', 'mtime_ns', 'label', 'created', 'eltorito', 'uefi', 'hybrid')
+
+
+def default_index_dir():
+    """$XDG_CACHE_HOME/ventoy-x/isolib (~/.cache by default)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ventoy-x', 'isolib')
+
+
+class Image:
+    """A boot image on the data partition; path is relative to the partition root."""
+    __slots__ = _COLUMNS
+
+    def __init__(self, path, size, mtime_ns, label='', created='', eltorito=False, uefi=False, hybrid=''):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.label = label
+        self.created = created
+        self.eltorito = bool(eltorito)
+        self.uefi = bool(uefi)
+        self.hybrid = hybrid
+
+    @property
+    def boot(self):
+        """Short description of how the image boots, e.g. 'El Torito, UEFI, MBR hybrid'."""
+        parts = []
+        if self.eltorito:
+            parts.append('El Torito')
+        if self.uefi:
+            parts.append('UEFI')
+        if self.hybrid:
+            parts.append(f"{self.hybrid} hybrid")
+        return ', '.join(parts)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ScanResult:
+    """What a scan changed in the index."""
+    __slots__ = ('images', 'probed', 'removed', 'elapsed')
+
+    def __init__(self, images, probed, removed, elapsed):
+        self.images = images
+        self.probed = probed
+        self.removed = removed
+        self.elapsed = elapsed
+
+    def to_dict(self):
+        return {'images': [i.to_dict() for i in self.images], 'probed': self.probed, 'removed': self.removed,
+                'elapsed': self.elapsed}
+
+
+def _text(raw):
+    return raw.decode('ascii', 'replace').strip(' \x00')
+
+
+def _iso_date(raw):
+    # "YYYYMMDDHHMMSScc" plus a timezone byte; all zeros or blanks when unset
+    text = _text(raw[:16])
+    if len(text) < 14 or not text.isdigit() or text.strip('0') == '':
+        return ''
+    return f"{text[0:4]}-{text[4:6]}-{text[6:8]} {text[8:10]}:{text[10:12]}:{text[12:14]}"
+
+
+def _uefi_in_catalog(catalog):
+    # Validation entry, then entries/section headers of 32 bytes; 0xEF is the EFI platform id
+    if len(catalog) < 32 or catalog[0] != 0x01 or catalog[30:32] != b'\x55\xaa':
+        return False
+    if catalog[1] == 0xEF:
+        return True
+    for pos in range(64, len(catalog) - 31, 32):
+        if catalog[pos] in (0x90, 0x91) and catalog[pos + 1] == 0xEF:
+            return True
+        if catalog[pos] == 0x00 and not any(catalog[pos:pos + 32]):
+            break
+    return False
+
+
+def probe_image(path):
+    """Return (label, created, eltorito, uefi, hybrid) from the headers of an image file."""
+    label = created = hybrid = ''
+    eltorito = uefi = False
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        head = os.pread(fd, 1024, 0)
+        if len(head) >= 512 and head[510:512] == b'\x55\xaa':
+            if head[512:520] == b'EFI PART':
+                hybrid = 'GPT'
+            elif any(head[446 + i * 16 + 4] for i in range(4)):
+                hybrid = 'MBR'
+        catalog_lba = None
+        descriptors = os.pread(fd, MAX_DESCRIPTORS * ISO_SECTOR, DESCRIPTOR_LBA * ISO_SECTOR)
+        for pos in range(0, len(descriptors) - ISO_SECTOR + 1, ISO_SECTOR):
+            descriptor = descriptors[pos:pos + ISO_SECTOR]
+            if descriptor[1:6] != b'CD001':
+                break
+            kind = descriptor[0]
+            if kind == 255:
+                break
+            if kind == 0 and descriptor[7:30] == b'EL TORITO SPECIFICATION':
+                eltorito = True
+                catalog_lba, = struct.unpack_from('<I', descriptor, 71)
+            elif kind == 1 and not label:
+                label = _text(descriptor[40:72])
+                created = _iso_date(descriptor[813:830])
+        if catalog_lba:
+            uefi = _uefi_in_catalog(os.pread(fd, ISO_SECTOR, catalog_lba * ISO_SECTOR))
+    finally:
+        os.close(fd)
+    return label, created, eltorito, uefi, hybrid
+
+
+def walk_images(root):
+    """Yield (relative path, os.stat_result) of the image files under root, as Ventoy would find them."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        directory = os.path.join(root, relative)
+        try:
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+        if relative and any(e.name == IGNORE_MARKER for e in entries):
+            continue
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not name.startswith('.') and not (not relative and name in SKIP_DIRS):
+                        stack.append(os.path.join(relative, name))
+                elif name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file(follow_symlinks=False):
+                    yield os.path.join(relative, name), entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+
+def data_partition(disk):
+    """The Ventoy data partition of a disk dict from core.disk.list_usb_disks, or None."""
+    partitions = disk.get('partitions', ())
+    for part in partitions:
+        if part.get('label') == DATA_LABEL:
+            return part
+    for part in partitions:
+        if part.get('number') == 1 and part.get('fstype'):
+            return part
+    return None
+
+
+class IsoLibrary:
+    """The SQLite index of one drive's images, stored as <index_dir>/<uuid>.sqlite."""
+
+    def __init__(self, uuid, index_dir=None):
+        self.uuid = uuid
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', uuid)
+        self.path = os.path.join(index_dir or default_index_dir(), f"{name}.sqlite")
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=10)
+        db.executescript(_SCHEMA)
+        return db
+
+    def images(self):
+        """The indexed images, by path, without touching the drive."""
+        if not os.path.exists(self.path):
+            return []
+        db = self._connect()
+        try:
+            rows = db.execute(f"SELECT {', '.join(_COLUMNS)} FROM images ORDER BY path COLLATE NOCASE").fetchall()
+        finally:
+            db.close()
+        return [Image(*row) for row in rows]
+
+    def digests(self, algorithm):
+        """{path: (size, mtime_ns, digest)} of the file digests cached for algorithm."""
+        if not os.path.exists(self.path):
+            return {}
+        db = self._connect()
+        try:
+            return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in db.execute(
+                'SELECT path, size, mtime_ns, digest FROM digests WHERE algorithm = ?', (algorithm,))}
+        finally:
+            db.close()
+
+    def store_digests(self, algorithm, rows):
+        """Cache (path, size, mtime_ns, digest) rows; a digest only counts while size and mtime match."""
+        db = self._connect()
+        try:
+            with db:
+                db.executemany('INSERT OR REPLACE INTO digests (path, algorithm, size, mtime_ns, digest) '
+                               'VALUES (?, ?, ?, ?, ?)', [(path, algorithm) + tuple(rest) for path, *rest in rows])
+        finally:
+            db.close()
+
+    def scan(self, root, progress=None):
+        """Bring the index up to date with the partition mounted at root; returns a ScanResult.
+
+        progress(done, total) is called after each image that had to be probed.
+        """
+        start = time.monotonic()
+        db = self._connect()
+        try:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns
+                     in db.execute('SELECT path, size, mtime_ns FROM images')}
+            found = {}
+            stale = []
+            for relative, st in walk_images(root):
+                found[relative] = st
+                if known.get(relative) != (st.st_size, st.st_mtime_ns):
+                    stale.append(relative)
+            rows = []
+            for n, relative in enumerate(stale, 1):
+                st = found[relative]
+                try:
+                    meta = probe_image(os.path.join(root, relative))
+                except OSError:
+                    meta = ('', '', False, False, '')
+                rows.append((relative, st.st_size, st.st_mtime_ns) + meta)
+                if progress:
+                    progress(n, len(stale))
+            removed = [(path,) for path in known if path not in found]
+            with db:
+                db.executemany(f"INSERT OR REPLACE INTO images ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               rows)
+                db.executemany('DELETE FROM images WHERE path = ?', removed)
+                db.executemany('DELETE FROM digests WHERE path = ?', removed)
+        finally:
+            db.close()
+        return ScanResult(self.images(), len(rows), len(removed), time.monotonic() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Index the boot images on a mounted Ventoy data partition.')
+    parser.add_argument('root', help='mount point of the data partition')
+    parser.add_argument('--uuid', required=True, help='partition UUID the index is stored under')
+    parser.add_argument('--index-dir', default=None)
+    args = parser.parse_args(argv)
+    try:
+        result = IsoLibrary(args.uuid, args.index_dir).scan(args.root)
+    except (OSError, sqlite3.Error) as e:
+        sys.stderr.write(f"isolib: {e}\n")
+        return 1
+    for image in result.images:
+        print(f"{image.path}\t{format_size(image.size)}\t{image.label}\t{image.created}\t{image.boot}")
+    print(f"{len(result.images)} images, {result.probed} probed, {result.removed} removed "
+          f"in {result.elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,818 @@
+"""Job engine for drive operations: install, upgrade, erase, verify and copy.
+
+A Job is one operation on one target. JobEngine queues jobs and runs them
+on worker threads under two limits:
+- one job per device at a time, always;
+- at most per_controller jobs on drives behind the same USB host
+  controller, which is the shared bandwidth a batch really competes for.
+max_workers caps the total. The queue is first in, first out, but a job
+that has to wait for its device or controller does not hold up the ones
+behind it.
+
+Work functions get a JobContext. It carries the job's log, progress and
+step reporting, and checks for cancellation. Cancellation is cooperative:
+JobEngine.cancel() sets a flag, and the next progress report or
+context.check() raises Cancelled. Subprocesses started with context.run()
+are terminated. Cleanups registered with context.defer() run, last first,
+however the job ends.
+
+Everything a job does is published as event dicts to the subscribers:
+status (state changes and whole-percent steps), log and progress.
+The GUI, core.cli and tests all subscribe the same way. Run as a program,
+the engine takes job specs as JSON arguments. It prints events as NDJSON
+and cancels everything on SIGINT or a "cancel" line on stdin, so a
+single pkexec covers a whole batch:
+
+    pkexec env PYTHONPATH=lib python3 -m core.jobs --jobs 4 '{"kind": "install", "target": "/dev/sdb"}' \\
+        '{"kind": "erase", "target": "/dev/sdc", "secure": true}'
+
+The GUI sends the same specs to core.privhelper instead, which runs them
+on its own engine and stays up between operations.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .inventory import _unescape_mount
+from .progress import parse_marker
+from .readiness import partition_path, wait_ready
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+KINDS = ('install', 'upgrade', 'erase', 'verify', 'copy')
+DEFAULT_WORKERS = 4
+DEFAULT_PER_CONTROLLER = 2
+PROGRESS_INTERVAL = 0.25
+# Grace period between SIGTERM and SIGKILL for a cancelled subprocess
+TERMINATE_TIMEOUT = 5.0
+# How long install steps wait for new partitions before going ahead anyway
+READY_TIMEOUT = 15.0
+
+_USB_BUS = re.compile(r'^usb\d+$')
+
+
+class Cancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class Job:
+    """One operation on one target; work(context) does it and raises to fail.
+
+    devices are the disks the job occupies (one, except for a copy to
+    several drives); controllers are looked up from them on submit.
+    result is whatever the work function leaves there.
+    """
+    __slots__ = ('id', 'kind', 'target', 'devices', 'controllers', 'state', 'percent', 'message', 'created',
+                 'started', 'finished', 'work', 'cancel_event', 'result')
+    FIELDS = ('id', 'kind', 'target', 'devices', 'controllers', 'state', 'percent', 'message', 'created', 'started',
+              'finished')
+
+    def __init__(self, kind, target, work, devices=None, controllers=None):
+        self.id = None
+        self.kind = kind
+        self.target = target
+        self.devices = tuple(devices or (disk_of(target),))
+        self.controllers = controllers
+        self.state = QUEUED
+        self.percent = 0
+        self.message = ''
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.work = work
+        self.cancel_event = threading.Event()
+        self.result = None
+
+    def to_dict(self):
+        return {name: list(value) if isinstance(value, tuple) else value
+                for name, value in ((name, getattr(self, name)) for name in self.FIELDS)}
+
+
+def disk_of(target):
+    """The whole-disk name of a device path ('/dev/sdb1' -> 'sdb'), or the real path of anything else."""
+    if not target.startswith('/dev/'):
+        return os.path.realpath(target)
+    name = os.path.basename(os.path.realpath(target))
+    if os.path.exists(f"/sys/class/block/{name}/partition"):
+        parent = os.path.basename(os.path.dirname(os.path.realpath(f"/sys/class/block/{name}")))
+        return parent or name
+    return name
+
+
+def usb_controller(device, sys_root='/sys'):
+    """The host controller (e.g. the PCI address '0000:00:14.0') a disk hangs off, or '' if it is not on USB."""
+    if '/' in device:
+        return ''
+    try:
+        path = os.path.realpath(os.path.join(sys_root, 'class', 'block', device))
+    except OSError:
+        return ''
+    parts = path.split(os.sep)
+    for i, part in enumerate(parts):
+        if _USB_BUS.match(part) and i > 0:
+            return parts[i - 1]
+    return ''
+
+
+class JobContext:
+    """What a work function uses to report, check for cancellation and clean up."""
+
+    def __init__(self, engine, job):
+        self.engine = engine
+        self.job = job
+        self.cleanups = []
+        self.cancel_hooks = []
+        self.steps = 0
+        self.last_progress = 0.0
+
+    @property
+    def cancelled(self):
+        return self.job.cancel_event.is_set()
+
+    def check(self):
+        """Raise Cancelled if the job has been cancelled."""
+        if self.cancelled:
+            raise Cancelled(f"{self.job.kind} cancelled")
+
+    def sleep(self, seconds):
+        """Wait, but give up as soon as the job is cancelled."""
+        if self.job.cancel_event.wait(seconds):
+            self.check()
+
+    def defer(self, cleanup):
+        """Run cleanup() when the job ends, whatever the outcome; cleanups run last first."""
+        self.cleanups.append(cleanup)
+
+    def on_cancel(self, hook):
+        """Call hook() from the cancelling thread, e.g. to stop an engine that has its own cancel()."""
+        self.cancel_hooks.append(hook)
+        if self.cancelled:
+            hook()
+
+    def log(self, message, level='info'):
+        self.engine.publish({'event': 'log', 'job': self.job.id, 'target': self.job.target, 'level': level,
+                             'message': message})
+
+    def step(self, name):
+        """Log a "Step N: name" header, which progress trackers use to time the steps."""
+        self.check()
+        self.steps += 1
+        self.log(f"Step {self.steps}: {name}")
+
+    def progress(self, done=None, total=None, step=None, percent=None):
+        """Report progress of the current step and/or the whole job; raises Cancelled once cancelled.
+
+        Safe to call from the worker threads of the step, as core.erase
+        and core.checksums do.
+        """
+        self.check()
+        if percent is None and total:
+            percent = done * 100 // total
+        if percent is not None and int(percent) > self.job.percent:
+            self.job.percent = min(100, int(percent))
+            self.engine.publish_status(self.job)
+        now = time.monotonic()
+        if now - self.last_progress < PROGRESS_INTERVAL and not (total and done >= total):
+            return
+        self.last_progress = now
+        event = {'event': 'progress', 'job': self.job.id, 'target': self.job.target}
+        event.update((key, value) for key, value in (('step', step), ('done', done), ('total', total),
+                                                     ('percent', percent)) if value is not None)
+        self.engine.publish(event)
+
+    def run(self, args, input=None, on_line=None, check=True, **kwargs):
+        """Run a command, passing each output line to on_line (default: the log); returns the exit code.
+
+        The command gets its own process group, which is terminated when
+        the job is cancelled. Lines that are progress markers become
+        progress events. check raises RuntimeError on a non-zero exit.
+        """
+        self.check()
+        process = subprocess.Popen(args, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                   start_new_session=True, **kwargs)
+        if input is not None:
+            try:
+                process.stdin.write(input)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        watcher = threading.Thread(target=self._watch, args=(process,), name=f"job-{self.job.id}-watch", daemon=True)
+        watcher.start()
+        for line in process.stdout:
+            if on_line:
+                on_line(line)
+                continue
+            fields = parse_marker(line)
+            if fields is not None:
+                self.progress(fields.get('done'), fields.get('total'), fields.get('step'), fields.get('overall'))
+            else:
+                self.log(line.rstrip())
+        process.wait()
+        watcher.join()
+        self.check()
+        if check and process.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(args[0])} exited with code {process.returncode}")
+        return process.returncode
+
+    def _watch(self, process):
+        while not self.job.cancel_event.wait(0.2):
+            if process.poll() is not None:
+                return
+        if process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(TERMINATE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class JobEngine:
+    """Queue and run Jobs under per-device, per-controller and total limits.
+
+    subscribe(callback) receives every event dict, one at a time, from
+    whichever thread produced it. controller_of(device) maps a disk name
+    to its USB host controller ('' for none, which is not limited).
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, per_controller=DEFAULT_PER_CONTROLLER,
+                 controller_of=usb_controller):
+        self.max_workers = max(1, int(max_workers))
+        self.per_controller = max(1, int(per_controller))
+        self.controller_of = controller_of
+        self.jobs = []
+        self.queue = []
+        self.running = []
+        self.subscribers = []
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._publish_lock = threading.Lock()
+        self._contexts = {}
+        self._by_id = {}
+
+    def subscribe(self, callback):
+        """Add an event subscriber; returns a function that removes it again."""
+        with self._publish_lock:
+            self.subscribers.append(callback)
+        return lambda: self._unsubscribe(callback)
+
+    def _unsubscribe(self, callback):
+        with self._publish_lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def publish(self, event):
+        with self._publish_lock:
+            for callback in list(self.subscribers):
+                callback(event)
+
+    def publish_status(self, job):
+        self.publish({'event': 'status', 'job': job.id, 'kind': job.kind, 'target': job.target, 'state': job.state,
+                      'percent': job.percent, 'message': job.message})
+
+    def submit(self, job):
+        """Queue a Job and return it; it starts as soon as the limits allow."""
+        if job.controllers is None:
+            job.controllers = tuple(sorted({c for c in map(self.controller_of, job.devices) if c}))
+        with self._cond:
+            job.id = next(self._ids)
+            self.jobs.append(job)
+            self._by_id[job.id] = job
+            self.queue.append(job)
+        self.publish_status(job)
+        self._schedule()
+        return job
+
+    def cancel(self, job_id=None):
+        """Cancel one job by id, or every queued and running job; returns the jobs affected."""
+        with self._cond:
+            targets = [job for job in self.jobs if job.state in (QUEUED, RUNNING) and job_id in (None, job.id)]
+            dropped = [job for job in targets if job.state == QUEUED]
+            for job in dropped:
+                job.state = CANCELLED
+                job.message = 'Cancelled before it started'
+                job.finished = time.time()
+            hooks = []
+            for job in targets:
+                job.cancel_event.set()
+                context = self._contexts.get(job.id)
+                if context:
+                    hooks.extend(context.cancel_hooks)
+        # Dropped jobs leave the queue only after their status went out, so wait() never returns before that
+        for job in dropped:
+            self.publish_status(job)
+        with self._cond:
+            for job in dropped:
+                self.queue.remove(job)
+            self._cond.notify_all()
+        for hook in hooks:
+            hook()
+        return targets
+
+    def wait(self, timeout=None):
+        """Block until nothing is queued or running; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.queue or self.running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def succeeded(self):
+        return all(job.state == DONE for job in self.jobs)
+
+    def get(self, job_id):
+        """The Job with id job_id, or None."""
+        return self._by_id.get(job_id)
+
+    def forget(self, job):
+        """Drop a finished job from jobs, so a long-running engine does not keep every job it ever ran."""
+        with self._cond:
+            if job.state in FINISHED and job in self.jobs:
+                self.jobs.remove(job)
+                del self._by_id[job.id]
+
+    def _runnable(self, job):
+        if any(set(other.devices) & set(job.devices) for other in self.running):
+            return False
+        return all(sum(controller in other.controllers for other in self.running) < self.per_controller
+                   for controller in job.controllers)
+
+    def _schedule(self):
+        started = []
+        with self._cond:
+            for job in list(self.queue):
+                if len(self.running) >= self.max_workers:
+                    break
+                if job.state == QUEUED and self._runnable(job):
+                    self.queue.remove(job)
+                    self.running.append(job)
+                    job.state = RUNNING
+                    job.started = time.time()
+                    self._contexts[job.id] = JobContext(self, job)
+                    started.append(job)
+        for job in started:
+            threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+
+    def _run(self, job):
+        context = self._contexts[job.id]
+        self.publish_status(job)
+        try:
+            job.work(context)
+            context.check()
+            job.state = DONE
+            job.percent = 100
+            job.message = job.message or 'Done'
+        except Cancelled:
+            job.state = CANCELLED
+            job.message = 'Cancelled'
+        except Exception as e:
+            # A step that gave up because of the cancel reports its own error
+            job.state = CANCELLED if job.cancel_event.is_set() else FAILED
+            job.message = 'Cancelled' if job.state == CANCELLED else str(e)
+        for cleanup in reversed(context.cleanups):
+            try:
+                cleanup()
+            except Exception as e:
+                context.log(f"Cleanup failed: {e}", 'warning')
+        job.finished = time.time()
+        # Published while still counted as running, so wait() never returns before the final status went out
+        self.publish_status(job)
+        with self._cond:
+            self.running.remove(job)
+            del self._contexts[job.id]
+            self._cond.notify_all()
+        self._schedule()
+
+
+def _mounted_partitions(device, mounts_path='/proc/self/mounts'):
+    disk = disk_of(device)
+    found = []
+    with open(mounts_path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) > 1 and fields[0].startswith('/dev/') and disk_of(fields[0]) == disk:
+                found.append((fields[0], _unescape_mount(fields[1])))
+    return found
+
+
+def unmount_all(context, device):
+    """Unmount every partition of device that is mounted."""
+    for partition, mountpoint in _mounted_partitions(device):
+        context.log(f"Unmounting {partition} ({mountpoint})...")
+        if context.run(['umount', partition], check=False) != 0:
+            context.log(f"Could not unmount {partition}", 'warning')
+
+
+def mount_temporarily(context, partition, read_only=False):
+    """Mount partition on a fresh directory until the job ends; returns the mount point, or None."""
+    mountpoint = tempfile.mkdtemp(prefix='ventoy-x-job-')
+    args = ['mount'] + (['-o', 'ro'] if read_only else []) + [partition, mountpoint]
+    if context.run(args, check=False, on_line=lambda line: None) != 0:
+        os.rmdir(mountpoint)
+        return None
+
+    def release():
+        subprocess.run(['umount', mountpoint], capture_output=True)
+        os.rmdir(mountpoint)
+    context.defer(release)
+    return mountpoint
+
+
+USER_DIRECTORIES = {
+    'ISO': """Ventoy ISO Directory
+==================
+
+Place your .iso and .img files here
+
+Supported formats:
+- .iso files (Linux distributions, Windows, etc.)
+- .img files (disk images)
+- .wim files (Windows imaging)
+- .vhd/.vhdx files (virtual hard disks)
+
+Simply copy your boot files here and they will appear in Ventoy's boot menu.
+""",
+    'Themes': """Ventoy Themes Directory
+=====================
+
+Place custom Ventoy themes here
+
+Theme structure:
+- Create subdirectories for each theme
+- Include theme.txt configuration file
+- Add background images and fonts
+
+Example: Themes/MyTheme/theme.txt
+""",
+    'Plugins': """Ventoy Plugins Directory
+======================
+
+Plugin files:
+- ventoy.json (main plugin configuration)
+- Custom plugin scripts
+- Persistence configuration
+
+Edit these files using the Plugson tab in Ventoy GUI.
+""",
+    'Scripts': """Ventoy Scripts Directory
+======================
+
+Custom tools and scripts:
+- Diagnostic tools
+- Utility scripts
+- Custom bootable tools
+""",
+}
+
+SAMPLE_VENTOY_JSON = {
+    'theme': {'file': '/Themes/default/theme.txt', 'gfxmode': '1024x768'},
+    'menu_alias': [{'image': '/ISO/ubuntu.iso', 'alias': 'Ubuntu Linux'}],
+    'menu_tip': {'left': '10', 'top': '80', 'color': 'red'},
+}
+# Free space (KiB) a partition needs to be taken for the data partition
+MIN_DATA_FREE_KB = 100000
+
+
+def wait_partitions(context, device, numbers=(), timeout=READY_TIMEOUT):
+    """Wait until the partitions of device are usable (core.readiness) instead of sleeping a fixed time."""
+    try:
+        seconds = wait_ready(device, numbers, timeout, cancelled=lambda: context.cancelled)
+    except TimeoutError as e:
+        # The steps after this look for the partitions themselves and report what is missing
+        context.log(str(e), 'warning')
+        return
+    context.check()
+    context.log(f"{device} ready after {seconds:.2f} s")
+
+
+def create_user_directories(context, device):
+    """Create ISO/, Themes/, Plugins/ and Scripts/ with READMEs and a sample ventoy.json on the data partition."""
+    for number in (2, 1):
+        partition = partition_path(device, number)
+        if not os.path.exists(partition):
+            continue
+        context.log(f"Trying to mount {partition}...")
+        mountpoint = mount_temporarily(context, partition)
+        if not mountpoint:
+            continue
+        st = os.statvfs(mountpoint)
+        if not os.access(mountpoint, os.W_OK) or st.f_bavail * st.f_frsize // 1024 <= MIN_DATA_FREE_KB:
+            continue
+        context.log(f"Found Ventoy data partition: {partition}")
+        for name, readme in USER_DIRECTORIES.items():
+            os.makedirs(os.path.join(mountpoint, name), exist_ok=True)
+            with open(os.path.join(mountpoint, name, 'README.txt'), 'w') as f:
+                f.write(readme)
+        sample = os.path.join(mountpoint, 'Plugins', 'ventoy.json')
+        if not os.path.exists(sample):
+            with open(sample, 'w') as f:
+                json.dump(SAMPLE_VENTOY_JSON, f, indent=2)
+            context.log('Created sample ventoy.json')
+        context.log(f"Created directories: {', '.join(f'{name}/' for name in USER_DIRECTORIES)}")
+        return True
+    context.log('Could not create user directories - no suitable partition found', 'warning')
+    return False
+
+
+def _sign_reporter(context):
+    def report(result):
+        name = os.path.basename(result.path)
+        if result.state == 'failed':
+            context.log(f"Failed to sign {name}: {result.message}", 'warning')
+        else:
+            context.log(f"{result.state.capitalize()} {name}")
+    return report
+
+
+def stage_signed_image(context, key, cert):
+    """Sign a copy of the ESP image once per certificate (core.efisign); returns its path, or None.
+
+    None means the copy could not be made (e.g. no loop mounts), so the
+    files have to be signed on the drive. Files that do not sign raise.
+    """
+    from .efisign import SigningError, stage_image
+    from .flash_station import ESP_IMAGE
+    try:
+        path = stage_image(ESP_IMAGE, key, cert, on_result=_sign_reporter(context),
+                           cancelled=lambda: context.cancelled)
+    except SigningError:
+        raise
+    except (OSError, RuntimeError) as e:
+        context.check()
+        context.log(f"Could not sign a copy of the EFI image ({e}), signing on the drive instead", 'warning')
+        return None
+    context.log(f"Using signed EFI image {path}")
+    return path
+
+
+def sign_efi_files(context, device, key, cert):
+    """Sign the .efi files on the EFI partition (2) of device in parallel; raises SigningError on failures."""
+    from .efisign import SigningError, find_efi_files, sign_files
+    mountpoint = mount_temporarily(context, partition_path(device, 2))
+    if not mountpoint:
+        raise RuntimeError('Could not mount EFI partition for signing')
+    results = sign_files(find_efi_files(mountpoint), key, cert, on_result=_sign_reporter(context),
+                         cancelled=lambda: context.cancelled)
+    context.check()
+    if any(result.state == 'failed' for result in results):
+        raise SigningError(results)
+    context.log(f"EFI signing completed ({len(results)} files)")
+
+
+def install_job(target, secureboot=False, use_gpt=False, reserve_mb=0, upgrade=False, verify=False,
+                sign_key='', sign_cert='', owner_guid='', user_directories=True, timeout=300, attach=None,
+                script_path=None):
+    """Install (or upgrade) Ventoy on a block device or disk image file with Ventoy2Disk.sh.
+
+    With sign_key and sign_cert the EFI files are signed in a staged copy
+    of the ESP image that the whole batch shares, or on the drive if that
+    copy cannot be made. sbsign has no owner GUID option; owner_guid is
+    only what the key is enrolled under.
+
+    An image file is attached with attach(path), a context manager that
+    returns the device (flash_station.LoopDevice, which needs root, by
+    default). attach=False hands the file to the script as it is, which
+    together with script_path lets a stub installer run unprivileged.
+    """
+    from .flash_station import LoopDevice, SCRIPT_PATH, Ventoy2DiskOutput, ventoy2disk_command
+    options = {'secureboot': secureboot, 'use_gpt': use_gpt, 'reserve_mb': reserve_mb, 'upgrade': upgrade}
+    script = script_path or SCRIPT_PATH
+    attacher = LoopDevice if attach is None else attach
+
+    def work(context):
+        device = target
+        if attacher and os.path.isfile(target):
+            attached = attacher(target)
+            device = attached.__enter__()
+            context.defer(lambda: attached.__exit__(None, None, None))
+            context.log(f"Attached {target} as {device}")
+        if not os.path.exists(script):
+            raise RuntimeError(f"Script not found at {script}")
+        efi_image = None
+        if sign_key and sign_cert:
+            context.step('Signing EFI files with custom keys')
+            efi_image = stage_signed_image(context, sign_key, sign_cert)
+        context.step('Unmounting any mounted partitions')
+        unmount_all(context, device)
+        context.step('Upgrading Ventoy' if upgrade else 'Installing Ventoy')
+
+        def report(message=None, percent=None, fields=None):
+            if fields:
+                context.progress(fields.get('done'), fields.get('total'), fields.get('step'), percent)
+            elif percent is not None:
+                context.progress(percent=percent)
+            if message:
+                context.log(message)
+
+        output = Ventoy2DiskOutput(report)
+        args, env, cwd = ventoy2disk_command(options, device, script, timeout, verify, efi_image)
+        try:
+            context.run(args, input='y\n' * 4, on_line=output.feed, env=env, cwd=cwd)
+        except Cancelled:
+            context.log(f"{target} was left half written; install Ventoy on it again", 'warning')
+            raise
+        # Ventoy2Disk.sh does not pass on VentoyWorker.sh's exit code
+        if not output.finished:
+            raise RuntimeError('Ventoy2Disk.sh did not report success, see log')
+        if sign_key and sign_cert and not efi_image:
+            context.step('Signing EFI files on the drive')
+            wait_partitions(context, device, (1, 2))
+            sign_efi_files(context, device, sign_key, sign_cert)
+        if user_directories:
+            context.step('Creating user directories')
+            wait_partitions(context, device, (1, 2))
+            create_user_directories(context, device)
+        context.job.message = 'Upgraded' if upgrade else 'Installed'
+
+    return Job('upgrade' if upgrade else 'install', target, work)
+
+
+def erase_job(target, secure=False, pattern='random', verify=False, threads=4):
+    """Clear the partition tables and metadata of target; secure also overwrites all of it with pattern."""
+    from .erase import RandomStream, erase, quick_erase, target_size
+    from .verify import verify_pattern
+
+    def work(context):
+        context.log(f"Target device: {target}")
+        context.step('Unmounting all partitions')
+        unmount_all(context, target)
+        context.step('Removing partition tables and filesystem signatures')
+        try:
+            extents = quick_erase(target)
+            context.log(f"Cleared {len(extents)} metadata extents ({sum(e.length for e in extents)} bytes)")
+        except OSError as e:
+            context.log(f"Quick erase failed ({e}), falling back to wipefs", 'warning')
+            context.run(['wipefs', '-af', target], check=False)
+            context.run(['dd', 'if=/dev/zero', f"of={target}", 'bs=1M', 'count=10', 'status=none'], check=False)
+        if secure:
+            context.step('Performing secure erase (this may take a while)')
+            stream = RandomStream()
+            try:
+                passes = erase(target, pattern, threads=threads, stream=stream,
+                               progress=lambda done, total: context.progress(done, total, 'Erasing'))
+            except Cancelled:
+                context.log(f"{target} was only partly overwritten", 'warning')
+                raise
+            context.log(f"Erased {target}: {' + '.join(passes)}")
+            if verify and passes[-1] in ('zero', 'one', 'random'):
+                context.step('Verifying erase')
+                fd = os.open(target, os.O_RDONLY | os.O_CLOEXEC)
+                try:
+                    size = target_size(fd)
+                finally:
+                    os.close(fd)
+                mismatches = verify_pattern(target, size, passes[-1], stream, threads=threads,
+                                            progress=lambda done, total: context.progress(done, total, 'Verifying'))
+                if mismatches:
+                    raise RuntimeError(f"{len(mismatches)} chunk(s) did not read back as written")
+                context.log(f"Verified {target}")
+        context.step('Final cleanup')
+        os.sync()
+        # The partitions are gone now; let udev catch up so the next disk scan sees the erased drive
+        wait_partitions(context, target)
+        if shutil.which('lsblk'):
+            context.run(['lsblk', target], check=False)
+        context.job.message = 'Erased'
+
+    return Job('erase', target, work)
+
+
+def verify_job(target, library=None, jobs=4):
+    """Check the images on a mounted data partition, or on a partition device (leased), against SHA256SUMS."""
+    from .checksums import OK, UNLISTED, describe, summarize, verify_images
+    levels = {OK: 'success', UNLISTED: 'info'}
+
+    def work(context):
+        def check(root):
+            report = verify_images(root, library, jobs,
+                                   progress=lambda done, total: context.progress(done, total, 'Verifying checksums'),
+                                   on_result=lambda result: context.log(describe(result),
+                                                                        levels.get(result.status, 'error')))
+            context.log(summarize(report), 'success' if report.ok else 'error')
+            if not report.ok:
+                raise RuntimeError(summarize(report))
+            context.job.message = summarize(report)
+
+        if os.path.isdir(target):
+            check(target)
+        else:
+            from .mounts import get_mount_manager
+            with get_mount_manager().lease(target) as mountpoint:
+                check(mountpoint)
+
+    return Job('verify', target, work)
+
+
+def copy_job(engine, batches):
+    """Copy [(partition device, [sources])] with a core.copyengine.CopyEngine, every drive at once."""
+    from contextlib import ExitStack
+    from itertools import zip_longest
+    from .copyengine import plan_jobs
+    from .mounts import get_mount_manager
+
+    def work(context):
+        report = engine.progress
+
+        def progress(done, total, rate):
+            # Raising Cancelled inside the copy engine would fail files; it stops by itself after engine.cancel()
+            if not context.cancelled:
+                context.progress(done, total, 'Copying')
+            if report:
+                report(done, total, rate)
+        engine.progress = progress
+        context.on_cancel(engine.cancel)
+        with ExitStack() as leases:
+            groups = [plan_jobs(sources, leases.enter_context(get_mount_manager().lease(partition, read_only=False)))
+                      for partition, sources in batches]
+            # Interleaved, so every drive is written to from the start
+            result = engine.copy([job for row in zip_longest(*groups) for job in row if job])
+        context.job.result = result
+
+    return Job('copy', ', '.join(partition for partition, _ in batches), work,
+               [disk_of(partition) for partition, _ in batches])
+
+
+def job_from_spec(spec):
+    """A Job from a JSON-able dict: {"kind": "install"|"upgrade"|"erase"|"verify", "target": ..., options}."""
+    spec = dict(spec)
+    kind = spec.pop('kind', None)
+    target = spec.pop('target', None)
+    if not target:
+        raise ValueError('a job needs a target')
+    if kind in ('install', 'upgrade'):
+        return install_job(target, upgrade=kind == 'upgrade', **spec)
+    if kind == 'erase':
+        return erase_job(target, **spec)
+    if kind == 'verify':
+        uuid = spec.pop('uuid', None)
+        library = None
+        if uuid:
+            from .isolib import IsoLibrary
+            library = IsoLibrary(uuid)
+        return verify_job(target, library, **spec)
+    raise ValueError(f"unknown job kind: {kind}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run install/upgrade/erase/verify jobs and print NDJSON events.')
+    parser.add_argument('specs', nargs='+', metavar='JSON', help='job spec, e.g. \'{"kind": "erase", "target": "/dev/sdb"}\'')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_WORKERS, help='jobs running at the same time')
+    parser.add_argument('--per-controller', type=int, default=DEFAULT_PER_CONTROLLER,
+                        help='jobs running at the same time on drives behind one USB controller')
+    args = parser.parse_args(argv)
+    try:
+        jobs = [job_from_spec(json.loads(spec)) for spec in args.specs]
+    except (ValueError, TypeError) as e:
+        sys.stderr.write(f"jobs: {e}\n")
+        return 2
+
+    def emit(event):
+        sys.stdout.write(json.dumps(event) + '\n')
+        sys.stdout.flush()
+
+    engine = JobEngine(args.jobs, args.per_controller)
+    engine.subscribe(emit)
+    if any(job.kind in ('install', 'upgrade') for job in jobs):
+        # Decompress the boot images once up front instead of in every job
+        from .assetcache import warm
+        from .flash_station import boot_assets
+        for source in warm(boot_assets()):
+            emit({'event': 'log', 'job': None, 'target': 'batch', 'level': 'warning',
+                  'message': f"could not cache {source}, it will be decompressed per drive"})
+
+    def commands():
+        for line in sys.stdin:
+            if line.strip() == 'cancel':
+                engine.cancel()
+
+    signal.signal(signal.SIGINT, lambda signum, frame: engine.cancel())
+    threading.Thread(target=commands, name='jobs-stdin', daemon=True).start()
+    for job in jobs:
+        engine.submit(job)
+    # Short waits keep the main thread responsive to SIGINT
+    while not engine.wait(0.5):
+        pass
+    return 0 if engine.succeeded() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Batched, memory-bounded log transport from worker threads to the GUI.
+
+Workers call LogPipe.write() for every line. It only appends to a pending
+list under a lock and to the on-disk log, with no cross-thread signal per
+line. The GUI drains the pending lines on a coalescing timer and renders
+them in one go. If the GUI falls behind, the oldest pending lines are
+dropped and replaced by a notice; the full log stays on disk.
+"""
+import os
+import threading
+import time
+
+DEFAULT_MAX_PENDING = 20000
+KEEP_LOGS = 20
+
+
+def default_log_dir():
+    """$XDG_STATE_HOME/ventoy-x/logs (~/.local/state by default)."""
+    base = os.environ.get('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state')
+    return os.path.join(base, 'ventoy-x', 'logs')
+
+
+def new_log_path(name, directory=None):
+    """Return a fresh timestamped log path, pruning the oldest logs beyond KEEP_LOGS."""
+    directory = directory or default_log_dir()
+    os.makedirs(directory, exist_ok=True)
+    logs = sorted(entry for entry in os.listdir(directory) if entry.endswith('.log'))
+    for old in logs[:max(0, len(logs) - KEEP_LOGS + 1)]:
+        try:
+            os.unlink(os.path.join(directory, old))
+        except OSError:
+            pass
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(directory, f"{stamp}-{name}.log")
+
+
+def classify(text, kind='info'):
+    """Pick the display kind of a line from its markers, as the old HTML log did."""
+    if kind == 'error' or '❌' in text or 'FAILED' in text or 'Error:' in text:
+        return 'error'
+    if kind == 'warning' or '⚠️' in text or 'WARNING' in text or 'Warning:' in text:
+        return 'warning'
+    if kind == 'success' or '✅' in text or 'SUCCESS' in text or 'completed' in text.lower():
+        return 'success'
+    if '📱' in text or '📤' in text:
+        return 'event'
+    return 'info'
+
+
+class LogPipe:
+    """Thread-safe line buffer with an on-disk copy of everything written."""
+
+    def __init__(self, path=None, max_pending=DEFAULT_MAX_PENDING):
+        self.path = path
+        self.max_pending = max_pending
+        self.lines_written = 0
+        self._pending = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8', errors='replace') if path else None
+
+    def write(self, text, kind='info'):
+        text = text.rstrip()
+        if not text.strip():
+            return
+        with self._lock:
+            if self._file:
+                self._file.write(text + '\n')
+            self.lines_written += 1
+            self._pending.append((classify(text, kind), text))
+            if len(self._pending) > self.max_pending:
+                # Trim in chunks so a flood does not cost a list shift per line
+                excess = len(self._pending) - self.max_pending // 2
+                del self._pending[:excess]
+                self._dropped += excess
+
+    def drain(self):
+        """Return and clear the pending [(kind, text)] lines, kinds already classified."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            dropped, self._dropped = self._dropped, 0
+            if self._file:
+                self._file.flush()
+        if dropped:
+            where = f", see {self.path}" if self.path else ''
+            lines.insert(0, ('warning', f"... {dropped} lines not shown{where}"))
+        return lines
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
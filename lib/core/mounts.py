@@ -0,0 +1,280 @@
+"""Shared, reference-counted mounts of removable partitions.
+
+Features that need to look inside a partition take a lease instead of
+mounting it themselves:
+
+    with get_mount_manager().lease('/dev/sdb1') as path:
+        os.listdir(os.path.join(path, 'Themes'))
+
+Concurrent requests for the same partition share one mount, and the
+second caller waits for the first one's mount to finish instead of
+starting its own. A partition stays mounted for idle_ttl seconds after its
+last lease is released, so a feature touching it again right away does
+not pay for another mount round-trip. Partitions that were already
+mounted by someone else are borrowed and never unmounted. Everything the
+manager mounted is unmounted at exit, or for one disk with release_disk()
+before that disk is installed to or erased.
+
+The backend does the actual mounting and can be swapped, e.g. for a stub
+in tests. It needs three methods: mountpoint(device) returns the current
+mount point or None, mount(device, read_only) returns the new mount point
+or raises OSError, and unmount(device, path) raises OSError on failure.
+"""
+import atexit
+import errno
+import os
+import re
+import subprocess
+import threading
+import time
+
+from .inventory import _unescape_mount
+
+DEFAULT_IDLE_TTL = 10.0
+
+
+def find_mountpoint(device, mounts_path='/proc/self/mounts'):
+    """Where device is mounted according to mounts_path, or None."""
+    device = os.path.realpath(device)
+    try:
+        with open(mounts_path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[0].startswith('/') and os.path.realpath(fields[0]) == device:
+                    return _unescape_mount(fields[1])
+    except OSError:
+        pass
+    return None
+
+
+class UdisksBackend:
+    """Mounts through udisksctl, which needs no root for removable drives."""
+
+    def mountpoint(self, device):
+        return find_mountpoint(device)
+
+    def mount(self, device, read_only):
+        args = ['udisksctl', 'mount', '--no-user-interaction', '-b', device]
+        if read_only:
+            args.extend(['-o', 'ro'])
+        try:
+            result = subprocess.run(args, capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise OSError(errno.EIO, f"udisksctl mount failed: {e}", device)
+        # "Mounted /dev/sdb1 at /media/user/Ventoy"
+        for line in result.stdout.splitlines():
+            if result.returncode == 0 and line.startswith('Mounted') and ' at ' in line:
+                return line.split(' at ', 1)[1].strip().rstrip('.')
+        path = self.mountpoint(device)
+        if path:
+            return path
+        raise OSError(errno.EIO, result.stderr.strip() or 'udisksctl mount failed', device)
+
+    def unmount(self, device, path):
+        try:
+            result = subprocess.run(['udisksctl', 'unmount', '--no-user-interaction', '-b', device],
+                                    capture_output=True, text=True, timeout=60)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise OSError(errno.EIO, f"udisksctl unmount failed: {e}", device)
+        if result.returncode:
+            raise OSError(errno.EBUSY, result.stderr.strip() or 'udisksctl unmount failed', device)
+
+
+class Lease:
+    """A hold on a mounted partition; release() it or use it as a context manager."""
+    __slots__ = ('device', 'path', 'read_only', '_manager', '_released')
+
+    def __init__(self, manager, device, path, read_only):
+        self._manager = manager
+        self.device = device
+        self.path = path
+        self.read_only = read_only
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._manager._release(self.device)
+
+    def __enter__(self):
+        return self.path
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Mount:
+    __slots__ = ('path', 'read_only', 'owned', 'refs', 'idle_since', 'pending')
+
+    def __init__(self, read_only):
+        self.path = None
+        self.read_only = read_only
+        self.owned = False
+        self.refs = 0
+        self.idle_since = None
+        self.pending = True
+
+
+class MountManager:
+    """Hands out reference-counted leases on mounted partitions. Thread-safe."""
+
+    def __init__(self, backend=None, idle_ttl=DEFAULT_IDLE_TTL, clock=time.monotonic):
+        self.backend = backend or UdisksBackend()
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._mounts = {}
+        self._cond = threading.Condition()
+        self._timer = None
+
+    def lease(self, device, read_only=True):
+        """Mount device (or reuse its mount) and return a Lease; raises OSError if it can not be mounted.
+
+        A read-write request for a partition the manager mounted read-only
+        waits until the read-only leases are gone and mounts it again.
+        """
+        with self._cond:
+            while True:
+                mount = self._mounts.get(device)
+                if mount is None:
+                    mount = self._mounts[device] = _Mount(read_only)
+                    break
+                if mount.pending:
+                    self._cond.wait()
+                    continue
+                if read_only or not mount.read_only or not mount.owned:
+                    mount.refs += 1
+                    mount.idle_since = None
+                    return Lease(self, device, mount.path, mount.read_only)
+                if mount.refs:
+                    self._cond.wait()
+                    continue
+                # Idle read-only mount, but a writer wants it: remount
+                mount.pending = True
+                break
+        # Mounting can take a while, so it runs outside the lock; waiters sleep on the condition
+        try:
+            if mount.path is not None:
+                self.backend.unmount(device, mount.path)
+                mount.path = None
+            path = self.backend.mountpoint(device)
+            owned = path is None
+            if owned:
+                path = self.backend.mount(device, read_only)
+        except Exception:
+            with self._cond:
+                if mount.path is None:
+                    del self._mounts[device]
+                else:
+                    # The read-only mount could not be dropped; it stays, idle
+                    mount.pending = False
+                    mount.idle_since = self.clock()
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            mount.path = path
+            mount.owned = owned
+            mount.read_only = read_only if owned else False
+            mount.refs = 1
+            mount.idle_since = None
+            mount.pending = False
+            self._cond.notify_all()
+        return Lease(self, device, path, read_only)
+
+    def _release(self, device):
+        with self._cond:
+            mount = self._mounts.get(device)
+            if mount is None or not mount.refs:
+                return
+            mount.refs -= 1
+            if mount.refs:
+                return
+            mount.idle_since = self.clock()
+            self._cond.notify_all()
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None and self.idle_ttl is not None:
+            self._timer = threading.Timer(self.idle_ttl, self._expire_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire_timer(self):
+        with self._cond:
+            self._timer = None
+        self.expire()
+        with self._cond:
+            if any(m.idle_since is not None and m.owned for m in self._mounts.values()):
+                self._schedule()
+
+    def _take_idle(self, match):
+        # Marks the idle mounts as pending so no lease can be handed out while they are unmounted
+        taken = []
+        with self._cond:
+            for device, mount in self._mounts.items():
+                if not mount.pending and not mount.refs and match(device, mount):
+                    mount.pending = True
+                    taken.append((device, mount))
+        return taken
+
+    def _unmount(self, taken):
+        failed = []
+        for device, mount in taken:
+            try:
+                if mount.owned:
+                    self.backend.unmount(device, mount.path)
+                gone = True
+            except OSError:
+                failed.append(device)
+                gone = False
+            with self._cond:
+                if gone:
+                    del self._mounts[device]
+                else:
+                    mount.pending = False
+                    mount.idle_since = self.clock()
+                self._cond.notify_all()
+        return failed
+
+    def expire(self):
+        """Unmount the partitions that have been idle for idle_ttl seconds or more."""
+        now = self.clock()
+        return self._unmount(self._take_idle(
+            lambda device, mount: mount.idle_since is not None and now - mount.idle_since >= self.idle_ttl))
+
+    def release_disk(self, disk):
+        """Unmount the idle partitions of disk (e.g. 'sdb'); returns the devices still leased or busy."""
+        pattern = re.compile(rf'{re.escape(disk)}p?\d+$')
+        failed = self._unmount(self._take_idle(lambda device, mount: bool(pattern.match(os.path.basename(device)))))
+        with self._cond:
+            leased = [device for device, mount in self._mounts.items()
+                      if mount.refs and pattern.match(os.path.basename(device))]
+        return failed + leased
+
+    def mounted(self):
+        """{device: (path, refs)} of the partitions currently held by the manager."""
+        with self._cond:
+            return {device: (mount.path, mount.refs) for device, mount in self._mounts.items() if not mount.pending}
+
+    def close(self):
+        """Unmount everything the manager mounted, leased or not."""
+        with self._cond:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for mount in self._mounts.values():
+                mount.refs = 0
+        return self._unmount(self._take_idle(lambda device, mount: True))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_mount_manager():
+    """Return the process-wide MountManager, which is closed at exit."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = MountManager()
+            atexit.register(_manager.close)
+        return _manager
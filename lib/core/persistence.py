@@ -0,0 +1,369 @@
+"""Build and grow Ventoy persistence images without piping them through dd and tr.
+
+CreatePersistentImg.sh makes the file with
+`dd if=/dev/zero bs=1M | tr '\\000' '\\377'`, so every byte goes through
+two processes and a pipe. Here the file is either:
+- preallocated with fallocate, which takes no time on ext4, xfs, btrfs
+  and the like; or
+- written with a pre-built 8 MiB buffer of 0xFF bytes, which is what the
+  script produces.
+The 0xFF fill is only needed when a copy of the file made with ordinary
+tools must stay non-sparse. cp treats preallocated (unwritten) extents as
+holes, but core.copyengine does not. It is also the fallback for
+filesystems that can not preallocate, such as exFAT and FAT, where
+glibc would otherwise emulate it one block at a time.
+
+The filesystem is made on the file directly, without a loop device. The
+ext2/3/4 config file is added with mkfs -d, so no root is needed. Only
+xfs needs root, and only for the config file. Several images can be
+built in parallel.
+
+    python3 -m core.persistence create ubuntu.dat -s 4096 -t ext4 -l casper-rw -c persistence.conf
+    python3 -m core.persistence allocate persistence.dat 4096 --fill
+    python3 -m core.persistence grow ubuntu.dat 2048
+"""
+import argparse
+import errno
+import mmap
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .inventory import _unescape_mount
+from .progress import format_marker
+
+MB = 1024 * 1024
+BUFFER_SIZE = 8 * MB
+DEFAULT_JOBS = 2
+DEFAULT_LABEL = 'casper-rw'
+# nodiscard keeps mkfs from punching holes into the file; -K is xfs for the same
+FSTYPES = {
+    'ext2': ['-E', 'nodiscard'],
+    'ext3': ['-E', 'nodiscard'],
+    'ext4': ['-E', 'nodiscard'],
+    'xfs': ['-K'],
+}
+MIN_SIZE_MB = {'xfs': 16}
+# Filesystems known to implement fallocate natively
+PREALLOCATING = ('ext4', 'xfs', 'btrfs', 'f2fs', 'tmpfs', 'bcachefs', 'ocfs2', 'gfs2')
+CONFIG_CONTENT = '/ union\n'
+
+_fill_buffer = None
+_fill_lock = threading.Lock()
+
+
+def filesystem_type(path, mounts_path='/proc/self/mounts'):
+    """Type of the filesystem path is on (the longest matching mount point), or ''."""
+    path = os.path.realpath(path)
+    best, fstype = '', ''
+    try:
+        with open(mounts_path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mountpoint = _unescape_mount(fields[1])
+                inside = path == mountpoint or path.startswith(mountpoint.rstrip('/') + '/')
+                if inside and len(mountpoint) >= len(best):
+                    best, fstype = mountpoint, fields[2]
+    except OSError:
+        pass
+    return fstype
+
+
+def can_preallocate(path):
+    """Whether fallocate is native (not emulated) on the filesystem path would be created on."""
+    return filesystem_type(os.path.dirname(os.path.abspath(path))) in PREALLOCATING
+
+
+def _ff_buffer():
+    # Built once and only ever read, so the worker threads share it
+    global _fill_buffer
+    with _fill_lock:
+        if _fill_buffer is None:
+            _fill_buffer = mmap.mmap(-1, BUFFER_SIZE)
+            _fill_buffer.write(b'\xff' * BUFFER_SIZE)
+        return _fill_buffer
+
+
+def _fill(fd, start, end, progress):
+    view = memoryview(_ff_buffer())
+    try:
+        offset = start
+        while offset < end:
+            n = os.pwrite(fd, view[:min(BUFFER_SIZE, end - offset)], offset)
+            offset += n
+            if progress:
+                progress(offset - start, end - start)
+    finally:
+        view.release()
+
+
+def allocate(path, size, start=0, fill=False, progress=None):
+    """Make path size bytes long and allocated from start on; returns 'fallocate' or 'fill'.
+
+    fill writes 0xFF bytes like CreatePersistentImg.sh. Without it the file
+    is preallocated where the filesystem supports that, and filled
+    otherwise. progress(done, total) counts the bytes from start. If
+    anything fails (ENOSPC halfway through the fill, say) the file is
+    truncated back to the size it had before.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o644)
+    try:
+        original = os.fstat(fd).st_size
+        if size < original:
+            raise OSError(errno.EINVAL, 'the image would shrink', path)
+        try:
+            method = 'fill'
+            if not fill and can_preallocate(path):
+                try:
+                    os.posix_fallocate(fd, start, size - start)
+                    method = 'fallocate'
+                    if progress:
+                        progress(size - start, size - start)
+                except OSError as e:
+                    if e.errno not in (errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL):
+                        raise
+            if method == 'fill':
+                _fill(fd, start, size, progress)
+            os.fsync(fd)
+        except BaseException:
+            os.ftruncate(fd, original)
+            raise
+    finally:
+        os.close(fd)
+    return method
+
+
+class PersistenceSpec:
+    """One persistence image to build; config is the name of a "/ union" file to put inside, if any."""
+    __slots__ = ('path', 'size_mb', 'fstype', 'label', 'config', 'fill')
+
+    def __init__(self, path, size_mb, fstype='ext4', label=DEFAULT_LABEL, config='', fill=False):
+        self.path = path
+        self.size_mb = size_mb
+        self.fstype = fstype
+        self.label = label
+        self.config = config
+        self.fill = fill
+
+    def validate(self):
+        """Raise ValueError for settings CreatePersistentImg.sh would refuse."""
+        if self.fstype not in FSTYPES:
+            raise ValueError(f"unsupported file system {self.fstype}")
+        if not self.label:
+            raise ValueError('the label can not be empty')
+        if self.size_mb < MIN_SIZE_MB.get(self.fstype, 1):
+            raise ValueError(f"size too small ({self.size_mb})")
+        if os.sep in self.config:
+            raise ValueError(f"the config file name can not contain {os.sep}")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BuildResult:
+    """How one image was built; error is empty on success."""
+    __slots__ = ('path', 'method', 'allocate_seconds', 'mkfs_seconds', 'error')
+
+    def __init__(self, path, method='', allocate_seconds=0.0, mkfs_seconds=0.0, error=''):
+        self.path = path
+        self.method = method
+        self.allocate_seconds = allocate_seconds
+        self.mkfs_seconds = mkfs_seconds
+        self.error = error
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _run(args, **kwargs):
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, **kwargs)
+    except OSError as e:
+        raise OSError(e.errno, f"{args[0]}: {e.strerror}")
+    if result.returncode:
+        raise OSError(errno.EIO, f"{' '.join(args)} failed: {(result.stderr or result.stdout).strip()}")
+    return result
+
+
+def make_filesystem(spec):
+    """Run mkfs on the image file itself, with the config file added when spec.config is set."""
+    if spec.fstype == 'xfs':
+        _run(['mkfs.xfs', '-f', *FSTYPES['xfs'], '-L', spec.label, spec.path])
+        if spec.config:
+            _write_config_mounted(spec)
+        return
+    args = [f"mkfs.{spec.fstype}", '-F', '-q', *FSTYPES[spec.fstype], '-L', spec.label]
+    if not spec.config:
+        _run(args + [spec.path])
+        return
+    # mke2fs -d populates the new filesystem from a directory, no mount needed
+    with tempfile.TemporaryDirectory(prefix='ventoy-persist-') as staging:
+        with open(os.path.join(staging, spec.config), 'w') as f:
+            f.write(CONFIG_CONTENT)
+        _run(args + ['-d', staging, spec.path])
+
+
+def _write_config_mounted(spec):
+    with tempfile.TemporaryDirectory(prefix='ventoy-persist-') as mountpoint:
+        _run(['mount', '-o', 'loop', spec.path, mountpoint])
+        try:
+            with open(os.path.join(mountpoint, spec.config), 'w') as f:
+                f.write(CONFIG_CONTENT)
+        finally:
+            _run(['umount', mountpoint])
+
+
+def build_image(spec, progress=None):
+    """Allocate and format one image; returns a BuildResult and never raises for build errors.
+
+    progress(step, done, total) is called while the file is allocated and
+    when mkfs starts.
+    """
+    result = BuildResult(spec.path)
+    try:
+        spec.validate()
+        directory = os.path.dirname(os.path.abspath(spec.path))
+        os.makedirs(directory, exist_ok=True)
+        size = spec.size_mb * MB
+        # A fresh file every time, like the script's "> file"
+        if os.path.exists(spec.path):
+            os.remove(spec.path)
+        start = time.monotonic()
+        result.method = allocate(spec.path, size, fill=spec.fill,
+                                 progress=(lambda done, total: progress('allocate', done, total)) if progress else None)
+        result.allocate_seconds = time.monotonic() - start
+        if progress:
+            progress('mkfs', 0, 1)
+        start = time.monotonic()
+        make_filesystem(spec)
+        result.mkfs_seconds = time.monotonic() - start
+        if progress:
+            progress('mkfs', 1, 1)
+    except (OSError, ValueError) as e:
+        result.error = str(e)
+    return result
+
+
+def build_images(specs, jobs=DEFAULT_JOBS, progress=None):
+    """Build several images at once; progress(index, step, done, total) identifies the spec by index."""
+    def one(indexed):
+        index, spec = indexed
+        return build_image(spec, (lambda step, done, total: progress(index, step, done, total)) if progress else None)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(specs))), thread_name_prefix='persistence') as pool:
+        return list(pool.map(one, enumerate(specs)))
+
+
+def detect_fstype(path):
+    """'xfs' or 'ext' from the superblock magic of an image file, or ''."""
+    with open(path, 'rb') as f:
+        head = f.read(1082)
+    if head[:4] == b'XFSB':
+        return 'xfs'
+    if head[1080:1082] == b'\x53\xef':
+        return 'ext'
+    return ''
+
+
+def grow_image(path, add_mb, fill=False, progress=None):
+    """Grow an image file by add_mb in place and resize its ext filesystem; returns the allocation method.
+
+    xfs can only be grown while mounted, so for xfs this only grows the
+    file and leaves xfs_growfs to ExtendPersistentImg.sh.
+    """
+    size = os.path.getsize(path)
+    if size % MB:
+        raise ValueError(f"file size of {path} is not aligned by 1MB")
+    fstype = detect_fstype(path)
+    method = allocate(path, size + add_mb * MB, start=size, fill=fill, progress=progress)
+    if fstype == 'ext':
+        _run(['e2fsck', '-f', '-p', path])
+        _run(['resize2fs', path, f"{size // MB + add_mb}M"])
+    return method
+
+
+def _marker_progress(label):
+    last = [0.0]
+
+    def progress(done, total):
+        now = time.monotonic()
+        if now - last[0] >= 0.25 or done == total:
+            last[0] = now
+            print(format_marker(label, done, total), flush=True)
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or grow Ventoy persistence images.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help='allocate and format one or more images')
+    create.add_argument('outputs', nargs='+', metavar='FILE')
+    create.add_argument('-s', '--size', type=int, default=1024, help='size in MB')
+    create.add_argument('-t', '--fstype', default='ext4', choices=sorted(FSTYPES))
+    create.add_argument('-l', '--label', default=DEFAULT_LABEL)
+    create.add_argument('-c', '--config', default='', help='name of a "/ union" config file inside the image')
+    create.add_argument('--fill', action='store_true', help='write 0xFF instead of preallocating')
+    create.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='images built at the same time')
+    create.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    alloc = commands.add_parser('allocate', help='only create the file (used by CreatePersistentImg.sh)')
+    alloc.add_argument('output')
+    alloc.add_argument('size', type=int, help='size in MB')
+    alloc.add_argument('--fill', action='store_true', help='write 0xFF instead of preallocating')
+    alloc.add_argument('--progress', action='store_true')
+    grow = commands.add_parser('grow', help='grow an image in place (used by ExtendPersistentImg.sh)')
+    grow.add_argument('file')
+    grow.add_argument('size', type=int, help='MB to add')
+    grow.add_argument('--fill', action='store_true', help='write 0xFF instead of preallocating')
+    grow.add_argument('--no-resize', action='store_true', help='only grow the file, leave the filesystem')
+    grow.add_argument('--progress', action='store_true')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'allocate':
+            if os.path.exists(args.output):
+                os.remove(args.output)
+            allocate(args.output, args.size * MB, fill=args.fill,
+                     progress=_marker_progress('Allocating') if args.progress else None)
+            return 0
+        if args.command == 'grow':
+            if args.size <= 0:
+                raise ValueError('only growing is supported here')
+            progress = _marker_progress('Growing') if args.progress else None
+            if args.no_resize:
+                size = os.path.getsize(args.file)
+                method = allocate(args.file, size + args.size * MB, start=size, fill=args.fill, progress=progress)
+            else:
+                method = grow_image(args.file, args.size, args.fill, progress)
+            print(f"{args.file}: grown by {args.size}MB ({method})")
+            return 0
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"persistence: {e}\n")
+        return 1
+
+    specs = [PersistenceSpec(path, args.size, args.fstype, args.label, args.config, args.fill) for path in args.outputs]
+    progress = None
+    if args.progress:
+        last = [0.0]
+
+        def progress(index, step, done, total):
+            now = time.monotonic()
+            if now - last[0] >= 0.25 or done == total:
+                last[0] = now
+                print(format_marker(f"{os.path.basename(specs[index].path)}: {step}", done, total), flush=True)
+    results = build_images(specs, args.jobs, progress)
+    for result in results:
+        if result.error:
+            sys.stderr.write(f"persistence: {result.path}: {result.error}\n")
+        else:
+            print(f"{result.path}: {result.method} {result.allocate_seconds:.1f} s, mkfs {result.mkfs_seconds:.1f} s")
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Spread a set of boot images over several Ventoy drives.
+
+A drive's capacity is worked out the way Ventoy2Disk lays it out: the
+exFAT data partition runs from sector 2048 to the 32 MiB Ventoy partition.
+Space reserved with -r and the 4 KiB alignment of the Ventoy partition
+are taken off, and so is the exFAT metadata. Every file is rounded up to
+the cluster size Ventoy formats with (128 KiB above 32 GiB, 32 KiB
+below). For a drive that is already in use, the free space of its mounted
+data partition can be passed instead.
+
+The images are placed largest first. The default "balanced" strategy is
+worst-fit decreasing: each image goes to the drive with the lowest fill
+ratio that still has room, which spreads the data evenly across mixed
+sizes. When that leaves something out, "tight" (best-fit decreasing,
+which packs each image where it leaves the least space over) is tried,
+and the plan that places more bytes wins. Both are O(n log n + n log m)
+for n images over m drives.
+
+Everything here works on plain sizes, so plans can be tried offline:
+
+    python3 -m core.planner --drive sdb=64G --drive sdc=32G ubuntu.iso=5.7G win11.iso=6.2G ...
+    python3 -m core.planner --drive sdb=64G --drive sdc=32G ~/isos/*.iso
+"""
+import argparse
+import bisect
+import heapq
+import os
+import re
+import sys
+
+from .inventory import format_size
+from .isolib import data_partition
+
+SECTOR_SIZE = 512
+DATA_START_SECTOR = 2048
+VENTOY_PART_SECTORS = 65536
+GPT_BACKUP_SECTORS = 33
+SMALL_DISK_GB = 32
+SMALL_CLUSTER = 32 * 1024
+LARGE_CLUSTER = 128 * 1024
+STRATEGIES = ('auto', 'balanced', 'tight')
+
+_SIZE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMGTP]?)(?:i?B)?$', re.IGNORECASE)
+
+
+def parse_size(text):
+    """Bytes in '5.7G', '700M', '4096' (binary units, like lsblk); raises ValueError."""
+    match = _SIZE.match(text.strip())
+    if not match:
+        raise ValueError(f"not a size: {text}")
+    return int(float(match.group(1)) * 1024 ** ' KMGTP'.index(match.group(2).upper() or ' '))
+
+
+def ventoy_data_sectors(disk_sectors, reserve_mb=0, gpt=False):
+    """Sectors of the data partition Ventoy2Disk creates (format_ventoy_disk_mbr/gpt in ventoy_lib.sh)."""
+    if reserve_mb > 0:
+        reserved = reserve_mb * 2048 + (GPT_BACKUP_SECTORS if gpt else 0)
+        end = disk_sectors - reserved - VENTOY_PART_SECTORS - 1
+    else:
+        end = disk_sectors - VENTOY_PART_SECTORS - (GPT_BACKUP_SECTORS + 1 if gpt else 1)
+    # The Ventoy partition starts 4 KiB aligned
+    end -= (end + 1) % 8
+    return max(0, end - DATA_START_SECTOR + 1)
+
+
+def exfat_cluster_size(disk_size):
+    """Cluster size Ventoy formats the data partition with (VentoyWorker.sh)."""
+    return LARGE_CLUSTER if disk_size // (1024 ** 3) > SMALL_DISK_GB else SMALL_CLUSTER
+
+
+def exfat_usable(partition_size, cluster_size):
+    """Bytes left for files on a fresh exFAT partition: the size minus the FAT, the bitmap and the boot region."""
+    clusters = partition_size // cluster_size
+    # FAT entries are 4 bytes, the allocation bitmap 1 bit per cluster; 1 MiB covers boot region, upcase table, root
+    metadata = clusters * 4 + -(-clusters // 8) + 1024 * 1024
+    return max(0, (clusters - -(-metadata // cluster_size)) * cluster_size)
+
+
+def allocated(size, cluster_size):
+    """Space a file of size bytes takes up on disk."""
+    return -(-size // cluster_size) * cluster_size
+
+
+class Item:
+    """An image to place; name is its path, or any label for a synthetic size."""
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Target:
+    """A drive to fill: capacity is the usable bytes, files are rounded up to cluster_size."""
+    __slots__ = ('name', 'capacity', 'cluster_size', 'device')
+
+    def __init__(self, name, capacity, cluster_size=LARGE_CLUSTER, device=''):
+        self.name = name
+        self.capacity = capacity
+        self.cluster_size = cluster_size
+        self.device = device
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def target_for_disk(disk, reserve_mb=0, gpt=False, free=None, cluster_size=None):
+    """A Target for a disk dict from core.disk.list_usb_disks.
+
+    A disk with a Ventoy data partition is measured by that partition;
+    any other disk by the layout a fresh install with reserve_mb and gpt
+    would give it. free (e.g. from statvfs of the mounted partition)
+    replaces the computed capacity for a drive that already holds files.
+    """
+    size = disk.get('size_bytes') or 0
+    cluster_size = cluster_size or exfat_cluster_size(size)
+    part = data_partition(disk)
+    if part and part.get('size'):
+        partition_size = part['size']
+        device = f"/dev/{part['name']}"
+    else:
+        partition_size = ventoy_data_sectors(size // SECTOR_SIZE, reserve_mb, gpt) * SECTOR_SIZE
+        device = ''
+    capacity = exfat_usable(partition_size, cluster_size) if free is None else free
+    return Target(disk['name'], capacity, cluster_size, device)
+
+
+def items_from_paths(paths):
+    """Items for real files, or for NAME=SIZE arguments such as 'ubuntu.iso=5.7G'."""
+    items = []
+    for path in paths:
+        if '=' in path and not os.path.exists(path):
+            name, size = path.rsplit('=', 1)
+            items.append(Item(name, parse_size(size)))
+        else:
+            items.append(Item(path, os.path.getsize(path)))
+    return items
+
+
+class Plan:
+    """Which items go on which target; assignments maps target names to lists of Items."""
+
+    def __init__(self, targets, assignments, unplaced, strategy):
+        self.targets = targets
+        self.assignments = assignments
+        self.unplaced = unplaced
+        self.strategy = strategy
+
+    def used(self, target):
+        return sum(allocated(item.size, target.cluster_size) for item in self.assignments[target.name])
+
+    def fill(self, target):
+        return self.used(target) / target.capacity if target.capacity else 1.0
+
+    @property
+    def complete(self):
+        return not self.unplaced
+
+    @property
+    def placed_bytes(self):
+        return sum(item.size for items in self.assignments.values() for item in items)
+
+    @property
+    def spread(self):
+        """Difference between the fullest and the emptiest target's fill ratio; 0 is perfectly balanced."""
+        fills = [self.fill(t) for t in self.targets]
+        return max(fills) - min(fills) if fills else 0.0
+
+    def sources(self, name):
+        """Paths planned for target name, in the order they should be copied."""
+        return [item.name for item in self.assignments.get(name, ())]
+
+    def batches(self):
+        """[(target, [paths])] for the targets that received anything."""
+        return [(t, self.sources(t.name)) for t in self.targets if self.assignments[t.name]]
+
+    def to_dict(self):
+        return {
+            'strategy': self.strategy,
+            'targets': [dict(t.to_dict(), used=self.used(t), items=[i.to_dict() for i in self.assignments[t.name]])
+                        for t in self.targets],
+            'unplaced': [item.to_dict() for item in self.unplaced],
+        }
+
+
+def _balanced(items, targets):
+    # Min-heap on fill ratio; a target that can not take the current item is set aside for it
+    used = {t.name: 0 for t in targets}
+    heap = [(0.0, i, t) for i, t in enumerate(targets) if t.capacity > 0]
+    heapq.heapify(heap)
+    assignments = {t.name: [] for t in targets}
+    unplaced = []
+    for item in items:
+        skipped = []
+        while heap:
+            fill, i, target = heapq.heappop(heap)
+            need = allocated(item.size, target.cluster_size)
+            if used[target.name] + need <= target.capacity:
+                used[target.name] += need
+                assignments[target.name].append(item)
+                heapq.heappush(heap, (used[target.name] / target.capacity, i, target))
+                break
+            skipped.append((fill, i, target))
+        else:
+            unplaced.append(item)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+    return assignments, unplaced
+
+
+def _tight(items, targets):
+    # Best fit: the target with the least room that still fits, found by bisecting the sorted free list
+    free = sorted((t.capacity, i) for i, t in enumerate(targets))
+    assignments = {t.name: [] for t in targets}
+    unplaced = []
+    for item in items:
+        # Cluster sizes differ per target, so the smallest fitting slot is searched from the plain size up
+        pos = bisect.bisect_left(free, (item.size, -1))
+        while pos < len(free):
+            room, i = free[pos]
+            need = allocated(item.size, targets[i].cluster_size)
+            if need <= room:
+                del free[pos]
+                bisect.insort(free, (room - need, i))
+                assignments[targets[i].name].append(item)
+                break
+            pos += 1
+        else:
+            unplaced.append(item)
+    return assignments, unplaced
+
+
+def plan(items, targets, strategy='auto'):
+    """Assign items to targets and return a Plan; items that fit nowhere end up in Plan.unplaced."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown strategy: {strategy}")
+    # Largest first; ties by name keep plans stable between runs
+    ordered = sorted(items, key=lambda item: (-item.size, item.name))
+    result = None
+    if strategy in ('auto', 'balanced'):
+        result = Plan(targets, *_balanced(ordered, targets), 'balanced')
+    if strategy == 'tight' or (strategy == 'auto' and result.unplaced):
+        tight = Plan(targets, *_tight(ordered, targets), 'tight')
+        if result is None or tight.placed_bytes > result.placed_bytes:
+            result = tight
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan how to spread boot images over several Ventoy drives.')
+    parser.add_argument('items', nargs='+', metavar='IMAGE', help='image file, or NAME=SIZE for a synthetic one')
+    parser.add_argument('--drive', action='append', required=True, metavar='NAME=SIZE[:FREE]',
+                        help='drive size (a fresh install is assumed), optionally with the free space left on it')
+    parser.add_argument('--reserve-mb', type=int, default=0, help='space reserved at the end of each drive (-r)')
+    parser.add_argument('--gpt', action='store_true', help='GPT layout (-g)')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='auto')
+    args = parser.parse_args(argv)
+    try:
+        targets = []
+        for spec in args.drive:
+            name, _, sizes = spec.partition('=')
+            size, _, free = sizes.partition(':')
+            disk = {'name': name, 'size_bytes': parse_size(size), 'partitions': []}
+            targets.append(target_for_disk(disk, args.reserve_mb, args.gpt, parse_size(free) if free else None))
+        items = items_from_paths(args.items)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"planner: {e}\n")
+        return 2
+    result = plan(items, targets, args.strategy)
+    for target in targets:
+        print(f"{target.name}: {len(result.assignments[target.name])} image(s), {format_size(result.used(target))} "
+              f"of {format_size(target.capacity)} ({result.fill(target) * 100:.1f}%)")
+        for item in result.assignments[target.name]:
+            print(f"    {item.name}\t{format_size(item.size)}")
+    for item in result.unplaced:
+        print(f"does not fit: {item.name}\t{format_size(item.size)}")
+    print(f"{result.strategy} plan, fill spread {result.spread * 100:.1f} points, "
+          f"{len(result.unplaced)} image(s) left over")
+    return 0 if result.complete else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,755 @@
+"""Privileged helper: one root process per session instead of a pkexec per operation.
+
+The GUI or CLI starts the helper once, so pkexec asks for the password
+once. After that it talks to the helper over a Unix socket that only the
+user who started it (and root) may connect to. The helper exits after
+idle_timeout seconds without work; the next request starts a new one.
+
+The protocol is NDJSON both ways. A request looks like this:
+
+    {"id": 7, "command": "erase", "args": {"target": "/dev/sdb", "pattern": "zero"}}
+
+A line may also hold a JSON array of requests, which are queued together.
+Every request runs as a core.jobs Job on the helper's engine. Requests
+for different drives therefore run concurrently, under the same
+per-device and per-controller limits, and requests for one drive queue
+behind each other. The helper streams the job's events back, each tagged
+with the request id, and ends with
+
+    {"id": 7, "event": "result", "ok": true, "state": "done", "message": "Done", "result": {...}}
+
+A request that is malformed or not allowed gets an ok false result
+straight away. Arguments are checked against COMMANDS, and paths must be
+absolute:
+- write-image: target, images [[source, seek, count or null], ...], sync.
+- patch-table: target, patches [[offset, hex], ...], copy [[path, offset,
+  count], ...], active [[index, bool], ...], new_disk_uuid,
+  new_disk_signature.
+- erase: target, pattern ('quick' or a core.erase pattern), threads.
+- mount: device, read_only; the result holds the mount point. Mounts
+  are always nosuid,nodev (read-only ones also noexec), and image files
+  are only mounted by the local stand-in.
+- unmount: mountpoint, for mounts the helper made.
+- sign: files, key, cert (core.efisign: in place, in parallel, verified).
+- job: spec, an install, upgrade or erase spec for core.jobs.job_from_spec.
+- cancel: request. Also ping and shutdown.
+
+The privileged helper only writes to whole disks or partitions that are
+removable or on USB and hold no system mount point, and to regular files
+that belong to the client. Those files are opened once, without
+following symlinks, checked on the open descriptor and used through it,
+so swapping the path afterwards changes nothing. The local stand-in (--local) runs the same
+server without privileges and accepts image files only. Everything but
+mount can be tried out against disk images that way:
+
+    python3 -m core.privhelper --socket /tmp/h.sock serve --local &
+    python3 -m core.privhelper --socket /tmp/h.sock call erase '{"target": "/tmp/disk.img"}'
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .jobs import (DEFAULT_PER_CONTROLLER, DEFAULT_WORKERS, DONE, FAILED, FINISHED, Job, JobEngine,
+                   _mounted_partitions, disk_of, usb_controller)
+
+DEFAULT_IDLE_TIMEOUT = 300
+# Long enough for the password prompt
+START_TIMEOUT = 120
+LIB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# A drive with one of these mounted is never written to
+SYSTEM_MOUNTS = ('/', '/boot', '/boot/efi', '/efi', '/home', '/usr', '/var')
+JOB_KINDS = ('install', 'upgrade', 'erase')
+# pkexec's exit codes when the password dialog was dismissed or authorization failed
+PKEXEC_DENIED = (126, 127)
+
+_REQUIRED = object()
+
+# Argument types and defaults of every command; any other argument is an error
+COMMANDS = {
+    'write-image': {'target': (str, _REQUIRED), 'images': (list, _REQUIRED), 'sync': (bool, True)},
+    'patch-table': {'target': (str, _REQUIRED), 'patches': (list, ()), 'copy': (list, ()), 'active': (list, ()),
+                    'new_disk_uuid': (bool, False), 'new_disk_signature': (bool, False)},
+    'erase': {'target': (str, _REQUIRED), 'pattern': (str, 'quick'), 'threads': (int, 4)},
+    'mount': {'device': (str, _REQUIRED), 'read_only': (bool, True)},
+    'unmount': {'mountpoint': (str, _REQUIRED)},
+    'sign': {'files': (list, _REQUIRED), 'key': (str, _REQUIRED), 'cert': (str, _REQUIRED)},
+    'job': {'spec': (dict, _REQUIRED)},
+    'cancel': {'request': (int, _REQUIRED)},
+    'ping': {},
+    'shutdown': {},
+}
+
+
+class HelperError(RuntimeError):
+    """A request the helper refused or that failed, or a helper that could not be reached."""
+
+
+def default_socket_path(uid=None):
+    """The per-user socket, in XDG_RUNTIME_DIR when there is one."""
+    uid = os.getuid() if uid is None else uid
+    return os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f"ventoy-x-helper-{uid}.sock")
+
+
+def _is_type(value, kind):
+    # bool is an int in Python, but not in the protocol
+    return isinstance(value, kind) and (kind is bool or not isinstance(value, bool))
+
+
+def parse_request(request):
+    """(id, command, args) of a request, with args checked against COMMANDS and defaults filled in; raises ValueError."""
+    if not isinstance(request, dict) or not _is_type(request.get('id'), int):
+        raise ValueError('a request needs an integer id')
+    command = request.get('command')
+    if command not in COMMANDS:
+        raise ValueError(f"unknown command: {command}")
+    args = request.get('args') or {}
+    if not isinstance(args, dict):
+        raise ValueError(f"{command}: args must be an object")
+    schema = COMMANDS[command]
+    unknown = sorted(set(args) - set(schema))
+    if unknown:
+        raise ValueError(f"{command}: unknown argument(s) {', '.join(unknown)}")
+    checked = {}
+    for name, (kind, default) in schema.items():
+        if name not in args:
+            if default is _REQUIRED:
+                raise ValueError(f"{command}: {name} is required")
+            checked[name] = default
+        elif _is_type(args[name], kind):
+            checked[name] = args[name]
+        else:
+            raise ValueError(f"{command}: {name} must be of type {kind.__name__}")
+    return request['id'], command, checked
+
+
+def _rows(command, name, rows, types, shape):
+    """Check list arguments made of fixed-shape rows, e.g. patches [[offset, hex], ...]."""
+    for row in rows:
+        if not (isinstance(row, list) and len(row) == len(types) and
+                all(_is_type(value, kind) for value, kind in zip(row, types))):
+            raise ValueError(f"{command}: {name} must be a list of {shape}")
+    return rows
+
+
+def _fd_path(fd):
+    # /proc/self would be the subprocess for a command the job runs
+    return f"/proc/{os.getpid()}/fd/{fd}"
+
+
+def _read_sys(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+class _Connection:
+    """One client connection; send() may be called from any thread."""
+
+    def __init__(self, sock, uid, gid):
+        self.sock = sock
+        self.uid = uid
+        self.gid = gid
+        self.lock = threading.Lock()
+        self.closed = False
+        # request id -> Job, for the requests still running
+        self.requests = {}
+        # (fd, real path) of the image files opened for the request being dispatched
+        self.opened = []
+
+    def send(self, message):
+        data = (json.dumps(message) + '\n').encode()
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.closed = True
+
+
+def _result(request_id, ok, state, message='', result=None):
+    return {'id': request_id, 'event': 'result', 'ok': ok, 'state': state, 'message': message, 'result': result}
+
+
+class Helper:
+    """The server: runs requests as jobs and streams their events back to the client that sent them."""
+
+    def __init__(self, socket_path, local=False, owner=None, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_workers=DEFAULT_WORKERS, per_controller=DEFAULT_PER_CONTROLLER):
+        self.socket_path = socket_path
+        self.local = local
+        self.owner = os.getuid() if owner is None else owner
+        self.idle_timeout = idle_timeout
+        self.engine = JobEngine(max_workers, per_controller)
+        self.engine.subscribe(self._forward)
+        # Job -> (connection, request id)
+        self.owners = {}
+        # mount point -> device, for the mounts made through the helper
+        self.mounts = {}
+        # Job -> fds of the image files it works on, closed when it finishes
+        self.held = {}
+        self.lock = threading.Lock()
+        self.last_active = time.monotonic()
+        self.stopping = threading.Event()
+
+    def busy(self):
+        return bool(self.engine.queue or self.engine.running)
+
+    def serve(self):
+        """Accept connections until shutdown, a signal, or idle_timeout seconds without work."""
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        if os.geteuid() == 0 and self.owner:
+            os.chown(self.socket_path, self.owner, -1)
+        server.listen(16)
+        server.settimeout(1.0)
+        try:
+            while not self.stopping.is_set():
+                try:
+                    sock, _ = server.accept()
+                except socket.timeout:
+                    if not self.busy() and time.monotonic() - self.last_active > self.idle_timeout:
+                        break
+                    continue
+                threading.Thread(target=self._serve_connection, args=(sock,), name='helper-connection',
+                                 daemon=True).start()
+        finally:
+            server.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            self.engine.cancel()
+            self.engine.wait()
+            for mountpoint in list(self.mounts):
+                if subprocess.run(['umount', mountpoint], capture_output=True).returncode == 0:
+                    os.rmdir(mountpoint)
+
+    def _serve_connection(self, sock):
+        pid, uid, gid = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                             struct.calcsize('3i')))
+        if uid not in (0, self.owner):
+            sock.close()
+            return
+        connection = _Connection(sock, uid, gid)
+        try:
+            for line in sock.makefile('rb'):
+                self.last_active = time.monotonic()
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    connection.send(_result(None, False, FAILED, 'not a JSON request'))
+                    continue
+                for request in message if isinstance(message, list) else [message]:
+                    self._dispatch(connection, request)
+        except OSError:
+            pass
+        finally:
+            with connection.lock:
+                connection.closed = True
+            # A client that went away does not leave half-done work running
+            for job in list(connection.requests.values()):
+                self.engine.cancel(job.id)
+            sock.close()
+
+    def _dispatch(self, connection, request):
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            request_id, command, args = parse_request(request)
+            if request_id in connection.requests:
+                raise ValueError(f"request {request_id} is still running")
+            if command == 'ping':
+                connection.send(_result(request_id, True, DONE, result={'pid': os.getpid(), 'local': self.local,
+                                                                        'uid': os.geteuid()}))
+            elif command == 'cancel':
+                job = connection.requests.get(args['request'])
+                cancelled = self.engine.cancel(job.id) if job else []
+                connection.send(_result(request_id, bool(cancelled), DONE if cancelled else FAILED,
+                                        '' if cancelled else f"request {args['request']} is not running"))
+            elif command == 'shutdown':
+                connection.send(_result(request_id, True, DONE))
+                self.stopping.set()
+            else:
+                job = getattr(self, '_' + command.replace('-', '_'))(connection, **args)
+                opened, connection.opened = connection.opened, []
+                # Events name the image file, not the descriptor the job works through
+                job.target = dict((_fd_path(fd), real) for fd, real in opened).get(job.target, job.target)
+                connection.requests[request_id] = job
+                with self.lock:
+                    self.owners[job] = (connection, request_id)
+                    self.held[job] = [fd for fd, _ in opened]
+                self.engine.submit(job)
+        except (OSError, ValueError) as e:
+            for fd, _ in connection.opened:
+                os.close(fd)
+            connection.opened = []
+            connection.send(_result(request_id, False, FAILED, str(e)))
+
+    def _forward(self, event):
+        job = self.engine.get(event.get('job'))
+        with self.lock:
+            owner = self.owners.get(job)
+        if owner is None:
+            return
+        connection, request_id = owner
+        connection.send(dict(event, id=request_id))
+        if event['event'] == 'status' and event['state'] in FINISHED:
+            connection.send(_result(request_id, job.state == DONE, job.state, job.message, job.result))
+            with self.lock:
+                del self.owners[job]
+                held = self.held.pop(job, ())
+            for fd in held:
+                os.close(fd)
+            connection.requests.pop(request_id, None)
+            self.engine.forget(job)
+            self.last_active = time.monotonic()
+
+    # -- checks
+
+    def _open_file(self, path, real, connection, flags):
+        """Open the regular file real once, without following a symlink, and check it on the open descriptor.
+
+        Returns /proc/<pid>/fd/<fd>, which every later open (the job's,
+        or a subprocess's) resolves to the same file, whatever happens to
+        the path in the meantime. The fd is closed when the job finishes.
+        """
+        fd = os.open(real, flags | os.O_NOFOLLOW | os.O_NOCTTY | os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise ValueError(f"{path} is not a regular file")
+            if flags & os.O_ACCMODE == os.O_RDONLY:
+                if connection.uid not in (0, st.st_uid) and not st.st_mode & stat.S_IROTH:
+                    raise PermissionError(f"{path} is not readable for you")
+            elif connection.uid not in (0, st.st_uid):
+                raise PermissionError(f"{path} belongs to someone else")
+        except BaseException:
+            os.close(fd)
+            raise
+        connection.opened.append((fd, real))
+        return _fd_path(fd)
+
+    def check_target(self, path, connection, partitions=True):
+        """A path to a device or image file the client may write to; raises OSError or ValueError.
+
+        Image files are opened here and handed on as their descriptor
+        (see _open_file), so the file checked is the file written.
+        """
+        if not os.path.isabs(path):
+            raise ValueError(f"{path}: paths must be absolute")
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        if stat.S_ISREG(st.st_mode):
+            return self._open_file(path, real, connection, os.O_RDWR)
+        if self.local:
+            raise PermissionError(f"{path}: the local helper only works on image files")
+        if not stat.S_ISBLK(st.st_mode):
+            raise ValueError(f"{path} is not a block device or an image file")
+        disk = disk_of(real)
+        if not partitions and disk != os.path.basename(real):
+            raise ValueError(f"{path} is a partition, not a whole disk")
+        if not usb_controller(disk) and _read_sys(f"/sys/class/block/{disk}/removable") != '1':
+            raise PermissionError(f"{path} is neither removable nor on USB")
+        for partition, mountpoint in _mounted_partitions(real):
+            if mountpoint in SYSTEM_MOUNTS:
+                raise PermissionError(f"{path} holds {mountpoint} ({partition})")
+        return real
+
+    def check_source(self, path, connection):
+        """A path to a file the client may read; the helper could read anything for it otherwise."""
+        if not os.path.isabs(path):
+            raise ValueError(f"{path}: paths must be absolute")
+        return self._open_file(path, os.path.realpath(path), connection, os.O_RDONLY)
+
+    def _mount_of(self, path):
+        with self.lock:
+            return next((mountpoint for mountpoint in self.mounts if path.startswith(mountpoint + os.sep)), None)
+
+    # -- commands; each returns the Job that carries it out
+
+    def _write_image(self, connection, target, images, sync):
+        from .imagewriter import WriteJob, write_images
+        target = self.check_target(target, connection)
+        writes = [WriteJob(self.check_source(source, connection), seek, count)
+                  for source, seek, count in _rows('write-image', 'images', images, (str, int, (int, type(None))),
+                                                   '[source, seek, count or null]')]
+
+        def work(context):
+            written = write_images(target, writes, sync=sync,
+                                   progress=lambda done: context.progress(done, step='Writing images'))
+            context.job.result = {'written': written}
+        return Job('write-image', target, work)
+
+    def _patch_table(self, connection, target, patches, copy, active, new_disk_uuid, new_disk_signature):
+        from .ptable import PartitionTable
+        target = self.check_target(target, connection, partitions=False)
+        patches = [(offset, bytes.fromhex(data))
+                   for offset, data in _rows('patch-table', 'patches', patches, (int, str), '[offset, hex]')]
+        copies = [(self.check_source(path, connection), offset, count)
+                  for path, offset, count in _rows('patch-table', 'copy', copy, (str, int, int),
+                                                   '[path, offset, count]')]
+        _rows('patch-table', 'active', active, (int, bool), '[index, bool]')
+
+        def work(context):
+            table = PartitionTable.load(target)
+            for offset, data in patches:
+                table.patch(offset, data)
+            for path, offset, count in copies:
+                table.copy_from(path, offset, count)
+            for index, flag in active:
+                table.set_active(index, flag)
+            if new_disk_uuid:
+                table.set_disk_uuid()
+            if new_disk_signature:
+                table.set_disk_signature()
+            written = table.commit(target)
+            context.job.result = {'written': written,
+                                  'info': dict(line.split('=', 1) for line in table.info().splitlines())}
+        return Job('patch-table', target, work)
+
+    def _erase(self, connection, target, pattern, threads):
+        from .erase import PATTERNS, erase, quick_erase
+        if pattern != 'quick' and pattern not in PATTERNS:
+            raise ValueError(f"erase: pattern must be quick or one of {', '.join(sorted(PATTERNS))}")
+        target = self.check_target(target, connection, partitions=False)
+
+        def work(context):
+            mounted = _mounted_partitions(target)
+            if mounted:
+                raise RuntimeError(f"{mounted[0][0]} is mounted on {mounted[0][1]}")
+            if pattern == 'quick':
+                extents = quick_erase(target)
+                context.job.result = {'cleared': [{'offset': e.offset, 'length': e.length, 'what': e.what}
+                                                  for e in extents]}
+            else:
+                passes = erase(target, pattern, threads=threads,
+                               progress=lambda done, total: context.progress(done, total, 'Erasing'))
+                context.job.result = {'passes': passes}
+        return Job('erase', target, work)
+
+    def _mount(self, connection, device, read_only):
+        # A user's own filesystem image could carry setuid-root binaries or device nodes
+        if not self.local and os.path.isabs(device) and os.path.isfile(device):
+            raise PermissionError(f"{device}: the helper only mounts drives, not image files")
+        device = self.check_target(device, connection)
+
+        def work(context):
+            mountpoint = tempfile.mkdtemp(prefix='ventoy-x-helper-')
+            options = (['ro', 'noexec'] if read_only else ['rw']) + ['nosuid', 'nodev']
+            options += ['loop'] if os.path.isfile(device) else []
+            # exFAT and FAT have no owners; mounted as the client, it can write to them. Others refuse uid=.
+            for extra in ([f"uid={connection.uid}", f"gid={connection.gid}"], []):
+                if context.run(['mount', '-o', ','.join(options + extra), device, mountpoint], check=False) == 0:
+                    break
+            else:
+                os.rmdir(mountpoint)
+                raise RuntimeError(f"could not mount {device}, see log")
+            with self.lock:
+                self.mounts[mountpoint] = device
+            context.job.result = {'mountpoint': mountpoint}
+        return Job('mount', device, work)
+
+    def _unmount(self, connection, mountpoint):
+        with self.lock:
+            device = self.mounts.get(mountpoint)
+        if device is None:
+            raise ValueError(f"{mountpoint} was not mounted by the helper")
+
+        def work(context):
+            context.run(['umount', mountpoint])
+            os.rmdir(mountpoint)
+            with self.lock:
+                del self.mounts[mountpoint]
+        return Job('unmount', device, work)
+
+    def _sign(self, connection, files, key, cert):
+        if not shutil.which('sbsign'):
+            raise ValueError('sign: sbsign is not installed')
+        if not files or not all(isinstance(path, str) for path in files):
+            raise ValueError('sign: files must be a list of paths')
+        # Reading keys only root can read is what the helper is for, so they are not checked like sources
+        key, cert = (os.path.realpath(path) for path in (key, cert))
+        for path in (key, cert):
+            if not os.path.isfile(path):
+                raise ValueError(f"sign: {path} is not a regular file")
+        signing, devices = [], set()
+        for path in files:
+            real = os.path.realpath(path)
+            mountpoint = self._mount_of(real)
+            if mountpoint:
+                devices.add(disk_of(self.mounts[mountpoint]))
+            else:
+                real = self.check_target(path, connection)
+                devices.add(disk_of(real))
+            signing.append((path, real))
+
+        def work(context):
+            from .efisign import FAILED, SigningError, sign_files
+            # Files passed by descriptor are signed in a private copy and written back through it
+            scratch = tempfile.mkdtemp(prefix='ventoy-x-sign-')
+            context.defer(lambda: shutil.rmtree(scratch, ignore_errors=True))
+            # signed path -> (path the client gave, path to write the result back to, or None)
+            paths = {}
+            for i, (path, real) in enumerate(signing):
+                if self._mount_of(real):
+                    paths[real] = (path, None)
+                else:
+                    copy = os.path.join(scratch, f"{i}-{os.path.basename(path)}")
+                    shutil.copyfile(real, copy)
+                    paths[copy] = (path, real)
+
+            def report(result):
+                context.log(f"{result.state} {paths[result.path][0]}{f': {result.message}' if result.message else ''}",
+                            'warning' if result.state == FAILED else 'info')
+            results = sign_files(list(paths), key, cert, on_result=report, cancelled=lambda: context.cancelled)
+            context.check()
+            for result in results:
+                path, back = paths[result.path]
+                if back and result.state != FAILED:
+                    shutil.copyfile(result.path, back)
+                result.path = path
+            context.job.result = {'signed': [result.path for result in results if result.state != FAILED],
+                                  'results': [result.to_dict() for result in results]}
+            if any(result.state == FAILED for result in results):
+                raise SigningError(results)
+        return Job('sign', signing[0][1], work, sorted(devices))
+
+    def _job(self, connection, spec):
+        from .jobs import job_from_spec
+        if spec.get('kind') not in JOB_KINDS:
+            raise ValueError(f"job: kind must be one of {', '.join(JOB_KINDS)}")
+        spec = dict(spec, target=self.check_target(spec.get('target') or '', connection, partitions=False))
+        try:
+            return job_from_spec(spec)
+        except TypeError as e:
+            raise ValueError(f"job: {e}")
+
+
+class Request:
+    """A request in flight; wait() returns its result or raises HelperError."""
+
+    def __init__(self, request_id, command, on_event=None):
+        self.id = request_id
+        self.command = command
+        self.on_event = on_event
+        self.done = threading.Event()
+        self.ok = False
+        self.state = None
+        self.message = ''
+        self.result = None
+
+    def finish(self, message):
+        self.ok = message.get('ok', False)
+        self.state = message.get('state')
+        self.message = message.get('message') or ''
+        self.result = message.get('result')
+        self.done.set()
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise HelperError(f"{self.command}: no answer after {timeout} s")
+        if not self.ok:
+            raise HelperError(self.message or f"{self.command} {self.state}")
+        return self.result
+
+
+class HelperClient:
+    """A connection to a running helper; may be shared between threads."""
+
+    def __init__(self, socket_path=None, timeout=5.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(None)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.closed = False
+        self._ids = itertools.count(1)
+        threading.Thread(target=self._read, name='helper-client', daemon=True).start()
+
+    def _read(self):
+        try:
+            for line in self.sock.makefile('rb'):
+                message = json.loads(line)
+                request = self.pending.get(message.get('id'))
+                if request is None:
+                    continue
+                if message.get('event') == 'result':
+                    with self.lock:
+                        del self.pending[request.id]
+                    request.finish(message)
+                elif request.on_event:
+                    request.on_event(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                pending, self.pending = list(self.pending.values()), {}
+            for request in pending:
+                request.finish({'ok': False, 'state': FAILED, 'message': 'the helper went away'})
+
+    def submit_batch(self, requests):
+        """Send (command, args, on_event) triples in one line, so they are queued together; returns Requests."""
+        sent, lines = [], []
+        with self.lock:
+            if self.closed:
+                raise HelperError('the helper connection is closed')
+            for command, args, on_event in requests:
+                request = Request(next(self._ids), command, on_event)
+                self.pending[request.id] = request
+                sent.append(request)
+                lines.append({'id': request.id, 'command': command, 'args': args})
+            try:
+                self.sock.sendall((json.dumps(lines if len(lines) > 1 else lines[0]) + '\n').encode())
+            except OSError as e:
+                for request in sent:
+                    del self.pending[request.id]
+                raise HelperError(f"could not reach the helper: {e}")
+        return sent
+
+    def submit(self, command, on_event=None, **args):
+        """Send one request and return its Request; on_event gets its status, log and progress events."""
+        return self.submit_batch([(command, args, on_event)])[0]
+
+    def call(self, command, on_event=None, timeout=None, **args):
+        """Send one request and wait for its result."""
+        return self.submit(command, on_event, **args).wait(timeout)
+
+    def cancel(self, request):
+        """Ask the helper to cancel a request; its result arrives as usual, with state cancelled."""
+        if not request.done.is_set():
+            self.submit('cancel', request=request.id)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def start_helper(socket_path=None, local=False, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=START_TIMEOUT):
+    """Connect to the helper on socket_path, starting one first (with pkexec unless local) if none answers."""
+    socket_path = socket_path or default_socket_path()
+    try:
+        return HelperClient(socket_path)
+    except OSError:
+        pass
+    args = [sys.executable, '-m', 'core.privhelper', '--socket', socket_path, 'serve', '--owner', str(os.getuid()),
+            '--idle-timeout', str(idle_timeout)]
+    if local:
+        args.append('--local')
+        env = dict(os.environ, PYTHONPATH=LIB_DIR)
+    else:
+        args = ['pkexec', 'env', f"PYTHONPATH={LIB_DIR}"] + args
+        env = None
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=env, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return HelperClient(socket_path)
+        except OSError:
+            pass
+        if process.poll() is not None:
+            reason = ' (authentication was refused or dismissed)' if not local and \
+                process.returncode in PKEXEC_DENIED else ''
+            raise HelperError(f"the helper exited with code {process.returncode}{reason}")
+        time.sleep(0.05)
+    process.terminate()
+    raise HelperError(f"the helper did not start within {timeout} s")
+
+
+_helper = None
+_helper_lock = threading.Lock()
+
+
+def get_helper(local=False):
+    """The session's shared HelperClient, starting the helper when none is running."""
+    global _helper
+    with _helper_lock:
+        if _helper is None or _helper.closed:
+            _helper = start_helper(local=local)
+        return _helper
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Privileged helper for drive operations, and a client for it.')
+    parser.add_argument('--socket', default=None, help='Unix socket (default: one per user in XDG_RUNTIME_DIR)')
+    commands = parser.add_subparsers(dest='action', metavar='ACTION', required=True)
+    serve = commands.add_parser('serve', help='run the helper (as root, or --local)')
+    serve.add_argument('--local', action='store_true', help='unprivileged stand-in that only works on image files')
+    serve.add_argument('--owner', type=int, default=None, help='uid allowed to connect besides root')
+    serve.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                       help='exit after this many seconds without work')
+    serve.add_argument('-j', '--jobs', type=int, default=DEFAULT_WORKERS, help='requests running at the same time')
+    serve.add_argument('--per-controller', type=int, default=DEFAULT_PER_CONTROLLER,
+                       help='requests running at the same time on drives behind one USB controller')
+    call = commands.add_parser('call', help='send one request, print its events as NDJSON')
+    call.add_argument('command', choices=sorted(COMMANDS))
+    call.add_argument('args', nargs='?', default='{}', help='arguments as a JSON object')
+    call.add_argument('--local', action='store_true', help='start the local stand-in if no helper is running')
+    args = parser.parse_args(argv)
+
+    if args.action == 'serve':
+        if not args.local and os.geteuid() != 0:
+            sys.stderr.write('privhelper: serve needs root; --local runs the unprivileged stand-in\n')
+            return 2
+        helper = Helper(args.socket or default_socket_path(args.owner), args.local, args.owner, args.idle_timeout,
+                        args.jobs, args.per_controller)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: helper.stopping.set())
+        helper.serve()
+        return 0
+
+    try:
+        request_args = json.loads(args.args)
+    except ValueError as e:
+        sys.stderr.write(f"privhelper: {e}\n")
+        return 2
+
+    def emit(event):
+        sys.stdout.write(json.dumps(event) + '\n')
+        sys.stdout.flush()
+
+    try:
+        client = start_helper(args.socket, args.local)
+        request = client.submit(args.command, emit, **request_args)
+        request.done.wait()
+    except (HelperError, TypeError) as e:
+        sys.stderr.write(f"privhelper: {e}\n")
+        return 1
+    emit({'event': 'result', 'ok': request.ok, 'state': request.state, 'message': request.message,
+          'result': request.result})
+    return 0 if request.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Progress tracking for long-running worker output.
+
+Workers report progress with marker lines on stdout, all keys optional:
+
+    @@PROGRESS {"step": "Writing boot images", "done": 1048576, "total": 34603008}
+
+`dd status=progress` lines ("1048576 bytes (1.0 MB, 1.0 MiB) copied, 1 s,
+1.0 MB/s") and the "Step N: ..." headers of the install/erase scripts are
+understood as well, so shell steps report progress without changes.
+ProgressTracker turns all of these into percent, a smoothed rate, ETA,
+per-step timings and stall detection.
+"""
+import json
+import re
+import time
+
+MARKER = '@@PROGRESS'
+
+_DD_PROGRESS = re.compile(r'^(\d+) bytes\b.*\bcopied\b')
+_STEP = re.compile(r'^Step (\d+): (.+?)[.\s]*$')
+
+# Ventoy2Disk.sh prints no progress of its own; these milestones approximate it
+VENTOY_MILESTONES = (
+    ('Create partitions', 15),
+    ('Format partition 1', 30),
+    ('writing data to disk', 50),
+    ('Upgrade operation is safe', 20),
+    ('sync data', 80),
+    ('esp partition processing', 90),
+    ('successfully finished', 100),
+)
+
+
+def format_marker(step=None, done=None, total=None, overall=None):
+    """Build a progress marker line (without the trailing newline)."""
+    fields = {key: value for key, value in (('step', step), ('done', done), ('total', total),
+                                            ('overall', overall)) if value is not None}
+    return f"{MARKER} {json.dumps(fields)}"
+
+
+def parse_marker(line):
+    """Return the fields of a progress marker line, or None for any other line."""
+    line = line.strip()
+    if not line.startswith(MARKER):
+        return None
+    try:
+        fields = json.loads(line[len(MARKER):] or '{}')
+    except ValueError:
+        return None
+    return fields if isinstance(fields, dict) else None
+
+
+def parse_dd_progress(line):
+    """Return the byte count of a `dd status=progress` line, or None."""
+    match = _DD_PROGRESS.match(line.strip())
+    return int(match.group(1)) if match else None
+
+
+def parse_step(line):
+    """Return the step name of a "Step N: name..." header, or None."""
+    match = _STEP.match(line.strip())
+    return match.group(2) if match else None
+
+
+def is_progress_line(line):
+    """True for marker and dd progress lines, which should not go to the log."""
+    return parse_marker(line) is not None or parse_dd_progress(line) is not None
+
+
+def milestone_percent(line):
+    """Return the Ventoy2Disk.sh milestone percent a line reaches, or None."""
+    percent = None
+    for marker, value in VENTOY_MILESTONES:
+        if marker in line:
+            percent = value
+    return percent
+
+
+def format_rate(rate):
+    if rate is None:
+        return ''
+    if rate >= 1e9:
+        return f"{rate / 1e9:.2f} GB/s"
+    if rate >= 1e6:
+        return f"{rate / 1e6:.1f} MB/s"
+    return f"{rate / 1e3:.0f} kB/s"
+
+
+def format_duration(seconds):
+    """Format seconds as M:SS or H:MM:SS."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressTracker:
+    """Percent, rate, ETA, per-step timing and stall state from progress lines.
+
+    The rate is an exponential moving average over samples at least
+    sample_interval seconds apart. A step counts as stalled when it has
+    reported bytes before but none for stall_after seconds. Not
+    thread-safe; feed it from one thread.
+    """
+
+    def __init__(self, stall_after=30.0, smoothing=0.3, sample_interval=0.5, clock=time.monotonic):
+        self.stall_after = stall_after
+        self.smoothing = smoothing
+        self.sample_interval = sample_interval
+        self.clock = clock
+        self.steps = []
+        self.step = None
+        self.done = 0
+        self.total = None
+        self.rate = None
+        self.overall = None
+        now = clock()
+        self._started = now
+        self._step_started = now
+        self._last_progress = now
+        self._sample = (now, 0)
+        self._counting = False
+
+    def start_step(self, name, total=None):
+        """Begin a new step; the previous one is recorded in steps as (name, seconds)."""
+        now = self.clock()
+        if self.step is not None:
+            self.steps.append((self.step, now - self._step_started))
+        self.step = name
+        self.done = 0
+        self.total = total
+        self.rate = None
+        self._step_started = now
+        self._last_progress = now
+        self._sample = (now, 0)
+        self._counting = False
+
+    def update(self, done, total=None):
+        now = self.clock()
+        if total is not None:
+            self.total = total
+        if done > self.done or not self._counting:
+            self._last_progress = now
+        self._counting = True
+        sample_time, sample_done = self._sample
+        elapsed = now - sample_time
+        if elapsed >= self.sample_interval:
+            rate = max(0, done - sample_done) / elapsed
+            self.rate = rate if self.rate is None else self.rate + self.smoothing * (rate - self.rate)
+            self._sample = (now, done)
+        self.done = done
+
+    def feed(self, line):
+        """Apply a marker, dd progress or step line; returns False for other lines."""
+        fields = parse_marker(line)
+        if fields is not None:
+            if fields.get('step') and fields['step'] != self.step:
+                self.start_step(fields['step'])
+            if 'overall' in fields:
+                self.overall = fields['overall']
+            if 'done' in fields or 'total' in fields:
+                self.update(fields.get('done', self.done), fields.get('total'))
+            return True
+        done = parse_dd_progress(line)
+        if done is not None:
+            self.update(done)
+            return True
+        step = parse_step(line)
+        if step is not None:
+            self.start_step(step)
+            return True
+        return False
+
+    def finish(self):
+        """Close the current step and return the [(name, seconds)] timings."""
+        if self.step is not None:
+            self.steps.append((self.step, self.clock() - self._step_started))
+            self.step = None
+        return self.steps
+
+    @property
+    def percent(self):
+        if not self.total:
+            return None
+        return min(100.0, self.done * 100.0 / self.total)
+
+    @property
+    def eta(self):
+        if not self.total or not self.rate:
+            return None
+        return max(0.0, (self.total - self.done) / self.rate)
+
+    def stalled_for(self):
+        if not self._counting or (self.total and self.done >= self.total):
+            return 0.0
+        return self.clock() - self._last_progress
+
+    @property
+    def stalled(self):
+        return self.stalled_for() >= self.stall_after
+
+    def snapshot(self):
+        now = self.clock()
+        return {
+            'step': self.step,
+            'done': self.done,
+            'total': self.total,
+            'percent': self.percent,
+            'overall': self.overall,
+            'rate': self.rate,
+            'eta': self.eta,
+            'elapsed': now - self._started,
+            'step_elapsed': now - self._step_started,
+            'stalled': self.stalled,
+            'stalled_for': self.stalled_for(),
+        }
@@ -0,0 +1,494 @@
+"""MBR/GPT partition table access with batched, transactional patching.
+
+Replaces the chains of `dd bs=1 count=1 seek=N` calls in VentoyWorker.sh:
+the head of the disk (MBR, primary GPT, core.img area and the reserved
+sectors) is read once, every change is applied in memory, and commit()
+writes the changed span back with one pwrite and one fsync. GPT header and
+partition array CRCs are recomputed and the backup GPT is rewritten from
+the primary one whenever the GPT changes.
+
+    python3 -m core.ptable /dev/sdX --info
+    python3 -m core.ptable /dev/sdX --copy boot.img 0 446 --new-disk-uuid --new-disk-signature
+"""
+import argparse
+import os
+import struct
+import sys
+import uuid
+import zlib
+
+SECTOR_SIZE = 512
+HEAD_SECTORS = 2048
+DISK_UUID_OFFSET = 384
+DISK_UUID_SIZE = 16
+DISK_SIGNATURE_OFFSET = 440
+PART_TABLE_OFFSET = 446
+PART_ENTRY_SIZE = 16
+BOOT_SIGNATURE = b'\x55\xaa'
+# Sectors 2040-2047 hold user data that survives a Ventoy upgrade
+RESERVED_START = 2040
+RESERVED_SECTORS = 8
+
+ACTIVE = 0x80
+GPT_PROTECTIVE = 0xEE
+GPT_SIGNATURE = b'EFI PART'
+GPT_REVISION = 0x00010000
+GPT_HEADER = struct.Struct('<8sIIIIQQQQ16sQIII')
+GPT_ENTRY = struct.Struct('<16s16sQQQ72s')
+GPT_ENTRY_COUNT = 128
+# Microsoft basic data attribute: do not assign a drive letter / automount
+GPT_ATTR_NO_AUTOMOUNT = 1 << 63
+
+BASIC_DATA_GUID = 'EBD0A0A2-B9E5-4433-87C0-68B6B72699C7'
+ESP_GUID = 'C12A7328-F81F-11D2-BA4B-00A0C93EC93B'
+
+
+class MbrPartition:
+    """One of the four primary MBR partition entries; start and sectors are in LBA."""
+    __slots__ = ('index', 'active', 'type', 'start', 'sectors')
+
+    def __init__(self, index, active=False, type=0, start=0, sectors=0):
+        self.index = index
+        self.active = active
+        self.type = type
+        self.start = start
+        self.sectors = sectors
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class GptPartition:
+    """A used GPT partition entry; GUIDs are upper-case strings."""
+    __slots__ = ('index', 'type_guid', 'guid', 'first_lba', 'last_lba', 'attributes', 'name')
+
+    def __init__(self, index, type_guid, guid, first_lba, last_lba, attributes=0, name=''):
+        self.index = index
+        self.type_guid = type_guid
+        self.guid = guid
+        self.first_lba = first_lba
+        self.last_lba = last_lba
+        self.attributes = attributes
+        self.name = name
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _guid_bytes(guid):
+    return uuid.UUID(guid).bytes_le
+
+
+def _guid_str(data):
+    return str(uuid.UUID(bytes_le=bytes(data))).upper()
+
+
+def _crc32(data):
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+def _disk_size(fd):
+    return os.lseek(fd, 0, os.SEEK_END)
+
+
+class PartitionTable:
+    """In-memory copy of the first HEAD_SECTORS of a disk.
+
+    All setters only touch the buffer; nothing reaches the disk until
+    commit(), so a whole install step costs one write and one flush.
+    Offsets are byte offsets from the start of the disk.
+    """
+
+    def __init__(self, head, disk_size):
+        self.head = bytearray(head)
+        self.disk_size = disk_size
+        self._original = bytes(head)
+        self._gpt_dirty = False
+
+    @classmethod
+    def load(cls, path):
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            disk_size = _disk_size(fd)
+            head = os.pread(fd, min(HEAD_SECTORS * SECTOR_SIZE, disk_size), 0)
+        finally:
+            os.close(fd)
+        if len(head) < SECTOR_SIZE:
+            raise ValueError(f"{path} is too small for a partition table")
+        return cls(head, disk_size)
+
+    @classmethod
+    def create(cls, disk_size, style='MBR', partitions=()):
+        """Build a fresh table for a disk of disk_size bytes (used for image fixtures).
+
+        partitions are (type, start, sectors) for MBR, where type is the
+        one-byte type, and (type_guid, start, sectors, name) for GPT.
+        """
+        table = cls(bytes(min(HEAD_SECTORS * SECTOR_SIZE, disk_size)), disk_size)
+        # A fresh table never matches what is on disk, so commit() writes it whole
+        table._original = b''
+        table.head[510:512] = BOOT_SIGNATURE
+        if style.upper() == 'GPT':
+            last = min(disk_size // SECTOR_SIZE - 1, 0xFFFFFFFF)
+            table._set_mbr_entry(0, False, GPT_PROTECTIVE, 1, last)
+            entries_sectors = GPT_ENTRY_COUNT * GPT_ENTRY.size // SECTOR_SIZE
+            table.head[SECTOR_SIZE:SECTOR_SIZE + GPT_HEADER.size] = GPT_HEADER.pack(
+                GPT_SIGNATURE, GPT_REVISION, GPT_HEADER.size, 0, 0, 1, disk_size // SECTOR_SIZE - 1,
+                2 + entries_sectors, disk_size // SECTOR_SIZE - 2 - entries_sectors,
+                uuid.uuid4().bytes_le, 2, GPT_ENTRY_COUNT, GPT_ENTRY.size, 0)
+            for i, (type_guid, start, sectors, name) in enumerate(partitions):
+                table._set_gpt_entry(i, GptPartition(i + 1, type_guid, str(uuid.uuid4()).upper(),
+                                                     start, start + sectors - 1, 0, name))
+            table._gpt_dirty = True
+        else:
+            for i, (ptype, start, sectors) in enumerate(partitions):
+                table._set_mbr_entry(i, i == 0, ptype, start, sectors)
+        return table
+
+    # -- raw access
+
+    def read(self, offset, count):
+        self._check_range(offset, count)
+        return bytes(self.head[offset:offset + count])
+
+    def patch(self, offset, data):
+        """Overwrite bytes at offset within the head of the disk."""
+        self._check_range(offset, len(data))
+        self.head[offset:offset + len(data)] = data
+        if offset < 2 * SECTOR_SIZE + GPT_ENTRY_COUNT * GPT_ENTRY.size and offset + len(data) > SECTOR_SIZE:
+            self._gpt_dirty = self.is_gpt()
+
+    def copy_from(self, path, offset, count):
+        """Copy count bytes at offset from an image file (e.g. boot.img) to the same offset."""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(count)
+        if len(data) != count:
+            raise ValueError(f"{path} has fewer than {offset + count} bytes")
+        self.patch(offset, data)
+
+    def _check_range(self, offset, count):
+        if offset < 0 or offset + count > len(self.head):
+            raise ValueError(f"range {offset}+{count} is outside the first {len(self.head)} bytes")
+
+    # -- MBR
+
+    @property
+    def style(self):
+        return 'GPT' if self.is_gpt() else 'MBR'
+
+    def is_gpt(self):
+        return self.head[PART_TABLE_OFFSET + 4] == GPT_PROTECTIVE and \
+            self.head[SECTOR_SIZE:SECTOR_SIZE + 8] == GPT_SIGNATURE
+
+    def mbr_partitions(self):
+        parts = []
+        for i in range(4):
+            offset = PART_TABLE_OFFSET + i * PART_ENTRY_SIZE
+            status, ptype, start, sectors = struct.unpack_from('<B3xB3xII', self.head, offset)
+            parts.append(MbrPartition(i + 1, status == ACTIVE, ptype, start, sectors))
+        return parts
+
+    def _set_mbr_entry(self, i, active, ptype, start, sectors):
+        # CHS fields are left as 0xFEFFFF ("use LBA"), as parted and fdisk do for large disks
+        struct.pack_into('<B3sB3sII', self.head, PART_TABLE_OFFSET + i * PART_ENTRY_SIZE,
+                         ACTIVE if active else 0, b'\xfe\xff\xff', ptype, b'\xfe\xff\xff', start, sectors)
+
+    def set_active(self, index, active=True):
+        """Set or clear the boot flag of MBR partition index (1-4)."""
+        self.patch(PART_TABLE_OFFSET + (index - 1) * PART_ENTRY_SIZE, bytes([ACTIVE if active else 0]))
+
+    def move_boot_flag(self, src, dst):
+        """Move the boot flag from partition src to dst if src has it and dst does not."""
+        parts = self.mbr_partitions()
+        if parts[src - 1].active and not parts[dst - 1].active:
+            self.set_active(dst, True)
+            self.set_active(src, False)
+            return True
+        return False
+
+    def set_type(self, index, ptype):
+        self.patch(PART_TABLE_OFFSET + (index - 1) * PART_ENTRY_SIZE + 4, bytes([ptype]))
+
+    @property
+    def disk_uuid(self):
+        return self.read(DISK_UUID_OFFSET, DISK_UUID_SIZE)
+
+    def set_disk_uuid(self, value=None):
+        self.patch(DISK_UUID_OFFSET, value if value is not None else os.urandom(DISK_UUID_SIZE))
+
+    @property
+    def disk_signature(self):
+        return struct.unpack_from('<I', self.head, DISK_SIGNATURE_OFFSET)[0]
+
+    def set_disk_signature(self, value=None):
+        self.patch(DISK_SIGNATURE_OFFSET, os.urandom(4) if value is None else struct.pack('<I', value))
+
+    def reserved_data(self):
+        return self.read(RESERVED_START * SECTOR_SIZE, RESERVED_SECTORS * SECTOR_SIZE)
+
+    # -- GPT
+
+    def gpt_header(self):
+        """Return the primary GPT header fields as a dict, or None for MBR disks."""
+        if not self.is_gpt():
+            return None
+        fields = GPT_HEADER.unpack_from(self.head, SECTOR_SIZE)
+        names = ('signature', 'revision', 'header_size', 'header_crc', 'reserved', 'current_lba',
+                 'backup_lba', 'first_usable_lba', 'last_usable_lba', 'disk_guid', 'entries_lba',
+                 'entry_count', 'entry_size', 'entries_crc')
+        header = dict(zip(names, fields))
+        header['disk_guid'] = _guid_str(header['disk_guid'])
+        return header
+
+    def _entries_span(self, header):
+        offset = header['entries_lba'] * SECTOR_SIZE
+        length = header['entry_count'] * header['entry_size']
+        self._check_range(offset, length)
+        return offset, length
+
+    def gpt_partitions(self):
+        header = self.gpt_header()
+        if not header:
+            return []
+        offset, _ = self._entries_span(header)
+        parts = []
+        for i in range(header['entry_count']):
+            type_guid, guid, first, last, attributes, name = GPT_ENTRY.unpack_from(
+                self.head, offset + i * header['entry_size'])
+            if type_guid == bytes(16):
+                continue
+            parts.append(GptPartition(i + 1, _guid_str(type_guid), _guid_str(guid), first, last, attributes,
+                                      name.decode('utf-16-le', 'replace').rstrip('\0')))
+        return parts
+
+    def _set_gpt_entry(self, i, part):
+        header = self.gpt_header()
+        offset, _ = self._entries_span(header)
+        name = part.name.encode('utf-16-le')[:72]
+        GPT_ENTRY.pack_into(self.head, offset + i * header['entry_size'], _guid_bytes(part.type_guid),
+                            _guid_bytes(part.guid), part.first_lba, part.last_lba, part.attributes, name)
+        self._gpt_dirty = True
+
+    def _gpt_partition(self, index):
+        for part in self.gpt_partitions():
+            if part.index == index:
+                return part
+        raise ValueError(f"GPT partition {index} does not exist")
+
+    def set_gpt_attributes(self, index, attributes):
+        part = self._gpt_partition(index)
+        part.attributes = attributes
+        self._set_gpt_entry(index - 1, part)
+
+    def set_gpt_type(self, index, type_guid):
+        part = self._gpt_partition(index)
+        part.type_guid = type_guid.upper()
+        self._set_gpt_entry(index - 1, part)
+
+    def set_gpt_name(self, index, name):
+        part = self._gpt_partition(index)
+        part.name = name
+        self._set_gpt_entry(index - 1, part)
+
+    def gpt_crc_ok(self):
+        """True if the primary header and partition array CRCs match their contents."""
+        header = self.gpt_header()
+        if not header:
+            return False
+        offset, length = self._entries_span(header)
+        if _crc32(self.head[offset:offset + length]) != header['entries_crc']:
+            return False
+        raw = bytearray(self.head[SECTOR_SIZE:SECTOR_SIZE + header['header_size']])
+        raw[16:20] = bytes(4)
+        return _crc32(raw) == header['header_crc']
+
+    def backup_gpt_problems(self, path):
+        """Problems with the backup GPT header and partition array of path, checked against the primary."""
+        header = self.gpt_header()
+        if not header:
+            return []
+        backup_lba = header['backup_lba']
+        if (backup_lba + 1) * SECTOR_SIZE > self.disk_size:
+            return [f"backup GPT header LBA {backup_lba} is beyond the end of the disk"]
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            raw = bytearray(os.pread(fd, SECTOR_SIZE, backup_lba * SECTOR_SIZE))
+            if raw[:8] != GPT_SIGNATURE:
+                return ['backup GPT header missing']
+            backup = dict(zip(('header_size', 'header_crc', 'current_lba', 'backup_lba', 'entries_lba'),
+                              struct.unpack_from('<12xII4xQQ', raw) + struct.unpack_from('<Q', raw, 72)))
+            length = header['entry_count'] * header['entry_size']
+            entries = os.pread(fd, length, backup['entries_lba'] * SECTOR_SIZE)
+        finally:
+            os.close(fd)
+        problems = []
+        if backup['current_lba'] != backup_lba or backup['backup_lba'] != header['current_lba']:
+            problems.append(f"backup GPT header points at LBA {backup['current_lba']} / {backup['backup_lba']}, "
+                            f"expected {backup_lba} / {header['current_lba']}")
+        size = min(backup['header_size'], SECTOR_SIZE)
+        crc_raw = bytearray(raw[:size])
+        crc_raw[16:20] = bytes(4)
+        if _crc32(crc_raw) != backup['header_crc']:
+            problems.append('backup GPT header CRC mismatch')
+        if _crc32(entries) != header['entries_crc']:
+            problems.append('backup GPT partition array does not match the primary')
+        return problems
+
+    def _update_gpt_crcs(self):
+        header = self.gpt_header()
+        offset, length = self._entries_span(header)
+        struct.pack_into('<I', self.head, SECTOR_SIZE + 88, _crc32(self.head[offset:offset + length]))
+        struct.pack_into('<I', self.head, SECTOR_SIZE + 16, 0)
+        crc = _crc32(self.head[SECTOR_SIZE:SECTOR_SIZE + header['header_size']])
+        struct.pack_into('<I', self.head, SECTOR_SIZE + 16, crc)
+
+    def _backup_gpt(self):
+        """Return (offset, data) for the backup partition array followed by the backup header."""
+        header = self.gpt_header()
+        offset, length = self._entries_span(header)
+        entries = bytes(self.head[offset:offset + length])
+        entries_sectors = (length + SECTOR_SIZE - 1) // SECTOR_SIZE
+        backup_lba = header['backup_lba']
+        if (backup_lba + 1) * SECTOR_SIZE > self.disk_size or backup_lba <= entries_sectors:
+            return None
+        raw = bytearray(self.head[SECTOR_SIZE:SECTOR_SIZE + header['header_size']])
+        struct.pack_into('<IIQQ', raw, 16, 0, 0, backup_lba, header['current_lba'])
+        struct.pack_into('<Q', raw, 72, backup_lba - entries_sectors)
+        struct.pack_into('<I', raw, 16, _crc32(raw))
+        data = bytearray(entries_sectors * SECTOR_SIZE + SECTOR_SIZE)
+        data[:length] = entries
+        data[entries_sectors * SECTOR_SIZE:entries_sectors * SECTOR_SIZE + len(raw)] = raw
+        return (backup_lba - entries_sectors) * SECTOR_SIZE, bytes(data)
+
+    # -- commit
+
+    def changed_span(self):
+        """Return (start, end) of the bytes that differ from what was loaded, or None."""
+        head, original = self.head, self._original
+        if len(original) != len(head):
+            return (0, len(head))
+        if head == original:
+            return None
+        start = 0
+        while head[start:start + SECTOR_SIZE] == original[start:start + SECTOR_SIZE]:
+            start += SECTOR_SIZE
+        end = len(head)
+        while head[end - SECTOR_SIZE:end] == original[end - SECTOR_SIZE:end]:
+            end -= SECTOR_SIZE
+        while head[start] == original[start]:
+            start += 1
+        while head[end - 1] == original[end - 1]:
+            end -= 1
+        return start, end
+
+    def commit(self, path, sync=True):
+        """Write the changes back with one write to the head (plus the backup GPT) and one flush.
+
+        Returns the number of bytes written; nothing is written or flushed
+        when the table is unchanged.
+        """
+        backup = None
+        if self._gpt_dirty and self.is_gpt():
+            self._update_gpt_crcs()
+            backup = self._backup_gpt()
+        span = self.changed_span()
+        if span is None and backup is None:
+            return 0
+        written = 0
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            if span:
+                start, end = span
+                written += os.pwrite(fd, self.head[start:end], start)
+            if backup:
+                written += os.pwrite(fd, backup[1], backup[0])
+            if sync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._original = bytes(self.head)
+        self._gpt_dirty = False
+        return written
+
+    def info(self):
+        """Shell-friendly summary used by VentoyWorker.sh (eval'able KEY=VALUE lines)."""
+        parts = self.mbr_partitions()
+        values = {
+            'PT_STYLE': self.style,
+            'PART1_TYPE': f"{parts[0].type:02X}",
+            'PART2_TYPE': f"{parts[1].type:02X}",
+            'PART1_ACTIVE': f"{ACTIVE if parts[0].active else 0:02X}",
+            'PART2_ACTIVE': f"{ACTIVE if parts[1].active else 0:02X}",
+            'DISK_UUID': self.disk_uuid.hex(),
+            'DISK_SIGNATURE': f"{self.disk_signature:08X}",
+        }
+        if self.is_gpt():
+            values['GPT_CRC_OK'] = 'YES' if self.gpt_crc_ok() else 'NO'
+        return '\n'.join(f"{key}={value}" for key, value in values.items())
+
+
+class _Apply(argparse.Action):
+    """Collect patch operations in command-line order."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        ops = getattr(namespace, 'ops', None) or []
+        ops.append((self.dest, values))
+        namespace.ops = ops
+
+
+def _int(text):
+    return int(text, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read or patch the MBR/GPT of a disk in one transaction.')
+    parser.add_argument('disk')
+    parser.add_argument('--info', action='store_true', help='print KEY=VALUE lines for the shell')
+    parser.add_argument('--copy', nargs=3, action=_Apply, metavar=('FILE', 'OFFSET', 'COUNT'),
+                        help='copy COUNT bytes at OFFSET from FILE to the same offset')
+    parser.add_argument('--byte', nargs=2, action=_Apply, metavar=('OFFSET', 'HEX'),
+                        help='set the byte at OFFSET')
+    parser.add_argument('--type', nargs=2, action=_Apply, metavar=('N', 'HEX'),
+                        help='set the type of MBR partition N')
+    parser.add_argument('--move-boot-flag', nargs=2, action=_Apply, metavar=('FROM', 'TO'),
+                        help='move the MBR boot flag if only FROM has it')
+    parser.add_argument('--gpt-attributes', nargs=2, action=_Apply, metavar=('N', 'VALUE'),
+                        help='set the attribute bits of GPT partition N')
+    parser.add_argument('--fix-gpt', nargs=0, action=_Apply,
+                        help='mark partition 2 (VTOYEFI) no-automount, like vtoycli gpt -f')
+    parser.add_argument('--new-disk-uuid', nargs=0, action=_Apply, help='write a random disk UUID (offset 384)')
+    parser.add_argument('--new-disk-signature', nargs=0, action=_Apply,
+                        help='write a random disk signature (offset 440)')
+    args = parser.parse_args(argv)
+
+    try:
+        table = PartitionTable.load(args.disk)
+        for op, values in getattr(args, 'ops', None) or []:
+            if op == 'copy':
+                table.copy_from(values[0], _int(values[1]), _int(values[2]))
+            elif op == 'byte':
+                table.patch(_int(values[0]), bytes([int(values[1], 16)]))
+            elif op == 'type':
+                table.set_type(int(values[0]), int(values[1], 16))
+            elif op == 'move_boot_flag':
+                table.move_boot_flag(int(values[0]), int(values[1]))
+            elif op == 'gpt_attributes':
+                table.set_gpt_attributes(int(values[0]), _int(values[1]))
+            elif op == 'fix_gpt':
+                table.set_gpt_attributes(2, GPT_ATTR_NO_AUTOMOUNT)
+            elif op == 'new_disk_uuid':
+                table.set_disk_uuid()
+            elif op == 'new_disk_signature':
+                table.set_disk_signature()
+        table.commit(args.disk)
+        if args.info:
+            print(table.info())
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"ptable: {e}\n")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Wait for a disk's partitions to be usable instead of sleeping a fixed time.
+
+After a partition table changes, the kernel announces the partitions with
+uevents, udev creates their /dev nodes, and automounters react to those
+events. The install pipeline used to cover all of that with fixed sleeps
+(3 s after partitioning, 2 s before the ESP resize, 3 and 5 s before
+signing and creating the user directories). Those sleeps are dead time on
+every drive.
+
+wait_ready() returns as soon as the disk and the partitions asked for
+exist as block devices and udev has worked through its queue
+(`udevadm settle`), so nothing is about to mount or relabel them. It
+listens for kernel uevents with core.hotplug's netlink source and checks
+again on every one. A short poll backs this up for events that get
+missed or where netlink is not available. Image files have no device
+nodes to wait for and are ready at once.
+
+    python3 -m core.readiness /dev/sdb 1 2 --timeout 10
+"""
+import argparse
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import time
+
+from .hotplug import NetlinkEventSource
+
+DEFAULT_TIMEOUT = 15.0
+# Backstop for uevents that were missed, or every check when netlink is not available
+POLL_INTERVAL = 0.05
+
+_PARTITION_SUFFIX = re.compile(r'\d$')
+
+
+def partition_path(device, number):
+    """/dev/sdb + 1 -> /dev/sdb1, /dev/nvme0n1 + 1 -> /dev/nvme0n1p1."""
+    return f"{device}{'p' if _PARTITION_SUFFIX.search(device) else ''}{number}"
+
+
+def _is_block(path):
+    try:
+        return stat.S_ISBLK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def udev_settle(timeout=DEFAULT_TIMEOUT):
+    """Wait until udev has handled every queued event; True if it did (or there is no udevadm)."""
+    if not shutil.which('udevadm'):
+        return True
+    try:
+        return subprocess.run(['udevadm', 'settle', f"--timeout={max(1, int(timeout + 0.999))}"],
+                              capture_output=True).returncode == 0
+    except OSError:
+        return True
+
+
+def wait_ready(device, partitions=(), timeout=DEFAULT_TIMEOUT, settle=True, cancelled=None, source=None):
+    """Wait until device and its partitions are block devices and udev has settled; returns the seconds taken.
+
+    partitions are numbers (partition_path of device) or device paths.
+    cancelled() is checked on every wake-up and ends the wait early.
+    Raises TimeoutError naming the nodes still missing after timeout.
+    """
+    start = time.monotonic()
+    if os.path.isfile(device):
+        return 0.0
+    deadline = start + timeout
+    paths = [device] + [p if isinstance(p, str) and p.startswith('/') else partition_path(device, p)
+                        for p in partitions]
+    # Listen before the first check, so a node that appears in between still wakes us up
+    source = source or NetlinkEventSource()
+    try:
+        source.open()
+    except OSError:
+        source = None
+    try:
+        while True:
+            missing = [path for path in paths if not _is_block(path)]
+            if not missing or (cancelled and cancelled()):
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{', '.join(missing)} did not show up within {timeout:g} s")
+            if source:
+                try:
+                    source.read(min(remaining, POLL_INTERVAL))
+                    continue
+                except OSError:
+                    # A broken event socket only costs the wake-ups; keep polling
+                    source.close()
+                    source = None
+            time.sleep(min(remaining, POLL_INTERVAL))
+    finally:
+        if source:
+            source.close()
+    if settle and not (cancelled and cancelled()):
+        udev_settle(max(0.0, deadline - time.monotonic()))
+    return time.monotonic() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Wait until a disk and its partitions are ready to use.')
+    parser.add_argument('device')
+    parser.add_argument('partitions', nargs='*', help='partition numbers or device paths')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--no-settle', action='store_true', help='do not wait for udev to settle')
+    args = parser.parse_args(argv)
+    partitions = [int(p) if p.isdigit() else p for p in args.partitions]
+    try:
+        seconds = wait_ready(args.device, partitions, args.timeout, not args.no_settle)
+    except TimeoutError as e:
+        sys.stderr.write(f"readiness: {e}\n")
+        return 1
+    print(f"{args.device} ready after {seconds:.3f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Locations of partition tables, filesystem and RAID/LVM metadata on a disk.
+
+metadata_extents() lists the byte ranges that a quick erase has to clear
+so that nothing on the disk is recognised afterwards, whether by blkid,
+by the kernel, or by fsck/mdadm going looking for backups. Each area
+(the whole disk, every partition named by the MBR, its logical
+partitions, the primary or backup GPT) has its head and tail cleared,
+plus the backup superblocks that live further in. Those are btrfs
+mirrors, ext2/3/4 backups in the sparse block groups and XFS secondary
+superblocks. Every EBR of a logical partition chain is cleared as well,
+not only the first. No data area is read or written, so the cost does not
+depend on the capacity.
+
+    AREA_HEAD   MBR/VBR, primary GPT, FAT/exFAT/NTFS boot sectors and their
+                backups, ext/XFS/btrfs primary superblocks, ISO9660 volume
+                descriptors, LVM label and metadata area, md 1.1/1.2,
+                LUKS1/2 headers, ZFS labels L0/L1, bcache
+    AREA_TAIL   backup GPT, md 0.90/1.0, NTFS backup boot sector, ZFS labels
+                L2/L3, DDF/IMSM RAID anchors
+"""
+import os
+import struct
+
+from .ptable import (BOOT_SIGNATURE, GPT_ENTRY, GPT_HEADER, GPT_PROTECTIVE, GPT_SIGNATURE, PART_ENTRY_SIZE,
+                     PART_TABLE_OFFSET, SECTOR_SIZE)
+
+AREA_HEAD = 4 * 1024 * 1024
+AREA_TAIL = 1024 * 1024
+SUPERBLOCK_SIZE = 4096
+BTRFS_MIRRORS = (64 * 1024 * 1024, 256 * 1024 * 1024 * 1024, 1024 ** 5)
+MBR_EXTENDED = (0x05, 0x0F, 0x85)
+MAX_LOGICAL = 128
+MAX_GPT_ENTRIES = 1024
+
+_EXT_MAGIC = b'\x53\xef'
+_XFS_MAGIC = b'XFSB'
+
+
+class Extent:
+    """A byte range of metadata to clear."""
+    __slots__ = ('offset', 'length', 'what')
+
+    def __init__(self, offset, length, what):
+        self.offset = offset
+        self.length = length
+        self.what = what
+
+    def to_dict(self):
+        return {'offset': self.offset, 'length': self.length, 'what': self.what}
+
+
+def _read(fd, offset, length):
+    try:
+        return os.pread(fd, length, offset)
+    except OSError:
+        return b''
+
+
+def _mbr_partitions(fd):
+    """([(start, length, name)] of the MBR primaries, extended container and logicals, [Extent] of the EBRs)."""
+    mbr = _read(fd, 0, SECTOR_SIZE)
+    if len(mbr) < SECTOR_SIZE or mbr[510:512] != BOOT_SIGNATURE:
+        return [], []
+    parts, extents = [], []
+    for i in range(4):
+        ptype, start, sectors = struct.unpack_from('<4xB3xII', mbr, PART_TABLE_OFFSET + i * PART_ENTRY_SIZE)
+        if not ptype or not sectors or ptype == GPT_PROTECTIVE:
+            continue
+        parts.append((start * SECTOR_SIZE, sectors * SECTOR_SIZE, f"partition {i + 1}"))
+        if ptype in MBR_EXTENDED:
+            _logical_partitions(fd, start, parts, extents)
+    return parts, extents
+
+
+def _logical_partitions(fd, extended_start, parts, extents):
+    # Every EBR of the chain is cleared, not only the first one at the head of the extended partition
+    ebr_lba = extended_start
+    seen = set()
+    # The EBR chain is bounded, so a looping or corrupt chain can not stall the erase
+    for n in range(MAX_LOGICAL):
+        if ebr_lba in seen:
+            break
+        seen.add(ebr_lba)
+        ebr = _read(fd, ebr_lba * SECTOR_SIZE, SECTOR_SIZE)
+        if len(ebr) < SECTOR_SIZE or ebr[510:512] != BOOT_SIGNATURE:
+            break
+        extents.append(Extent(ebr_lba * SECTOR_SIZE, SECTOR_SIZE, f"EBR {n + 5}"))
+        ptype, start, sectors = struct.unpack_from('<4xB3xII', ebr, PART_TABLE_OFFSET)
+        if ptype and sectors:
+            parts.append(((ebr_lba + start) * SECTOR_SIZE, sectors * SECTOR_SIZE, f"partition {n + 5}"))
+        next_type, next_start, _ = struct.unpack_from('<4xB3xII', ebr, PART_TABLE_OFFSET + PART_ENTRY_SIZE)
+        if next_type not in MBR_EXTENDED or not next_start:
+            break
+        ebr_lba = extended_start + next_start
+
+
+def _gpt_header(fd, lba):
+    raw = _read(fd, lba * SECTOR_SIZE, SECTOR_SIZE)
+    if len(raw) < GPT_HEADER.size or raw[:8] != GPT_SIGNATURE:
+        return None
+    fields = GPT_HEADER.unpack_from(raw)
+    return {'current_lba': fields[5], 'backup_lba': fields[6], 'entries_lba': fields[10],
+            'entry_count': min(fields[11], MAX_GPT_ENTRIES), 'entry_size': fields[12]}
+
+
+def _gpt(fd, size):
+    """Return ([(start, length, name)] partitions, [Extent] GPT structures) from both GPT copies."""
+    last_lba = size // SECTOR_SIZE - 1
+    headers = []
+    primary = _gpt_header(fd, 1)
+    if primary:
+        headers.append(('primary GPT', primary))
+    # A stick imaged from a smaller disk keeps its old backup GPT somewhere in the middle
+    for lba in {last_lba, primary['backup_lba'] if primary else last_lba}:
+        if 1 < lba <= last_lba:
+            header = _gpt_header(fd, lba)
+            if header:
+                headers.append(('backup GPT', header))
+    parts, extents = [], []
+    for what, header in headers:
+        entry_size = header['entry_size']
+        if not GPT_ENTRY.size <= entry_size <= SECTOR_SIZE:
+            continue
+        length = header['entry_count'] * entry_size
+        extents.append(Extent(header['current_lba'] * SECTOR_SIZE, SECTOR_SIZE, f"{what} header"))
+        extents.append(Extent(header['entries_lba'] * SECTOR_SIZE, length, f"{what} entries"))
+        entries = _read(fd, header['entries_lba'] * SECTOR_SIZE, length)
+        for i in range(len(entries) // entry_size):
+            type_guid, _, first, last, _, _ = GPT_ENTRY.unpack_from(entries, i * entry_size)
+            if type_guid != bytes(16) and first <= last:
+                parts.append((first * SECTOR_SIZE, (last - first + 1) * SECTOR_SIZE, f"partition {i + 1}"))
+    return parts, extents
+
+
+def _ext_backups(fd, start, length):
+    """Offsets of the ext2/3/4 backup superblocks of a filesystem at start."""
+    sb = _read(fd, start + 1024, 1024)
+    if len(sb) < 1024 or sb[56:58] != _EXT_MAGIC:
+        return []
+    blocks_lo, first_data_block, log_block_size, blocks_per_group = struct.unpack_from('<4x I 12x I I 4x I', sb)
+    feature_compat, feature_incompat, feature_ro_compat = struct.unpack_from('<III', sb, 92)
+    if log_block_size > 6 or not blocks_per_group:
+        return []
+    block_size = 1024 << log_block_size
+    blocks = blocks_lo
+    if feature_incompat & 0x80:
+        blocks |= struct.unpack_from('<I', sb, 0x150)[0] << 32
+    blocks = min(blocks, length // block_size)
+    groups = -(-(blocks - first_data_block) // blocks_per_group)
+    if feature_compat & 0x200:
+        # sparse_super2: at most two backups, named in the superblock
+        backup_groups = [g for g in struct.unpack_from('<II', sb, 0x24C) if g]
+    elif feature_ro_compat & 0x1:
+        backup_groups = {1}
+        for base in (3, 5, 7):
+            g = base
+            while g < groups:
+                backup_groups.add(g)
+                g *= base
+    else:
+        # Without sparse_super every group has a copy; clearing a bounded number keeps this constant time
+        backup_groups = range(1, min(groups, 64))
+    return sorted(start + (first_data_block + g * blocks_per_group) * block_size
+                  for g in backup_groups if 0 < g < groups)
+
+
+def _xfs_secondaries(fd, start, length):
+    """Offsets of the XFS secondary superblocks (one per allocation group) of a filesystem at start."""
+    sb = _read(fd, start, 512)
+    if len(sb) < 512 or sb[:4] != _XFS_MAGIC:
+        return []
+    block_size, = struct.unpack_from('>I', sb, 4)
+    ag_blocks, ag_count = struct.unpack_from('>II', sb, 84)
+    if not block_size or not ag_blocks:
+        return []
+    return [start + g * ag_blocks * block_size for g in range(1, min(ag_count, 1024))
+            if g * ag_blocks * block_size < length]
+
+
+def _area_extents(fd, start, length, name):
+    extents = [Extent(start, min(AREA_HEAD, length), f"{name} head")]
+    if length > AREA_HEAD:
+        tail = min(AREA_TAIL, length - AREA_HEAD)
+        extents.append(Extent(start + length - tail, tail, f"{name} tail"))
+    for offset in BTRFS_MIRRORS:
+        if offset + SUPERBLOCK_SIZE <= length:
+            extents.append(Extent(start + offset, SUPERBLOCK_SIZE, f"{name} btrfs mirror"))
+    for offset in _ext_backups(fd, start, length):
+        extents.append(Extent(offset, SUPERBLOCK_SIZE, f"{name} ext backup superblock"))
+    for offset in _xfs_secondaries(fd, start, length):
+        extents.append(Extent(offset, SUPERBLOCK_SIZE, f"{name} xfs secondary superblock"))
+    return extents
+
+
+def merge_extents(extents, size):
+    """Clip extents to [0, size), sort them and merge overlapping or touching ones."""
+    merged = []
+    for extent in sorted(extents, key=lambda e: e.offset):
+        offset = max(0, extent.offset)
+        end = min(size, extent.offset + extent.length)
+        if end <= offset:
+            continue
+        if merged and offset <= merged[-1].offset + merged[-1].length:
+            last = merged[-1]
+            last.length = max(last.length, end - last.offset)
+            if extent.what not in last.what.split(', '):
+                last.what += f", {extent.what}"
+        else:
+            merged.append(Extent(offset, end - offset, extent.what))
+    return merged
+
+
+def metadata_extents(fd, size):
+    """Return the merged Extents of every known metadata location on the disk open as fd."""
+    gpt_parts, extents = _gpt(fd, size)
+    mbr_parts, ebrs = _mbr_partitions(fd)
+    extents.extend(ebrs)
+    areas = [(0, size, 'disk')] + mbr_parts + gpt_parts
+    seen = set()
+    for start, length, name in areas:
+        length = min(length, size - start)
+        if length <= 0 or (start, length) in seen:
+            continue
+        seen.add((start, length))
+        extents.extend(_area_extents(fd, start, length, name))
+    return merge_extents(extents, size)
@@ -0,0 +1,299 @@
+"""Index of the GRUB themes in the Themes/ folder of Ventoy partitions.
+
+Partitions are scanned in parallel. Each is read the cheapest way that
+works:
+- through its existing mount point;
+- straight from the block device for exFAT (Ventoy's default data
+  filesystem), without mounting anything;
+- through a lease from a core.mounts.MountManager.
+Results are cached on disk keyed by the partition UUID and the
+modification time of its Themes/ directory, so an unchanged stick costs
+one directory lookup.
+"""
+import json
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+THEMES_DIR = 'Themes'
+THEME_FILE = 'theme.txt'
+PREVIEW_BYTES = 4096
+DEFAULT_JOBS = 4
+# Filesystems a Ventoy data partition can carry
+MOUNTABLE = ('exfat', 'vfat', 'ntfs', 'ntfs3', 'ext2', 'ext3', 'ext4', 'xfs', 'udf')
+
+_EXFAT_FILE = 0x85
+_EXFAT_STREAM = 0xC0
+_EXFAT_NAME = 0xC1
+_EXFAT_DIRECTORY = 0x10
+_EXFAT_NO_FAT_CHAIN = 0x02
+
+
+def default_cache_path():
+    """$XDG_CACHE_HOME/ventoy-x/themes.json (~/.cache by default)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ventoy-x', 'themes.json')
+
+
+class Theme:
+    """A theme folder (one with a theme.txt) found on a partition."""
+    __slots__ = ('name', 'disk', 'partition', 'path', 'config_file', 'preview')
+
+    def __init__(self, name, disk, partition, path='', config_file='', preview=''):
+        self.name = name
+        self.disk = disk
+        self.partition = partition
+        self.path = path
+        self.config_file = config_file
+        self.preview = preview
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExfatReader:
+    """Read-only access to the directories and small files of an exFAT filesystem in a device or image."""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            boot = os.pread(self.fd, 512, 0)
+            if len(boot) < 512 or boot[3:11] != b'EXFAT   ':
+                raise ValueError(f"{path}: not an exFAT filesystem")
+            fat_offset, _, heap_offset, _, self.root_cluster = struct.unpack_from('<IIIII', boot, 80)
+            sector_shift, cluster_shift = boot[108], boot[109]
+            self.sector_size = 1 << sector_shift
+            self.cluster_size = self.sector_size << cluster_shift
+            self.fat_offset = fat_offset * self.sector_size
+            self.heap_offset = heap_offset * self.sector_size
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _clusters(self, first, length, contiguous):
+        if contiguous:
+            return range(first, first + -(-length // self.cluster_size))
+        clusters = []
+        cluster = first
+        # A bounded walk, so a corrupt (looping) FAT can not hang the scan
+        while 2 <= cluster < 0xFFFFFFF7 and len(clusters) < 65536:
+            clusters.append(cluster)
+            cluster, = struct.unpack('<I', os.pread(self.fd, 4, self.fat_offset + cluster * 4))
+        return clusters
+
+    def read(self, entry, limit=None):
+        """Contents of a file or directory entry, at most limit bytes."""
+        length = entry['size'] if limit is None else min(entry['size'], limit)
+        data = bytearray()
+        for cluster in self._clusters(entry['cluster'], entry['size'], entry['contiguous']):
+            if len(data) >= length:
+                break
+            data += os.pread(self.fd, self.cluster_size, self.heap_offset + (cluster - 2) * self.cluster_size)
+        return bytes(data[:length])
+
+    def root(self):
+        # The root directory has no entry of its own and is always FAT-chained
+        return {'name': '', 'directory': True, 'cluster': self.root_cluster, 'size': 0, 'contiguous': False,
+                'mtime': ''}
+
+    def listdir(self, entry):
+        """Entries of a directory as dicts: name, directory, cluster, size, contiguous, mtime."""
+        if entry is None:
+            return []
+        if entry['size']:
+            data = self.read(entry)
+        else:
+            data = b''.join(os.pread(self.fd, self.cluster_size, self.heap_offset + (c - 2) * self.cluster_size)
+                            for c in self._clusters(entry['cluster'], 0, False))
+        entries = []
+        pos = 0
+        while pos + 32 <= len(data):
+            kind = data[pos]
+            if kind == 0:
+                break
+            if kind != _EXFAT_FILE:
+                pos += 32
+                continue
+            secondary = data[pos + 1]
+            attributes, = struct.unpack_from('<H', data, pos + 4)
+            modified, = struct.unpack_from('<I', data, pos + 12)
+            modified_10ms = data[pos + 21]
+            stream = data[pos + 32:pos + 64]
+            if len(stream) < 32 or stream[0] != _EXFAT_STREAM:
+                pos += 32
+                continue
+            name_length = stream[3]
+            cluster, = struct.unpack_from('<I', stream, 20)
+            size, = struct.unpack_from('<Q', stream, 24)
+            name = b''.join(data[pos + 32 * i + 2:pos + 32 * i + 32] for i in range(2, secondary + 1)
+                            if data[pos + 32 * i] == _EXFAT_NAME)
+            entries.append({
+                'name': name[:name_length * 2].decode('utf-16-le', 'replace'),
+                'directory': bool(attributes & _EXFAT_DIRECTORY),
+                'cluster': cluster,
+                'size': size,
+                'contiguous': bool(stream[1] & _EXFAT_NO_FAT_CHAIN),
+                'mtime': f"exfat:{modified}:{modified_10ms}",
+            })
+            pos += 32 * (secondary + 1)
+        return entries
+
+    def lookup(self, directory, name):
+        """The entry called name (case-insensitive, like exFAT) in directory, or None."""
+        for entry in self.listdir(directory):
+            if entry['name'].lower() == name.lower():
+                return entry
+        return None
+
+
+class ThemeIndex:
+    """Parallel, cached theme scanner for the partitions of a list of disks.
+
+    dev_root and cache_path can be pointed at a fake tree and a scratch
+    file. Partitions that need mounting are leased read-only from mounts,
+    a MountManager; without one they are skipped.
+    """
+
+    def __init__(self, cache_path=None, jobs=DEFAULT_JOBS, dev_root='/dev', mounts=None):
+        self.cache_path = cache_path or default_cache_path()
+        self.jobs = jobs
+        self.dev_root = dev_root
+        self.mounts = mounts
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._cache is None:
+            try:
+                with open(self.cache_path) as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), prefix='.themes-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _cached(self, uuid, stamp):
+        with self._lock:
+            entry = self._load().get(uuid) if uuid else None
+        if entry and entry.get('stamp') == stamp:
+            return entry['themes']
+        return None
+
+    def _store(self, uuid, stamp, themes):
+        if uuid:
+            with self._lock:
+                self._load()[uuid] = {'stamp': stamp, 'themes': themes}
+
+    def scan(self, disks, callback=None):
+        """Return the Themes found on the partitions of disks (dicts from core.disk.list_usb_disks).
+
+        callback(themes) is called from a worker thread with each
+        partition's themes as soon as that partition is done.
+        """
+        partitions = [(disk['name'], part) for disk in disks for part in disk.get('partitions', ())
+                      if part.get('mountpoint') or part.get('fstype') in MOUNTABLE]
+        found = []
+        if not partitions:
+            return found
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(partitions))),
+                                thread_name_prefix='themes') as pool:
+            futures = [pool.submit(self.scan_partition, disk, part) for disk, part in partitions]
+            for future in as_completed(futures):
+                try:
+                    themes = future.result()
+                except (OSError, ValueError):
+                    continue
+                found.extend(themes)
+                if callback and themes:
+                    callback(themes)
+        with self._lock:
+            self._save()
+        return found
+
+    def scan_partition(self, disk, part):
+        """Return the Themes on one partition dict (name, uuid, fstype, mountpoint)."""
+        device = os.path.join(self.dev_root, part['name'])
+        uuid = part.get('uuid', '')
+        if not part.get('mountpoint') and part.get('fstype') == 'exfat' and os.access(device, os.R_OK):
+            try:
+                return self._scan_exfat(disk, part, device)
+            except (OSError, ValueError, struct.error):
+                pass
+        if self.mounts is not None:
+            # The lease also keeps an existing mount from expiring while it is read
+            with self.mounts.lease(device) as mountpoint:
+                return self._scan_mounted(disk, part, mountpoint, uuid)
+        if part.get('mountpoint'):
+            return self._scan_mounted(disk, part, part['mountpoint'])
+        return []
+
+    def _scan_mounted(self, disk, part, mountpoint, uuid=None):
+        uuid = part.get('uuid', '') if uuid is None else uuid
+        themes_dir = os.path.join(mountpoint, THEMES_DIR)
+        try:
+            stamp = str(os.stat(themes_dir).st_mtime_ns)
+        except OSError:
+            return []
+        names = self._cached(uuid, stamp)
+        if names is None:
+            names = []
+            with os.scandir(themes_dir) as entries:
+                for entry in entries:
+                    config_file = os.path.join(entry.path, THEME_FILE)
+                    if entry.is_dir() and os.path.isfile(config_file):
+                        names.append({'name': entry.name, 'preview': _read_preview(config_file)})
+            self._store(uuid, stamp, names)
+        # Paths are only valid while the partition stays mounted
+        keep = bool(part.get('mountpoint'))
+        return [Theme(n['name'], disk, part['name'],
+                      os.path.join(themes_dir, n['name']) if keep else f"/{THEMES_DIR}/{n['name']}",
+                      os.path.join(themes_dir, n['name'], THEME_FILE) if keep else '', n['preview'])
+                for n in sorted(names, key=lambda n: n['name'].lower())]
+
+    def _scan_exfat(self, disk, part, device):
+        uuid = part.get('uuid', '')
+        with ExfatReader(device) as fs:
+            themes_dir = fs.lookup(fs.root(), THEMES_DIR)
+            if not themes_dir or not themes_dir['directory']:
+                return []
+            names = self._cached(uuid, themes_dir['mtime'])
+            if names is None:
+                names = []
+                for entry in fs.listdir(themes_dir):
+                    if not entry['directory']:
+                        continue
+                    config = fs.lookup(entry, THEME_FILE)
+                    if config and not config['directory']:
+                        preview = fs.read(config, PREVIEW_BYTES).decode('utf-8', 'replace')
+                        names.append({'name': entry['name'], 'preview': preview})
+                self._store(uuid, themes_dir['mtime'], names)
+        return [Theme(n['name'], disk, part['name'], f"/{THEMES_DIR}/{n['name']}", '', n['preview'])
+                for n in sorted(names, key=lambda n: n['name'].lower())]
+
+
+def _read_preview(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(PREVIEW_BYTES).decode('utf-8', 'replace')
+    except OSError:
+        return ''
@@ -0,0 +1,279 @@
+"""Parallel read-back verification of what an install or erase wrote.
+
+The target is read in chunks by several threads and every chunk is
+compared with what should be there by SHA-256 digest. Reads and hashing
+release the GIL, so a full pass runs at device read speed. Cached pages
+of each range are dropped before it is read, so the data really comes
+from the medium and not from the page cache the writer just filled.
+
+    python3 -m core.verify /dev/sdX core.img.xz 1 2047 ventoy.disk.img.xz 2048 65536 \\
+        --copy boot.img 0 440 --ignore 384 16 --check-table
+"""
+import argparse
+import hashlib
+import lzma
+import mmap
+import os
+import random
+import sys
+import threading
+import time
+
+from .assetcache import AssetCache
+from .imagewriter import SECTOR_SIZE, WriteJob, open_source
+from .progress import format_marker
+from .ptable import HEAD_SECTORS, PartitionTable
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_THREADS = 4
+DEFAULT_SAMPLES = 64
+
+_FILL_BYTES = {'zero': b'\x00', 'one': b'\xff'}
+
+
+class Mismatch:
+    """A chunk of the target that differs from the expected data."""
+    __slots__ = ('offset', 'length')
+
+    def __init__(self, offset, length):
+        self.offset = offset
+        self.length = length
+
+    def to_dict(self):
+        return {'offset': self.offset, 'length': self.length}
+
+
+def _pread(fd, view, offset):
+    filled = 0
+    while filled < len(view):
+        n = os.preadv(fd, [view[filled:]], offset + filled)
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _chunks(ranges, chunk_size):
+    for offset, length in ranges:
+        end = offset + length
+        while offset < end:
+            n = min(chunk_size, end - offset)
+            yield offset, n
+            offset += n
+
+
+def verify_ranges(target, ranges, expected, ignore=(), threads=DEFAULT_THREADS, chunk_size=DEFAULT_CHUNK_SIZE,
+                  progress=None):
+    """Read back [(offset, length)] ranges of target in parallel and compare them with expected.
+
+    expected(offset, view) fills view with the bytes that belong at
+    offset. Bytes in the ignore [(offset, length)] spans are not compared.
+    progress(done, total) is called from the worker threads. Returns the
+    mismatching chunks as Mismatch records, in offset order.
+    """
+    chunks = list(_chunks(ranges, chunk_size))
+    total = sum(n for _, n in chunks)
+    state = {'next': 0, 'done': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    mismatches = []
+    error = []
+    fd = os.open(target, os.O_RDONLY | os.O_CLOEXEC)
+
+    def worker():
+        actual = mmap.mmap(-1, chunk_size)
+        wanted = mmap.mmap(-1, chunk_size)
+        try:
+            with memoryview(actual) as actual_view, memoryview(wanted) as wanted_view:
+                while not stop.is_set():
+                    with lock:
+                        if state['next'] >= len(chunks):
+                            break
+                        offset, n = chunks[state['next']]
+                        state['next'] += 1
+                    os.posix_fadvise(fd, offset, n, os.POSIX_FADV_DONTNEED)
+                    got = _pread(fd, actual_view[:n], offset)
+                    expected(offset, wanted_view[:n])
+                    for span_offset, span_length in ignore:
+                        start = max(span_offset, offset)
+                        end = min(span_offset + span_length, offset + n)
+                        if start < end:
+                            actual_view[start - offset:end - offset] = bytes(end - start)
+                            wanted_view[start - offset:end - offset] = bytes(end - start)
+                    if got < n or (hashlib.sha256(actual_view[:n]).digest() !=
+                                   hashlib.sha256(wanted_view[:n]).digest()):
+                        with lock:
+                            mismatches.append(Mismatch(offset, n))
+                    # Keep a full-device pass from evicting everything else
+                    os.posix_fadvise(fd, offset, n, os.POSIX_FADV_DONTNEED)
+                    with lock:
+                        state['done'] += n
+                        if progress:
+                            progress(state['done'], total)
+        except Exception as e:
+            error.append(e)
+            stop.set()
+        finally:
+            actual.close()
+            wanted.close()
+
+    try:
+        workers = [threading.Thread(target=worker, name=f"verify-{i}", daemon=True)
+                   for i in range(max(1, min(threads, len(chunks))))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        os.close(fd)
+    if error:
+        raise error[0]
+    return sorted(mismatches, key=lambda m: m.offset)
+
+
+def sample_ranges(size, samples=DEFAULT_SAMPLES, chunk_size=DEFAULT_CHUNK_SIZE):
+    """First and last chunk plus samples random chunk-aligned ones, or everything if that is not less."""
+    count = -(-size // chunk_size)
+    if samples is None or samples + 2 >= count:
+        return [(0, size)]
+    picked = {0, count - 1} | set(random.sample(range(1, count - 1), samples))
+    return [(i * chunk_size, min(chunk_size, size - i * chunk_size)) for i in sorted(picked)]
+
+
+def verify_pattern(target, size, kind, stream=None, samples=DEFAULT_SAMPLES, threads=DEFAULT_THREADS,
+                   progress=None):
+    """Check that an erase left kind ('zero', 'one' or 'random' from stream) on target.
+
+    samples=None reads the whole target.
+    """
+    if kind == 'random':
+        def expected(offset, view):
+            stream.fill(view, offset)
+    else:
+        fill = _FILL_BYTES[kind] * DEFAULT_CHUNK_SIZE
+
+        def expected(offset, view):
+            view[:] = fill[:len(view)]
+    return verify_ranges(target, sample_ranges(size, samples), expected, threads=threads, progress=progress)
+
+
+class _Layout:
+    """Expected content of the start of a disk: images at sector offsets, copies and byte patches."""
+
+    def __init__(self, jobs, copies=(), patches=(), cache=None):
+        self.pieces = []
+        for job in jobs:
+            data = self._load(job.source, cache)
+            limit = len(data) if job.count is None else min(len(data), job.count * SECTOR_SIZE)
+            self.pieces.append((job.seek * SECTOR_SIZE, memoryview(data)[:limit]))
+        for path, offset, count in copies:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                self.pieces.append((offset, memoryview(f.read(count))))
+        for offset, value in patches:
+            self.pieces.append((offset, memoryview(value)))
+
+    @staticmethod
+    def _load(source, cache):
+        if cache is not None and source.endswith('.xz'):
+            try:
+                return cache.map(source)
+            except (OSError, ValueError):
+                pass
+        with open_source(source) as f:
+            return f.read()
+
+    def ranges(self):
+        return [(offset, len(data)) for offset, data in self.pieces]
+
+    def __call__(self, offset, view):
+        # Later pieces win, as they were written later
+        end = offset + len(view)
+        for start, data in self.pieces:
+            lo, hi = max(start, offset), min(start + len(data), end)
+            if lo < hi:
+                view[lo - offset:hi - offset] = data[lo - start:hi - start]
+
+
+def verify_layout(target, jobs, copies=(), patches=(), ignore=(), threads=DEFAULT_THREADS, progress=None,
+                  cache=None):
+    """Check images (WriteJob), byte copies [(file, offset, count)] and patches [(offset, bytes)] on target."""
+    layout = _Layout(jobs, copies, patches, cache)
+    return verify_ranges(target, layout.ranges(), layout, ignore, threads, progress=progress)
+
+
+def check_table(target):
+    """Return the problems found in the partition table of target (empty if it looks sane)."""
+    fd = os.open(target, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        os.posix_fadvise(fd, 0, HEAD_SECTORS * SECTOR_SIZE, os.POSIX_FADV_DONTNEED)
+        # The backup GPT lives in the last sectors
+        tail = max(0, os.lseek(fd, 0, os.SEEK_END) - HEAD_SECTORS * SECTOR_SIZE)
+        os.posix_fadvise(fd, tail, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    table = PartitionTable.load(target)
+    problems = []
+    if table.read(510, 2) != b'\x55\xaa':
+        problems.append('MBR boot signature missing')
+    if table.is_gpt() and not table.gpt_crc_ok():
+        problems.append('GPT header or partition array CRC mismatch')
+    if table.is_gpt():
+        problems.extend(table.backup_gpt_problems(target))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read back and verify images written to a disk.')
+    parser.add_argument('target')
+    parser.add_argument('images', nargs='*', metavar='SOURCE SEEK COUNT',
+                        help='image, offset in 512-byte sectors and maximum sectors ("-" for no limit)')
+    parser.add_argument('--copy', nargs=3, action='append', default=[], metavar=('FILE', 'OFFSET', 'COUNT'),
+                        help='COUNT bytes of FILE at OFFSET are expected at the same disk offset')
+    parser.add_argument('--byte', nargs=2, action='append', default=[], metavar=('OFFSET', 'HEX'))
+    parser.add_argument('--ignore', nargs=2, action='append', default=[], metavar=('OFFSET', 'LENGTH'),
+                        help='bytes that are not compared, e.g. the random disk UUID')
+    parser.add_argument('--check-table', action='store_true', help='also check the MBR signature, the GPT CRCs and the backup GPT')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+    parser.add_argument('--no-cache', action='store_true', help='decompress the images instead of using the cache')
+    parser.add_argument('--progress', action='store_true', help='print @@PROGRESS marker lines')
+    args = parser.parse_args(argv)
+    if len(args.images) % 3:
+        parser.error('images must be given as SOURCE SEEK COUNT triples')
+    try:
+        jobs = [WriteJob(args.images[i], int(args.images[i + 1]),
+                         None if args.images[i + 2] == '-' else int(args.images[i + 2]))
+                for i in range(0, len(args.images), 3)]
+        copies = [(path, int(offset), int(count)) for path, offset, count in args.copy]
+        patches = [(int(offset), bytes.fromhex(value)) for offset, value in args.byte]
+        ignore = [(int(offset), int(length)) for offset, length in args.ignore]
+    except ValueError:
+        parser.error('offsets and counts must be numbers, byte values hex')
+    progress = None
+    if args.progress:
+        last = [0.0]
+
+        def progress(done, total):
+            now = time.monotonic()
+            if now - last[0] >= 0.25 or done >= total:
+                last[0] = now
+                print(format_marker('Verifying', done, total), flush=True)
+    try:
+        mismatches = verify_layout(args.target, jobs, copies, patches, ignore, args.threads, progress,
+                                   None if args.no_cache else AssetCache())
+        problems = check_table(args.target) if args.check_table else []
+    except (OSError, ValueError, lzma.LZMAError) as e:
+        sys.stderr.write(f"verify: {e}\n")
+        return 2
+    for m in mismatches:
+        print(f"Mismatch at byte {m.offset} ({m.length} bytes)")
+    for problem in problems:
+        print(problem)
+    if mismatches or problems:
+        return 1
+    print(f"Verified {args.target}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,403 +1,619 @@
 import sys
-from PySide6.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QLabel, QPushButton, QListWidget, QMessageBox, QHBoxLayout, QTextEdit, QCheckBox, QLineEdit, QFormLayout, QStackedWidget, QComboBox, QRadioButton, QButtonGroup, QFileDialog, QProgressBar
-from PySide6.QtGui import QIcon, QColor
-from PySide6.QtCore import Qt, QThread, Signal, QTimer
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QLabel, QPushButton, QListView, QMessageBox, QHBoxLayout, QTextEdit, QPlainTextEdit, QCheckBox, QLineEdit, QFormLayout, QStackedWidget, QComboBox, QRadioButton, QButtonGroup, QFileDialog, QProgressBar, QSpinBox, QAbstractItemView, QTableView, QHeaderView, QDialog
+from PySide6.QtGui import QIcon, QColor, QTextCharFormat, QTextCursor
+from PySide6.QtCore import Qt, QThread, Signal, QTimer, QObject, QAbstractListModel, QAbstractTableModel, QModelIndex
 import os
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), 'lib'))
-from core.disk import list_usb_disks
+from core.copyengine import DEFAULT_JOBS as COPY_JOBS, CopyEngine
+from core.disk import list_usb_disks, get_inventory
 from core.disk_ops import run_ventoy_install
+from core.hotplug import HotplugMonitor
+from core.inventory import diff_devices, format_size, unique_keys
+from core.isolib import IMAGE_EXTENSIONS, IsoLibrary, data_partition
+from core.logpipe import LogPipe, new_log_path
+from core.mounts import get_mount_manager
+from core.persistence import DEFAULT_JOBS as PERSISTENCE_JOBS, DEFAULT_LABEL as PERSISTENCE_LABEL, FSTYPES as PERSISTENCE_FSTYPES, MB, PersistenceSpec, build_images
+from core.jobs import CANCELLED as JOB_CANCELLED, DONE as JOB_DONE, FINISHED as JOB_FINISHED, JobEngine, copy_job, verify_job
+from core.privhelper import HelperError, get_helper
+from core.planner import items_from_paths, plan as plan_placement, target_for_disk
+from core.progress import ProgressTracker, format_duration, format_marker, format_rate, parse_step
 from core.plugson import load_plugin_json, save_plugin_json
 from core.secureboot import detect_system_keys, get_machine_owner_guid
+from core.themes import MOUNTABLE, ThemeIndex
 
-class EraseThread(QThread):
-    log_signal = Signal(str)
+class HotplugBridge(QObject):
+    """Carries hotplug events from the monitor thread to the GUI thread"""
+    event_signal = Signal(str, str, str)
+    failed_signal = Signal(str)
+
+    def forward(self, event):
+        self.event_signal.emit(event.action, event.name, event.devtype)
+
+    def fail(self, error):
+        self.failed_signal.emit(str(error))
+
+class LogView(QPlainTextEdit):
+    """Read-only, block-limited log view that appends batches of (kind, text) lines"""
+    COLORS = {'error': '#ff6b6b', 'warning': '#ffa726', 'success': '#4caf50', 'event': '#29b6f6'}
+
+    def __init__(self, max_blocks=5000, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_blocks)
+        self.formats = {'info': QTextCharFormat()}
+        for kind, color in self.COLORS.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            self.formats[kind] = fmt
+
+    def append_lines(self, lines):
+        """Append lines in one edit block; only follows the output if already at the bottom"""
+        if not lines:
+            return
+        # Lines that would scroll out of the block limit straight away are never rendered
+        lines = lines[-self.maximumBlockCount():]
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 4
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        first = self.document().isEmpty()
+        for kind, text in lines:
+            if not first:
+                cursor.insertBlock()
+            first = False
+            cursor.insertText(text, self.formats.get(kind, self.formats['info']))
+        cursor.endEditBlock()
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+class DiskListModel(QAbstractListModel):
+    """USB disk list keyed by stable device identity (WWN/serial, plus the
+    kernel name for drives that report the same one).
+
+    Refreshes are applied as row inserts, removals and updates, so the
+    view keeps its selection and per-row operation state survives.
+    """
+    KeyRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys = []
+        self._disks = {}
+        self._states = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._keys):
+            return None
+        key = self._keys[index.row()]
+        d = self._disks[key]
+        if role == Qt.DisplayRole:
+            # Enhanced disk information display
+            status_icon = "🟢" if d.get('mounted', False) else "⚪"
+            disk_info = f"{status_icon} {d['name']} | {d['model']} | {d['size']}"
+            if 'filesystem' in d and d['filesystem']:
+                disk_info += f" | {d['filesystem']}"
+            state = self._states.get(key)
+            if state:
+                disk_info += f"  —  {state}"
+            return disk_info
+        if role == Qt.ToolTipRole:
+            return f"/dev/{d['name']}\nVendor: {d.get('vendor', '')}\nSerial: {d.get('serial', '') or 'n/a'}"
+        if role == self.KeyRole:
+            return key
+        return None
+
+    def disk(self, row):
+        if 0 <= row < len(self._keys):
+            return self._disks[self._keys[row]]
+        return None
+
+    def row_for_key(self, key):
+        try:
+            return self._keys.index(key)
+        except ValueError:
+            return -1
+
+    def set_state(self, key, state):
+        """Set the operation state shown next to a disk (e.g. "Installing...")"""
+        self._states[key] = state
+        row = self.row_for_key(key)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def update_disks(self, disks):
+        """Apply a fresh disk list as diffs; returns (added, removed) key lists"""
+        new = {d['key']: d for d in unique_keys(disks)}
+        added, removed, changed = diff_devices(self._disks, new)
+        for key in removed:
+            row = self._keys.index(key)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[row]
+            del self._disks[key]
+            self.endRemoveRows()
+        for key in changed:
+            self._disks[key] = new[key]
+            index = self.index(self._keys.index(key))
+            self.dataChanged.emit(index, index)
+        if added:
+            first = len(self._keys)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for key in added:
+                self._keys.append(key)
+                self._disks[key] = new[key]
+            self.endInsertRows()
+        return added, removed
+
+class IsoTableModel(QAbstractTableModel):
+    """Images of one drive's ISO library"""
+    COLUMNS = ("Name", "Folder", "Size", "Label", "Created", "Boot")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._images = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._images)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._images):
+            return None
+        image = self._images[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return os.path.basename(image.path)
+            if column == 1:
+                return os.path.dirname(image.path) or "/"
+            if column == 2:
+                return format_size(image.size)
+            if column == 3:
+                return image.label
+            if column == 4:
+                return image.created
+            return image.boot or "—"
+        if role == Qt.ToolTipRole:
+            return image.path
+        if role == Qt.TextAlignmentRole and index.column() == 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def set_images(self, images):
+        self.beginResetModel()
+        self._images = list(images)
+        self.endResetModel()
+
+class JobThread(QThread):
+    """Runs core.jobs jobs and turns their events into signals.
+
+    Job specs go to the privileged helper, which is started (and asks for
+    the password) only when none is running; Job objects run in an engine
+    in this process.
+    """
+    progress_signal = Signal(str)
+    status_signal = Signal(str, str, int, str)
     done_signal = Signal(bool, str)
-    
-    def __init__(self, disk_name, secure_erase=False):
+    # Log type for the jobs' plain output lines
+    log_type = "info"
+
+    def __init__(self, specs=(), jobs=(), workers=1, log_pipe=None):
         super().__init__()
-        self.disk_name = disk_name
-        self.secure_erase = secure_erase
-    
-    def run(self):
-        import subprocess, tempfile
-        disk_path = f"/dev/{self.disk_name}"
-        
-        try:
-            self.log_signal.emit(f"Starting USB erase operation on {disk_path}...")
-            
-            # Create comprehensive erase script
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False) as erase_script:
-                erase_script.write('#!/bin/bash\n')
-                erase_script.write('set -e\n')
-                erase_script.write('exec > >(tee /tmp/ventoy_erase.log) 2>&1\n')
-                erase_script.write('\n')
-                erase_script.write('echo "=== Ventoy-X - USB Erase Operation ==="\n')
-                erase_script.write(f'echo "Target device: {disk_path}"\n')
-                erase_script.write('echo ""\n')
-                
-                # Step 1: Unmount all partitions
-                erase_script.write('echo "Step 1: Unmounting all partitions..."\n')
-                erase_script.write(f'for partition in $(lsblk -ln -o NAME {disk_path} | tail -n +2); do\n')
-                erase_script.write('    partition_path="/dev/$partition"\n')
-                erase_script.write('    echo "Unmounting $partition_path..."\n')
-                erase_script.write('    umount "$partition_path" 2>/dev/null || echo "  $partition_path not mounted or failed to unmount"\n')
-                erase_script.write('done\n')
-                erase_script.write('echo ""\n')
-                
-                # Step 2: Remove partition table
-                erase_script.write('echo "Step 2: Removing partition table..."\n')
-                erase_script.write(f'wipefs -af {disk_path} || echo "Warning: wipefs failed"\n')
-                erase_script.write('echo ""\n')
-                
-                # Step 3: Zero out the beginning and end of the drive
-                erase_script.write('echo "Step 3: Clearing partition signatures..."\n')
-                erase_script.write(f'dd if=/dev/zero of={disk_path} bs=1M count=10 status=progress 2>/dev/null || echo "Warning: could not zero start of drive"\n')
-                erase_script.write('echo ""\n')
-                
-                if self.secure_erase:
-                    # Step 4: Secure erase (optional)
-                    erase_script.write('echo "Step 4: Performing secure erase (this may take a while)..."\n')
-                    erase_script.write('echo "Writing random data to entire drive..."\n')
-                    erase_script.write(f'dd if=/dev/urandom of={disk_path} bs=1M status=progress 2>/dev/null || echo "Warning: secure erase may have been interrupted"\n')
-                    erase_script.write('echo ""\n')
-                else:
-                    erase_script.write('echo "Step 4: Skipping secure erase (quick mode)"\n')
-                    erase_script.write('echo ""\n')
-                
-                # Step 5: Final cleanup
-                erase_script.write('echo "Step 5: Final cleanup..."\n')
-                erase_script.write(f'sync\n')
-                erase_script.write('echo "Synchronizing filesystem..."\n')
-                erase_script.write('sleep 2\n')
-                erase_script.write('echo ""\n')
-                
-                erase_script.write('echo "=== USB ERASE OPERATION COMPLETED SUCCESSFULLY! ==="\n')
-                erase_script.write(f'echo "✅ Device {disk_path} has been completely wiped and is ready for use."\n')
-                erase_script.write('echo "✅ All data, partitions, and file system signatures have been removed."\n')
-                erase_script.write('echo "✅ The drive is now in a clean state for new installations."\n')
-                erase_script.write('echo ""\n')
-                erase_script.write('echo "📋 What you can do next:"\n')
-                erase_script.write('echo "   • Install Ventoy using the Install/Update button"\n')
-                erase_script.write('echo "   • Format with a specific file system (FAT32, NTFS, ext4)"\n')
-                erase_script.write('echo "   • Use for any other storage purpose"\n')
-                erase_script.write('echo ""\n')
-                erase_script.write('echo "Drive status after erase:"\n')
-                erase_script.write(f'lsblk {disk_path} 2>/dev/null || echo "✅ Drive is completely clean (no partitions found)"\n')
-                
-                erase_script_path = erase_script.name
-            
-            # Make script executable
-            import os
-            os.chmod(erase_script_path, 0o755)
-            
-            # Execute the erase script
-            self.log_signal.emit("Starting erase operation (you'll only need to enter password once)...")
-            args = ['pkexec', 'bash', erase_script_path]
-            
-            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
-                                     text=True, bufsize=1, universal_newlines=True)
-            
-            output = ''
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                output += line
-                self.log_signal.emit(line.strip())
-            process.wait()
-            
-            # Clean up script
+        self.specs = list(specs)
+        self.jobs = list(jobs)
+        self.workers = workers
+        self.log_pipe = log_pipe or LogPipe()
+        self.engine = None
+        self.helper = None
+        self.requests = []
+        self.cancelled = False
+        self.messages = {}
+        self.failed = []
+
+    def on_event(self, event):
+        kind = event.get('event')
+        if kind == 'log':
+            line = event['message']
+            if parse_step(line):
+                self.progress_signal.emit(line)
+            prefix = f"[{os.path.basename(event['target'])}] " if len(self.specs) + len(self.jobs) > 1 else ""
+            self.log_pipe.write(prefix + line, {'info': self.log_type}.get(event.get('level'), event.get('level')))
+        elif kind == 'progress':
+            if event.get('total'):
+                self.progress_signal.emit(format_marker(event.get('step'), event.get('done'), event['total']))
+            else:
+                self.progress_signal.emit(format_marker(event.get('step'), overall=event.get('percent')))
+        elif kind == 'status':
+            self.status_signal.emit(event['target'], event['state'], event.get('percent', 0), event.get('message', ''))
+            if event['state'] in JOB_FINISHED:
+                self.messages[event['target']] = event.get('message', '')
+                if event['state'] != JOB_DONE:
+                    self.failed.append(f"{event['target']}: {event.get('message', '')}")
+
+    def cancel(self):
+        """Ask the jobs to stop; they clean up and finish as cancelled"""
+        self.cancelled = True
+        if self.engine:
+            self.engine.cancel()
+        for target, request in self.requests:
             try:
-                os.unlink(erase_script_path)
-            except:
+                self.helper.cancel(request)
+            except HelperError:
                 pass
-            
-            if process.returncode == 0:
-                self.log_signal.emit("USB erase completed successfully!")
-                self.done_signal.emit(True, output)
-            else:
-                self.log_signal.emit(f"Erase operation failed with exit code: {process.returncode}")
-                self.done_signal.emit(False, output)
-                
+
+    def run_privileged(self):
+        self.helper = get_helper()
+        waiting = list(self.specs)
+        # The helper limits per drive and controller; workers caps how many of ours it gets at once
+        while waiting and not self.cancelled:
+            if sum(not request.done.is_set() for _, request in self.requests) >= self.workers:
+                time.sleep(0.1)
+                continue
+            spec = waiting.pop(0)
+            self.requests.append((spec['target'], self.helper.submit('job', self.on_event, spec=spec)))
+        for spec in waiting:
+            self.on_event({'event': 'status', 'target': spec['target'], 'state': JOB_CANCELLED, 'percent': 0,
+                           'message': "Cancelled before it started"})
+        for target, request in self.requests:
+            request.done.wait()
+            if target not in self.messages:
+                # Refused by the helper before it became a job, so there were no status events
+                self.on_event({'event': 'status', 'target': target, 'state': request.state, 'percent': 0,
+                               'message': request.message})
+        return not waiting and all(request.ok for _, request in self.requests)
+
+    def run_local(self):
+        self.engine = JobEngine(self.workers)
+        self.engine.subscribe(self.on_event)
+        for job in self.jobs:
+            self.engine.submit(job)
+        self.engine.wait()
+        return self.engine.succeeded()
+
+    def run(self):
+        try:
+            success = self.run_privileged() if self.specs else self.run_local()
+            self.done_signal.emit(success, "\n".join(self.failed) if self.failed else "\n".join(self.messages.values()))
         except Exception as e:
-            self.log_signal.emit(f"Error during erase operation: {str(e)}")
+            self.log_pipe.write(f"Error: {str(e)}", "error")
             self.done_signal.emit(False, str(e))
 
-class InstallThread(QThread):
-    log_signal = Signal(str)
-    done_signal = Signal(bool, str)
-    def __init__(self, disk_name, secureboot, use_gpt=False, preserve_space=False, sign_efi=False, owner_guid="", vendor_key="", vendor_cert="", upgrade_mode=False):
+class EraseThread(JobThread):
+    """Erases a drive with a core.jobs erase job"""
+    log_type = "warning"
+
+    def __init__(self, disk_name, secure_erase=False, verify=False, log_pipe=None):
+        super().__init__([{'kind': 'erase', 'target': f"/dev/{disk_name}", 'secure': secure_erase, 'verify': verify}],
+                         log_pipe=log_pipe)
+
+    def run(self):
+        self.log_pipe.write(f"Starting USB erase operation on {self.specs[0]['target']} (you'll only need to enter password once)...", "warning")
+        super().run()
+
+class InstallThread(JobThread):
+    """Installs or upgrades Ventoy on one drive with a core.jobs install job (EFI signing and user directories included)"""
+
+    def __init__(self, disk_name, secureboot, use_gpt=False, reserve_mb=0, sign_efi=False, owner_guid="", vendor_key="", vendor_cert="", upgrade_mode=False, verify=False, log_pipe=None):
+        spec = {'kind': 'upgrade' if upgrade_mode else 'install', 'target': f"/dev/{disk_name}", 'secureboot': secureboot,
+                'use_gpt': use_gpt, 'reserve_mb': reserve_mb, 'verify': verify}
+        if sign_efi and vendor_key and vendor_cert:
+            spec.update(sign_key=vendor_key, sign_cert=vendor_cert, owner_guid=owner_guid)
+        super().__init__([spec], log_pipe=log_pipe)
+
+    def run(self):
+        self.log_pipe.write(f"Starting Ventoy install on {self.specs[0]['target']} (you'll only need to enter password once)...")
+        super().run()
+
+class BatchInstallThread(JobThread):
+    """Installs/upgrades Ventoy on several drives under a single pkexec session, limited per drive and USB controller"""
+
+    def __init__(self, targets, secureboot=False, use_gpt=False, reserve_mb=0, upgrade_mode=False, jobs=2, verify=False,
+                 vendor_key="", vendor_cert="", log_pipe=None):
+        kind = 'upgrade' if upgrade_mode else 'install'
+        # The EFI image is signed once and the same signed copy written to every drive
+        signing = {'sign_key': vendor_key, 'sign_cert': vendor_cert} if vendor_key and vendor_cert else {}
+        super().__init__([dict({'kind': kind, 'target': target, 'secureboot': secureboot, 'use_gpt': use_gpt,
+                                'reserve_mb': reserve_mb, 'verify': verify}, **signing) for target in targets],
+                         workers=jobs, log_pipe=log_pipe)
+
+    def run(self):
+        self.log_pipe.write(f"Starting batch on {len(self.specs)} drive(s), {self.workers} at a time (you'll only need to enter password once)...")
+        super().run()
+
+class ThemeScanThread(QThread):
+    """Indexes the Ventoy themes on USB drives off the GUI thread"""
+    themes_signal = Signal(list)
+    done_signal = Signal(int, str)
+
+    def __init__(self, index):
         super().__init__()
-        self.disk_name = disk_name
-        self.secureboot = secureboot
-        self.use_gpt = use_gpt
-        self.preserve_space = preserve_space
-        self.sign_efi = sign_efi
-        self.owner_guid = owner_guid
-        self.vendor_key = vendor_key
-        self.vendor_cert = vendor_cert
-        self.upgrade_mode = upgrade_mode
+        self.index = index
+
     def run(self):
-        import subprocess, os, tempfile
-        # Use the downloaded ventoy release directory which contains the proper Ventoy installation files
-        script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'src/Ventoy2Disk.sh'))
-        install_dir = os.path.dirname(script_path)
-        disk_path = f"/dev/{self.disk_name}"
-        
         try:
-            self.log_signal.emit(f"Starting Ventoy install on {disk_path}...")
-            self.log_signal.emit(f"Script path: {script_path}")
-            self.log_signal.emit(f"Working directory: {install_dir}")
-            
-            # Check if script exists
-            if not os.path.exists(script_path):
-                self.log_signal.emit(f"Error: Script not found at {script_path}")
-                self.done_signal.emit(False, f"Script not found at {script_path}")
-                return
-            
-            # Create a comprehensive script that does EVERYTHING in one sudo session
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False) as master_script:
-                master_script.write('#!/bin/bash\n')
-                master_script.write('set -e\n')
-                master_script.write('exec > >(tee /tmp/ventoy_install.log) 2>&1\n')  # Log everything
-                master_script.write('\n')
-                master_script.write('echo "=== Ventoy-X - Installation Process ==="\n')
-                master_script.write('echo "All operations will be completed efficiently"\n')
-                master_script.write('\n')
-                
-                # Step 1: Unmount any mounted partitions
-                master_script.write('echo "Step 1: Unmounting any mounted partitions..."\n')
-                master_script.write(f'for partition in $(mount | grep "{disk_path}" | cut -d" " -f1); do\n')
-                master_script.write('    echo "Unmounting $partition..."\n')
-                master_script.write('    umount "$partition" 2>/dev/null || echo "Could not unmount $partition (may not be mounted)"\n')
-                master_script.write('done\n')
-                master_script.write('\n')
-                
-                # Step 2: Run Ventoy installation
-                master_script.write('echo "Step 2: Installing/Upgrading Ventoy..."\n')
-                master_script.write(f'cd "{install_dir}"\n')
-                master_script.write('chmod +x "{}"\n'.format(script_path))
-                
-                # Build Ventoy command arguments
-                script_args = []
-                if self.secureboot:
-                    script_args.append('-s')
-                if self.use_gpt:
-                    script_args.append('-g')
-                if self.preserve_space:
-                    script_args.append('-r')
-                if self.upgrade_mode:
-                    script_args.append('-u')
-                else:
-                    script_args.append('-I')
-                script_args.append(disk_path)
-                
-                master_script.write(f'yes | timeout 300 bash "{script_path}" {" ".join(script_args)}\n')
-                master_script.write('VENTOY_EXIT_CODE=$?\n')
-                master_script.write('if [ $VENTOY_EXIT_CODE -ne 0 ]; then\n')
-                master_script.write('    echo "ERROR: Ventoy installation failed with exit code $VENTOY_EXIT_CODE"\n')
-                master_script.write('    exit $VENTOY_EXIT_CODE\n')
-                master_script.write('fi\n')
-                master_script.write('\n')
-                
-                # Step 3: EFI Signing (if requested and custom keys provided)
-                if self.sign_efi and self.vendor_key and self.vendor_cert:
-                    master_script.write('echo "Step 3: Signing EFI files with custom keys..."\n')
-                    master_script.write('sleep 3  # Wait for partitions to be available\n')
-                    master_script.write(f'EFI_PARTITION="{disk_path}1"\n')
-                    master_script.write('MOUNT_POINT="/tmp/ventoy_efi_signing"\n')
-                    master_script.write('mkdir -p "$MOUNT_POINT"\n')
-                    master_script.write('if mount "$EFI_PARTITION" "$MOUNT_POINT" 2>/dev/null; then\n')
-                    master_script.write('    echo "Mounted EFI partition for signing"\n')
-                    master_script.write('    find "$MOUNT_POINT" -name "*.efi" -type f | while read efi_file; do\n')
-                    master_script.write('        echo "Signing $(basename \\"$efi_file\\")..."\n')
-                    master_script.write(f'        sbsign --key "{self.vendor_key}" --cert "{self.vendor_cert}"')
-                    if self.owner_guid:
-                        master_script.write(f' --owner-guid "{self.owner_guid}"')
-                    master_script.write(' --output "$efi_file" "$efi_file" 2>/dev/null || echo "Failed to sign $(basename \\"$efi_file\\")"\n')
-                    master_script.write('    done\n')
-                    master_script.write('    umount "$MOUNT_POINT"\n')
-                    master_script.write('    rmdir "$MOUNT_POINT"\n')
-                    master_script.write('    echo "EFI signing completed"\n')
-                    master_script.write('else\n')
-                    master_script.write('    echo "Could not mount EFI partition for signing"\n')
-                    master_script.write('fi\n')
-                    master_script.write('\n')
-                
-                # Step 4: Create user directories
-                master_script.write('echo "Step 4: Creating user directories..."\n')
-                master_script.write('sleep 5  # Wait for partitions to be fully available\n')
-                master_script.write('\n')
-                master_script.write('# Try to find and mount the Ventoy data partition\n')
-                master_script.write('DATA_MOUNTED=false\n')
-                master_script.write('MOUNT_POINT="/tmp/ventoy_data_setup"\n')
-                master_script.write('mkdir -p "$MOUNT_POINT"\n')
-                master_script.write('\n')
-                master_script.write(f'for partition in "{disk_path}2" "{disk_path}1"; do\n')
-                master_script.write('    if [ "$DATA_MOUNTED" = "false" ]; then\n')
-                master_script.write('        echo "Trying to mount $partition..."\n')
-                master_script.write('        if mount "$partition" "$MOUNT_POINT" 2>/dev/null; then\n')
-                master_script.write('            # Check if this is writable and has reasonable space\n')
-                master_script.write('            if [ -w "$MOUNT_POINT" ] && [ "$(df "$MOUNT_POINT" | tail -1 | awk \'{print $4}\')" -gt 100000 ]; then\n')
-                master_script.write('                echo "Found Ventoy data partition: $partition"\n')
-                master_script.write('                DATA_MOUNTED=true\n')
-                master_script.write('                \n')
-                master_script.write('                # Create directories\n')
-                master_script.write('                mkdir -p "$MOUNT_POINT/ISO"\n')
-                master_script.write('                mkdir -p "$MOUNT_POINT/Themes"\n')
-                master_script.write('                mkdir -p "$MOUNT_POINT/Plugins"\n')
-                master_script.write('                mkdir -p "$MOUNT_POINT/Scripts"\n')
-                master_script.write('                \n')
-                master_script.write('                # Create README files\n')
-                self._add_readme_creation_to_script(master_script)
-                master_script.write('                \n')
-                master_script.write('                echo "Created directories: ISO/, Themes/, Plugins/, Scripts/"\n')
-                master_script.write('                umount "$MOUNT_POINT"\n')
-                master_script.write('            else\n')
-                master_script.write('                umount "$MOUNT_POINT" 2>/dev/null || true\n')
-                master_script.write('            fi\n')
-                master_script.write('        fi\n')
-                master_script.write('    fi\n')
-                master_script.write('done\n')
-                master_script.write('\n')
-                master_script.write('rmdir "$MOUNT_POINT" 2>/dev/null || true\n')
-                master_script.write('\n')
-                master_script.write('if [ "$DATA_MOUNTED" = "true" ]; then\n')
-                master_script.write('    echo "User directories created successfully!"\n')
-                master_script.write('else\n')
-                master_script.write('    echo "Warning: Could not create user directories - no suitable partition found"\n')
-                master_script.write('fi\n')
-                master_script.write('\n')
-                master_script.write('echo "=== All operations completed successfully! ==="\n')
-                
-                master_script_path = master_script.name
-            
-            # Make the master script executable
-            os.chmod(master_script_path, 0o755)
-            
-            # Run everything in ONE pkexec session
-            self.log_signal.emit("Starting single-session installation (you'll only need to enter password once)...")
-            args = ['pkexec', 'bash', master_script_path]
-            
-            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
-            
-            output = ''
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                output += line
-                self.log_signal.emit(line.strip())
-            process.wait()
-            
-            # Clean up scripts
-            try:
-                os.unlink(master_script_path)
-            except:
-                pass
-            
-            # Check results
-            if process.returncode == 0:
-                self.log_signal.emit("All operations completed successfully!")
-                self.done_signal.emit(True, output)
-            else:
-                self.log_signal.emit(f"Installation failed with exit code: {process.returncode}")
-                self.done_signal.emit(False, output)
-                
+            # Each partition's themes are sent as soon as it is scanned
+            themes = self.index.scan(list_usb_disks(),
+                                     lambda found: self.themes_signal.emit([t.to_dict() for t in found]))
+            self.done_signal.emit(len(themes), "")
         except Exception as e:
-            self.log_signal.emit(f"Error: {str(e)}")
-            self.done_signal.emit(False, str(e))
-    
-    def _add_readme_creation_to_script(self, script_file):
-        """Add README file creation commands to the master script"""
-        script_file.write('                # ISO README\n')
-        script_file.write('                cat > "$MOUNT_POINT/ISO/README.txt" << \'EOF\'\n')
-        script_file.write('Ventoy ISO Directory\n')
-        script_file.write('==================\n')
-        script_file.write('\n')
-        script_file.write('Place your .iso and .img files here\n')
-        script_file.write('\n')
-        script_file.write('Supported formats:\n')
-        script_file.write('- .iso files (Linux distributions, Windows, etc.)\n')
-        script_file.write('- .img files (disk images)\n')
-        script_file.write('- .wim files (Windows imaging)\n')
-        script_file.write('- .vhd/.vhdx files (virtual hard disks)\n')
-        script_file.write('\n')
-        script_file.write('Simply copy your boot files here and they will appear in Ventoy\'s boot menu.\n')
-        script_file.write('EOF\n')
-        script_file.write('\n')
-        
-        script_file.write('                # Themes README\n')
-        script_file.write('                cat > "$MOUNT_POINT/Themes/README.txt" << \'EOF\'\n')
-        script_file.write('Ventoy Themes Directory\n')
-        script_file.write('=====================\n')
-        script_file.write('\n')
-        script_file.write('Place custom Ventoy themes here\n')
-        script_file.write('\n')
-        script_file.write('Theme structure:\n')
-        script_file.write('- Create subdirectories for each theme\n')
-        script_file.write('- Include theme.txt configuration file\n')
-        script_file.write('- Add background images and fonts\n')
-        script_file.write('\n')
-        script_file.write('Example: Themes/MyTheme/theme.txt\n')
-        script_file.write('EOF\n')
-        script_file.write('\n')
-        
-        script_file.write('                # Plugins README\n')
-        script_file.write('                cat > "$MOUNT_POINT/Plugins/README.txt" << \'EOF\'\n')
-        script_file.write('Ventoy Plugins Directory\n')
-        script_file.write('======================\n')
-        script_file.write('\n')
-        script_file.write('Plugin files:\n')
-        script_file.write('- ventoy.json (main plugin configuration)\n')
-        script_file.write('- Custom plugin scripts\n')
-        script_file.write('- Persistence configuration\n')
-        script_file.write('\n')
-        script_file.write('Edit these files using the Plugson tab in Ventoy GUI.\n')
-        script_file.write('EOF\n')
-        script_file.write('\n')
-        
-        script_file.write('                # Scripts README\n')
-        script_file.write('                cat > "$MOUNT_POINT/Scripts/README.txt" << \'EOF\'\n')
-        script_file.write('Ventoy Scripts Directory\n')
-        script_file.write('======================\n')
-        script_file.write('\n')
-        script_file.write('Custom tools and scripts:\n')
-        script_file.write('- Diagnostic tools\n')
-        script_file.write('- Utility scripts\n')
-        script_file.write('- Custom bootable tools\n')
-        script_file.write('EOF\n')
-        script_file.write('\n')
-        
-        script_file.write('                # Sample ventoy.json\n')
-        script_file.write('                if [ ! -f "$MOUNT_POINT/Plugins/ventoy.json" ]; then\n')
-        script_file.write('                    cat > "$MOUNT_POINT/Plugins/ventoy.json" << \'EOF\'\n')
-        script_file.write('{\n')
-        script_file.write('  "theme": {\n')
-        script_file.write('    "file": "/Themes/default/theme.txt",\n')
-        script_file.write('    "gfxmode": "1024x768"\n')
-        script_file.write('  },\n')
-        script_file.write('  "menu_alias": [\n')
-        script_file.write('    {\n')
-        script_file.write('      "image": "/ISO/ubuntu.iso",\n')
-        script_file.write('      "alias": "Ubuntu Linux"\n')
-        script_file.write('    }\n')
-        script_file.write('  ],\n')
-        script_file.write('  "menu_tip": {\n')
-        script_file.write('    "left": "10",\n')
-        script_file.write('    "top": "80",\n')
-        script_file.write('    "color": "red"\n')
-        script_file.write('  }\n')
-        script_file.write('}\n')
-        script_file.write('EOF\n')
-        script_file.write('                    echo "Created sample ventoy.json"\n')
-        script_file.write('                fi\n')
+            self.done_signal.emit(0, str(e))
+
+class StartupProbeThread(QThread):
+    """Probes drives, hotplug support and secure boot keys off the GUI thread at startup"""
+    disks_signal = Signal(list)
+    hotplug_signal = Signal(bool)
+    keys_signal = Signal(str, str, str)
+
+    def __init__(self, hotplug_monitor):
+        super().__init__()
+        self.hotplug_monitor = hotplug_monitor
+
+    def run(self):
+        # Drives first, so the list fills in before the slower probes finish
+        self.disks_signal.emit(list_usb_disks())
+        self.hotplug_signal.emit(self.hotplug_monitor.start())
+        try:
+            key_path, cert_path = detect_system_keys()
+            owner_guid = get_machine_owner_guid()
+        except Exception:
+            key_path = cert_path = owner_guid = None
+        self.keys_signal.emit(key_path or "", cert_path or "", owner_guid or "")
+
+class IsoScanThread(QThread):
+    """Brings a drive's ISO library index up to date off the GUI thread"""
+    done_signal = Signal(list, int, int, str)
+
+    def __init__(self, library, device):
+        super().__init__()
+        self.library = library
+        self.device = device
+
+    def run(self):
+        try:
+            with get_mount_manager().lease(self.device) as mountpoint:
+                result = self.library.scan(mountpoint)
+            self.done_signal.emit(result.images, result.probed, result.removed, "")
+        except Exception as e:
+            self.done_signal.emit([], 0, 0, str(e))
+
+class CopyThread(QThread):
+    """Copies images onto the data partitions of one or more drives with the copy engine"""
+    # done, total and rate are floats because byte counts overflow a Qt int
+    progress_signal = Signal(float, float, float)
+    done_signal = Signal(float, float, list, bool, str)
+
+    def __init__(self, engine, batches):
+        super().__init__()
+        self.engine = engine
+        # [(partition device, [source paths])]
+        self.batches = batches
+        self.last_emit = 0.0
+
+    def report(self, done, total, rate):
+        now = time.monotonic()
+        if now - self.last_emit >= 0.2 or done == total:
+            self.last_emit = now
+            self.progress_signal.emit(done, total, rate)
+
+    def run(self):
+        self.engine.progress = self.report
+        job = copy_job(self.engine, self.batches)
+        jobs = JobEngine(1)
+        jobs.submit(job)
+        jobs.wait()
+        if job.result is None:
+            self.done_signal.emit(0.0, 0.0, [], False, job.message)
+            return
+        failed = [f"{os.path.basename(j.source)}: {j.error}" for j in job.result.failed]
+        self.done_signal.emit(job.result.copied, job.result.rate, failed, job.result.cancelled, "")
+
+class FreeSpaceThread(QThread):
+    """Measures the free space and cluster size of data partitions for the placement planner"""
+    done_signal = Signal(dict, str)
+
+    def __init__(self, devices):
+        super().__init__()
+        self.devices = devices
+
+    def run(self):
+        space = {}
+        errors = []
+        for device in self.devices:
+            try:
+                # Read-write, so a copy started right after can reuse the mount
+                with get_mount_manager().lease(device, read_only=False) as mountpoint:
+                    st = os.statvfs(mountpoint)
+                space[device] = [st.f_bavail * st.f_frsize, st.f_frsize]
+            except Exception as e:
+                errors.append(f"{device}: {e}")
+        self.done_signal.emit(space, "\n".join(errors))
+
+class VerifyThread(JobThread):
+    """Checks the images on a drive's data partition against their SHA256SUMS with a core.jobs verify job"""
+
+    def __init__(self, library, device, log_pipe=None):
+        super().__init__(jobs=[verify_job(device, library)], log_pipe=log_pipe)
+
+class PersistenceThread(QThread):
+    """Builds persistence images with core.persistence, several at a time"""
+    progress_signal = Signal(float, float, str)
+    done_signal = Signal(list)
+
+    def __init__(self, specs, jobs):
+        super().__init__()
+        self.specs = specs
+        self.jobs = jobs
+        self.done = [0] * len(specs)
+        self.last_emit = 0.0
+
+    def report(self, index, step, done, total):
+        # mkfs counts as the last megabyte of its image, so the bar does not sit at 100% while it runs
+        size = self.specs[index].size_mb * MB
+        self.done[index] = min(done, size - MB) if step == 'allocate' else size - MB + MB * done // total
+        now = time.monotonic()
+        if now - self.last_emit >= 0.2 or step == 'mkfs':
+            self.last_emit = now
+            label = "Allocating" if step == 'allocate' else "Formatting"
+            self.progress_signal.emit(sum(self.done), sum(spec.size_mb * MB for spec in self.specs), f"{label} {os.path.basename(self.specs[index].path)}")
+
+    def run(self):
+        results = build_images(self.specs, self.jobs, self.report)
+        self.done_signal.emit([result.to_dict() for result in results])
+
+class PersistenceDialog(QDialog):
+    """Creates persistence images (the GUI side of CreatePersistentImg.sh)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Create Persistence Image")
+        self.build_thread = None
+        layout = QVBoxLayout()
+        form = QFormLayout()
+        
+        output_layout = QHBoxLayout()
+        self.output_edit = QLineEdit(os.path.join(os.path.expanduser("~"), "persistence.dat"))
+        browse_button = QPushButton("Browse")
+        output_layout.addWidget(self.output_edit)
+        output_layout.addWidget(browse_button)
+        form.addRow("Output File:", output_layout)
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(1, 32)
+        self.count_spin.setToolTip("Number of images to create; more than one are numbered name-1.dat, name-2.dat, ...")
+        form.addRow("Images:", self.count_spin)
+        self.size_spin = QSpinBox()
+        self.size_spin.setRange(16, 1024 * 1024)
+        self.size_spin.setValue(1024)
+        self.size_spin.setSuffix(" MB")
+        form.addRow("Size:", self.size_spin)
+        self.fstype_combo = QComboBox()
+        self.fstype_combo.addItems(sorted(PERSISTENCE_FSTYPES))
+        self.fstype_combo.setCurrentText("ext4")
+        form.addRow("File System:", self.fstype_combo)
+        self.label_edit = QLineEdit(PERSISTENCE_LABEL)
+        self.label_edit.setToolTip("casper-rw for Ubuntu based distros, persistence for Debian based ones")
+        form.addRow("Label:", self.label_edit)
+        self.config_edit = QLineEdit()
+        self.config_edit.setPlaceholderText("e.g. persistence.conf (optional)")
+        self.config_edit.setToolTip('Name of a config file inside the image, containing "/ union"')
+        form.addRow("Config File:", self.config_edit)
+        self.fill_check = QCheckBox("Fill with 0xFF instead of preallocating")
+        self.fill_check.setToolTip("Slower, but the file stays fully allocated when copied with other tools.\nFile systems that can not preallocate (exFAT, FAT) are always filled.")
+        form.addRow("", self.fill_check)
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, 8)
+        self.jobs_spin.setValue(PERSISTENCE_JOBS)
+        self.jobs_spin.setToolTip("Number of images built at the same time")
+        form.addRow("Parallel Builds:", self.jobs_spin)
+        layout.addLayout(form)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.create_button = QPushButton("💾 Create")
+        self.close_button = QPushButton("Close")
+        button_layout.addWidget(self.create_button)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        
+        browse_button.clicked.connect(self.browse)
+        self.create_button.clicked.connect(self.create)
+        self.close_button.clicked.connect(self.close)
+
+    def browse(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Persistence Image", self.output_edit.text(), "Persistence Images (*.dat *.img);;All Files (*)")
+        if path:
+            self.output_edit.setText(path)
+
+    def specs(self):
+        path = self.output_edit.text().strip()
+        count = self.count_spin.value()
+        if count > 1:
+            root, ext = os.path.splitext(path)
+            paths = [f"{root}-{i}{ext}" for i in range(1, count + 1)]
+        else:
+            paths = [path]
+        return [PersistenceSpec(p, self.size_spin.value(), self.fstype_combo.currentText(), self.label_edit.text().strip(),
+                                self.config_edit.text().strip(), self.fill_check.isChecked()) for p in paths]
+
+    def create(self):
+        if self.build_thread and self.build_thread.isRunning():
+            return
+        specs = self.specs()
+        try:
+            for spec in specs:
+                spec.validate()
+        except ValueError as e:
+            QMessageBox.warning(self, "Create Persistence Image", str(e))
+            return
+        existing = [spec.path for spec in specs if os.path.exists(spec.path)]
+        if existing and QMessageBox.question(self, "Create Persistence Image", "Overwrite these files?\n\n" + "\n".join(existing), QMessageBox.Yes | QMessageBox.No, QMessageBox.No) != QMessageBox.Yes:
+            return
+        self.create_button.setEnabled(False)
+        self.close_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.started = time.monotonic()
+        self.build_thread = PersistenceThread(specs, self.jobs_spin.value())
+        self.build_thread.progress_signal.connect(self.build_progress)
+        self.build_thread.done_signal.connect(self.build_done)
+        self.build_thread.start()
+
+    def build_progress(self, done, total, step):
+        if total:
+            self.progress_bar.setValue(int(done * 1000 / total))
+        self.status_label.setText(f"{step}... {format_size(done)} of {format_size(total)}")
+
+    def build_done(self, results):
+        self.create_button.setEnabled(True)
+        self.close_button.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        failed = [r for r in results if r['error']]
+        lines = [f"❌ {os.path.basename(r['path'])}: {r['error']}" for r in failed]
+        lines += [f"✅ {os.path.basename(r['path'])} ({'preallocated' if r['method'] == 'fallocate' else 'filled'} in {r['allocate_seconds']:.1f} s, mkfs {r['mkfs_seconds']:.1f} s)"
+                  for r in results if not r['error']]
+        self.status_label.setText(f"{len(results) - len(failed)} of {len(results)} image(s) created in {format_duration(time.monotonic() - self.started)}.\n" + "\n".join(lines))
+
+    def closeEvent(self, event):
+        # The images would be left half built
+        if self.build_thread and self.build_thread.isRunning():
+            event.ignore()
+            return
+        super().closeEvent(event)
 
 class DashboardTab(QWidget):
+    # Emitted when the startup drive scan has been shown
+    ready = Signal()
+
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout()
-        self.disk_list = QListWidget()
+        self.disk_model = DiskListModel(self)
+        self.disk_list = QListView()
+        self.disk_list.setModel(self.disk_model)
+        self.disk_list.setUniformItemSizes(True)
+        self.disk_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         
         # Partition style options
         partition_layout = QHBoxLayout()
@@ -415,8 +631,20 @@ class DashboardTab(QWidget):
         # Other options
         self.secure_boot_checkbox = QCheckBox("Enable Secure Boot Support (-s)")
         self.preserve_space_checkbox = QCheckBox("Preserve some space at disk end (-r)")
+        self.reserve_size_spin = QSpinBox()
+        self.reserve_size_spin.setRange(1, 1024 * 1024)
+        self.reserve_size_spin.setValue(1024)
+        self.reserve_size_spin.setSuffix(" MB")
+        self.reserve_size_spin.setEnabled(False)
+        self.preserve_space_checkbox.toggled.connect(self.reserve_size_spin.setEnabled)
+        reserve_layout = QHBoxLayout()
+        reserve_layout.addWidget(self.preserve_space_checkbox)
+        reserve_layout.addWidget(self.reserve_size_spin)
+        reserve_layout.addStretch()
         self.upgrade_mode_checkbox = QCheckBox("Upgrade existing Ventoy installation (-u)")
         self.upgrade_mode_checkbox.setToolTip("Use this if Ventoy is already installed on the disk")
+        self.verify_checkbox = QCheckBox("Verify written data (read back after install/secure erase)")
+        self.verify_checkbox.setToolTip("Reads back the boot images, boot code and partition table after an install,\nand samples the drive after a secure erase")
         self.sign_efi_checkbox = QCheckBox("Enable EFI signing (uses Ventoy's built-in or custom keys)")
         
         # EFI signing options (initially hidden)
@@ -460,6 +688,15 @@ class DashboardTab(QWidget):
         self.install_button = QPushButton("🚀 Install/Update Ventoy")
         self.config_button = QPushButton("Configure Ventoy")
         self.erase_button = QPushButton("🗑️ Erase USB Drive")
+        self.batch_button = QPushButton("⚡ Batch Install Selected")
+        self.verify_isos_button = QPushButton("🔍 Verify ISOs")
+        self.verify_isos_button.setToolTip("Check every image on the drive against the SHA256SUMS / *.sha256 files next to it.\nUnchanged images are not hashed again.")
+        self.verify_isos_button.setEnabled(False)
+        self.batch_button.setToolTip("Install/upgrade Ventoy on all selected drives in parallel\n(Ctrl/Shift-click to select several drives)")
+        self.batch_jobs_spin = QSpinBox()
+        self.batch_jobs_spin.setRange(1, 16)
+        self.batch_jobs_spin.setValue(2)
+        self.batch_jobs_spin.setToolTip("Maximum number of drives written at the same time.\nKeep this low when several sticks share one USB controller.")
         self.install_button.setEnabled(False)
         self.config_button.setEnabled(False)
         self.erase_button.setEnabled(False)
@@ -476,25 +713,57 @@ class DashboardTab(QWidget):
         self.erase_options_widget.setLayout(erase_layout)
         self.erase_options_widget.setVisible(False)
         
-        self.log_view = QTextEdit()
-        self.log_view.setReadOnly(True)
+        self.log_view = LogView()
         self.log_view.setVisible(False)  # Initially hidden to save space
+        # Workers write into the pipe; the timer drains it into the view in batches
+        self.log_pipe = LogPipe()
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(100)
+        self.log_flush_timer.timeout.connect(self.flush_log)
         
-        # Progress bar for operations
+        # Progress bar for operations, with rate/ETA/stall details underneath
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
+        self.progress_label = QLabel()
+        self.progress_label.setVisible(False)
+        self.progress_tracker = None
+        self.cancel_button = QPushButton("⏹ Cancel")
+        self.cancel_button.setToolTip("Stop the running operation; partitions are unmounted and temporary files removed")
+        self.cancel_button.setVisible(False)
+        self.stall_reported = False
+        # Re-evaluates ETA and stall state even when the worker goes quiet
+        self.progress_timer = QTimer()
+        self.progress_timer.setInterval(1000)
+        self.progress_timer.timeout.connect(self.update_progress_display)
+        
+        # Hotplug events trigger a refresh; a burst of events (disk + partitions)
+        # is coalesced into a single refresh
+        self.hotplug_refresh_timer = QTimer()
+        self.hotplug_refresh_timer.setSingleShot(True)
+        self.hotplug_refresh_timer.setInterval(300)
+        self.hotplug_refresh_timer.timeout.connect(self.auto_refresh_disks)
+        self.hotplug_bridge = HotplugBridge()
+        self.hotplug_bridge.event_signal.connect(self.on_hotplug_event)
+        self.hotplug_bridge.failed_signal.connect(self.on_hotplug_failed)
+        self.hotplug_monitor = HotplugMonitor(self.hotplug_bridge.forward, on_error=self.hotplug_bridge.fail)
         
-        # Auto-refresh timer for disk detection
+        # Polling timer, only used when hotplug events are unavailable
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.auto_refresh_disks)
-        self.refresh_timer.start(5000)  # Refresh every 5 seconds
+        
+        # A refresh that comes in while jobs run is retried until they are done,
+        # so drives plugged in during a batch still show up afterwards
+        self.deferred_refresh_timer = QTimer()
+        self.deferred_refresh_timer.setInterval(1000)
+        self.deferred_refresh_timer.timeout.connect(self.auto_refresh_disks)
         
         layout.addWidget(QLabel("Detected USB Disks:"))
         layout.addWidget(self.disk_list)
         layout.addLayout(partition_layout)
         layout.addWidget(self.secure_boot_checkbox)
-        layout.addWidget(self.preserve_space_checkbox)
+        layout.addLayout(reserve_layout)
         layout.addWidget(self.upgrade_mode_checkbox)
+        layout.addWidget(self.verify_checkbox)
         layout.addWidget(self.sign_efi_checkbox)
         layout.addWidget(self.erase_options_widget)
         layout.addWidget(self.efi_signing_widget)
@@ -504,8 +773,16 @@ class DashboardTab(QWidget):
         btn_layout.addWidget(self.install_button)
         btn_layout.addWidget(self.config_button)
         btn_layout.addWidget(self.erase_button)
+        btn_layout.addWidget(self.verify_isos_button)
         layout.addLayout(btn_layout)
         
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(QLabel("Parallel installs:"))
+        batch_layout.addWidget(self.batch_jobs_spin)
+        batch_layout.addWidget(self.batch_button)
+        batch_layout.addStretch()
+        layout.addLayout(batch_layout)
+        
         # Log section with toggle button
         log_header_layout = QHBoxLayout()
         log_label = QLabel("Install Log:")
@@ -521,23 +798,27 @@ class DashboardTab(QWidget):
         
         layout.addLayout(log_header_layout)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.progress_label)
+        layout.addWidget(self.cancel_button)
         layout.addWidget(self.log_view)
         self.setLayout(layout)
-        self.refresh_button.clicked.connect(self.refresh_disks)
+        self.refresh_button.clicked.connect(lambda: self.refresh_disks())
         self.install_button.clicked.connect(self.install_ventoy)
         self.config_button.clicked.connect(self.configure_ventoy)
         self.erase_button.clicked.connect(self.erase_usb)
-        self.disk_list.currentRowChanged.connect(self.on_disk_selected)
+        self.batch_button.clicked.connect(self.batch_install)
+        self.verify_isos_button.clicked.connect(self.verify_isos)
+        self.cancel_button.clicked.connect(self.cancel_operation)
+        self.disk_list.selectionModel().currentRowChanged.connect(lambda current, previous: self.on_disk_selected(current.row()))
         self.sign_efi_checkbox.toggled.connect(self.toggle_efi_signing)
         auto_detect_btn.clicked.connect(self.auto_detect_keys)
         browse_key_btn.clicked.connect(self.browse_vendor_key)
         browse_cert_btn.clicked.connect(self.browse_vendor_cert)
-        self.refresh_disks()
         self.install_thread = None
         self.erase_thread = None
-        
-        # Auto-detect keys on startup
-        self.auto_detect_keys()
+        self.batch_thread = None
+        self.verify_thread = None
+        self.active_disk_key = None
 
         # Set up keyboard shortcuts
         self.refresh_button.setShortcut("Ctrl+R")
@@ -551,6 +832,33 @@ class DashboardTab(QWidget):
         self.config_button.setToolTip("Configure Ventoy settings")
         self.erase_button.setToolTip("Completely erase USB drive")
 
+    def start_background(self):
+        """Start device probing and monitoring, once the window has been painted"""
+        self.startup_thread = StartupProbeThread(self.hotplug_monitor)
+        self.startup_thread.disks_signal.connect(self.on_startup_disks)
+        self.startup_thread.hotplug_signal.connect(self.on_hotplug_started)
+        # Auto-detect keys on startup, without the result dialogs
+        self.startup_thread.keys_signal.connect(lambda key_path, cert_path, owner_guid: self.show_detected_keys(key_path, cert_path, owner_guid, quiet=True))
+        self.startup_thread.start()
+
+    def on_startup_disks(self, disks):
+        self.refresh_disks(disks=disks)
+        self.ready.emit()
+
+    def on_hotplug_started(self, started):
+        if started:
+            app = QApplication.instance()
+            if app:
+                app.aboutToQuit.connect(self.hotplug_monitor.stop)
+        else:
+            self.refresh_timer.start(5000)  # Refresh every 5 seconds
+
+    def on_hotplug_failed(self, error):
+        """The hotplug monitor stopped; fall back to polling"""
+        self.append_log(f"⚠️ Hotplug events stopped ({error}), polling for drives instead", "warning")
+        self.refresh_timer.start(5000)
+        self.auto_refresh_disks()
+
     def toggle_efi_signing(self, checked):
         self.efi_signing_widget.setVisible(checked)
 
@@ -560,7 +868,14 @@ class DashboardTab(QWidget):
             # Detect keys and certificates
             key_path, cert_path = detect_system_keys()
             owner_guid = get_machine_owner_guid()
-            
+        except Exception as e:
+            QMessageBox.critical(self, "Detection Error", f"Error during auto-detection: {str(e)}")
+            return
+        self.show_detected_keys(key_path, cert_path, owner_guid)
+
+    def show_detected_keys(self, key_path, cert_path, owner_guid, quiet=False):
+        """Fill in the signing fields from detected keys; quiet skips the result dialog"""
+        try:
             # Update fields with detected values
             if key_path:
                 self.vendor_key_path_edit.setText(key_path)
@@ -581,6 +896,8 @@ class DashboardTab(QWidget):
                 self.owner_guid_edit.setPlaceholderText("Optional: Custom GUID (leave empty if not needed)")
                 
             # Show status message
+            if quiet:
+                return
             if key_path and cert_path:
                 QMessageBox.information(self, "Auto-Detection Complete", 
                                       f"Found system keys:\nKey: {os.path.basename(key_path)}\nCertificate: {os.path.basename(cert_path)}\n\nNote: These are optional - you can clear them to use Ventoy's built-in signing.")
@@ -592,7 +909,8 @@ class DashboardTab(QWidget):
                                       "No custom secure boot keys detected.\n\nVentoy will use its built-in secure boot support, or you can browse for custom keys if needed.")
                                       
         except Exception as e:
-            QMessageBox.critical(self, "Detection Error", f"Error during auto-detection: {str(e)}")
+            if not quiet:
+                QMessageBox.critical(self, "Detection Error", f"Error during auto-detection: {str(e)}")
 
     def browse_vendor_key(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Vendor Key File", "", "Key Files (*.key *.pem);;All Files (*)")
@@ -604,42 +922,42 @@ class DashboardTab(QWidget):
         if file_path:
             self.vendor_cert_path_edit.setText(file_path)
 
-    def refresh_disks(self):
-        self.disk_list.clear()
-        self.disks = list_usb_disks()
-        for i, d in enumerate(self.disks):
-            # Enhanced disk information display
-            status_icon = "🟢" if d.get('mounted', False) else "⚪"
-            disk_info = f"{status_icon} {d['name']} | {d['model']} | {d['size']}"
-            if 'filesystem' in d and d['filesystem']:
-                disk_info += f" | {d['filesystem']}"
-            self.disk_list.addItem(disk_info)
-        
-        self.install_button.setEnabled(False)
-        self.config_button.setEnabled(False)
+    def refresh_disks(self, quiet=False, disks=None):
+        """Update the disk list in place; quiet refreshes only log when drives come or go"""
+        added, removed = self.disk_model.update_disks(list_usb_disks() if disks is None else disks)
+        count = self.disk_model.rowCount()
+        if self.selected_disk() is None:
+            self.on_disk_selected(-1)
         
+        if quiet and not added and not removed:
+            return
         # Show status message in log
-        if len(self.disks) == 0:
+        if count == 0:
             self.append_log("🔍 No USB drives detected. Please connect a USB drive.", "warning")
         else:
-            self.append_log(f"📱 Found {len(self.disks)} USB drive(s). Select one to continue.", "info")
+            self.append_log(f"📱 Found {count} USB drive(s). Select one to continue.", "info")
+
+    def selected_disk(self):
+        """Return the disk dict for the current row, or None"""
+        return self.disk_model.disk(self.disk_list.currentIndex().row())
 
     def on_disk_selected(self, idx):
         enabled = idx >= 0
         self.install_button.setEnabled(enabled)
         self.config_button.setEnabled(enabled)
         self.erase_button.setEnabled(enabled)
+        self.verify_isos_button.setEnabled(enabled)
         # Show erase options when a disk is selected
         self.erase_options_widget.setVisible(enabled)
 
     def install_ventoy(self):
-        idx = self.disk_list.currentRow()
-        if idx < 0:
+        disk = self.selected_disk()
+        if disk is None:
             return
-        disk = self.disks[idx]
         secureboot = self.secure_boot_checkbox.isChecked()
         use_gpt = self.gpt_radio.isChecked()
         preserve_space = self.preserve_space_checkbox.isChecked()
+        reserve_mb = self.reserve_size_spin.value() if preserve_space else 0
         upgrade_mode = self.upgrade_mode_checkbox.isChecked()
         sign_efi = self.sign_efi_checkbox.isChecked()
         
@@ -678,7 +996,7 @@ class DashboardTab(QWidget):
         else:
             efi_status = "Disabled"
         
-        options = f"Mode: {install_mode}\nPartition Style: {partition_style}\nSecure Boot: {'Enabled' if secureboot else 'Disabled'}\nPreserve Space: {'Yes' if preserve_space else 'No'}\nEFI Signing: {efi_status}"
+        options = f"Mode: {install_mode}\nPartition Style: {partition_style}\nSecure Boot: {'Enabled' if secureboot else 'Disabled'}\nPreserve Space: {f'{reserve_mb} MB' if preserve_space else 'No'}\nEFI Signing: {efi_status}\nVerify: {'Yes' if self.verify_checkbox.isChecked() else 'No'}"
         
         warning_text = "All data on the disk will be lost!" if not upgrade_mode else "Existing data in ISO folder will be preserved."
         
@@ -690,75 +1008,187 @@ class DashboardTab(QWidget):
             self.config_button.setEnabled(False)
             
             # Show progress bar and log
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setRange(0, 0)  # Indeterminate progress
+            self.start_progress()
             
-            self.log_view.clear()
-            # Show log view when operation starts
-            if not self.log_view.isVisible():
-                self.toggle_log_view()
-            self.log_view.append("🎯 INSTALLATION MODE: All operations will be completed efficiently!")
-            self.log_view.append("=" * 70)
+            self.begin_log('install', "🎯 INSTALLATION MODE: All operations will be completed efficiently!")
+            self.release_mounts(disk['name'])
             
-            self.install_thread = InstallThread(disk['name'], secureboot, use_gpt, preserve_space, sign_efi, owner_guid, vendor_key, vendor_cert, upgrade_mode)
-            self.install_thread.log_signal.connect(lambda text: self.append_log(text, "info"))
+            self.active_disk_key = disk['key']
+            self.disk_model.set_state(disk['key'], "🔄 Installing...")
+            self.install_thread = InstallThread(disk['name'], secureboot, use_gpt, reserve_mb, sign_efi, owner_guid, vendor_key, vendor_cert, upgrade_mode, self.verify_checkbox.isChecked(), log_pipe=self.log_pipe)
+            self.install_thread.progress_signal.connect(self.on_progress_line)
             self.install_thread.done_signal.connect(self.install_done)
             self.install_thread.start()
 
+    def batch_install(self):
+        """Install/upgrade Ventoy on every selected drive as core.jobs install jobs"""
+        rows = sorted(index.row() for index in self.disk_list.selectionModel().selectedRows())
+        disks = [self.disk_model.disk(row) for row in rows]
+        if not disks:
+            QMessageBox.information(self, "Batch Install", "Select one or more drives first (Ctrl/Shift-click).")
+            return
+        upgrade_mode = self.upgrade_mode_checkbox.isChecked()
+        reserve_mb = self.reserve_size_spin.value() if self.preserve_space_checkbox.isChecked() else 0
+        jobs = self.batch_jobs_spin.value()
+        drive_list = "\n".join(f"• /dev/{d['name']} ({d['model']}, {d['size']})" for d in disks)
+        warning_text = "All data on these disks will be lost!" if not upgrade_mode else "Existing data in ISO folders will be preserved."
+        vendor_key = vendor_cert = ""
+        if self.sign_efi_checkbox.isChecked():
+            vendor_key = self.vendor_key_path_edit.text().strip()
+            vendor_cert = self.vendor_cert_path_edit.text().strip()
+            if not (os.path.exists(vendor_key) and os.path.exists(vendor_cert)):
+                vendor_key = vendor_cert = ""
+        note = "\n\nEFI files are signed once with your keys and written to every drive." if vendor_key else ""
+        reply = QMessageBox.question(self, "Confirm Batch Install",
+            f"{'Upgrade' if upgrade_mode else 'Install'} Ventoy on {len(disks)} drive(s), {jobs} at a time?\n\n{drive_list}\n\n{warning_text}{note}",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        for button in (self.install_button, self.erase_button, self.refresh_button, self.config_button, self.batch_button):
+            button.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 100 * len(disks))
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setVisible(True)
+        self.batch_percent = {}
+        self.begin_log('batch', f"⚡ BATCH MODE: {len(disks)} drive(s), up to {jobs} in parallel")
+        
+        for d in disks:
+            self.release_mounts(d['name'])
+            self.disk_model.set_state(d['key'], "⏳ Queued")
+        self.batch_thread = BatchInstallThread([f"/dev/{d['name']}" for d in disks], self.secure_boot_checkbox.isChecked(),
+                                               self.gpt_radio.isChecked(), reserve_mb, upgrade_mode, jobs,
+                                               self.verify_checkbox.isChecked(), vendor_key, vendor_cert,
+                                               log_pipe=self.log_pipe)
+        self.batch_thread.status_signal.connect(self.on_batch_status)
+        self.batch_thread.done_signal.connect(self.batch_done)
+        self.batch_thread.start()
+
+    def on_batch_status(self, target, state, percent, message):
+        """Show per-drive batch progress in the disk list and the overall progress bar"""
+        name = os.path.basename(target)
+        row = next((r for r in range(self.disk_model.rowCount()) if self.disk_model.disk(r)['name'] == name), -1)
+        if row >= 0:
+            key = self.disk_model.disk(row)['key']
+            labels = {'queued': "⏳ Queued", 'running': f"🔄 {percent}%", 'done': "✅ Installed", 'failed': f"❌ {message}",
+                      'cancelled': "⏹ Cancelled"}
+            self.disk_model.set_state(key, labels.get(state, state))
+        self.batch_percent[target] = 100 if state in JOB_FINISHED else percent
+        self.progress_bar.setValue(sum(self.batch_percent.values()))
+        if state in JOB_FINISHED:
+            self.append_log(f"{'✅' if state == 'done' else '❌'} {target}: {message}", "success" if state == 'done' else "error")
+
+    def batch_done(self, success, message):
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        for button in (self.install_button, self.erase_button, self.refresh_button, self.config_button, self.batch_button):
+            button.setEnabled(True)
+        if success:
+            self.append_log("✅ SUCCESS: Batch completed on all drives", "success")
+        else:
+            self.append_log(f"❌ FAILED: Batch finished with errors ({message})", "error")
+        self.end_log()
+        self.refresh_disks(quiet=True)
+
+    def verify_isos(self):
+        """Verify the images on the selected drive's data partition against their checksum files"""
+        disk = self.selected_disk()
+        if disk is None or (self.verify_thread and self.verify_thread.isRunning()):
+            return
+        part = data_partition(disk)
+        if part is None:
+            QMessageBox.information(self, "Verify ISOs", f"/dev/{disk['name']} has no Ventoy data partition.")
+            return
+        self.verify_isos_button.setEnabled(False)
+        self.start_progress()
+        self.begin_log('verify', f"🔍 CHECKSUM VERIFICATION: images on /dev/{part['name']}")
+        self.active_disk_key = disk['key']
+        self.disk_model.set_state(disk['key'], "🔍 Verifying...")
+        self.verify_thread = VerifyThread(IsoLibrary(part.get('uuid') or disk['key']), f"/dev/{part['name']}", log_pipe=self.log_pipe)
+        self.verify_thread.progress_signal.connect(self.on_progress_line)
+        self.verify_thread.done_signal.connect(self.verify_done)
+        self.verify_thread.start()
+
+    def verify_done(self, success, summary):
+        self.stop_progress()
+        self.verify_isos_button.setEnabled(self.selected_disk() is not None)
+        self.disk_model.set_state(self.active_disk_key, "✅ Checksums OK" if success else "❌ Checksum errors")
+        self.append_log("=" * 70, "success" if success else "error")
+        self.end_log()
+        if not success:
+            QMessageBox.warning(self, "Verification Failed", f"❌ Some images did not verify.\n\n{summary}\n\nCheck the log for details.")
+
     def configure_ventoy(self):
-        idx = self.disk_list.currentRow()
-        if idx < 0:
+        disk = self.selected_disk()
+        if disk is None:
             return
-        disk = self.disks[idx]
         QMessageBox.information(self, "Configure Ventoy", f"Ventoy configuration for /dev/{disk['name']} will be available in the Plugson tab.\n\nYou can also manually edit files on the Ventoy partition after installation.")
 
     def append_log(self, text, log_type="info"):
-        """Append colored log messages based on type"""
-        if text.strip():  # Only append non-empty lines
-            # Add color coding based on log type
-            if log_type == "error" or "❌" in text or "FAILED" in text or "Error:" in text:
-                colored_text = f'<span style="color: #ff6b6b;">{text.strip()}</span>'
-            elif log_type == "warning" or "⚠️" in text or "WARNING" in text or "Warning:" in text:
-                colored_text = f'<span style="color: #ffa726;">{text.strip()}</span>'
-            elif log_type == "success" or "✅" in text or "SUCCESS" in text or "completed" in text.lower():
-                colored_text = f'<span style="color: #4caf50;">{text.strip()}</span>'
-            elif "📱" in text or "📤" in text:
-                colored_text = f'<span style="color: #29b6f6;">{text.strip()}</span>'
-            else:
-                colored_text = text.strip()
-            
-            self.log_view.append(colored_text)
-            # Auto-scroll to bottom
-            cursor = self.log_view.textCursor()
-            cursor.movePosition(cursor.MoveOperation.End)
-            self.log_view.setTextCursor(cursor)
+        """Append a colored log message; flushes first so it lands after pending worker output"""
+        self.log_pipe.write(text, log_type)
+        self.flush_log()
+
+    def flush_log(self):
+        self.log_view.append_lines(self.log_pipe.drain())
+
+    def begin_log(self, name, banner):
+        """Start a fresh log for an operation, mirrored to a file under the user state directory"""
+        self.flush_log()
+        self.log_pipe.close()
+        try:
+            self.log_pipe = LogPipe(new_log_path(name))
+        except OSError:
+            self.log_pipe = LogPipe()
+        self.log_view.clear()
+        # Show log view when operation starts
+        if not self.log_view.isVisible():
+            self.toggle_log_view()
+        self.append_log(banner)
+        self.append_log("=" * 70)
+        self.log_flush_timer.start()
+
+    def release_mounts(self, disk_name):
+        """Drop the GUI's own idle mounts of a disk before the privileged script takes it over"""
+        busy = get_mount_manager().release_disk(disk_name)
+        if busy:
+            self.append_log(f"⚠️ Still mounted by Ventoy-X: {', '.join(busy)}", "warning")
+
+    def end_log(self):
+        self.log_flush_timer.stop()
+        self.flush_log()
+        if self.log_pipe.path:
+            self.append_log(f"📄 Full log ({self.log_pipe.lines_written} lines): {self.log_pipe.path}")
+        self.log_pipe.close()
 
     def install_done(self, success, output):
-        self.progress_bar.setVisible(False)
+        self.stop_progress()
         self.install_button.setText("🚀 Install/Update Ventoy")
         self.install_button.setEnabled(True)
         self.refresh_button.setEnabled(True)
         self.config_button.setEnabled(True)
         self.erase_button.setEnabled(True)
         
+        self.disk_model.set_state(self.active_disk_key, "✅ Installed" if success else "❌ Install failed")
         if success:
             self.append_log("=" * 70, "success")
             self.append_log("✅ SUCCESS: All operations completed successfully!", "success")
+            self.end_log()
             QMessageBox.information(self, "Success", "✅ Ventoy installed/updated successfully!\n\n🎯 Operation completed:\n• Installation/upgrade\n• EFI signing (if enabled)\n• Directory creation\n• All steps finished!")
             self.refresh_disks()
         else:
             self.append_log("=" * 70, "error")
             self.append_log("❌ FAILED: Installation encountered errors", "error")
+            self.end_log()
             QMessageBox.critical(self, "Error", "❌ Failed to install/update Ventoy.\nCheck the log for details.")
-        
-        self.install_thread = None
 
     def erase_usb(self):
         """Erase the selected USB drive"""
-        idx = self.disk_list.currentRow()
-        if idx < 0:
+        disk = self.selected_disk()
+        if disk is None:
             return
-        disk = self.disks[idx]
         secure_erase = self.secure_erase_checkbox.isChecked()
         
         erase_type = "Secure erase (with random data overwrite)" if secure_erase else "Quick erase (partition table only)"
@@ -791,34 +1221,32 @@ class DashboardTab(QWidget):
             self.config_button.setEnabled(False)
             
             # Show progress bar and log
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setRange(0, 0)  # Indeterminate progress
+            self.start_progress()
             
-            self.log_view.clear()
-            # Show log view when operation starts
-            if not self.log_view.isVisible():
-                self.toggle_log_view()
-            self.log_view.append("🗑️ USB ERASE MODE: Complete drive wipe operation!")
-            self.log_view.append("=" * 70)
+            self.begin_log('erase', "🗑️ USB ERASE MODE: Complete drive wipe operation!")
+            self.release_mounts(disk['name'])
             
-            self.erase_thread = EraseThread(disk['name'], secure_erase)
-            self.erase_thread.log_signal.connect(lambda text: self.append_log(text, "warning"))
+            self.active_disk_key = disk['key']
+            self.disk_model.set_state(disk['key'], "🔄 Erasing...")
+            self.erase_thread = EraseThread(disk['name'], secure_erase, self.verify_checkbox.isChecked(), log_pipe=self.log_pipe)
+            self.erase_thread.progress_signal.connect(self.on_progress_line)
             self.erase_thread.done_signal.connect(self.erase_done)
             self.erase_thread.start()
-            self.erase_thread.start()
 
     def erase_done(self, success, output):
         """Handle completion of USB erase operation"""
-        self.progress_bar.setVisible(False)
+        self.stop_progress()
         self.erase_button.setText("🗑️ Erase USB Drive")
         self.erase_button.setEnabled(True)
         self.install_button.setEnabled(True)
         self.refresh_button.setEnabled(True)
         self.config_button.setEnabled(True)
         
+        self.disk_model.set_state(self.active_disk_key, "✅ Erased" if success else "❌ Erase failed")
         if success:
             self.append_log("=" * 70, "success")
             self.append_log("✅ SUCCESS: USB drive erased successfully!", "success")
+            self.end_log()
             QMessageBox.information(self, "Erase Complete", 
                 "✅ USB drive erased successfully!\n\n"
                 "The drive is now completely clean and ready for:\n"
@@ -830,12 +1258,94 @@ class DashboardTab(QWidget):
         else:
             self.append_log("=" * 70, "error")
             self.append_log("❌ FAILED: Erase operation encountered errors", "error")
+            self.end_log()
             QMessageBox.critical(self, "Erase Failed", 
                 "❌ Failed to erase USB drive.\n"
                 "Check the log for details.\n\n"
                 "The drive may still be partially usable,\n"
                 "but the erase operation was not completed.")
 
+    def start_progress(self):
+        """Show the progress bar (busy until the worker reports numbers) and start tracking"""
+        self.progress_tracker = ProgressTracker()
+        self.stall_reported = False
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.progress_label.setText("Starting...")
+        self.progress_label.setVisible(True)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setVisible(True)
+        self.progress_timer.start()
+
+    def on_progress_line(self, line):
+        """Feed a progress/step line from the worker into the tracker"""
+        if not self.progress_tracker:
+            return
+        finished_steps = len(self.progress_tracker.steps)
+        self.progress_tracker.feed(line)
+        for name, seconds in self.progress_tracker.steps[finished_steps:]:
+            self.append_log(f"⏱️ {name}: {format_duration(seconds)}")
+        self.update_progress_display()
+
+    def update_progress_display(self):
+        """Render percent, size, MB/s, ETA and stall state from the tracker"""
+        if not self.progress_tracker:
+            return
+        snap = self.progress_tracker.snapshot()
+        percent = snap['percent'] if snap['percent'] is not None else snap['overall']
+        if percent is None:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(percent * 10))
+        
+        parts = [snap['step'] or "Working"]
+        if snap['total']:
+            parts.append(f"{format_size(snap['done'])} of {format_size(snap['total'])}")
+        elif snap['done']:
+            parts.append(format_size(snap['done']))
+        if snap['rate'] is not None:
+            parts.append(format_rate(snap['rate']))
+        if snap['eta'] is not None:
+            parts.append(f"ETA {format_duration(snap['eta'])}")
+        parts.append(f"elapsed {format_duration(snap['step_elapsed'])}")
+        text = " · ".join(parts)
+        
+        if snap['stalled']:
+            text += f"\n⚠️ No progress for {format_duration(snap['stalled_for'])} - the drive may have stalled or been disconnected"
+            self.progress_label.setStyleSheet("color: #ffa726;")
+            if not self.stall_reported:
+                self.stall_reported = True
+                self.append_log(f"⚠️ WARNING: no write progress for {format_duration(snap['stalled_for'])} during '{snap['step']}'", "warning")
+        else:
+            self.progress_label.setStyleSheet("")
+            self.stall_reported = False
+        self.progress_label.setText(text)
+
+    def stop_progress(self):
+        """Hide the progress widgets and log the timing of the last step"""
+        self.progress_timer.stop()
+        if self.progress_tracker:
+            finished_steps = len(self.progress_tracker.steps)
+            for name, seconds in self.progress_tracker.finish()[finished_steps:]:
+                self.append_log(f"⏱️ {name}: {format_duration(seconds)}")
+            self.progress_tracker = None
+        self.progress_bar.setVisible(False)
+        self.progress_label.setVisible(False)
+        self.cancel_button.setVisible(False)
+
+    def running_jobs(self):
+        """Dashboard job threads that have not finished yet"""
+        threads = (self.install_thread, self.erase_thread, self.batch_thread, self.verify_thread)
+        return [thread for thread in threads if thread and thread.isRunning()]
+
+    def cancel_operation(self):
+        """Ask the running jobs to stop; they report back as cancelled once cleaned up"""
+        self.cancel_button.setEnabled(False)
+        self.append_log("⏹ Cancelling...", "warning")
+        for thread in self.running_jobs():
+            thread.cancel()
+
     def toggle_log_view(self):
         """Toggle the visibility of the install log"""
         if self.log_view.isVisible():
@@ -845,19 +1355,32 @@ class DashboardTab(QWidget):
             self.log_view.show()
             self.log_toggle_button.setText("Hide Log")
     
+    def on_hotplug_event(self, action, name, devtype):
+        """Schedule a disk refresh for block device add/remove/change events"""
+        if action in ('add', 'remove', 'change'):
+            get_inventory().invalidate(name)
+            self.hotplug_refresh_timer.start()
+        elif action == 'rescan':
+            # The kernel dropped events, so any drive may have changed
+            get_inventory().invalidate()
+            self.hotplug_refresh_timer.start()
+
     def auto_refresh_disks(self):
-        """Auto-refresh disk list if no operations are running"""
-        if not self.install_thread and not self.erase_thread:
-            old_disk_count = len(self.disks) if hasattr(self, 'disks') else 0
-            self.refresh_disks()
-            new_disk_count = len(self.disks)
-            
-            # Only show notification if disks changed
-            if old_disk_count != new_disk_count:
-                if new_disk_count > old_disk_count:
-                    self.append_log(f"📱 USB device detected - {new_disk_count - old_disk_count} new disk(s) found")
-                elif new_disk_count < old_disk_count:
-                    self.append_log(f"📤 USB device removed - {old_disk_count - new_disk_count} disk(s) disconnected")
+        """Auto-refresh disk list, deferred while operations are running"""
+        if self.running_jobs():
+            self.deferred_refresh_timer.start()
+            return
+        self.deferred_refresh_timer.stop()
+        old_disk_count = self.disk_model.rowCount()
+        self.refresh_disks(quiet=True)
+        new_disk_count = self.disk_model.rowCount()
+        
+        # Only show notification if disks changed
+        if old_disk_count != new_disk_count:
+            if new_disk_count > old_disk_count:
+                self.append_log(f"📱 USB device detected - {new_disk_count - old_disk_count} new disk(s) found")
+            elif new_disk_count < old_disk_count:
+                self.append_log(f"📤 USB device removed - {old_disk_count - new_disk_count} disk(s) disconnected")
 
 class PlugsonTab(QWidget):
     def __init__(self):
@@ -939,10 +1462,265 @@ class PlugsonTab(QWidget):
         else:
             QMessageBox.critical(self, "Error", "Failed to save plugin settings.")
 
+class IsoLibraryTab(QWidget):
+    """Images on a Ventoy drive, listed from the index first and then rescanned in the background"""
+
+    def __init__(self):
+        super().__init__()
+        self.scan_thread = None
+        self.copy_thread = None
+        self.copy_summary = ""
+        self.library = None
+        self.pending_rescan = False
+        layout = QVBoxLayout()
+        
+        drive_layout = QHBoxLayout()
+        drive_layout.addWidget(QLabel("Ventoy Drive:"))
+        self.drive_combo = QComboBox()
+        self.rescan_button = QPushButton("Rescan")
+        self.rescan_button.setToolTip("Look for new or changed images on the drive")
+        drive_layout.addWidget(self.drive_combo, 1)
+        drive_layout.addWidget(self.rescan_button)
+        layout.addLayout(drive_layout)
+        
+        self.iso_model = IsoTableModel(self)
+        self.iso_table = QTableView()
+        self.iso_table.setModel(self.iso_model)
+        self.iso_table.setSortingEnabled(False)
+        self.iso_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.iso_table.verticalHeader().setVisible(False)
+        self.iso_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.iso_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.iso_table)
+        
+        copy_layout = QHBoxLayout()
+        self.add_button = QPushButton("➕ Add ISOs...")
+        self.add_button.setToolTip("Copy images onto the drive.\nAn interrupted copy continues where it stopped when the same files are added again.")
+        self.plan_button = QPushButton("🗂️ Plan Across Drives...")
+        self.plan_button.setToolTip("Spread a set of images over all the Ventoy drives listed above, balancing how full they get,\nthen copy them as planned")
+        self.persistence_button = QPushButton("💾 Persistence Image...")
+        self.persistence_button.setToolTip("Create persistence images for live distros")
+        self.copy_jobs_spin = QSpinBox()
+        self.copy_jobs_spin.setRange(1, 8)
+        self.copy_jobs_spin.setValue(COPY_JOBS)
+        self.copy_jobs_spin.setToolTip("Number of files copied to each drive at the same time")
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setVisible(False)
+        self.cancel_copy_button = QPushButton("Stop")
+        self.cancel_copy_button.setVisible(False)
+        copy_layout.addWidget(self.add_button)
+        copy_layout.addWidget(self.plan_button)
+        copy_layout.addWidget(self.persistence_button)
+        copy_layout.addWidget(QLabel("Parallel copies:"))
+        copy_layout.addWidget(self.copy_jobs_spin)
+        copy_layout.addStretch()
+        copy_layout.addWidget(self.pause_button)
+        copy_layout.addWidget(self.cancel_copy_button)
+        layout.addLayout(copy_layout)
+        
+        self.copy_progress_bar = QProgressBar()
+        self.copy_progress_bar.setRange(0, 1000)
+        self.copy_progress_bar.setVisible(False)
+        layout.addWidget(self.copy_progress_bar)
+        
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+        
+        self.drive_combo.currentIndexChanged.connect(self.on_drive_selected)
+        self.rescan_button.clicked.connect(self.rescan)
+        self.add_button.clicked.connect(self.add_isos)
+        self.plan_button.clicked.connect(self.plan_isos)
+        self.persistence_button.clicked.connect(self.create_persistence)
+        self.pause_button.clicked.connect(self.toggle_copy_pause)
+        self.cancel_copy_button.clicked.connect(self.cancel_copy)
+        self.refresh_drives()
+
+    def refresh_drives(self):
+        self.drive_combo.blockSignals(True)
+        self.drive_combo.clear()
+        for disk in list_usb_disks():
+            part = data_partition(disk)
+            if part:
+                self.drive_combo.addItem(f"{disk['name']} | {disk['model']} | {disk['size']}", (disk, part))
+        self.drive_combo.blockSignals(False)
+        if self.drive_combo.count():
+            self.on_drive_selected(self.drive_combo.currentIndex())
+        else:
+            self.iso_model.set_images([])
+            self.status_label.setText("No Ventoy drive detected.")
+
+    def on_drive_selected(self, idx):
+        data = self.drive_combo.itemData(idx)
+        if not data:
+            return
+        disk, part = data
+        self.library = IsoLibrary(part.get('uuid') or disk['key'])
+        # What the last scan found is shown right away; the rescan only probes changed files
+        images = self.library.images()
+        self.iso_model.set_images(images)
+        self.status_label.setText(f"{len(images)} image(s) from the last scan, checking the drive...")
+        self.rescan()
+
+    def rescan(self):
+        data = self.drive_combo.currentData()
+        if not data:
+            self.refresh_drives()
+            return
+        if self.scan_thread and self.scan_thread.isRunning():
+            # Another drive was selected while one is being scanned
+            self.pending_rescan = True
+            return
+        disk, part = data
+        self.rescan_button.setEnabled(False)
+        self.scan_thread = IsoScanThread(self.library, f"/dev/{part['name']}")
+        self.scan_thread.done_signal.connect(self.scan_done)
+        self.scan_thread.finished.connect(self.scan_finished)
+        self.scan_thread.start()
+
+    def scan_finished(self):
+        self.rescan_button.setEnabled(True)
+        if self.pending_rescan:
+            self.pending_rescan = False
+            self.rescan()
+
+    def scan_done(self, images, probed, removed, error):
+        if self.scan_thread.library is not self.library:
+            return
+        if error:
+            self.status_label.setText(f"Could not scan the drive: {error}")
+            return
+        self.iso_model.set_images(images)
+        total = sum(image.size for image in images)
+        self.status_label.setText(f"{len(images)} image(s), {format_size(total)} — {probed} new or changed, {removed} removed{self.copy_summary}")
+        self.copy_summary = ""
+
+    def add_isos(self):
+        data = self.drive_combo.currentData()
+        if not data or (self.copy_thread and self.copy_thread.isRunning()):
+            return
+        patterns = " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS)
+        sources, _ = QFileDialog.getOpenFileNames(self, "Add ISOs", os.path.expanduser("~"), f"Boot Images ({patterns});;All Files (*)")
+        if not sources:
+            return
+        disk, part = data
+        self.start_copy([(f"/dev/{part['name']}", sources)], f"Copying {len(sources)} file(s) to {disk['name']}...")
+
+    def plan_isos(self):
+        """Spread a set of images over all the Ventoy drives, then copy them as planned"""
+        drives = [self.drive_combo.itemData(i) for i in range(self.drive_combo.count())]
+        if not drives or (self.copy_thread and self.copy_thread.isRunning()):
+            return
+        patterns = " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS)
+        sources, _ = QFileDialog.getOpenFileNames(self, "Plan ISOs Across Drives", os.path.expanduser("~"), f"Boot Images ({patterns});;All Files (*)")
+        if not sources:
+            return
+        self.plan_request = (drives, sources)
+        self.add_button.setEnabled(False)
+        self.plan_button.setEnabled(False)
+        self.status_label.setText(f"Measuring free space on {len(drives)} drive(s)...")
+        self.space_thread = FreeSpaceThread([f"/dev/{part['name']}" for disk, part in drives])
+        self.space_thread.done_signal.connect(self.plan_measured)
+        self.space_thread.start()
+
+    def plan_measured(self, space, errors):
+        self.add_button.setEnabled(True)
+        self.plan_button.setEnabled(True)
+        drives, sources = self.plan_request
+        targets = [target_for_disk(disk, free=space[f"/dev/{part['name']}"][0], cluster_size=space[f"/dev/{part['name']}"][1])
+                   for disk, part in drives if f"/dev/{part['name']}" in space]
+        try:
+            result = plan_placement(items_from_paths(sources), targets)
+        except OSError as e:
+            self.status_label.setText(f"Could not plan: {e}")
+            return
+        lines = [f"{t.name}: {len(result.assignments[t.name])} image(s), {format_size(result.used(t))} of {format_size(t.capacity)} free ({result.fill(t) * 100:.0f}%)"
+                 for t in targets]
+        if result.unplaced:
+            lines.append(f"\n⚠️ Does not fit anywhere: {', '.join(os.path.basename(i.name) for i in result.unplaced)}")
+        if errors:
+            lines.append(f"\n⚠️ Skipped:\n{errors}")
+        batches = [(target.device, paths) for target, paths in result.batches()]
+        self.status_label.setText(f"Plan: {len(sources) - len(result.unplaced)} of {len(sources)} image(s) on {len(batches)} drive(s)")
+        if not batches:
+            QMessageBox.warning(self, "Copy Plan", "\n".join(lines))
+            return
+        reply = QMessageBox.question(self, "Copy Plan", "\n".join(lines) + "\n\nCopy the images as planned?", QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply == QMessageBox.Yes:
+            self.start_copy(batches, f"Copying {sum(len(paths) for _, paths in batches)} file(s) to {len(batches)} drive(s)...")
+
+    def create_persistence(self):
+        dialog = PersistenceDialog(parent=self)
+        dialog.exec()
+
+    def start_copy(self, batches, message):
+        # The spin box is per drive; drives are written to in parallel
+        engine = CopyEngine(self.copy_jobs_spin.value() * len(batches))
+        self.copy_thread = CopyThread(engine, batches)
+        self.copy_thread.progress_signal.connect(self.copy_progress)
+        self.copy_thread.done_signal.connect(self.copy_done)
+        self.add_button.setEnabled(False)
+        self.plan_button.setEnabled(False)
+        self.copy_jobs_spin.setEnabled(False)
+        self.pause_button.setText("Pause")
+        self.pause_button.setVisible(True)
+        self.cancel_copy_button.setVisible(True)
+        self.copy_progress_bar.setValue(0)
+        self.copy_progress_bar.setVisible(True)
+        self.status_label.setText(message)
+        self.copy_thread.start()
+
+    def toggle_copy_pause(self):
+        engine = self.copy_thread.engine
+        if engine.paused:
+            engine.resume()
+            self.pause_button.setText("Pause")
+        else:
+            engine.pause()
+            self.pause_button.setText("Resume")
+            self.status_label.setText("Copy paused.")
+
+    def cancel_copy(self):
+        self.copy_thread.engine.cancel()
+        self.cancel_copy_button.setEnabled(False)
+
+    def copy_progress(self, done, total, rate):
+        if total:
+            self.copy_progress_bar.setValue(int(done * 1000 / total))
+        if not self.copy_thread.engine.paused:
+            self.status_label.setText(f"Copying: {format_size(done)} of {format_size(total)} · {format_rate(rate)}")
+
+    def copy_done(self, copied, rate, failed, cancelled, error):
+        self.add_button.setEnabled(True)
+        self.plan_button.setEnabled(True)
+        self.copy_jobs_spin.setEnabled(True)
+        self.pause_button.setVisible(False)
+        self.cancel_copy_button.setVisible(False)
+        self.cancel_copy_button.setEnabled(True)
+        self.copy_progress_bar.setVisible(False)
+        self.copy_thread = None
+        if error:
+            self.status_label.setText(f"Could not copy: {error}")
+            QMessageBox.critical(self, "Copy Failed", f"❌ {error}")
+            return
+        summary = f"{format_size(copied)} copied at {format_rate(rate)}"
+        if cancelled:
+            self.copy_summary = f"\nCopy stopped after {summary}. Add the same files again to continue where it stopped."
+        elif failed:
+            self.copy_summary = f"\n{summary}; {len(failed)} file(s) failed."
+            QMessageBox.warning(self, "Copy Incomplete", "These files could not be copied:\n\n" + "\n".join(failed))
+        else:
+            self.copy_summary = f"\n✅ {summary}."
+        self.status_label.setText(self.copy_summary.strip())
+        self.rescan()
+
 class SettingsTab(QWidget):
     def __init__(self, main_window=None):
         super().__init__()
         self.main_window = main_window
+        self.theme_index = ThemeIndex(mounts=get_mount_manager())
+        self.theme_scan = None
+        self.themes_folder_lease = None
         layout = QVBoxLayout()
         
         # GUI Theme section
@@ -1021,9 +1799,9 @@ class SettingsTab(QWidget):
                     QWidget { background: #232629; color: #f0f0f0; }
                     QPushButton { background: #444; color: #fff; border: 1px solid #666; padding: 5px; }
                     QPushButton:hover { background: #555; }
-                    QLineEdit, QTextEdit { background: #333; color: #fff; border: 1px solid #666; }
+                    QLineEdit, QTextEdit, QPlainTextEdit { background: #333; color: #fff; border: 1px solid #666; }
                     QComboBox { background: #333; color: #fff; border: 1px solid #666; }
-                    QListWidget { background: #333; color: #fff; border: 1px solid #666; }
+                    QListView { background: #333; color: #fff; border: 1px solid #666; }
                     QTabWidget::pane { border: 1px solid #666; }
                     QTabBar::tab { background: #444; color: #fff; padding: 5px 10px; margin-right: 2px; }
                     QTabBar::tab:selected { background: #555; }
@@ -1032,84 +1810,35 @@ class SettingsTab(QWidget):
                 self.main_window.setStyleSheet("")
     
     def refresh_ventoy_themes(self):
-        """Scan for available Ventoy themes on connected USB drives"""
+        """Scan connected USB drives for Ventoy themes in the background"""
+        if self.theme_scan and self.theme_scan.isRunning():
+            return
         self.ventoy_theme_combo.clear()
         self.ventoy_theme_combo.addItem("Default Ventoy Theme", None)
+        self.theme_info_text.setText("Scanning USB drives for themes...")
+        self.refresh_themes_btn.setEnabled(False)
         
-        # Import here to avoid circular imports
-        from core.disk import list_usb_disks
-        
-        try:
-            usb_disks = list_usb_disks()
-            themes_found = []
-            
-            for disk in usb_disks:
-                # Check both possible partition layouts
-                for partition_num in ['1', '2']:
-                    mount_point = f"/tmp/ventoy_theme_scan_{disk['name']}{partition_num}"
-                    try:
-                        import subprocess, os
-                        # Create mount point
-                        subprocess.run(['mkdir', '-p', mount_point], check=True)
-                        
-                        # Try to mount
-                        mount_result = subprocess.run(
-                            ['udisksctl', 'mount', '-b', f"/dev/{disk['name']}{partition_num}"],
-                            capture_output=True, text=True
-                        )
-                        
-                        if mount_result.returncode == 0:
-                            # Extract mount path from output
-                            for line in mount_result.stdout.split('\n'):
-                                if 'Mounted' in line and 'at' in line:
-                                    actual_mount = line.split('at')[-1].strip().rstrip('.')
-                                    break
-                            else:
-                                actual_mount = mount_point
-                            
-                            # Look for Themes directory
-                            themes_dir = os.path.join(actual_mount, 'Themes')
-                            if os.path.exists(themes_dir) and os.path.isdir(themes_dir):
-                                # Scan for theme directories
-                                for theme_name in os.listdir(themes_dir):
-                                    theme_path = os.path.join(themes_dir, theme_name)
-                                    if os.path.isdir(theme_path):
-                                        # Check if theme.txt exists
-                                        theme_file = os.path.join(theme_path, 'theme.txt')
-                                        if os.path.exists(theme_file):
-                                            theme_info = {
-                                                'name': theme_name,
-                                                'path': theme_path,
-                                                'config_file': theme_file,
-                                                'disk': disk['name']
-                                            }
-                                            themes_found.append(theme_info)
-                            
-                            # Unmount
-                            subprocess.run(['udisksctl', 'unmount', '-b', f"/dev/{disk['name']}{partition_num}"], 
-                                         capture_output=True)
-                            
-                    except Exception:
-                        pass
-                    finally:
-                        # Cleanup
-                        try:
-                            subprocess.run(['rmdir', mount_point], capture_output=True)
-                        except:
-                            pass
-            
-            # Add found themes to combo box
-            for theme in themes_found:
-                display_name = f"{theme['name']} (USB: {theme['disk']})"
-                self.ventoy_theme_combo.addItem(display_name, theme)
-                
-            if themes_found:
-                self.theme_info_text.setText(f"Found {len(themes_found)} custom theme(s)")
-            else:
-                self.theme_info_text.setText("No custom themes found. You can add themes to the Themes/ folder on your Ventoy USB drive.")
-                
-        except Exception as e:
-            self.theme_info_text.setText(f"Error scanning for themes: {str(e)}")
+        self.theme_scan = ThemeScanThread(self.theme_index)
+        self.theme_scan.themes_signal.connect(self.add_ventoy_themes)
+        self.theme_scan.done_signal.connect(self.ventoy_themes_done)
+        self.theme_scan.start()
+    
+    def add_ventoy_themes(self, themes):
+        """Add the themes found on one partition to the combo box"""
+        for theme in themes:
+            display_name = f"{theme['name']} (USB: {theme['disk']})"
+            self.ventoy_theme_combo.addItem(display_name, theme)
+    
+    def ventoy_themes_done(self, count, error):
+        self.refresh_themes_btn.setEnabled(True)
+        if error:
+            self.theme_info_text.setText(f"Error scanning for themes: {error}")
+        elif self.ventoy_theme_combo.currentData() is not None:
+            return
+        elif count:
+            self.theme_info_text.setText(f"Found {count} custom theme(s)")
+        else:
+            self.theme_info_text.setText("No custom themes found. You can add themes to the Themes/ folder on your Ventoy USB drive.")
     
     def on_ventoy_theme_selected(self):
         """Handle theme selection change"""
@@ -1119,11 +1848,13 @@ class SettingsTab(QWidget):
             self.apply_theme_btn.setEnabled(False)
         else:
             try:
-                # Read theme.txt file to show info
-                with open(current_data['config_file'], 'r') as f:
-                    theme_content = f.read()
+                # The index keeps the start of theme.txt, so the partition does not need to be mounted
+                theme_content = current_data.get('preview')
+                if theme_content is None:
+                    with open(current_data['config_file'], 'r') as f:
+                        theme_content = f.read()
                     
-                self.theme_info_text.setText(f"Theme: {current_data['name']}\nLocation: {current_data['path']}\n\nConfiguration preview:\n{theme_content[:200]}{'...' if len(theme_content) > 200 else ''}")
+                self.theme_info_text.setText(f"Theme: {current_data['name']}\nLocation: {current_data['path']} on /dev/{current_data.get('partition', current_data['disk'])}\n\nConfiguration preview:\n{theme_content[:200]}{'...' if len(theme_content) > 200 else ''}")
                 self.apply_theme_btn.setEnabled(True)
             except Exception as e:
                 self.theme_info_text.setText(f"Error reading theme configuration: {str(e)}")
@@ -1167,63 +1898,111 @@ The theme will be active on next boot from the Ventoy USB drive."""
     def open_themes_folder(self):
         """Open the Themes folder on the Ventoy USB drive"""
         try:
-            from core.disk import list_usb_disks
             import subprocess
             
             usb_disks = list_usb_disks()
             if not usb_disks:
-                from PySide6.QtWidgets import QMessageBox
                 QMessageBox.information(self, "No USB Drive", "No USB drives detected. Please connect a Ventoy USB drive.")
                 return
             
-            # For simplicity, try to open the first USB drive's Themes folder
+            # For simplicity, open the first USB drive's Themes folder
             disk = usb_disks[0]
             
-            # Try to mount and open
-            for partition_num in ['1', '2']:
+            for part in disk['partitions']:
+                if not part.get('mountpoint') and part.get('fstype') not in MOUNTABLE:
+                    continue
                 try:
-                    mount_result = subprocess.run(
-                        ['udisksctl', 'mount', '-b', f"/dev/{disk['name']}{partition_num}"],
-                        capture_output=True, text=True
-                    )
-                    
-                    if mount_result.returncode == 0:
-                        # Extract mount path
-                        for line in mount_result.stdout.split('\n'):
-                            if 'Mounted' in line and 'at' in line:
-                                mount_path = line.split('at')[-1].strip().rstrip('.')
-                                themes_path = f"{mount_path}/Themes"
-                                
-                                # Open file manager
-                                subprocess.run(['xdg-open', themes_path])
-                                return
-                                
-                except Exception:
+                    lease = get_mount_manager().lease(f"/dev/{part['name']}", read_only=False)
+                except OSError:
                     continue
+                themes_path = os.path.join(lease.path, 'Themes')
+                if not os.path.isdir(themes_path):
+                    lease.release()
+                    continue
+                # The file manager outlives this call, so the mount is held until the next open or exit
+                if self.themes_folder_lease:
+                    self.themes_folder_lease.release()
+                self.themes_folder_lease = lease
+                subprocess.Popen(['xdg-open', themes_path])
+                return
             
-            from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "Error", "Could not access Themes folder on USB drive.")
             
         except Exception as e:
-            from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "Error", f"Error opening Themes folder: {str(e)}")
 
+class LazyTab(QWidget):
+    """Placeholder that builds its real tab the first time it is shown"""
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+        self.widget = None
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    def ensure(self):
+        if self.widget is None:
+            self.widget = self.factory()
+            self.layout().addWidget(self.widget)
+        return self.widget
+
+    def showEvent(self, event):
+        self.ensure()
+        super().showEvent(event)
+
 class MainWindow(QMainWindow):
+    # Emitted once the deferred startup work (disk scan, hotplug monitor) is done
+    ready = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Ventoy-X")
         self.setWindowIcon(QIcon())
         self.resize(800, 600)
 
+        # Only the visible tab is built before the first paint; the others on first use
         tabs = QTabWidget()
-        tabs.addTab(DashboardTab(), "Dashboard")
-        tabs.addTab(PlugsonTab(), "Plugson")
-        self.settings_tab = SettingsTab(main_window=self)
+        self.dashboard_tab = DashboardTab()
+        tabs.addTab(self.dashboard_tab, "Dashboard")
+        tabs.addTab(LazyTab(PlugsonTab), "Plugson")
+        tabs.addTab(LazyTab(IsoLibraryTab), "ISO Library")
+        self.settings_tab = LazyTab(lambda: SettingsTab(main_window=self))
         tabs.addTab(self.settings_tab, "Settings")
 
         self.setCentralWidget(tabs)
+        self.started = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.started:
+            # Device I/O starts after the first frame is on screen
+            self.started = True
+            QTimer.singleShot(0, self.start_background)
+
+    def start_background(self):
+        self.dashboard_tab.ready.connect(self.ready)
+        self.dashboard_tab.start_background()
+
+def leaks_singletons():
+    """True when the Qt binding drops references to None and True (PySide6 6.12.0 on Python < 3.12)
+
+    With such a build every void call and every emit() releases a reference the
+    interpreter still owns, so the GUI aborts in bool_dealloc after a few thousand
+    progress lines whatever the signal signatures are.
+    """
+    probe = QObject()
+    none_refs, true_refs = sys.getrefcount(None), sys.getrefcount(True)
+    for _ in range(8):
+        probe.setObjectName("probe")
+        probe.objectNameChanged.emit("probe")
+    return sys.getrefcount(None) < none_refs or sys.getrefcount(True) < true_refs
 
 def main():
+    if leaks_singletons():
+        sys.stderr.write(f"ventoy-x: PySide6 {PYSIDE_VERSION} loses references to None/True on Python {sys.version.split()[0]} and would crash; install another PySide6 release or use Python 3.12+\n")
+        sys.exit(1)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
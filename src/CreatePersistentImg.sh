@@ -5,6 +5,7 @@ fstype=ext4
 label=casper-rw
 config=''
 outputfile=persistence.dat
+fillopt='--fill'
 
 print_usage() {
     echo 'Usage:  sudo ./CreatePersistentImg.sh [ -s size ] [ -t fstype ] [ -l LABEL ] [ -c CFG ] [ -e ]'
@@ -15,6 +16,7 @@ print_usage() {
     echo '   -c configfile name inside the persistence file. File content is "/ union"'
     echo '   -o outputfile name, default is persistence.dat'
     echo '   -e enable encryption, disabled by default (only few distros support this)'    
+    echo '   -a preallocate the file instead of filling it with 0xFF (much faster, but copies made with cp may be sparse)'
     echo ''
 }
 
@@ -46,6 +48,8 @@ while [ -n "$1" ]; do
     elif [ "$1" = "-o" ]; then
         shift
         outputfile=$1
+    elif [ "$1" = "-a" ]; then
+        fillopt=''
     elif [ "$1" = "-e" ]; then
         read -s -p "Encryption passphrase: " passphrase
         echo
@@ -100,7 +104,10 @@ if [ "$outputdir" != "persistence.dat" ]; then
 fi
 
 # 00->ff avoid sparse file
-dd if=/dev/zero  bs=1M count=$size | tr '\000' '\377' > "$outputfile"
+# lib/core/persistence.py does the same with large buffers (or fallocate for -a); dd+tr is the fallback
+if ! PYTHONPATH="$(dirname "$0")/../lib" python3 -m core.persistence allocate "$outputfile" $size $fillopt 2>/dev/null; then
+    dd if=/dev/zero  bs=1M count=$size | tr '\000' '\377' > "$outputfile"
+fi
 sync
 
 freeloop=$(losetup -f)
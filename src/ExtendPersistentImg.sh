@@ -103,7 +103,16 @@ fi
 
 if [ "$mode" = "Extend" ]; then
     echo "$mode dat file... (current is ${fsMB}MB, append ${size}MB, total ${total}MB)"
-    dd if=/dev/zero bs=1M count=$size status=none >> "$file"
+    # Grown in place by lib/core/persistence.py (fallocate where supported, large buffers otherwise)
+    if ! PYTHONPATH="$(dirname "$0")/../lib" python3 -m core.persistence grow "$file" $size --no-resize >/dev/null 2>&1; then
+        # A failed grow may have left part of the new space behind, so append from the original size
+        truncate "$file" -s $fsize
+        if ! dd if=/dev/zero bs=1M count=$size status=none >> "$file"; then
+            truncate "$file" -s $fsize
+            echo "Failed to extend $file, it is left at ${fsMB}MB."
+            exit 1
+        fi
+    fi
     sync
 else
     echo "$mode dat file... (current is ${fsMB}MB, reduce ${size}MB, finally ${total}MB)"
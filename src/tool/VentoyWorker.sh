@@ -24,6 +24,8 @@ print_usage() {
 SECUREBOOT="YES"
 VTNEW_LABEL='Ventoy'
 RESERVE_SIZE_MB=0
+#ESP image for partition 2; Ventoy-X points VTOY_EFI_IMAGE at a copy with the EFI files signed
+VTOY_EFI_IMG=${VTOY_EFI_IMAGE:-./ventoy/ventoy.disk.img.xz}
 while [ -n "$1" ]; do
     if [ "$1" = "-i" ]; then
         MODE="install"
@@ -330,30 +332,33 @@ if [ "$MODE" = "install" -a -z "$NONDESTRUCTIVE" ]; then
     fi
 
     vtinfo "writing data to disk ..."
-    dd status=none conv=fsync if=./boot/boot.img of=$DISK bs=1 count=446
 
     if [ -n "$VTGPT" ]; then
-        echo -en '\x22' | dd status=none of=$DISK conv=fsync bs=1 count=1 seek=92
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2014 seek=34
-        echo -en '\x23' | dd of=$DISK conv=fsync bs=1 count=1 seek=17908 status=none
+        CORE_SEEK=34; CORE_COUNT=2014
+        GPT_BOOT_PATCH="--byte 92 22 --byte 17908 23"
     else
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2047 seek=1
+        CORE_SEEK=1; CORE_COUNT=2047
+        GPT_BOOT_PATCH=""
     fi
     
     # check and umount
     check_umount_disk "$DISK"
 
-    xzcat ./ventoy/ventoy.disk.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=$VENTOY_SECTOR_NUM seek=$part2_start_sector
+    # both images in one pass with a single flush
+    vt_write_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start_sector $VENTOY_SECTOR_NUM
 
     #test UUID
     testUUIDStr=$(vtoy_gen_uuid | hexdump -C)
     vtdebug "test uuid: $testUUIDStr"
 
-    #disk uuid
-    vtoy_gen_uuid | dd status=none conv=fsync of=${DISK} seek=384 bs=1 count=16
+    #boot code, GPT boot patches, disk uuid and disk signature in one transaction
+    vt_patch_disk $DISK --copy ./boot/boot.img 0 446 $GPT_BOOT_PATCH --new-disk-uuid --new-disk-signature
 
-    #disk signature
-    vtoy_gen_uuid | dd status=none conv=fsync of=${DISK} skip=12 seek=440 bs=1 count=4
+    if ! vt_verify_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start_sector $VENTOY_SECTOR_NUM \
+            --copy ./boot/boot.img 0 440 --ignore 384 16 $GPT_BOOT_PATCH; then
+        vterr "Verification of the data written to $DISK failed."
+        exit 1
+    fi
 
     vtinfo "sync data ..."
     sync
@@ -361,7 +366,9 @@ if [ "$MODE" = "install" -a -z "$NONDESTRUCTIVE" ]; then
     vtinfo "esp partition processing ..."
 
     if [ "$SECUREBOOT" != "YES" ]; then 
-        sleep 2
+        if ! vt_wait_ready $DISK 1 2; then
+            sleep 2
+        fi
         check_umount_disk "$DISK"  
         vtoycli partresize -s $DISK $part2_start_sector
     fi
@@ -435,7 +442,9 @@ elif [ "$MODE" = "install" -a -n "$NONDESTRUCTIVE" ]; then
     else
         # check and umount
         check_umount_disk "$DISK"
-        sleep 1
+        if ! vt_wait_ready $DISK; then
+            sleep 1
+        fi
         check_umount_disk "$DISK"
     
         if [ $vtRet -eq 1 ]; then
@@ -496,24 +505,28 @@ elif [ "$MODE" = "install" -a -n "$NONDESTRUCTIVE" ]; then
 
     vtinfo "writing data to disk part2_start=$part2_start_sector ..."
     
-    dd status=none conv=fsync if=./boot/boot.img of=$DISK bs=1 count=440
-    
     if [ "$OldStyle" = "GPT" ]; then
-        echo -en '\x22' | dd status=none of=$DISK conv=fsync bs=1 count=1 seek=92        
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2014 seek=34
-        echo -en '\x23' | dd of=$DISK conv=fsync bs=1 count=1 seek=17908 status=none
+        CORE_SEEK=34; CORE_COUNT=2014
+        GPT_BOOT_PATCH="--byte 92 22 --byte 17908 23"
     else
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2047 seek=1
+        CORE_SEEK=1; CORE_COUNT=2047
+        GPT_BOOT_PATCH=""
     fi
     
-    xzcat ./ventoy/ventoy.disk.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=$VENTOY_SECTOR_NUM seek=$part2_start_sector
-    
+    vt_write_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start_sector $VENTOY_SECTOR_NUM
+
     #test UUID
     testUUIDStr=$(vtoy_gen_uuid | hexdump -C)
     vtdebug "test uuid: $testUUIDStr"
     
-    #disk uuid
-    vtoy_gen_uuid | dd status=none conv=fsync of=${DISK} seek=384 bs=1 count=16
+    #boot code, GPT boot patches and disk uuid in one transaction
+    vt_patch_disk $DISK --copy ./boot/boot.img 0 440 $GPT_BOOT_PATCH --new-disk-uuid
+
+    if ! vt_verify_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start_sector $VENTOY_SECTOR_NUM \
+            --copy ./boot/boot.img 0 440 --ignore 384 16 $GPT_BOOT_PATCH; then
+        vterr "Verification of the data written to $DISK failed."
+        exit 1
+    fi
     
     vtinfo "sync data ..."
     sync
@@ -579,49 +592,39 @@ else
 
     PART1_TYPE=$(dd if=$DISK bs=1 count=1 skip=450 status=none | hexdump -n1 -e  '1/1 "%02X"')
 
-    #reserve disk uuid
-    rm -f ./diskuuid.bin
-    dd status=none conv=fsync if=${DISK} skip=384 bs=1 count=16 of=./diskuuid.bin
-
-    dd status=none conv=fsync if=./boot/boot.img of=$DISK bs=1 count=440
-    dd status=none conv=fsync if=./diskuuid.bin of=$DISK bs=1 count=16 seek=384
-    rm -f ./diskuuid.bin
-
-    #reserve data
-    rm -f ./rsvdata.bin
-    dd status=none conv=fsync if=${DISK} skip=2040 bs=512 count=8 of=./rsvdata.bin
-
+    #core.img stops short of sector 2040, so the reserved sectors 2040-2047 are kept
     if [ "$PART1_TYPE" = "EE" ]; then
         vtdebug "This is GPT partition style ..."
-        echo -en '\x22' | dd status=none of=$DISK conv=fsync bs=1 count=1 seek=92
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2014 seek=34
-        echo -en '\x23' | dd of=$DISK conv=fsync bs=1 count=1 seek=17908 status=none
+        CORE_SEEK=34; CORE_COUNT=2006
+        GPT_BOOT_PATCH="--byte 92 22 --byte 17908 23"
+        BOOT_PATCH="$GPT_BOOT_PATCH"
     else
         vtdebug "This is MBR partition style ..."
-
-        PART1_ACTIVE=$(dd if=$DISK bs=1 count=1 skip=446 status=none | hexdump -n1 -e  '1/1 "%02X"')
-        PART2_ACTIVE=$(dd if=$DISK bs=1 count=1 skip=462 status=none | hexdump -n1 -e  '1/1 "%02X"')
-
-        vtdebug "PART1_ACTIVE=$PART1_ACTIVE  PART2_ACTIVE=$PART2_ACTIVE"
-        if [ "$PART1_ACTIVE" = "00" ] && [ "$PART2_ACTIVE" = "80" ]; then
-            vtdebug "change 1st partition active, 2nd partition inactive ..."
-            echo -en '\x80' | dd of=$DISK conv=fsync bs=1 count=1 seek=446 status=none
-            echo -en '\x00' | dd of=$DISK conv=fsync bs=1 count=1 seek=462 status=none
-        fi
-        xzcat ./boot/core.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=2047 seek=1
+        CORE_SEEK=1; CORE_COUNT=2039
+        GPT_BOOT_PATCH=""
+        #make the 1st partition active if only the 2nd one is
+        BOOT_PATCH="--move-boot-flag 2 1"
     fi
 
-    dd status=none conv=fsync if=./rsvdata.bin seek=2040 bs=512 count=8 of=${DISK}
-    rm -f ./rsvdata.bin
-
     check_umount_disk "$DISK"
     
-    xzcat ./ventoy/ventoy.disk.img.xz | dd status=none conv=fsync of=$DISK bs=512 count=$VENTOY_SECTOR_NUM seek=$part2_start
+    vt_write_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start $VENTOY_SECTOR_NUM
+
+    #new boot code around the existing disk uuid (bytes 384-399)
+    vt_patch_disk $DISK --copy ./boot/boot.img 0 384 --copy ./boot/boot.img 400 40 $BOOT_PATCH
+
+    if ! vt_verify_images $DISK ./boot/core.img.xz $CORE_SEEK $CORE_COUNT $VTOY_EFI_IMG $part2_start $VENTOY_SECTOR_NUM \
+            --copy ./boot/boot.img 0 440 --ignore 384 16 $GPT_BOOT_PATCH; then
+        vterr "Verification of the data written to $DISK failed."
+        exit 1
+    fi
     sync
 
     vtinfo "esp partition processing ..."
     if [ "$SECUREBOOT" != "YES" ]; then
-        sleep 2
+        if ! vt_wait_ready $DISK 1 2; then
+            sleep 2
+        fi
         check_umount_disk "$DISK"
         vtoycli partresize -s $DISK $part2_start
     fi
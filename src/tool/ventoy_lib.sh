@@ -50,6 +50,98 @@ vtoy_gen_uuid() {
     fi
 }
 
+#write (xz) images to disk at sector offsets: vt_write_images disk image seek count [image seek count ...]
+#uses Ventoy-X's native writer (large buffers, one flush) when VTOY_PYTHON is set,
+#with @@PROGRESS lines on stdout when VTOY_PROGRESS is set
+vt_write_images() {
+    vtdisk=$1
+    shift
+    if [ -n "$VTOY_PYTHON" ]; then
+        if $VTOY_PYTHON -m core.imagewriter ${VTOY_PROGRESS:+--progress} $vtdisk "$@"; then
+            return 0
+        fi
+        vtdebug "native image writer failed, fall back to dd"
+    fi
+    while [ -n "$1" ]; do
+        xzcat -f "$1" | dd status=none conv=fsync of=$vtdisk bs=512 count=$3 seek=$2
+        shift 3
+    done
+}
+
+#read back what was written and compare it with the sources:
+#vt_verify_images disk image seek count [image seek count ...] [--copy FILE OFFSET COUNT] [--byte OFFSET HEX] [--ignore OFFSET LENGTH]
+#only runs when VTOY_VERIFY is set; it needs Ventoy-X's native verifier (VTOY_PYTHON)
+vt_verify_images() {
+    vtdisk=$1
+    shift
+    if [ -z "$VTOY_VERIFY" ]; then
+        return 0
+    fi
+    if [ -z "$VTOY_PYTHON" ]; then
+        vtwarn "VTOY_PYTHON is not set, skip verification"
+        return 0
+    fi
+    $VTOY_PYTHON -m core.verify ${VTOY_PROGRESS:+--progress} --check-table $vtdisk "$@"
+}
+
+#patch the MBR/GPT area in one transaction: vt_patch_disk disk op [op ...]
+#ops: --copy FILE OFFSET COUNT, --byte OFFSET HEX, --type N HEX, --move-boot-flag FROM TO,
+#     --fix-gpt, --new-disk-uuid, --new-disk-signature
+vt_patch_disk() {
+    vtdisk=$1
+    shift
+    if [ -n "$VTOY_PYTHON" ]; then
+        if $VTOY_PYTHON -m core.ptable $vtdisk "$@"; then
+            return 0
+        fi
+        vtdebug "native partition table patcher failed, fall back to dd"
+    fi
+    while [ -n "$1" ]; do
+        case "$1" in
+            --copy)
+                dd status=none conv=fsync if=$2 of=$vtdisk bs=1 skip=$3 seek=$3 count=$4
+                shift 4;;
+            --byte)
+                echo -en "\x$3" | dd status=none conv=fsync of=$vtdisk bs=1 count=1 seek=$2
+                shift 3;;
+            --type)
+                echo -en "\x$3" | dd status=none conv=fsync of=$vtdisk bs=1 count=1 seek=$(expr 434 + $2 \* 16)
+                shift 3;;
+            --move-boot-flag)
+                vtFromActive=$(dd if=$vtdisk bs=1 count=1 skip=$(expr 430 + $2 \* 16) status=none | hexdump -n1 -e '1/1 "%02X"')
+                vtToActive=$(dd if=$vtdisk bs=1 count=1 skip=$(expr 430 + $3 \* 16) status=none | hexdump -n1 -e '1/1 "%02X"')
+                if [ "$vtFromActive" = "80" ] && [ "$vtToActive" = "00" ]; then
+                    echo -en '\x80' | dd of=$vtdisk conv=fsync bs=1 count=1 seek=$(expr 430 + $3 \* 16) status=none
+                    echo -en '\x00' | dd of=$vtdisk conv=fsync bs=1 count=1 seek=$(expr 430 + $2 \* 16) status=none
+                fi
+                shift 3;;
+            --fix-gpt)
+                vtoycli gpt -f $vtdisk
+                shift;;
+            --new-disk-uuid)
+                vtoy_gen_uuid | dd status=none conv=fsync of=$vtdisk seek=384 bs=1 count=16
+                shift;;
+            --new-disk-signature)
+                vtoy_gen_uuid | dd status=none conv=fsync of=$vtdisk skip=12 seek=440 bs=1 count=4
+                shift;;
+            *)
+                vtdebug "vt_patch_disk: unknown operation $1"
+                shift;;
+        esac
+    done
+}
+
+#wait until a disk and its partitions are block devices and udev has settled:
+#vt_wait_ready disk [partition number or device ...]
+#uses Ventoy-X's event-driven wait when VTOY_PYTHON is set and fails otherwise, so callers keep their
+#old fixed sleep as the fallback; VTOY_FIXED_SLEEPS=1 forces that fallback (for comparisons)
+vt_wait_ready() {
+    if [ -z "$VTOY_PYTHON" ] || [ "$VTOY_FIXED_SLEEPS" = "1" ]; then
+        return 1
+    fi
+    $VTOY_PYTHON -m core.readiness "$@"
+}
+
 check_tool_work_ok() {
     
     if echo 1 | hexdump > /dev/null; then
@@ -214,6 +306,7 @@ wait_and_create_part() {
     vPART1=$1
     vPART2=$2
     echo 'Wait for partitions $vPART1 and $vPART2 ...'
+    vt_wait_ready $vPART1 $vPART2
     for i in 0 1 2 3 4 5 6 7 8 9; do
         if ls -l $vPART1 2>/dev/null | grep -q '^b'; then
             if ls -l $vPART2 2>/dev/null | grep -q '^b'; then
@@ -311,7 +404,7 @@ format_ventoy_disk_mbr() {
             quit
 
         sync
-        echo -en '\xEF' | dd of=$DISK conv=fsync bs=1 count=1 seek=466 > /dev/null 2>&1
+        vt_patch_disk $DISK --type 2 EF > /dev/null 2>&1
     else
     vtdebug "format disk by fdisk ..."
     
@@ -341,7 +434,9 @@ EOF
    
     udevadm trigger --name-match=$DISK >/dev/null 2>&1
     partprobe >/dev/null 2>&1
-    sleep 3
+    if ! vt_wait_ready $DISK 1 2; then
+        sleep 3
+    fi
     echo "Done"
 
 
@@ -453,12 +548,14 @@ format_ventoy_disk_gpt() {
 
     sync
     
-    vtoycli gpt -f $DISK
+    vt_patch_disk $DISK --fix-gpt
     sync
 
     udevadm trigger --name-match=$DISK >/dev/null 2>&1
     partprobe >/dev/null 2>&1
-    sleep 3
+    if ! vt_wait_ready $DISK 1 2; then
+        sleep 3
+    fi
     echo "Done"
 
     echo 'Wait for partitions ...'
@@ -0,0 +1,45 @@
+import core.jobs
+from core import cli
+
+MIB = 1024 * 1024
+
+
+def image(tmp_path):
+    path = tmp_path / 'disk.img'
+    path.write_bytes(b'\x5a' * MIB)
+    return str(path)
+
+
+def test_erase_needs_confirmation(tmp_path, capsys):
+    path = image(tmp_path)
+    assert cli.main(['erase', path, '--quick']) == 2
+    assert '--yes' in capsys.readouterr().err
+    assert cli.main(['erase', path, '--pattern', 'zero', '--buffered', '--yes']) == 0
+    with open(path, 'rb') as f:
+        assert f.read() == bytes(MIB)
+
+
+def test_erase_refuses_mounted_drives(tmp_path, monkeypatch, capsys):
+    path = image(tmp_path)
+    mounts = [('/dev/sdz1', '/media/stick')]
+    monkeypatch.setattr(core.jobs, '_mounted_partitions', lambda device: mounts)
+    assert cli.main(['erase', path, '--quick', '--yes']) == 2
+    assert 'mounted partitions' in capsys.readouterr().err
+    assert cli.main(['erase', path, '--quick', '--force']) == 0
+
+    mounts.append(('/dev/sdz2', '/home'))
+    assert cli.main(['erase', path, '--quick', '--force']) == 2
+    assert 'holds /home' in capsys.readouterr().err
+
+
+def test_install_refuses_the_system_disk_before_any_job(tmp_path, monkeypatch, capsys):
+    path = image(tmp_path)
+    monkeypatch.setattr(core.jobs, '_mounted_partitions', lambda device: [('/dev/sda1', '/boot/efi'),
+                                                                          ('/dev/sda2', '/')])
+
+    def install_job(*args, **kwargs):
+        raise AssertionError('no job may start')
+    monkeypatch.setattr(core.jobs, 'install_job', install_job)
+    for argv in (['install', path], ['install', '--force', path], ['upgrade', path]):
+        assert cli.main(argv) == 2
+        assert 'holds /boot/efi' in capsys.readouterr().err
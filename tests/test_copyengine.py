@@ -0,0 +1,39 @@
+import os
+
+import core.copyengine
+from core.copyengine import CopyEngine, plan_jobs
+
+
+def make_source(tmp_path, size=3 * 1024 * 1024):
+    source = tmp_path / 'src' / 'image.iso'
+    source.parent.mkdir()
+    source.write_bytes(os.urandom(size))
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    return source, dest
+
+
+def test_copy_then_rerun_skips(tmp_path):
+    source, dest = make_source(tmp_path)
+    engine = CopyEngine(chunk_size=1024 * 1024, sync=False)
+    result = engine.copy(plan_jobs([str(source)], str(dest)))
+    assert not result.failed and result.copied == source.stat().st_size
+    assert (dest / 'image.iso').read_bytes() == source.read_bytes()
+    result = CopyEngine(sync=False).copy(plan_jobs([str(source)], str(dest)))
+    assert result.skipped == 1 and result.copied == 0
+
+
+def test_rerun_skips_within_destination_mtime_granularity(tmp_path, monkeypatch):
+    source, dest = make_source(tmp_path, 4096)
+    mtime_ns = 1700000000 * 10**9 + 1234567
+    os.utime(source, ns=(mtime_ns, mtime_ns))
+    CopyEngine(sync=False).copy(plan_jobs([str(source)], str(dest)))
+    # What FAT keeps of that mtime: whole even seconds
+    stored = mtime_ns - mtime_ns % (2 * 10**9)
+    os.utime(dest / 'image.iso', ns=(stored, stored))
+
+    monkeypatch.setattr(core.copyengine, 'filesystem_type', lambda path: 'ext4')
+    assert CopyEngine(sync=False).copy(plan_jobs([str(source)], str(dest))).skipped == 0
+    os.utime(dest / 'image.iso', ns=(stored, stored))
+    monkeypatch.setattr(core.copyengine, 'filesystem_type', lambda path: 'vfat')
+    assert CopyEngine(sync=False).copy(plan_jobs([str(source)], str(dest))).skipped == 1
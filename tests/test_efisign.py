@@ -0,0 +1,25 @@
+import threading
+
+import core.efisign
+from core.efisign import SIGNED, sign_files
+
+
+def test_cancel_stops_queued_files(tmp_path, monkeypatch):
+    key, cert = tmp_path / 'db.key', tmp_path / 'db.crt'
+    key.write_text('key')
+    cert.write_text('cert')
+    signed = []
+    lock = threading.Lock()
+
+    def sign_one(path, key, cert, ident, cache_dir=None, verify=True):
+        with lock:
+            signed.append(path)
+        return core.efisign.SignResult(path, SIGNED)
+
+    monkeypatch.setattr(core.efisign.shutil, 'which', lambda name: '/usr/bin/' + name)
+    monkeypatch.setattr(core.efisign, 'sign_one', sign_one)
+    paths = [str(tmp_path / f"{i}.efi") for i in range(50)]
+    results = sign_files(paths, str(key), str(cert), jobs=1, cache=False, cancelled=lambda: True)
+    assert 1 <= len(results) < len(paths)
+    assert len(signed) < len(paths)
+    assert all(result.state == SIGNED for result in results)
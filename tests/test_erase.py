@@ -0,0 +1,48 @@
+from core.erase import ALIGNMENT, RESEED_INTERVAL, RandomStream, erase
+from core.verify import verify_pattern
+
+MIB = 1024 * 1024
+
+
+def filled(stream, position, size):
+    data = bytearray(size)
+    stream.fill(memoryview(data), position)
+    return data
+
+
+def test_stream_regenerates_across_a_reseed():
+    stream = RandomStream()
+    around = filled(stream, RESEED_INTERVAL - 4 * MIB, 8 * MIB)
+    assert filled(stream, RESEED_INTERVAL, 4 * MIB) == around[4 * MIB:]
+    assert filled(stream, RESEED_INTERVAL - 4 * MIB, 4 * MIB) == around[:4 * MIB]
+    # Any single block can be regenerated on its own
+    assert filled(stream, RESEED_INTERVAL + 100 * ALIGNMENT, ALIGNMENT) == around[(1024 + 100) * ALIGNMENT:][:ALIGNMENT]
+
+
+def test_every_block_differs():
+    stream = RandomStream()
+    data = filled(stream, 0, 4 * MIB) + filled(stream, RESEED_INTERVAL, 4 * MIB)
+    blocks = {bytes(data[i:i + ALIGNMENT]) for i in range(0, len(data), ALIGNMENT)}
+    assert len(blocks) == len(data) // ALIGNMENT
+
+
+def test_random_erase_verifies(tmp_path):
+    target = tmp_path / 'disk.img'
+    target.write_bytes(b'\x5a' * (8 * MIB + 512))
+    stream = RandomStream()
+    erase(str(target), 'random', chunk_size=MIB, threads=2, sync=False, direct=False, stream=stream)
+    size = target.stat().st_size
+    assert not verify_pattern(str(target), size, 'random', stream, samples=None)
+    assert verify_pattern(str(target), size, 'random', RandomStream(), samples=None)
+
+
+def test_only_a_secure_discard_skips_the_zero_pass(tmp_path, monkeypatch):
+    import core.erase
+    target = tmp_path / 'disk.img'
+    for kind, passes, content in (('secure', ['secure'], b'\x5a'), ('discard', ['discard', 'zero'], b'\0'),
+                                  (None, ['zero'], b'\0')):
+        target.write_bytes(b'\x5a' * MIB)
+        monkeypatch.setattr(core.erase, 'discard', lambda fd, size: kind)
+        assert erase(str(target), 'discard', sync=False, direct=False) == passes
+        # The discard is faked here, so only the zero pass changes the file
+        assert target.read_bytes() == content * MIB
@@ -0,0 +1,60 @@
+import errno
+import socket
+import threading
+
+from core.hotplug import RESCAN, HotplugMonitor, NetlinkEventSource, QueueEventSource
+
+
+class OverflowingSocket:
+    """Socket stand-in that reports an overflow, then one uevent, then nothing."""
+
+    def __init__(self):
+        self.pair = socket.socketpair()
+        self.pair[1].send(b'x')
+        self.replies = [OSError(errno.ENOBUFS, 'No buffer space available'),
+                        b'add@/block/sdz\0ACTION=add\0SUBSYSTEM=block\0DEVNAME=sdz\0DEVTYPE=disk\0',
+                        BlockingIOError()]
+
+    def fileno(self):
+        return self.pair[0].fileno()
+
+    def recv(self, size, flags=0):
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def close(self):
+        for sock in self.pair:
+            sock.close()
+
+
+def test_overflow_becomes_rescan_event():
+    source = NetlinkEventSource()
+    source.sock = OverflowingSocket()
+    try:
+        events = source.read(1)
+    finally:
+        source.close()
+    assert [(event.action, event.name) for event in events] == [(RESCAN, ''), ('add', 'sdz')]
+
+
+def test_monitor_reports_a_failing_source():
+    class BrokenSource(QueueEventSource):
+        def read(self, timeout):
+            raise OSError(errno.EIO, 'Input/output error')
+
+    failed = threading.Event()
+    errors = []
+
+    def on_error(error):
+        errors.append(error)
+        failed.set()
+
+    monitor = HotplugMonitor(lambda event: None, source=BrokenSource(), poll_interval=0.1, on_error=on_error)
+    assert monitor.start()
+    try:
+        assert failed.wait(5)
+    finally:
+        monitor.stop()
+    assert errors[0].errno == errno.EIO
@@ -0,0 +1,141 @@
+import os
+import sys
+
+from core.inventory import SECTOR_SIZE, BlockDevice, DiskInventory, unique_keys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def build_fake_sysfs(root, disks, partitions=2, wwns=()):
+    """Create a fake /sys, udev database and mounts file with USB disks; returns their three roots.
+
+    Disk i is 14.3 GiB with serial 4C5300012345<i:04d> on its USB device,
+    wwns[i] (if given) in udev, and partition 1 mounted at
+    "/media/user/Ventoy <i>". Also used by bench/bench_inventory.py.
+    """
+    class_dir = os.path.join(root, 'sys', 'class', 'block')
+    udev_dir = os.path.join(root, 'udev')
+    os.makedirs(class_dir)
+    os.makedirs(udev_dir)
+    mounts = []
+    for i in range(disks):
+        name = f"sd{chr(ord('a') + i % 26)}{'' if i < 26 else chr(ord('a') + i // 26 - 1)}"
+        usbdev = os.path.join(root, 'sys', 'devices', 'pci0000:00', f"usb{i}", f"{i}-1")
+        devdir = os.path.join(usbdev, f"{i}-1:1.0", f"host{i}", f"target{i}:0:0", f"{i}:0:0:0")
+        diskdir = os.path.join(devdir, 'block', name)
+        os.makedirs(diskdir)
+        with open(os.path.join(usbdev, 'idVendor'), 'w') as f:
+            f.write('0781\n')
+        with open(os.path.join(usbdev, 'serial'), 'w') as f:
+            f.write(f"4C5300012345{i:04d}\n")
+        with open(os.path.join(devdir, 'model'), 'w') as f:
+            f.write('Cruzer Blade    \n')
+        with open(os.path.join(devdir, 'vendor'), 'w') as f:
+            f.write('SanDisk \n')
+        os.symlink(devdir, os.path.join(diskdir, 'device'))
+        for attr, value in (('size', 30031872), ('removable', 1), ('dev', f"8:{i * 16}")):
+            with open(os.path.join(diskdir, attr), 'w') as f:
+                f.write(f"{value}\n")
+        with open(os.path.join(udev_dir, f"b8:{i * 16}"), 'w') as f:
+            f.write('E:ID_MODEL=Cruzer_Blade\n')
+            if i < len(wwns):
+                f.write(f"E:ID_WWN={wwns[i]}\n")
+        os.symlink(os.path.relpath(diskdir, class_dir), os.path.join(class_dir, name))
+        for p in range(1, partitions + 1):
+            pname = f"{name}{p}"
+            pdir = os.path.join(diskdir, pname)
+            os.makedirs(pdir)
+            for attr, value in (('size', 65536), ('start', 2048 * p), ('partition', p),
+                                ('dev', f"8:{i * 16 + p}")):
+                with open(os.path.join(pdir, attr), 'w') as f:
+                    f.write(f"{value}\n")
+            with open(os.path.join(udev_dir, f"b8:{i * 16 + p}"), 'w') as f:
+                f.write(f"E:ID_FS_TYPE=exfat\nE:ID_FS_UUID={i:04X}-{p:04X}\nE:ID_FS_LABEL=Ventoy\n")
+            os.symlink(os.path.relpath(pdir, class_dir), os.path.join(class_dir, pname))
+            if p == 1:
+                mounts.append(f"/dev/{pname} /media/user/Ventoy\\040{i} exfat rw 0 0\n")
+    mounts_path = os.path.join(root, 'mounts')
+    with open(mounts_path, 'w') as f:
+        f.writelines(mounts)
+    return os.path.join(root, 'sys'), udev_dir, mounts_path
+
+
+def scan_fake(tmp_path, disks=2, **kwargs):
+    roots = build_fake_sysfs(str(tmp_path), disks, **kwargs)
+    inventory = DiskInventory(*roots)
+    return inventory, inventory.scan(), roots
+
+
+def test_scan_reads_disks_partitions_and_mounts(tmp_path):
+    _, devices, _ = scan_fake(tmp_path, wwns=['0x5000000000000001'])
+    assert [device.name for device in devices] == ['sda', 'sdb']
+    first, second = devices
+    assert first.size == 30031872 * SECTOR_SIZE and first.removable and first.transport == 'usb'
+    assert (first.vendor, first.model) == ('SanDisk', 'Cruzer Blade')
+    assert first.serial == '4C53000123450000' and second.serial == '4C53000123450001'
+    assert first.wwn == '0x5000000000000001' and second.wwn == ''
+    assert [(p.name, p.number, p.start, p.size) for p in first.partitions] == \
+        [('sda1', 1, 2048 * SECTOR_SIZE, 65536 * SECTOR_SIZE), ('sda2', 2, 4096 * SECTOR_SIZE, 65536 * SECTOR_SIZE)]
+    assert (first.partitions[0].fstype, first.partitions[0].label, first.partitions[0].uuid) == \
+        ('exfat', 'Ventoy', '0000-0001')
+    # "\040" in the mounts file is a space
+    assert first.partitions[0].mountpoint == '/media/user/Ventoy 0' and first.mounted
+    assert second.partitions[0].mountpoint == '/media/user/Ventoy 1'
+    assert first.partitions[1].mountpoint == ''
+    assert first.key == 'wwn:0x5000000000000001'
+    assert second.key == 'serial:SanDisk:Cruzer Blade:4C53000123450001'
+    assert first.to_dict()['size'] == '14.3G'
+
+
+def test_rescan_rereads_only_invalidated_disks(tmp_path):
+    inventory, before, (sys_root, _, _) = scan_fake(tmp_path)
+    assert inventory.scan() == before and all(a is b for a, b in zip(inventory.scan(), before))
+    # A change that leaves the link, the partitions and the udev entries alone shows only after invalidate()
+    with open(os.path.join(sys_root, 'class', 'block', 'sdb', 'size'), 'w') as f:
+        f.write('60063744\n')
+    assert inventory.scan()[1].size == before[1].size
+    inventory.invalidate('sdb2')
+    after = inventory.scan()
+    assert after[0] is before[0]
+    assert after[1].size == 60063744 * SECTOR_SIZE
+
+
+def test_new_partitions_are_picked_up_without_invalidate(tmp_path):
+    inventory, before, (sys_root, _, _) = scan_fake(tmp_path, partitions=1)
+    assert [len(device.partitions) for device in before] == [1, 1]
+    class_dir = os.path.join(sys_root, 'class', 'block')
+    disk_dir = os.path.realpath(os.path.join(class_dir, 'sda'))
+    os.makedirs(os.path.join(disk_dir, 'sda2'))
+    with open(os.path.join(disk_dir, 'sda2', 'partition'), 'w') as f:
+        f.write('2\n')
+    os.symlink(os.path.relpath(os.path.join(disk_dir, 'sda2'), class_dir), os.path.join(class_dir, 'sda2'))
+    after = inventory.scan()
+    assert [p.name for p in after[0].partitions] == ['sda1', 'sda2']
+    assert after[1] is before[1]
+
+
+def twin_sticks():
+    return [BlockDevice(name, model='Cruzer', vendor='SanDisk', serial='0123456789', size=16 * 1024 ** 3,
+                        transport='usb').to_dict() for name in ('sdb', 'sdc')]
+
+
+def test_drives_sharing_a_serial_get_distinct_keys():
+    disks = unique_keys(twin_sticks() + [BlockDevice('sdd', serial='other', transport='usb').to_dict()])
+    assert [disk['key'] for disk in disks] == ['serial:SanDisk:Cruzer:0123456789@sdb',
+                                               'serial:SanDisk:Cruzer:0123456789@sdc',
+                                               'serial:::other']
+
+
+def test_disk_list_keeps_a_row_per_drive():
+    import pytest
+    pytest.importorskip('PySide6')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, ROOT)
+    from main import DiskListModel
+    model = DiskListModel()
+    added, removed = model.update_disks(twin_sticks())
+    assert model.rowCount() == 2 and len(added) == 2 and not removed
+    assert [model.disk(row)['name'] for row in range(2)] == ['sdb', 'sdc']
+    # The same two drives again: nothing moves, both rows stay
+    assert model.update_disks(twin_sticks()) == ([], [])
+    assert model.rowCount() == 2
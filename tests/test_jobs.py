@@ -0,0 +1,205 @@
+import threading
+import time
+
+from core.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, Job, JobEngine
+
+CONTROLLERS = {'sdb': 'usb-a', 'sdc': 'usb-a', 'sdd': 'usb-a', 'sde': 'usb-b', 'sdf': 'usb-b'}
+
+
+def engine_with_events(**kwargs):
+    engine = JobEngine(controller_of=lambda device: CONTROLLERS.get(device, ''), **kwargs)
+    events = []
+    lock = threading.Lock()
+
+    def record(event):
+        with lock:
+            events.append(event)
+    engine.subscribe(record)
+    return engine, events
+
+
+class Tracker:
+    """Work functions that record how many ran at once, per controller and in total."""
+
+    def __init__(self, seconds=0.1):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = []
+        self.peak = 0
+        self.peak_per_controller = {}
+
+    def work(self, device):
+        def work(context):
+            with self.lock:
+                self.running.append(device)
+                self.peak = max(self.peak, len(self.running))
+                for controller in set(CONTROLLERS.values()):
+                    count = sum(CONTROLLERS[d] == controller for d in self.running)
+                    self.peak_per_controller[controller] = max(self.peak_per_controller.get(controller, 0), count)
+                overlapping = self.running.count(device)
+            assert overlapping == 1, f"two jobs on {device} at once"
+            context.sleep(self.seconds)
+            with self.lock:
+                self.running.remove(device)
+        return work
+
+
+def test_limits_per_controller_device_and_total():
+    engine, _ = engine_with_events(max_workers=3, per_controller=2)
+    tracker = Tracker()
+    jobs = [engine.submit(Job('erase', f"/dev/{device}", tracker.work(device)))
+            for device in ('sdb', 'sdc', 'sdd', 'sde', 'sdf', 'sdb')]
+    assert engine.wait(10)
+    assert all(job.state == DONE for job in jobs) and engine.succeeded()
+    assert tracker.peak == 3
+    assert tracker.peak_per_controller == {'usb-a': 2, 'usb-b': 2}
+
+
+def test_waiting_job_does_not_hold_up_the_queue():
+    engine, _ = engine_with_events(max_workers=4, per_controller=1)
+    started = {}
+    release = threading.Event()
+
+    def work(name):
+        def run(context):
+            started[name] = time.monotonic()
+            release.wait(5)
+        return run
+    engine.submit(Job('erase', '/dev/sdb', work('first')))
+    engine.submit(Job('erase', '/dev/sdc', work('same controller')))
+    engine.submit(Job('erase', '/dev/sde', work('other controller')))
+    deadline = time.monotonic() + 5
+    while 'other controller' not in started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert set(started) == {'first', 'other controller'}
+    release.set()
+    assert engine.wait(5)
+    assert set(started) == {'first', 'same controller', 'other controller'}
+
+
+def test_cancel_stops_running_and_drops_queued_jobs():
+    engine, events = engine_with_events(max_workers=1)
+    cleaned = []
+
+    def slow(context):
+        context.defer(lambda: cleaned.append('slow'))
+        while True:
+            context.progress(percent=10)
+            time.sleep(0.01)
+    running = engine.submit(Job('erase', '/dev/sdb', slow))
+    queued = engine.submit(Job('erase', '/dev/sde', lambda context: None))
+    while running.state != RUNNING:
+        time.sleep(0.01)
+    assert queued.state == QUEUED
+    assert set(engine.cancel()) == {running, queued}
+    assert engine.wait(5)
+    assert running.state == CANCELLED and queued.state == CANCELLED
+    assert queued.message == 'Cancelled before it started'
+    assert cleaned == ['slow']
+    assert not engine.succeeded()
+    assert [event['state'] for event in events if event['event'] == 'status' and event['job'] == queued.id] == \
+        [QUEUED, CANCELLED]
+
+
+def test_cancelled_subprocess_is_terminated():
+    engine, _ = engine_with_events()
+    job = engine.submit(Job('install', '/dev/sdb', lambda context: context.run(['sleep', '30'])))
+    while job.state != RUNNING:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    start = time.monotonic()
+    engine.cancel(job.id)
+    assert engine.wait(10)
+    assert job.state == CANCELLED and time.monotonic() - start < 5
+
+
+def test_event_stream():
+    engine, events = engine_with_events()
+
+    def work(context):
+        context.step('Writing')
+        context.progress(50, 100, 'Writing')
+        context.progress(100, 100, 'Writing')
+        context.job.message = 'Written'
+    done = engine.submit(Job('install', '/dev/sdb', work))
+    failed = engine.submit(Job('erase', '/dev/sde', lambda context: 1 / 0))
+    assert engine.wait(5)
+    assert done.state == DONE and done.message == 'Written' and done.percent == 100
+    assert failed.state == FAILED and 'division by zero' in failed.message
+
+    mine = [event for event in events if event['job'] == done.id]
+    statuses = [(event['state'], event['percent']) for event in mine if event['event'] == 'status']
+    assert statuses[0] == (QUEUED, 0) and statuses[1] == (RUNNING, 0) and statuses[-1] == (DONE, 100)
+    assert (RUNNING, 50) in statuses
+    assert {'event': 'log', 'job': done.id, 'target': '/dev/sdb', 'level': 'info',
+            'message': 'Step 1: Writing'} in mine
+    progress = [event for event in mine if event['event'] == 'progress']
+    assert progress[-1] == {'event': 'progress', 'job': done.id, 'target': '/dev/sdb', 'step': 'Writing',
+                            'done': 100, 'total': 100, 'percent': 100}
+
+
+STUB_INSTALLER = r'''#!/bin/bash
+# Stands in for Ventoy2Disk.sh: records its options and writes a marker to the target
+target="${@: -1}"
+echo "options: ${*:1:$#-1}"
+echo "Create partitions on $target"
+printf 'VENTOY-STUB' | dd of="$target" bs=1 seek=512 conv=notrunc status=none
+echo "writing data to disk ..."
+echo "Install Ventoy to $target successfully finished."
+'''
+
+
+def stub_script(tmp_path, body=STUB_INSTALLER):
+    script = tmp_path / 'Ventoy2Disk.sh'
+    script.write_text(body)
+    return str(script)
+
+
+def disk_image(tmp_path):
+    image = tmp_path / 'disk.img'
+    image.write_bytes(bytes(1024 * 1024))
+    return str(image)
+
+
+def run_install(tmp_path, image, **kwargs):
+    from core.jobs import install_job
+    engine, events = engine_with_events()
+    job = engine.submit(install_job(image, user_directories=False, **kwargs))
+    assert engine.wait(30)
+    return job, [event['message'] for event in events if event['event'] == 'log']
+
+
+def test_install_job_runs_the_installer_against_an_image_file(tmp_path):
+    image = disk_image(tmp_path)
+    job, log = run_install(tmp_path, image, use_gpt=True, attach=False, script_path=stub_script(tmp_path))
+    assert job.state == DONE and job.message == 'Installed', log
+    assert 'options: -g -I' in log and f"Create partitions on {image}" in log
+    with open(image, 'rb') as f:
+        f.seek(512)
+        assert f.read(11) == b'VENTOY-STUB'
+
+
+def test_install_job_attaches_and_detaches_image_files(tmp_path):
+    image = disk_image(tmp_path)
+    calls = []
+
+    class Attach:
+        def __init__(self, path):
+            calls.append(('attach', path))
+
+        def __enter__(self):
+            # The "device" is the image itself, so the stub can write to it
+            return image
+
+        def __exit__(self, *exc):
+            calls.append(('detach', image))
+    job, log = run_install(tmp_path, image, attach=Attach, script_path=stub_script(tmp_path))
+    assert job.state == DONE
+    assert calls == [('attach', image), ('detach', image)]
+    assert f"Attached {image} as {image}" in log
+
+
+def test_install_job_fails_without_the_success_line(tmp_path):
+    script = stub_script(tmp_path, STUB_INSTALLER.replace('successfully finished', 'failed'))
+    job, _ = run_install(tmp_path, disk_image(tmp_path), attach=False, script_path=script)
+    assert job.state == FAILED and 'did not report success' in job.message
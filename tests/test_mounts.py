@@ -0,0 +1,122 @@
+import threading
+import time
+
+from core.mounts import MountManager
+
+
+class StubBackend:
+    """Records mounts instead of making them; borrowed maps devices someone else mounted."""
+
+    def __init__(self, borrowed=None, delay=0.0):
+        self.borrowed = dict(borrowed or {})
+        self.delay = delay
+        self.mounted = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def mountpoint(self, device):
+        return self.borrowed.get(device) or self.mounted.get(device)
+
+    def mount(self, device, read_only):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append(('mount', device, read_only))
+            self.mounted[device] = f"/media/{device.rsplit('/', 1)[-1]}"
+            return self.mounted[device]
+
+    def unmount(self, device, path):
+        with self.lock:
+            self.calls.append(('unmount', device, path))
+            del self.mounted[device]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_leases_share_one_mount_until_the_last_is_released():
+    backend, clock = StubBackend(), Clock()
+    manager = MountManager(backend, idle_ttl=None, clock=clock)
+    first = manager.lease('/dev/sdz1')
+    second = manager.lease('/dev/sdz1')
+    assert first.path == second.path == '/media/sdz1'
+    assert manager.mounted() == {'/dev/sdz1': ('/media/sdz1', 2)}
+    first.release()
+    first.release()
+    assert manager.mounted() == {'/dev/sdz1': ('/media/sdz1', 1)}
+    second.release()
+    assert manager.mounted() == {'/dev/sdz1': ('/media/sdz1', 0)}
+    assert backend.calls == [('mount', '/dev/sdz1', True)]
+
+
+def test_idle_mounts_expire_after_the_ttl():
+    backend, clock = StubBackend(), Clock()
+    manager = MountManager(backend, idle_ttl=10.0, clock=clock)
+    with manager.lease('/dev/sdz1'):
+        pass
+    clock.now += 5
+    assert manager.expire() == []
+    # Leased again within the TTL: still the same mount
+    with manager.lease('/dev/sdz1'):
+        clock.now += 20
+        manager.expire()
+        assert '/dev/sdz1' in backend.mounted
+    clock.now += 9.9
+    manager.expire()
+    assert '/dev/sdz1' in backend.mounted
+    clock.now += 0.1
+    manager.expire()
+    assert backend.calls == [('mount', '/dev/sdz1', True), ('unmount', '/dev/sdz1', '/media/sdz1')]
+    assert manager.mounted() == {}
+    manager.close()
+
+
+def test_concurrent_leases_wait_for_one_mount():
+    backend = StubBackend(delay=0.2)
+    manager = MountManager(backend, idle_ttl=None)
+    leases = []
+    threads = [threading.Thread(target=lambda: leases.append(manager.lease('/dev/sdz1'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(leases) == 4 and {lease.path for lease in leases} == {'/media/sdz1'}
+    assert [call[0] for call in backend.calls] == ['mount']
+    assert manager.close() == []
+
+
+def test_borrowed_mounts_are_never_unmounted():
+    backend, clock = StubBackend(borrowed={'/dev/sdz1': '/run/media/user/Ventoy'}), Clock()
+    manager = MountManager(backend, idle_ttl=1.0, clock=clock)
+    with manager.lease('/dev/sdz1', read_only=False) as path:
+        assert path == '/run/media/user/Ventoy'
+    clock.now += 5
+    manager.expire()
+    assert manager.close() == []
+    assert backend.calls == []
+
+
+def test_writer_remounts_an_idle_read_only_mount():
+    backend = StubBackend()
+    manager = MountManager(backend, idle_ttl=None)
+    manager.lease('/dev/sdz1').release()
+    with manager.lease('/dev/sdz1', read_only=False):
+        pass
+    assert backend.calls == [('mount', '/dev/sdz1', True), ('unmount', '/dev/sdz1', '/media/sdz1'),
+                             ('mount', '/dev/sdz1', False)]
+
+
+def test_release_disk_reports_leased_partitions():
+    backend = StubBackend()
+    manager = MountManager(backend, idle_ttl=None)
+    manager.lease('/dev/sdz1').release()
+    held = manager.lease('/dev/sdz2')
+    assert manager.release_disk('sdz') == ['/dev/sdz2']
+    assert '/dev/sdz1' not in backend.mounted
+    held.release()
+    assert manager.release_disk('sdz') == []
+    assert backend.mounted == {}
@@ -0,0 +1,56 @@
+import errno
+import os
+
+import pytest
+
+import core.persistence
+from core.persistence import MB, allocate
+
+
+def no_space(*args):
+    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+
+def test_fill_grows_from_start(tmp_path):
+    image = tmp_path / 'persistence.dat'
+    image.write_bytes(b'\x5a' * MB)
+    assert allocate(str(image), 3 * MB, start=MB, fill=True) == 'fill'
+    data = image.read_bytes()
+    assert data[:MB] == b'\x5a' * MB and data[MB:] == b'\xff' * (2 * MB)
+
+
+def test_failed_fill_truncates_back(tmp_path, monkeypatch):
+    image = tmp_path / 'persistence.dat'
+    image.write_bytes(b'\x5a' * MB)
+    pwrite = os.pwrite
+    writes = []
+
+    def short_of_space(fd, data, offset):
+        # The first buffer lands, then the filesystem runs out
+        if writes:
+            no_space()
+        writes.append(offset)
+        return pwrite(fd, data, offset)
+
+    monkeypatch.setattr(core.persistence, 'BUFFER_SIZE', MB)
+    monkeypatch.setattr(core.persistence, '_fill_buffer', None)
+    monkeypatch.setattr(os, 'pwrite', short_of_space)
+    with pytest.raises(OSError) as e:
+        allocate(str(image), 4 * MB, start=MB, fill=True)
+    assert e.value.errno == errno.ENOSPC and writes == [MB]
+    assert image.read_bytes() == b'\x5a' * MB
+
+
+def test_failed_fallocate_truncates_back(tmp_path, monkeypatch):
+    image = tmp_path / 'persistence.dat'
+    image.write_bytes(b'\x5a' * MB)
+
+    def partial(fd, offset, length):
+        os.ftruncate(fd, offset + length // 2)
+        no_space()
+
+    monkeypatch.setattr(core.persistence, 'can_preallocate', lambda path: True)
+    monkeypatch.setattr(os, 'posix_fallocate', partial)
+    with pytest.raises(OSError):
+        allocate(str(image), 4 * MB, start=MB)
+    assert image.read_bytes() == b'\x5a' * MB
@@ -0,0 +1,59 @@
+import random
+
+from core.planner import (LARGE_CLUSTER, SMALL_CLUSTER, Item, Target, allocated, exfat_usable, plan,
+                          target_for_disk)
+
+GIB = 1024 ** 3
+MIB = 1024 ** 2
+
+
+def synthetic(count, seed):
+    rng = random.Random(seed)
+    return [Item(f"image{i}.iso", rng.randrange(300 * MIB, 7 * GIB)) for i in range(count)]
+
+
+def check_fits(result):
+    for target in result.targets:
+        assert result.used(target) <= target.capacity
+    # Each image is placed once, or left over
+    everything = [item for items in result.assignments.values() for item in items] + result.unplaced
+    assert len({id(item) for item in everything}) == len(everything)
+
+
+def test_every_drive_stays_within_its_capacity():
+    for seed in range(20):
+        targets = [target_for_disk({'name': name, 'size_bytes': size, 'partitions': []})
+                   for name, size in (('sdb', 64 * GIB), ('sdc', 32 * GIB), ('sdd', 16 * GIB))]
+        result = plan(synthetic(40, seed), targets)
+        check_fits(result)
+        assert len(result.unplaced) + sum(len(items) for items in result.assignments.values()) == 40
+
+
+def test_balanced_spreads_evenly_over_mixed_sizes():
+    targets = [Target('sdb', 120 * GIB), Target('sdc', 60 * GIB), Target('sdd', 30 * GIB)]
+    result = plan(synthetic(30, 1), targets, 'balanced')
+    assert result.complete
+    assert result.spread < 0.05
+
+
+def test_auto_falls_back_to_tight_packing():
+    targets = [Target('a', 12 * GIB, cluster_size=SMALL_CLUSTER), Target('b', 8 * GIB, cluster_size=SMALL_CLUSTER)]
+    items = [Item('big.iso', 8 * GIB), Item('one.iso', 6 * GIB), Item('two.iso', 6 * GIB)]
+    assert plan(items, targets, 'balanced').unplaced
+    result = plan(items, targets)
+    assert result.strategy == 'tight' and result.complete
+    assert result.sources('b') == ['big.iso']
+
+
+def test_files_are_rounded_up_to_clusters():
+    target = Target('sdb', 10 * LARGE_CLUSTER)
+    result = plan([Item(f"{i}.cfg", 1) for i in range(11)], [target], 'tight')
+    assert len(result.assignments['sdb']) == 10 and len(result.unplaced) == 1
+    assert allocated(LARGE_CLUSTER + 1, LARGE_CLUSTER) == 2 * LARGE_CLUSTER
+
+
+def test_fresh_drive_capacity_leaves_room_for_the_layout():
+    target = target_for_disk({'name': 'sdb', 'size_bytes': 64 * GIB, 'partitions': []})
+    assert target.cluster_size == LARGE_CLUSTER
+    assert 63 * GIB < target.capacity < 64 * GIB - 32 * MIB
+    assert exfat_usable(target.capacity, LARGE_CLUSTER) < target.capacity
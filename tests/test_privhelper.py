@@ -0,0 +1,94 @@
+import os
+import types
+
+import pytest
+
+from core.privhelper import Helper, HelperError, _Connection, start_helper
+from core.ptable import PartitionTable
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def helper(tmp_path):
+    client = start_helper(str(tmp_path / 'helper.sock'), local=True, idle_timeout=30)
+    yield client
+    client.call('shutdown')
+    client.close()
+
+
+def image(tmp_path, name='disk.img', size=8 * MIB, fill=b'\xab'):
+    path = tmp_path / name
+    path.write_bytes(fill * size)
+    return str(path)
+
+
+def test_ping_reports_local_helper(helper):
+    result = helper.call('ping')
+    assert result['local'] is True
+    assert result['pid'] != os.getpid()
+
+
+def test_quick_erase_round_trip(helper, tmp_path):
+    path = image(tmp_path)
+    table = PartitionTable.create(8 * MIB, 'MBR', [(0x07, 2048, 8192)])
+    table.commit(path, sync=False)
+    result = helper.call('erase', target=path)
+    assert result['cleared']
+    with open(path, 'rb') as f:
+        assert f.read(512)[510:512] == b'\0\0'
+
+
+def test_write_image_round_trip(helper, tmp_path):
+    path = image(tmp_path)
+    source = tmp_path / 'source.img'
+    source.write_bytes(b'ventoy' * 1000)
+    helper.call('write-image', target=path, images=[[str(source), 4, None]])
+    with open(path, 'rb') as f:
+        f.seek(4 * 512)
+        assert f.read(6000) == source.read_bytes()
+
+
+def test_batch_and_events(helper, tmp_path):
+    paths = [image(tmp_path, f"disk{i}.img") for i in range(3)]
+    events = []
+    requests = helper.submit_batch([('erase', {'target': path}, events.append) for path in paths])
+    for request in requests:
+        request.wait()
+    assert all(request.ok for request in requests)
+    targets = {event['target'] for event in events if event.get('event') == 'status'}
+    assert targets == {os.path.realpath(path) for path in paths}
+
+
+def test_refuses_bad_requests(helper, tmp_path):
+    with pytest.raises(HelperError, match='absolute'):
+        helper.call('erase', target='disk.img')
+    with pytest.raises(HelperError, match='unknown argument'):
+        helper.call('erase', target=image(tmp_path), force=True)
+    with pytest.raises(HelperError, match='image files'):
+        helper.call('erase', target='/dev/null')
+
+
+def test_checked_file_is_the_file_written(tmp_path):
+    server = Helper(str(tmp_path / 'unused.sock'), local=True)
+    connection = _Connection(types.SimpleNamespace(), os.getuid(), os.getgid())
+    path = image(tmp_path, fill=b'\x11')
+    checked = server.check_target(path, connection)
+    # Whatever replaces the path after the check, the job writes to the file that was checked
+    original = os.stat(path).st_ino
+    os.replace(image(tmp_path, 'other.img', fill=b'\x22'), path)
+    with open(checked, 'r+b') as f:
+        assert os.fstat(f.fileno()).st_ino == original
+        f.write(b'\x33')
+    with open(path, 'rb') as f:
+        assert f.read(1) == b'\x22'
+    for fd, _ in connection.opened:
+        os.close(fd)
+
+
+def test_mount_refuses_image_files_when_privileged(tmp_path):
+    server = Helper(str(tmp_path / 'unused.sock'))
+    connection = _Connection(types.SimpleNamespace(), os.getuid(), os.getgid())
+    with pytest.raises(PermissionError, match='only mounts drives'):
+        server._mount(connection, image(tmp_path), True)
+    assert connection.opened == []
@@ -0,0 +1,60 @@
+import struct
+
+from core.ptable import BASIC_DATA_GUID, ESP_GUID, GPT_ATTR_NO_AUTOMOUNT, SECTOR_SIZE, PartitionTable
+from core.verify import check_table
+
+MIB = 1024 * 1024
+
+
+def make_gpt_image(path, size=64 * MIB):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    sectors = size // SECTOR_SIZE
+    table = PartitionTable.create(size, 'GPT', [(BASIC_DATA_GUID, 2048, sectors - 2048 - 65536 - 40, 'Ventoy'),
+                                                (ESP_GUID, sectors - 65536 - 34, 65536, 'VTOYEFI')])
+    table.commit(str(path), sync=False)
+    return sectors
+
+
+def backup_header(path, sectors):
+    with open(path, 'rb') as f:
+        f.seek((sectors - 1) * SECTOR_SIZE)
+        return f.read(SECTOR_SIZE)
+
+
+def test_commit_writes_backup_header_fields(tmp_path):
+    path = tmp_path / 'gpt.img'
+    sectors = make_gpt_image(path)
+    table = PartitionTable.load(str(path))
+    table.set_gpt_attributes(2, GPT_ATTR_NO_AUTOMOUNT)
+    table.commit(str(path), sync=False)
+
+    raw = backup_header(path, sectors)
+    assert raw[:8] == b'EFI PART'
+    reserved, my_lba, alternate_lba = struct.unpack_from('<IQQ', raw, 20)
+    entries_lba = struct.unpack_from('<Q', raw, 72)[0]
+    assert (reserved, my_lba, alternate_lba) == (0, sectors - 1, 1)
+    assert entries_lba == sectors - 1 - 32
+    assert check_table(str(path)) == []
+
+
+def test_check_table_reports_broken_backup_header(tmp_path):
+    path = tmp_path / 'gpt.img'
+    sectors = make_gpt_image(path)
+    with open(path, 'r+b') as f:
+        f.seek((sectors - 1) * SECTOR_SIZE + 24)
+        f.write(struct.pack('<Q', 12345))
+    problems = check_table(str(path))
+    assert any('points at LBA 12345' in problem for problem in problems)
+    assert 'backup GPT header CRC mismatch' in problems
+
+
+def test_primary_table_survives_commit(tmp_path):
+    path = tmp_path / 'gpt.img'
+    make_gpt_image(path)
+    table = PartitionTable.load(str(path))
+    table.set_gpt_name(1, 'Data')
+    table.commit(str(path), sync=False)
+    table = PartitionTable.load(str(path))
+    assert table.gpt_crc_ok()
+    assert [part.name for part in table.gpt_partitions()] == ['Data', 'VTOYEFI']
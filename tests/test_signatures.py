@@ -0,0 +1,98 @@
+import os
+import random
+import struct
+
+from core.erase import quick_erase
+from core.ptable import BASIC_DATA_GUID, PART_TABLE_OFFSET, SECTOR_SIZE, PartitionTable
+
+MIB = 1024 * 1024
+DISK_SECTORS = 96 * MIB // SECTOR_SIZE
+EXT_START = 4 * MIB
+EXTENDED_LBA = 36 * MIB // SECTOR_SIZE
+SECOND_EBR_LBA = EXTENDED_LBA + 20480
+MD_MAGIC = struct.pack('<I', 0xa92b4efc)
+
+
+def mbr_entry(ptype, start, sectors):
+    return struct.pack('<B3xB3xII', 0, ptype, start, sectors)
+
+
+def write_at(f, offset, data):
+    f.seek(offset)
+    f.write(data)
+
+
+def ext_superblock():
+    """A 32 MiB ext2 superblock: 1 KiB blocks, 8192 per group, sparse_super, so backups in groups 1 and 3."""
+    sb = bytearray(1024)
+    struct.pack_into('<I', sb, 4, 32 * 1024)
+    struct.pack_into('<III', sb, 20, 1, 0, 0)
+    struct.pack_into('<I', sb, 32, 8192)
+    sb[56:58] = b'\x53\xef'
+    struct.pack_into('<I', sb, 100, 1)
+    return bytes(sb)
+
+
+def build_image(path):
+    """A disk with noise everywhere, a GPT, a hybrid MBR with an EBR chain, ext2 and an md 0.90 superblock.
+
+    Returns {what: offset} of every planted structure.
+    """
+    rng = random.Random(7)
+    with open(path, 'wb') as f:
+        for _ in range(DISK_SECTORS * SECTOR_SIZE // MIB):
+            f.write(rng.getrandbits(8 * MIB).to_bytes(MIB, 'little'))
+    size = DISK_SECTORS * SECTOR_SIZE
+    PartitionTable.create(size, 'GPT', [(BASIC_DATA_GUID, 118784, 16384, 'data')]).commit(path, sync=False)
+    planted = {'MBR': 510, 'primary GPT header': SECTOR_SIZE, 'primary GPT entries': 2 * SECTOR_SIZE,
+               'backup GPT header': size - SECTOR_SIZE, 'backup GPT entries': size - 33 * SECTOR_SIZE}
+    with open(path, 'r+b') as f:
+        # Hybrid MBR: an ext2 primary and an extended partition holding two logicals
+        write_at(f, PART_TABLE_OFFSET, mbr_entry(0x83, EXT_START // SECTOR_SIZE, 65536) +
+                 mbr_entry(0x05, EXTENDED_LBA, 40960) + bytes(32))
+        for ebr_lba, next_start in ((EXTENDED_LBA, SECOND_EBR_LBA - EXTENDED_LBA), (SECOND_EBR_LBA, 0)):
+            write_at(f, ebr_lba * SECTOR_SIZE, bytes(SECTOR_SIZE))
+            write_at(f, ebr_lba * SECTOR_SIZE + PART_TABLE_OFFSET,
+                     mbr_entry(0x83, 2048, 8192) + (mbr_entry(0x05, next_start, 8192) if next_start else bytes(16)))
+            write_at(f, ebr_lba * SECTOR_SIZE + 510, b'\x55\xaa')
+            planted[f"EBR at LBA {ebr_lba}"] = ebr_lba * SECTOR_SIZE + 510
+        # Superblocks of the logicals, which start past the extended partition's 4 MiB head
+        for n, ebr_lba in enumerate((EXTENDED_LBA, SECOND_EBR_LBA)):
+            write_at(f, (ebr_lba + 2048) * SECTOR_SIZE + 1024, ext_superblock())
+            planted[f"logical {n + 5} superblock"] = (ebr_lba + 2048) * SECTOR_SIZE + 1024 + 56
+        write_at(f, EXT_START + 1024, ext_superblock())
+        planted['ext superblock'] = EXT_START + 1024 + 56
+        for group in (1, 3):
+            offset = EXT_START + (1 + group * 8192) * 1024
+            write_at(f, offset, ext_superblock())
+            planted[f"ext backup superblock {group}"] = offset + 56
+        md = (size & ~0xffff) - 0x10000
+        write_at(f, md, MD_MAGIC)
+        planted['md 0.90 superblock'] = md
+    return planted
+
+
+def test_quick_erase_clears_every_structure_and_nothing_else(tmp_path):
+    path = str(tmp_path / 'disk.img')
+    planted = build_image(path)
+    with open(path, 'rb') as f:
+        before = f.read()
+    extents = quick_erase(path, sync=False)
+    with open(path, 'rb') as f:
+        after = f.read()
+    assert len(after) == len(before)
+
+    names = ', '.join(extent.what for extent in extents)
+    for what in ('partition 5', 'partition 6', 'backup GPT header', 'ext backup superblock'):
+        assert what in names
+    for what, offset in planted.items():
+        assert any(e.offset <= offset < e.offset + e.length for e in extents), f"{what} not cleared"
+
+    end = 0
+    for extent in sorted(extents, key=lambda e: e.offset):
+        assert after[end:extent.offset] == before[end:extent.offset], f"bytes before {extent.what} changed"
+        assert after[extent.offset:extent.offset + extent.length] == bytes(extent.length), f"{extent.what} not zero"
+        end = extent.offset + extent.length
+    assert after[end:] == before[end:]
+    # Constant time: only metadata is touched, nowhere near the whole disk
+    assert sum(extent.length for extent in extents) < len(before) // 2
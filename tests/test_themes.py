@@ -0,0 +1,177 @@
+import math
+import struct
+
+import pytest
+
+from core.themes import ExfatReader, ThemeIndex
+
+SECTOR_SHIFT = 9
+CLUSTER_SHIFT = 1
+SECTOR = 1 << SECTOR_SHIFT
+CLUSTER = SECTOR << CLUSTER_SHIFT
+FAT_OFFSET = 24
+HEAP_OFFSET = 64
+CLUSTERS = 96
+
+FRAGMENTED_THEME = ''.join(f"# line {i:04d} of a theme.txt spread over reversed clusters\n" for i in range(60))
+
+
+class Fragmented(dict):
+    """A directory whose children and own clusters are chained out of order"""
+
+
+def _entry_set(name, directory, cluster, size, contiguous, modified):
+    units = name.encode('utf-16-le')
+    names = [units[i:i + 30] for i in range(0, len(units), 30)]
+    primary = bytearray(32)
+    primary[0], primary[1] = 0x85, 1 + len(names)
+    struct.pack_into('<H', primary, 4, 0x10 if directory else 0x20)
+    struct.pack_into('<I', primary, 12, modified)
+    primary[21] = modified % 200
+    stream = bytearray(32)
+    stream[0], stream[1], stream[3] = 0xC0, 0x01 | (0x02 if contiguous else 0), len(name)
+    struct.pack_into('<Q', stream, 8, size)
+    struct.pack_into('<IQ', stream, 20, cluster, size)
+    parts = [bytes(primary), bytes(stream)]
+    for chunk in names:
+        entry = bytearray(32)
+        entry[0] = 0xC1
+        entry[2:2 + len(chunk)] = chunk
+        parts.append(bytes(entry))
+    return b''.join(parts)
+
+
+def build_exfat(path, tree):
+    """Write a small exFAT image holding tree (name: bytes for files, dict for directories).
+
+    Everything is contiguous (NoFatChain) except in Fragmented directories,
+    whose own clusters and files are FAT-chained in reverse order. The root
+    is always chained, as exFAT requires. Checksums and the allocation
+    bitmap are left out: ExfatReader does not read them.
+    """
+    heap = bytearray(CLUSTERS * CLUSTER)
+    fat = [0xFFFFFFF8, 0xFFFFFFFF] + [0] * CLUSTERS
+    next_free = [2]
+    stamp = [0x5A000000]
+
+    def allocate(data, chained, reverse):
+        count = max(1, math.ceil(len(data) / CLUSTER))
+        block = list(range(next_free[0], next_free[0] + count))
+        next_free[0] += count
+        clusters = block[::-1] if reverse else block
+        for i, cluster in enumerate(clusters):
+            chunk = data[i * CLUSTER:(i + 1) * CLUSTER]
+            heap[(cluster - 2) * CLUSTER:(cluster - 2) * CLUSTER + len(chunk)] = chunk
+            if chained:
+                fat[cluster] = clusters[i + 1] if i + 1 < len(clusters) else 0xFFFFFFFF
+        return clusters[0]
+
+    def directory(children):
+        entries = b''
+        for name, value in children.items():
+            stamp[0] += 1
+            data = directory(value) if isinstance(value, dict) else value
+            chained = isinstance(children, Fragmented) or isinstance(value, Fragmented)
+            cluster = allocate(data, chained, chained)
+            entries += _entry_set(name, isinstance(value, dict), cluster, len(data), not chained, stamp[0])
+        # Zero padding to the end of the cluster, which also ends the listing
+        return entries + bytes(CLUSTER - len(entries) % CLUSTER)
+
+    # A volume label and a deleted entry set, which listing must skip
+    label = bytearray(32)
+    label[0], label[1] = 0x83, 6
+    label[2:14] = 'VENTOY'.encode('utf-16-le')
+    deleted = bytearray(_entry_set('Removed', False, 0, 0, True, 1))
+    deleted[0], deleted[32], deleted[64] = 0x05, 0x40, 0x41
+    root = bytes(label) + bytes(deleted) + directory(Fragmented(tree))
+    root_cluster = allocate(root, True, True)
+
+    fat_length = math.ceil(len(fat) * 4 / SECTOR)
+    assert FAT_OFFSET + fat_length <= HEAP_OFFSET and next_free[0] - 2 <= CLUSTERS
+    boot = bytearray(SECTOR)
+    boot[0:3] = b'\xebv\x90'
+    boot[3:11] = b'EXFAT   '
+    volume_sectors = HEAP_OFFSET + CLUSTERS * (CLUSTER // SECTOR)
+    struct.pack_into('<QQIIIIIIHH', boot, 64, 0, volume_sectors, FAT_OFFSET, fat_length, HEAP_OFFSET, CLUSTERS,
+                     root_cluster, 0x1234ABCD, 0x0100, 0)
+    boot[108], boot[109], boot[110] = SECTOR_SHIFT, CLUSTER_SHIFT, 1
+    boot[510:512] = b'\x55\xaa'
+    with open(path, 'wb') as f:
+        f.write(boot)
+        f.seek(FAT_OFFSET * SECTOR)
+        f.write(struct.pack(f"<{len(fat)}I", *fat))
+        f.seek(HEAP_OFFSET * SECTOR)
+        f.write(heap)
+
+
+def ventoy_tree():
+    return {
+        'ventoy': {'ventoy.json': b'{"theme": {"file": "/Themes/Vimix/theme.txt"}}\n'},
+        'Themes': {
+            'Vimix': {'theme.txt': b'title-text: ""\ndesktop-image: "background.png"\n', 'background.png': b'\x89PNG'},
+            'Fragmented': Fragmented({'icons': {}, 'theme.txt': FRAGMENTED_THEME.encode()}),
+            'Stylish Theme With A Long Name é': {'THEME.TXT': b'# long name\n'},
+            'NoConfig': {'readme.md': b'not a theme\n'},
+            'notes.txt': b'a file, not a theme folder\n',
+        },
+        **{f"linux-distribution-{i:02d}.iso": bytes([i]) * 700 for i in range(8)},
+    }
+
+
+def test_lists_directories_and_reads_files(tmp_path):
+    image = tmp_path / 'exfat.img'
+    build_exfat(image, ventoy_tree())
+    with ExfatReader(str(image)) as fs:
+        assert fs.cluster_size == CLUSTER
+        root = fs.listdir(fs.root())
+        # The root spans several reversed clusters; the label and deleted set are skipped
+        assert [e['name'] for e in root] == ['ventoy', 'Themes'] + [f"linux-distribution-{i:02d}.iso" for i in range(8)]
+        iso = root[-1]
+        assert not iso['directory'] and not iso['contiguous'] and iso['size'] == 700
+        assert fs.read(iso) == bytes([7]) * 700
+        themes = fs.lookup(fs.root(), 'THEMES')
+        assert themes['directory'] and not themes['contiguous']
+        names = {e['name']: e for e in fs.listdir(themes)}
+        assert sorted(names) == sorted(ventoy_tree()['Themes'])
+        assert len({e['mtime'] for e in names.values()}) == len(names)
+        vimix = fs.lookup(names['Vimix'], 'theme.txt')
+        assert vimix['contiguous'] and fs.read(vimix).startswith(b'title-text')
+        long_name = names['Stylish Theme With A Long Name é']
+        assert fs.read(fs.lookup(long_name, 'theme.txt')) == b'# long name\n'
+
+
+def test_reads_a_fragmented_file(tmp_path):
+    image = tmp_path / 'exfat.img'
+    build_exfat(image, ventoy_tree())
+    with ExfatReader(str(image)) as fs:
+        fragmented = fs.lookup(fs.lookup(fs.root(), 'Themes'), 'Fragmented')
+        assert not fragmented['contiguous']
+        config = fs.lookup(fragmented, 'theme.txt')
+        assert not config['contiguous'] and config['size'] > 2 * CLUSTER
+        chain = fs._clusters(config['cluster'], config['size'], config['contiguous'])
+        assert chain == sorted(chain, reverse=True) and len(chain) == math.ceil(config['size'] / CLUSTER)
+        assert fs.read(config) == FRAGMENTED_THEME.encode()
+        assert fs.read(config, CLUSTER + 10) == FRAGMENTED_THEME.encode()[:CLUSTER + 10]
+        assert fs.listdir(fs.lookup(fragmented, 'icons')) == []
+
+
+def test_rejects_other_filesystems(tmp_path):
+    image = tmp_path / 'ext.img'
+    image.write_bytes(bytes(4096))
+    with pytest.raises(ValueError, match='not an exFAT'):
+        ExfatReader(str(image))
+
+
+def test_theme_index_reads_exfat_without_mounting(tmp_path):
+    build_exfat(tmp_path / 'sdx1', ventoy_tree())
+    index = ThemeIndex(cache_path=str(tmp_path / 'cache' / 'themes.json'), dev_root=str(tmp_path))
+    disk = {'name': 'sdx', 'partitions': [{'name': 'sdx1', 'fstype': 'exfat', 'uuid': '1234-ABCD'}]}
+    themes = index.scan([disk])
+    assert [t.name for t in themes] == ['Fragmented', 'Stylish Theme With A Long Name é', 'Vimix']
+    assert themes[0].path == '/Themes/Fragmented' and themes[0].partition == 'sdx1'
+    assert themes[0].preview == FRAGMENTED_THEME[:4096]
+    # A second scan is answered from the cache, keyed by the Themes/ entry's timestamp
+    cached = ThemeIndex(cache_path=index.cache_path, dev_root=str(tmp_path))
+    for entry in cached._load()['1234-ABCD']['themes']:
+        entry['preview'] = 'from cache'
+    assert [t.preview for t in cached.scan([disk])] == ['from cache'] * 3